@@ -0,0 +1,195 @@
+"""In-memory prefix index of account names for autocomplete."""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Separates the folded name from the account id in an index key. Control
+# characters are stripped from names and prefixes, so it never matches.
+_SEP = "\x00"
+
+_CONTROL = re.compile(r"[\x00-\x1f]")
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """
+    Normalise text for case-insensitive prefix matching.
+    """
+    return " ".join(_CONTROL.sub(" ", text).split()).casefold()
+
+
+class AccountIndex:
+    """
+    Sorted arrays of folded account names, searched with bisect. Every
+    account has one key for its whole name and one for each later word, so
+    "cash" finds both "Cash at bank" and "Petty cash"; whole-name matches
+    are returned first.
+
+    Updates are applied in place. While the index is being loaded, updates
+    are also recorded and replayed over the loaded snapshot, so a change
+    committed during the load is never lost.
+    """
+
+    def __init__(self):
+        self._accounts: Dict[str, Tuple[str, str]] = {}
+        self._name_keys: List[str] = []
+        self._word_keys: List[str] = []
+        self._pending: Optional[List[Tuple[str, Tuple[Any, ...]]]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._generation = 0
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        """
+        Return the number of indexed accounts.
+        """
+        return len(self._accounts)
+
+    def stale(self, max_age: float = 0) -> bool:
+        """
+        Whether the index must be (re)loaded: it never was, it was
+        invalidated, or it is older than max_age seconds (0 for no limit).
+        """
+        loaded_at = self.loaded_at
+        return loaded_at is None or (
+            max_age > 0 and time.monotonic() - loaded_at > max_age
+        )
+
+    def ensure(
+        self,
+        load_rows: Callable[[], Iterable[Tuple[Any, str, str]]],
+        max_age: float = 0,
+    ) -> None:
+        """
+        Load the index from (id, name, type) rows if it is stale. Concurrent
+        callers wait for a single load.
+        """
+        if not self.stale(max_age):
+            return
+        with self._load_lock:
+            if not self.stale(max_age):
+                return
+            with self._lock:
+                self._pending = []
+                generation = self._generation
+            try:
+                rows = list(load_rows())
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+            self.load(rows)
+            if self._generation != generation:
+                # Invalidated while loading: the snapshot may miss changes
+                self.loaded_at = None
+
+    def load(self, rows: Iterable[Tuple[Any, str, str]]) -> None:
+        """
+        Replace the contents with (id, name, type) rows, then replay the
+        updates received since loading started.
+        """
+        accounts = {str(account_id): (name, type_) for account_id, name, type_ in rows}
+        name_keys, word_keys = [], []
+        for account_id, (name, _) in accounts.items():
+            whole, words = self._keys(account_id, name)
+            name_keys.append(whole)
+            word_keys.extend(words)
+        name_keys.sort()
+        word_keys.sort()
+        with self._lock:
+            self._accounts = accounts
+            self._name_keys = name_keys
+            self._word_keys = word_keys
+            pending, self._pending = self._pending or [], None
+            for operation, args in pending:
+                getattr(self, operation)(*args)
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """
+        Mark the index stale, so the next ensure() reloads it.
+        """
+        self._generation += 1
+        self.loaded_at = None
+
+    def upsert(self, account_id: Any, name: str, account_type: str) -> None:
+        """
+        Add an account or update its name and type.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("_upsert", (str(account_id), name, account_type)))
+            self._upsert(str(account_id), name, account_type)
+
+    def remove(self, account_id: Any) -> None:
+        """
+        Drop an account from the index.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(("_discard", (str(account_id),)))
+            self._discard(str(account_id))
+
+    def suggest(
+        self, prefix: str, limit: int = 10, account_type: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Return up to limit accounts with a name, or a word of the name,
+        starting with prefix (case-insensitive), optionally of one type.
+        """
+        folded = fold(prefix)
+        seen: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for keys in (self._name_keys, self._word_keys):
+                i = bisect_left(keys, folded)
+                while i < len(keys) and len(seen) < limit:
+                    key = keys[i]
+                    if not key.startswith(folded):
+                        break
+                    account_id = key.rsplit(_SEP, 1)[1]
+                    name, type_ = self._accounts[account_id]
+                    if account_id not in seen and (
+                        account_type is None or type_ == account_type
+                    ):
+                        seen[account_id] = {
+                            "id": account_id,
+                            "name": name,
+                            "type": type_,
+                        }
+                    i += 1
+        return list(seen.values())
+
+    @staticmethod
+    def _keys(account_id: str, name: str) -> Tuple[str, List[str]]:
+        folded = fold(name)
+        words = [
+            f"{folded[match.start():]}{_SEP}{account_id}"
+            for match in _WORD.finditer(folded)
+            if match.start() > 0
+        ]
+        return f"{folded}{_SEP}{account_id}", words
+
+    # Callers hold self._lock
+
+    def _upsert(self, account_id: str, name: str, account_type: str) -> None:
+        self._discard(account_id)
+        self._accounts[account_id] = (name, account_type)
+        whole, words = self._keys(account_id, name)
+        insort(self._name_keys, whole)
+        for key in words:
+            insort(self._word_keys, key)
+
+    def _discard(self, account_id: str) -> None:
+        current = self._accounts.pop(account_id, None)
+        if current is None:
+            return
+        whole, words = self._keys(account_id, current[0])
+        for keys, key in [(self._name_keys, whole)] + [
+            (self._word_keys, word) for word in words
+        ]:
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
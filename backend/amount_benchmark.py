@@ -0,0 +1,191 @@
+"""
+Compare DECIMAL(19,4) amounts with BIGINT minor units (AMOUNT_STORAGE).
+
+The same generated ledger is loaded into two temporary tables, one per
+storage, on a single connection to the database of DATABASE_URL, so both run
+on the same server and cache. Each workload is a query shape the reports or
+postings depend on:
+
+    trial_balance   SUM per account over every row
+    profit_loss     monthly sums of two account groups
+    balance_update  add an amount to every balance row
+    load_amounts    fetch amounts into Decimals through the column type
+
+Nothing outside the temporary tables is read or written. To compare the
+application end to end, run posting_benchmark.py and the reports against a
+database migrated with 010_minor_unit_amounts.sql and one that is not.
+
+Usage:
+    python amount_benchmark.py                      # 500000 rows, 10 repeats
+    python amount_benchmark.py --rows 2000000 --repeat 20 --json results.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+from driver_benchmark import summarize
+
+STORAGES = {"numeric": "DECIMAL(19, 4)", "minor_units": "BIGINT"}
+
+# Minor units are scaled back to DECIMAL(19,4) for the numeric table, so
+# both hold the same amounts
+SETUP = """
+    CREATE TEMP TABLE amount_bench_{storage} AS
+    SELECT
+        g % :accounts AS account,
+        DATE '2015-01-01' + (g % 3650) AS day,
+        CAST(CASE WHEN :minor THEN a ELSE a / 10000.0 END AS {type}) AS amount
+    FROM (
+        SELECT g, 1 + (hashint8(g) & 1073741823) % 100000000 AS a
+        FROM generate_series(1, :rows) g
+    ) s;
+    CREATE TEMP TABLE amount_bench_{storage}_balances AS
+    SELECT account, CAST(0 AS {type}) AS balance
+    FROM generate_series(0, :accounts - 1) account;
+    ANALYZE amount_bench_{storage};
+    ANALYZE amount_bench_{storage}_balances
+"""
+
+WORKLOADS = {
+    "trial_balance": (
+        "SELECT account, SUM(amount) FROM amount_bench_{storage} GROUP BY account"
+    ),
+    "profit_loss": (
+        "SELECT date_trunc('month', day) AS month,"
+        " SUM(amount) FILTER (WHERE account % 2 = 0) AS income,"
+        " SUM(amount) FILTER (WHERE account % 2 = 1) AS expenses"
+        " FROM amount_bench_{storage} GROUP BY 1"
+    ),
+    "balance_update": (
+        "UPDATE amount_bench_{storage}_balances SET balance = balance + :amount"
+    ),
+}
+
+
+def setup(connection, rows: int, accounts: int) -> None:
+    """
+    Create and fill the temporary tables of both storages.
+    """
+    from sqlalchemy import text
+
+    for storage, column_type in STORAGES.items():
+        for statement in SETUP.format(storage=storage, type=column_type).split(";"):
+            connection.execute(
+                text(statement),
+                {"rows": rows, "accounts": accounts, "minor": storage != "numeric"},
+            )
+
+
+def time_alternating(calls: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """
+    Call each function once to warm up, then repeat times in turn, so drift
+    in the server's load affects every storage alike. Returns timings per
+    storage.
+    """
+    samples: Dict[str, List[float]] = {storage: [] for storage in calls}
+    for fn in calls.values():
+        fn()
+    for _ in range(repeat):
+        for storage, fn in calls.items():
+            started = time.perf_counter()
+            fn()
+            samples[storage].append(time.perf_counter() - started)
+    return {storage: summarize(timings) for storage, timings in samples.items()}
+
+
+def workload_calls(connection, name: str, load_rows: int) -> Dict[str, Any]:
+    """
+    Return a function per storage running the named workload.
+    """
+    from decimal import Decimal
+
+    from sqlalchemy import column, select, table, text
+
+    from app import db
+    from money import MinorUnits
+
+    calls = {}
+    for storage in STORAGES:
+        minor = storage == "minor_units"
+        if name == "load_amounts":
+            amount_type = MinorUnits() if minor else db.Numeric(19, 4)
+            statement = (
+                select(column("amount", amount_type))
+                .select_from(table(f"amount_bench_{storage}"))
+                .limit(load_rows)
+            )
+            calls[storage] = lambda statement=statement: sum(
+                connection.execute(statement).scalars(), Decimal(0)
+            )
+        else:
+            statement = text(WORKLOADS[name].format(storage=storage))
+            params = {"amount": 10000 if minor else Decimal("1.0000")}
+            calls[storage] = lambda statement=statement, params=params: (
+                connection.execute(statement, params)
+            )
+    return calls
+
+
+def run(rows: int, accounts: int, repeat: int, load_rows: int) -> Dict[str, Any]:
+    """
+    Build the tables and time both storages. Returns results per workload
+    and storage.
+    """
+    from app import app, db
+
+    with app.app_context(), db.engine.connect() as connection:
+        setup(connection, rows, accounts)
+        results = {
+            name: time_alternating(workload_calls(connection, name, load_rows), repeat)
+            for name in [*WORKLOADS, "load_amounts"]
+        }
+        connection.rollback()
+    return results
+
+
+def report(results: Dict[str, Any]) -> str:
+    """
+    Format a table with the median of each workload per storage.
+    """
+    lines = [f"{'workload':16}{'numeric ms':>12}{'minor ms':>12}{'speedup':>10}"]
+    for name, r in results.items():
+        numeric, minor = r["numeric"]["p50_ms"], r["minor_units"]["p50_ms"]
+        speedup = numeric / minor if minor else 0.0
+        lines.append(f"{name:16}{numeric:>12.3f}{minor:>12.3f}{speedup:>9.2f}x")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare DECIMAL and minor-unit amount storage."
+    )
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--load-rows", type=int, default=100000, help="Rows fetched by load_amounts"
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """
+    Run the benchmark and print the comparison.
+    """
+    args = parse_args(argv)
+    results = run(args.rows, args.accounts, args.repeat, args.load_rows)
+    print(report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
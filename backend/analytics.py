@@ -0,0 +1,345 @@
+"""Columnar in-memory copy of the ledger, reported on with NumPy."""
+import json
+import os
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+
+# Amounts are held as integer minor units at the scale of DECIMAL(19,4)
+SCALE = 10_000
+
+ROW = np.dtype(
+    [
+        ("day", "<i4"),  # date.toordinal()
+        ("account", "<i4"),
+        ("contra", "<i4"),
+        ("amount", "<i8"),
+        ("void", "?"),
+        ("id_hi", "<u8"),
+        ("id_lo", "<u8"),
+    ]
+)
+
+_LOW = (1 << 64) - 1
+
+
+def to_minor(amount: Any) -> int:
+    """
+    Convert an amount to integer minor units.
+    """
+    return int((Decimal(amount) * SCALE).to_integral_value())
+
+
+def from_minor(value: Any) -> Decimal:
+    """
+    Convert integer minor units back to a Decimal amount.
+    """
+    return Decimal(int(value)).scaleb(-4)
+
+
+def _split_id(value: Any) -> Tuple[int, int]:
+    number = UUID(str(value)).int
+    return number >> 64, number & _LOW
+
+
+def month_starts(start: date, end: date) -> List[date]:
+    """
+    Return the first day of every month overlapping start..end, the first
+    one clipped to start.
+    """
+    starts = [start]
+    day = start.replace(day=1)
+    while True:
+        day = (day + timedelta(days=32)).replace(day=1)
+        if day > end:
+            return starts
+        starts.append(day)
+
+
+class LedgerColumns:
+    """
+    The ledger as one structured NumPy array with a row per transaction,
+    sorted by date: day ordinal, account and contra account indexes, amount
+    in minor units, void flag and id. Accounts are numbered in the order
+    they are added, with their names, types and opening balances alongside.
+
+    Reports are vectorized: searchsorted finds the rows of a date range and
+    bincount sums amounts per account or per period. bincount adds in
+    float64, which is exact while a sum stays below 2**53 minor units.
+
+    position is the change feed position the copy is current to; it is
+    stored with the snapshot and is not interpreted here.
+    """
+
+    def __init__(self):
+        self._rows = np.empty(0, ROW)
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._types = np.empty(0, "<U9")
+        self._opening = np.empty(0, np.int64)
+        self._lock = threading.Lock()
+        self.position: Any = None
+
+    def __len__(self) -> int:
+        """
+        Return the number of transactions held.
+        """
+        return len(self._rows)
+
+    def has_account(self, account_id: Any) -> bool:
+        return str(account_id) in self._index
+
+    # Loading
+
+    def add_accounts(self, accounts: Iterable[Tuple[Any, str, str, Any]]) -> None:
+        """
+        Add (id, name, type, opening_balance) accounts, or update the ones
+        already held.
+        """
+        with self._lock:
+            types = list(self._types)
+            opening = list(self._opening)
+            for account_id, name, account_type, opening_balance in accounts:
+                key = str(account_id)
+                i = self._index.get(key)
+                if i is None:
+                    i = self._index[key] = len(self._ids)
+                    self._ids.append(key)
+                    self._names.append(name)
+                    types.append(account_type)
+                    opening.append(to_minor(opening_balance))
+                else:
+                    self._names[i] = name
+                    types[i] = account_type
+                    opening[i] = to_minor(opening_balance)
+            self._types = np.array(types, "<U9")
+            self._opening = np.array(opening, np.int64)
+
+    def add_transactions(
+        self, transactions: Iterable[Tuple[Any, Any, Any, date, Any, bool]]
+    ) -> int:
+        """
+        Add (id, account_id, contra_account_id, transaction_date, amount,
+        is_void) transactions, skipping ids already held. Their accounts
+        must have been added. Returns the number added.
+        """
+        with self._lock:
+            new = np.fromiter(
+                (
+                    (
+                        day.toordinal(),
+                        self._index[str(account_id)],
+                        self._index[str(contra_id)],
+                        to_minor(amount),
+                        bool(is_void),
+                        *_split_id(transaction_id),
+                    )
+                    for transaction_id, account_id, contra_id, day, amount, is_void in (
+                        transactions
+                    )
+                ),
+                ROW,
+            )
+            if len(new) and len(self._rows):
+                held = self._find(new["id_hi"], new["id_lo"])
+                new = new[held < 0]
+            if not len(new):
+                return 0
+            rows = np.concatenate([self._rows, new])
+            if len(self._rows) and new["day"].min() < self._rows["day"][-1]:
+                rows = rows[np.argsort(rows["day"], kind="stable")]
+            elif len(new) > 1:
+                order = np.argsort(new["day"], kind="stable")
+                rows[len(self._rows) :] = new[order]
+            self._rows = rows
+            return len(new)
+
+    def void(self, transaction_ids: Iterable[Any]) -> int:
+        """
+        Flag transactions as void. Returns the number found.
+        """
+        ids = [_split_id(transaction_id) for transaction_id in transaction_ids]
+        if not ids:
+            return 0
+        with self._lock:
+            found = self._find(
+                np.array([hi for hi, _ in ids], np.uint64),
+                np.array([lo for _, lo in ids], np.uint64),
+            )
+            found = found[found >= 0]
+            if len(found):
+                if not self._rows.flags.writeable:
+                    self._rows = self._rows.copy()
+                self._rows["void"][found] = True
+            return len(found)
+
+    def _find(self, hi: np.ndarray, lo: np.ndarray) -> np.ndarray:
+        # Row of each id, -1 when not held; callers hold self._lock
+        found = np.full(len(hi), -1, np.int64)
+        candidates = np.flatnonzero(np.isin(self._rows["id_hi"], hi))
+        if len(candidates):
+            wanted = {key: i for i, key in enumerate(zip(hi.tolist(), lo.tolist()))}
+            for row in candidates.tolist():
+                key = (int(self._rows["id_hi"][row]), int(self._rows["id_lo"][row]))
+                if key in wanted:
+                    found[wanted[key]] = row
+        return found
+
+    # Snapshots
+
+    def save(self, path: str) -> None:
+        """
+        Write the rows to path as a .npy file that can be memory-mapped,
+        with the accounts and position in a JSON file next to it.
+        """
+        with self._lock:
+            rows = self._rows
+            meta = {
+                "rows": len(rows),
+                "position": self.position,
+                "accounts": [
+                    [account_id, name, account_type, int(opening)]
+                    for account_id, name, account_type, opening in zip(
+                        self._ids, self._names, self._types.tolist(), self._opening
+                    )
+                ],
+            }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as fh:
+            np.save(fh, rows)
+        with open(f"{path}.json.tmp", "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.replace(f"{path}.tmp", path)
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    @classmethod
+    def open(cls, path: str) -> Optional["LedgerColumns"]:
+        """
+        Map a snapshot written by save(). Pages are read on first use and
+        copied only when a void is applied. Returns None when there is no
+        complete snapshot at path.
+        """
+        try:
+            with open(f"{path}.json", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            rows = np.load(path, mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+        if rows.dtype != ROW or len(rows) != meta["rows"]:
+            return None
+        columns = cls()
+        columns.add_accounts(
+            (account_id, name, account_type, from_minor(opening))
+            for account_id, name, account_type, opening in meta["accounts"]
+        )
+        columns._rows = rows
+        columns.position = meta["position"]
+        return columns
+
+    # Reports
+
+    def _slice(self, start: Optional[date], end: Optional[date]) -> np.ndarray:
+        days = self._rows["day"]
+        lo = 0 if start is None else np.searchsorted(days, start.toordinal(), "left")
+        hi = (
+            len(days)
+            if end is None
+            else np.searchsorted(days, end.toordinal(), "right")
+        )
+        rows = self._rows[lo:hi]
+        return rows[~rows["void"]]
+
+    def _per_account(self, rows: np.ndarray, side: str) -> np.ndarray:
+        sums = np.bincount(rows[side], weights=rows["amount"], minlength=len(self._ids))
+        return np.rint(sums).astype(np.int64)
+
+    def balances(self, day: date) -> Dict[str, Decimal]:
+        """
+        Return every account's balance at the end of day.
+        """
+        with self._lock:
+            rows = self._slice(None, day)
+            balances = (
+                self._opening
+                + self._per_account(rows, "account")
+                - self._per_account(rows, "contra")
+            )
+            return {
+                account_id: from_minor(balance)
+                for account_id, balance in zip(self._ids, balances.tolist())
+            }
+
+    def account_totals(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Return per account: opening balance at the start of start, debits
+        (account side) and credits (contra side) within start..end and the
+        closing balance at the end of end.
+        """
+        with self._lock:
+            before = self._slice(None, start - timedelta(days=1))
+            opening = (
+                self._opening
+                + self._per_account(before, "account")
+                - self._per_account(before, "contra")
+            )
+            rows = self._slice(start, end)
+            debits = self._per_account(rows, "account")
+            credits = self._per_account(rows, "contra")
+            closing = opening + debits - credits
+            return [
+                {
+                    "account_id": account_id,
+                    "name": name,
+                    "type": account_type,
+                    "opening_balance": from_minor(o),
+                    "debits": from_minor(d),
+                    "credits": from_minor(c),
+                    "closing_balance": from_minor(b),
+                }
+                for account_id, name, account_type, o, d, c, b in zip(
+                    self._ids,
+                    self._names,
+                    self._types.tolist(),
+                    opening.tolist(),
+                    debits.tolist(),
+                    credits.tolist(),
+                    closing.tolist(),
+                )
+            ]
+
+    def profit_loss(
+        self, start: date, end: date, periods: Optional[List[date]] = None
+    ) -> Tuple[Decimal, Decimal, List[Tuple[Decimal, Decimal]]]:
+        """
+        Return income (account side of INCOME accounts) and expenses (contra
+        side of EXPENSE accounts) within start..end, and the same split into
+        the periods starting at each of periods.
+        """
+        with self._lock:
+            rows = self._slice(start, end)
+            income = rows[(self._types == "INCOME")[rows["account"]]]
+            expenses = rows[(self._types == "EXPENSE")[rows["contra"]]]
+            edges = np.array([day.toordinal() for day in periods or [start]], np.int32)
+
+            def per_period(side: np.ndarray) -> np.ndarray:
+                period = np.searchsorted(edges, side["day"], "right") - 1
+                sums = np.bincount(period, weights=side["amount"], minlength=len(edges))
+                return np.rint(sums).astype(np.int64)
+
+            income_by_period = per_period(income)
+            expenses_by_period = per_period(expenses)
+        return (
+            from_minor(income_by_period.sum()),
+            from_minor(expenses_by_period.sum()),
+            [
+                (from_minor(i), from_minor(e))
+                for i, e in zip(income_by_period.tolist(), expenses_by_period.tolist())
+            ]
+            if periods
+            else [],
+        )
@@ -1,24 +1,79 @@
 """Flask application for accounting system API."""
+import atexit
+import csv
+import json
 import logging
+import multiprocessing
 import os
-from datetime import date, datetime, timedelta
+import random
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from functools import wraps
 from logging.config import dictConfig
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
 
+import click
 import jwt
 from dotenv import load_dotenv
-from flask import Flask, jsonify, request
+from flask import (
+    Flask,
+    Response,
+    g,
+    has_request_context,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+)
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from itsdangerous import BadSignature, URLSafeSerializer
 from jwt.exceptions import InvalidTokenError
 from pydantic import BaseModel, Field, ValidationError, validator
-from sqlalchemy import and_, func, or_, select
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy import (
+    REAL,
+    and_,
+    bindparam,
+    case,
+    cast,
+    delete,
+    event,
+    false,
+    func,
+    insert,
+    inspect,
+    literal,
+    literal_column,
+    or_,
+    select,
+    text,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import aliased, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from werkzeug.security import check_password_hash, generate_password_hash
 
+from account_index import AccountIndex
+from analytics import LedgerColumns, month_starts
+from audit import AuditWriter
+from events import RESET, EventHub, EventPublisher, format_sse
+from group_commit import GroupCommitter
+from money import MAX_AMOUNT as MAX_MINOR_UNIT_AMOUNT
+from money import MINOR_UNITS, AmountOutOfRange, MinorUnits
+
 load_dotenv()  # Load .env file
 
 # Application setup
@@ -28,14 +83,119 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = os.environ["SECRET_KEY"]
 app.config["JWT_ALGORITHM"] = os.environ.get("JWT_ALGORITHM", "HS256")
 app.config["TOKEN_EXPIRES_SECONDS"] = int(os.environ.get("TOKEN_EXPIRES_SECONDS", 3600))
+app.config["AUDIT_ENABLED"] = os.environ.get("AUDIT_ENABLED", "true").lower() == "true"
+app.config["AUDIT_SPOOL_PATH"] = os.environ.get(
+    "AUDIT_SPOOL_PATH", os.path.join(app.instance_path, "audit_spool.jsonl")
+)
+app.config["AUDIT_BATCH_SIZE"] = int(os.environ.get("AUDIT_BATCH_SIZE", 500))
+app.config["AUDIT_FLUSH_INTERVAL"] = float(os.environ.get("AUDIT_FLUSH_INTERVAL", 1.0))
+app.config["RECONCILIATION_WORKERS"] = int(os.environ.get("RECONCILIATION_WORKERS", 4))
+app.config["RECONCILIATION_OVERLAP_SECONDS"] = int(
+    os.environ.get("RECONCILIATION_OVERLAP_SECONDS", 300)
+)
+app.config["PARTITION_GRANULARITY"] = os.environ.get("PARTITION_GRANULARITY", "month")
+app.config["PARTITION_MONTHS_AHEAD"] = int(os.environ.get("PARTITION_MONTHS_AHEAD", 3))
+app.config["PARTITION_MAINTENANCE_INTERVAL"] = int(
+    os.environ.get("PARTITION_MAINTENANCE_INTERVAL", 6 * 3600)
+)
+app.config["AMOUNT_STORAGE"] = os.environ.get("AMOUNT_STORAGE", "numeric").lower()
+app.config["POSTING_FUNCTION_ENABLED"] = (
+    os.environ.get("POSTING_FUNCTION_ENABLED", "true").lower() == "true"
+)
+app.config["WRITE_ISOLATION_LEVEL"] = os.environ.get(
+    "WRITE_ISOLATION_LEVEL", "READ COMMITTED"
+).upper()
+app.config["WRITE_RETRY_ATTEMPTS"] = int(os.environ.get("WRITE_RETRY_ATTEMPTS", 5))
+app.config["WRITE_RETRY_BASE_DELAY_MS"] = float(
+    os.environ.get("WRITE_RETRY_BASE_DELAY_MS", 5.0)
+)
+app.config["WRITE_RETRY_MAX_DELAY_MS"] = float(
+    os.environ.get("WRITE_RETRY_MAX_DELAY_MS", 250.0)
+)
+app.config["REQUEST_TIMEOUT_MS"] = int(os.environ.get("REQUEST_TIMEOUT_MS", 10000))
+app.config["REQUEST_TIMEOUTS"] = {
+    endpoint.strip(): int(ms)
+    for endpoint, _, ms in (
+        item.partition("=")
+        for item in os.environ.get("REQUEST_TIMEOUTS", "").split(",")
+        if item.strip()
+    )
+}
+app.config["GROUP_COMMIT_ENABLED"] = (
+    os.environ.get("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+)
+app.config["GROUP_COMMIT_MAX_BATCH"] = int(os.environ.get("GROUP_COMMIT_MAX_BATCH", 32))
+app.config["GROUP_COMMIT_MAX_WAIT_MS"] = float(
+    os.environ.get("GROUP_COMMIT_MAX_WAIT_MS", 2.0)
+)
+app.config["PSYCOPG_PREPARE_THRESHOLD"] = int(
+    os.environ.get("PSYCOPG_PREPARE_THRESHOLD", 5)
+)
+app.config["PSYCOPG_PIPELINE"] = (
+    os.environ.get("PSYCOPG_PIPELINE", "true").lower() == "true"
+)
+app.config["LEDGER_PAGE_SIZE"] = int(os.environ.get("LEDGER_PAGE_SIZE", 1000))
+app.config["DASHBOARD_WORKERS"] = int(os.environ.get("DASHBOARD_WORKERS", 8))
+app.config["DASHBOARD_QUERY_TIMEOUT"] = float(
+    os.environ.get("DASHBOARD_QUERY_TIMEOUT", 2.0)
+)
+app.config["EVENTS_ENABLED"] = (
+    os.environ.get("EVENTS_ENABLED", "true").lower() == "true"
+)
+app.config["EVENTS_HEARTBEAT_INTERVAL"] = float(
+    os.environ.get("EVENTS_HEARTBEAT_INTERVAL", 15.0)
+)
+app.config["EVENTS_BUFFER_SIZE"] = int(os.environ.get("EVENTS_BUFFER_SIZE", 1000))
+app.config["EVENTS_QUEUE_SIZE"] = int(os.environ.get("EVENTS_QUEUE_SIZE", 256))
+app.config["ACCOUNT_INDEX_MAX_AGE"] = float(
+    os.environ.get("ACCOUNT_INDEX_MAX_AGE", 300.0)
+)
+app.config["ANALYTICS_ENABLED"] = (
+    os.environ.get("ANALYTICS_ENABLED", "false").lower() == "true"
+)
+app.config["ANALYTICS_SNAPSHOT_PATH"] = os.environ.get(
+    "ANALYTICS_SNAPSHOT_PATH",
+    os.path.join(app.instance_path, "analytics", "ledger.npy"),
+)
+app.config["ANALYTICS_REFRESH_INTERVAL"] = float(
+    os.environ.get("ANALYTICS_REFRESH_INTERVAL", 1.0)
+)
+app.config["JOB_RESULT_DIR"] = os.environ.get(
+    "JOB_RESULT_DIR", os.path.join(app.instance_path, "jobs")
+)
+app.config["JOB_RESULT_TTL_HOURS"] = int(os.environ.get("JOB_RESULT_TTL_HOURS", 24))
+app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+app.config["JOB_RETRY_DELAY"] = int(os.environ.get("JOB_RETRY_DELAY", 30))
+app.config["JOB_POLL_INTERVAL"] = float(os.environ.get("JOB_POLL_INTERVAL", 2.0))
+app.config["JOB_HEARTBEAT_INTERVAL"] = float(
+    os.environ.get("JOB_HEARTBEAT_INTERVAL", 10.0)
+)
+app.config["JOB_STALE_SECONDS"] = int(os.environ.get("JOB_STALE_SECONDS", 120))
+app.config["JOB_MAINTENANCE_INTERVAL"] = int(
+    os.environ.get("JOB_MAINTENANCE_INTERVAL", 300)
+)
+
+# With the psycopg (3) driver, a statement run more than the threshold number
+# of times on a connection is prepared server side and reused. A negative
+# threshold disables preparing, which PgBouncer in transaction mode needs.
+if make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_driver_name() == "psycopg":
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "connect_args": {
+            "prepare_threshold": app.config["PSYCOPG_PREPARE_THRESHOLD"]
+            if app.config["PSYCOPG_PREPARE_THRESHOLD"] >= 0
+            else None
+        }
+    }
 
 # CORS setup (restrict origins as needed)
 # CORS(app, resources={r"/api/*": {"origins": os.environ.get('CORS_ORIGINS', '*')}},
 #      supports_credentials=True)
 CORS(app, origins="*", supports_credentials=True)
 
-# Database setup
-db = SQLAlchemy(app)
+# Database setup. Objects keep their state after commit so responses are
+# built without reloading what the write just returned.
+db = SQLAlchemy(app, session_options={"expire_on_commit": False})
 
 # Configure logging for the application
 dictConfig(
@@ -61,6 +221,20 @@ dictConfig(
 logger = logging.getLogger(__name__)
 
 
+# Amount columns are DECIMAL(19,4), or BIGINT minor units with
+# AMOUNT_STORAGE=minor_units once migration 010 has been applied. Both load
+# and bind as Decimal; MAX_AMOUNT is the largest amount either can hold.
+# AMOUNT_SCALE turns an amount into its stored value in hand-written SQL.
+if app.config["AMOUNT_STORAGE"] == "minor_units":
+    AMOUNT = MinorUnits()
+    AMOUNT_SCALE = MINOR_UNITS
+    MAX_AMOUNT = MAX_MINOR_UNIT_AMOUNT
+else:
+    AMOUNT = db.Numeric(19, 4)
+    AMOUNT_SCALE = 1
+    MAX_AMOUNT = Decimal("999999999999999.9999")
+
+
 # Database Models
 class Account(db.Model):  # type: ignore
     """
@@ -69,6 +243,8 @@ class Account(db.Model):  # type: ignore
 
     __tablename__ = "accounts"
     __table_args__ = {"schema": "accounting"}
+    # Fetch server-generated columns with INSERT/UPDATE ... RETURNING
+    __mapper_args__ = {"eager_defaults": True}
 
     id = db.Column(
         db.UUID(as_uuid=True),
@@ -78,8 +254,8 @@ class Account(db.Model):  # type: ignore
     name = db.Column(db.String(255), nullable=False)
     type = db.Column(db.String(50), nullable=False)
     description = db.Column(db.Text)
-    opening_balance = db.Column(db.Numeric(19, 4), nullable=False)
-    current_balance = db.Column(db.Numeric(19, 4), nullable=False)
+    opening_balance = db.Column(AMOUNT, nullable=False)
+    current_balance = db.Column(AMOUNT, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     updated_at = db.Column(
         db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now()
@@ -109,7 +285,22 @@ class Transaction(db.Model):  # type: ignore
     """
 
     __tablename__ = "transactions"
-    __table_args__ = {"schema": "accounting"}
+    # search_vector is generated by the database for full-text search. It
+    # is part of the table for queries but left unmapped, so loading,
+    # inserting and returning transactions never carries it.
+    __table_args__ = (
+        db.Column(
+            "search_vector",
+            TSVECTOR,
+            db.Computed(
+                "setweight(to_tsvector('simple', coalesce(reference_number, '')), 'A')"
+                " || setweight(to_tsvector('simple', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+        ),
+        {"schema": "accounting"},
+    )
+    __mapper_args__ = {"eager_defaults": True, "exclude_properties": ["search_vector"]}
 
     id = db.Column(
         db.UUID(as_uuid=True),
@@ -123,12 +314,15 @@ class Transaction(db.Model):  # type: ignore
         db.UUID(as_uuid=True), db.ForeignKey("accounting.accounts.id"), nullable=False
     )
     transaction_date = db.Column(db.Date, nullable=False)
-    amount = db.Column(db.Numeric(19, 4), nullable=False)
+    amount = db.Column(AMOUNT, nullable=False)
     description = db.Column(db.String(500))
     reference_number = db.Column(db.String(100))
     is_void = db.Column(db.Boolean, nullable=False, server_default=db.text("false"))
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     created_by = db.Column(db.String(100), server_default=db.text("current_user"))
+    journal_entry_id = db.Column(
+        db.UUID(as_uuid=True), db.ForeignKey("accounting.journal_entries.id")
+    )
 
     account = db.relationship(
         "Account", foreign_keys=[account_id], backref="transactions"
@@ -158,6 +352,73 @@ class Transaction(db.Model):  # type: ignore
         }
 
 
+class JournalEntry(db.Model):  # type: ignore
+    """
+    A multi-leg journal entry. Its legs are carried by the two-leg
+    transactions that reference it.
+    """
+
+    __tablename__ = "journal_entries"
+    __table_args__ = {"schema": "accounting"}
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = db.Column(
+        db.UUID(as_uuid=True),
+        primary_key=True,
+        server_default=db.text("gen_random_uuid()"),
+    )
+    entry_date = db.Column(db.Date, nullable=False)
+    description = db.Column(db.String(500))
+    reference_number = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    created_by = db.Column(db.String(100), server_default=db.text("current_user"))
+
+    transactions = db.relationship(
+        "Transaction", backref="journal_entry", order_by="Transaction.id"
+    )
+
+    def legs(self) -> List[Dict[str, Any]]:
+        """
+        Return the entry's legs, one per account, netted from its
+        transactions: debits as positive amounts, then credits as negative.
+        """
+        legs: Dict[Any, Dict[str, Any]] = {}
+        for transaction in self.transactions:
+            for account, delta in (
+                (transaction.account, transaction.amount),
+                (transaction.contra_account, -transaction.amount),
+            ):
+                leg = legs.setdefault(
+                    account.id, {"account": account, "amount": Decimal("0")}
+                )
+                leg["amount"] += delta
+        return [
+            {
+                "account_id": str(leg["account"].id),
+                "account_name": leg["account"].name,
+                "amount": float(leg["amount"]),
+            }
+            for leg in sorted(
+                legs.values(),
+                key=lambda leg: (leg["amount"] < 0, leg["account"].name),
+            )
+        ]
+
+    def to_dict(self):
+        """
+        Serialize the JournalEntry object to a dictionary for JSON responses.
+        """
+        return {
+            "id": str(self.id),
+            "entry_date": self.entry_date.isoformat(),
+            "description": self.description,
+            "reference_number": self.reference_number,
+            "legs": self.legs(),
+            "transactions": [t.to_dict() for t in self.transactions],
+            "created_at": self.created_at.isoformat(),
+        }
+
+
 class BalanceHistory(db.Model):  # type: ignore
     """
     Stores historical balance snapshots for accounts.
@@ -175,7 +436,7 @@ class BalanceHistory(db.Model):  # type: ignore
         db.UUID(as_uuid=True), db.ForeignKey("accounting.accounts.id"), nullable=False
     )
     balance_date = db.Column(db.Date, nullable=False)
-    balance = db.Column(db.Numeric(19, 4), nullable=False)
+    balance = db.Column(AMOUNT, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
 
     account = db.relationship("Account", backref="balance_history")
@@ -213,786 +474,5393 @@ class User(db.Model):  # type: ignore
         return check_password_hash(self.password_hash, password)
 
 
-# Pydantic Models for Validation
-class AccountCreate(BaseModel):
+class AuditLog(db.Model):  # type: ignore
     """
-    Pydantic model for validating account creation requests.
+    Audit trail entry for a change to an accounting record.
     """
 
-    name: str = Field(..., max_length=255)
-    type: str = Field(
-        ..., pattern="^(INCOME|EXPENSE|ASSET|LIABILITY)$"
-    )  # <-- changed here
-    description: Optional[str] = None
-    opening_balance: Decimal = Field(..., decimal_places=4)
+    __tablename__ = "audit_log"
+    __table_args__ = {"schema": "accounting"}
 
+    id = db.Column(db.BigInteger, primary_key=True)
+    table_name = db.Column(db.String(100), nullable=False)
+    record_id = db.Column(db.UUID(as_uuid=False), nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    old_values = db.Column(db.JSON().with_variant(JSONB(), "postgresql"))
+    new_values = db.Column(db.JSON().with_variant(JSONB(), "postgresql"))
+    changed_by = db.Column(db.String(100), nullable=False)
+    changed_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    entry_id = db.Column(db.UUID(as_uuid=False), unique=True)
 
-class AccountUpdate(BaseModel):
+
+class ReconciliationRun(db.Model):  # type: ignore
     """
-    Pydantic model for validating account update requests.
+    Records each ledger reconciliation run.
     """
 
-    name: Optional[str] = Field(None, max_length=255)
-    description: Optional[str] = None
+    __tablename__ = "reconciliation_runs"
+    __table_args__ = {"schema": "accounting"}
 
+    id = db.Column(db.BigInteger, primary_key=True)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    finished_at = db.Column(db.DateTime(timezone=True))
+    mode = db.Column(db.String(20), nullable=False)
+    accounts_checked = db.Column(db.Integer, nullable=False, default=0)
+    accounts_drifted = db.Column(db.Integer, nullable=False, default=0)
+    accounts_repaired = db.Column(db.Integer, nullable=False, default=0)
 
-class TransactionCreate(BaseModel):
+
+class Job(db.Model):  # type: ignore
     """
-    Pydantic model for validating transaction creation requests.
+    A long-running report or export, queued in the database and run by the
+    job worker processes.
     """
 
-    account_id: str = Field(..., min_length=36, max_length=36)
-    contra_account_id: str = Field(..., min_length=36, max_length=36)
-    transaction_date: date
-    amount: Decimal = Field(..., gt=0, decimal_places=4)
-    description: Optional[str] = Field(None, max_length=500)
-    reference_number: Optional[str] = Field(None, max_length=100)
+    __tablename__ = "jobs"
+    __table_args__ = {"schema": "accounting"}
+    __mapper_args__ = {"eager_defaults": True}
 
-    @validator("contra_account_id")
-    def accounts_must_differ(cls, v, values):
+    id = db.Column(
+        db.UUID(as_uuid=True),
+        primary_key=True,
+        server_default=db.text("gen_random_uuid()"),
+    )
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(
+        db.JSON().with_variant(JSONB(), "postgresql"), nullable=False, default=dict
+    )
+    status = db.Column(db.String(20), nullable=False, server_default="queued")
+    progress = db.Column(db.Numeric(5, 2), nullable=False, server_default="0")
+    attempts = db.Column(db.Integer, nullable=False, server_default="0")
+    max_attempts = db.Column(db.Integer, nullable=False)
+    cancel_requested = db.Column(
+        db.Boolean, nullable=False, server_default=db.text("false")
+    )
+    result_path = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_by = db.Column(db.String(100), nullable=False)
+    run_after = db.Column(
+        db.DateTime(timezone=True), nullable=False, server_default=db.func.now()
+    )
+    heartbeat_at = db.Column(db.DateTime(timezone=True))
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    started_at = db.Column(db.DateTime(timezone=True))
+    finished_at = db.Column(db.DateTime(timezone=True))
+
+    def to_dict(self):
         """
-        Ensure that the account and contra account are not the same.
+        Serialize the Job object to a dictionary for JSON responses.
         """
-        if "account_id" in values and v == values["account_id"]:
-            raise ValueError("Account and contra account must be different")
-        return v
+        return {
+            "id": str(self.id),
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": float(self.progress),
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "cancel_requested": self.cancel_requested,
+            "error": self.error,
+            "result_url": f"/api/jobs/{self.id}/result"
+            if self.status == "succeeded"
+            else None,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
 
 
-# Custom Exceptions
-class FinancialSystemError(Exception):
+class Change(db.Model):  # type: ignore
     """
-    Base exception class for financial system errors.
+    Outbox entry for an account or transaction change, written by database
+    triggers in the same transaction as the change.
     """
 
-    status_code = 500
-    detail = "An unexpected error occurred"
+    __tablename__ = "change_outbox"
+    __table_args__ = {"schema": "accounting"}
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    txid = db.Column(
+        db.BigInteger,
+        nullable=False,
+        server_default=db.text("(pg_current_xact_id()::text::bigint)"),
+    )
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.UUID(as_uuid=False), nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    changed_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
 
-    def __init__(self, detail=None, status_code=None):
-        super().__init__()
-        if detail is not None:
-            self.detail = detail
-        if status_code is not None:
-            self.status_code = status_code
+
+class ClosedPeriod(db.Model):  # type: ignore
+    """
+    A closed accounting period, ending at period_end. Postings dated on or
+    before the latest period_end are rejected by the database.
+    """
+
+    __tablename__ = "closed_periods"
+    __table_args__ = {"schema": "accounting"}
+
+    period_end = db.Column(db.Date, primary_key=True)
+    archived = db.Column(db.Boolean, nullable=False, server_default=db.text("false"))
+    closed_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    closed_by = db.Column(db.String(100), server_default=db.text("current_user"))
 
     def to_dict(self):
         """
-        Serialize the error to a dictionary for JSON responses.
+        Serialize the ClosedPeriod object to a dictionary for JSON responses.
         """
-        return {"error": self.detail}
+        return {
+            "period_end": self.period_end.isoformat(),
+            "archived": self.archived,
+            "closed_at": self.closed_at.isoformat(),
+            "closed_by": self.closed_by,
+        }
 
 
-class RequestValidationError(FinancialSystemError):
+class ArchivedTransaction(db.Model):  # type: ignore
     """
-    Exception for validation errors.
+    A transaction of an archived closed period, moved out of the ledger
+    into accounting.transactions_archive.
     """
 
-    status_code = 400
-    detail = "Validation error"
+    __tablename__ = "transactions_archive"
+    __table_args__ = {"schema": "accounting"}
+
+    id = db.Column(db.UUID(as_uuid=True), primary_key=True)
+    account_id = db.Column(db.UUID(as_uuid=True), nullable=False)
+    contra_account_id = db.Column(db.UUID(as_uuid=True), nullable=False)
+    transaction_date = db.Column(db.Date, nullable=False)
+    amount = db.Column(AMOUNT, nullable=False)
+    description = db.Column(db.String(500))
+    reference_number = db.Column(db.String(100))
+    is_void = db.Column(db.Boolean, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True))
+    created_by = db.Column(db.String(100))
+    journal_entry_id = db.Column(db.UUID(as_uuid=True))
 
 
-class InsufficientFundsError(FinancialSystemError):
-    """
-    Exception for insufficient funds during a transaction.
-    """
+# Audit Trail
+AUDITED_MODELS = (Account, Transaction, BalanceHistory, JournalEntry)
 
-    status_code = 402
-    detail = "Insufficient funds"
+audit_writer = AuditWriter(
+    AuditLog.__table__,
+    spool_path=app.config["AUDIT_SPOOL_PATH"],
+    batch_size=app.config["AUDIT_BATCH_SIZE"],
+    flush_interval=app.config["AUDIT_FLUSH_INTERVAL"],
+)
+atexit.register(audit_writer.close)
+
+# Live events: NOTIFY'd after commit, one LISTEN connection per process
+event_publisher = EventPublisher()
+atexit.register(event_publisher.close)
+event_hub = EventHub(
+    buffer_size=app.config["EVENTS_BUFFER_SIZE"],
+    max_queue=app.config["EVENTS_QUEUE_SIZE"],
+)
 
+# Account name autocomplete, one index per process. Kept current by this
+# process's own writes and by the account events of every other process.
+account_index = AccountIndex()
 
-class NotFoundError(FinancialSystemError):
+# Shared by all dashboard requests, so concurrent requests queue for workers
+# instead of each checking out a full set of pooled connections.
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=app.config["DASHBOARD_WORKERS"], thread_name_prefix="dashboard"
+)
+atexit.register(dashboard_executor.shutdown, wait=False, cancel_futures=True)
+
+
+def _audit_value(value):
     """
-    Exception for resources not found.
+    Convert a column value to something that can be stored in JSONB.
     """
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
 
-    status_code = 404
-    detail = "Resource not found"
+
+def _audit_snapshot(obj) -> Dict[str, Any]:
+    """
+    Collect the loaded column values of an ORM object without triggering loads.
+    """
+    state = inspect(obj)
+    return {
+        attr.key: _audit_value(state.dict[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
 
 
-class AuthorizationError(FinancialSystemError):
+def _audit_changes(obj):
     """
-    Exception for authorization errors.
+    Return the (old, new) values of the columns modified on an ORM object.
     """
+    state = inspect(obj)
+    old_values, new_values = {}, {}
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if not history.added:
+            continue
+        old_values[attr.key] = (
+            _audit_value(history.deleted[0]) if history.deleted else None
+        )
+        new_values[attr.key] = _audit_value(history.added[0])
+    return old_values, new_values
+
+
+def _current_actor() -> str:
+    if has_request_context():
+        return g.get("current_user") or "anonymous"
+    return "system"
+
+
+def _stage_audit_record(
+    session,
+    table_name,
+    record_id,
+    operation,
+    old_values,
+    new_values,
+    changed_at=None,
+    changed_by=None,
+):
+    """
+    Stage one audit record on the session. Staged records are only handed to
+    the writer once the surrounding transaction commits. changed_by defaults
+    to the user of the current request.
+    """
+    if not app.config["AUDIT_ENABLED"]:
+        return
+    session.info.setdefault("audit_pending", []).append(
+        {
+            "table_name": table_name,
+            "record_id": str(record_id),
+            "operation": operation,
+            "old_values": old_values,
+            "new_values": new_values,
+            "changed_by": changed_by or _current_actor(),
+            "changed_at": changed_at or datetime.now(timezone.utc),
+        }
+    )
 
-    status_code = 403
-    detail = "Authorization error"
 
+@event.listens_for(db.session, "after_flush")
+def _capture_audit_records(session, flush_context):
+    """
+    Stage audit records for the rows written by this flush.
+    """
+    if not app.config["AUDIT_ENABLED"]:
+        return
+
+    changed_at = datetime.now(timezone.utc)
+
+    def stage(obj, operation, old_values, new_values):
+        _stage_audit_record(
+            session,
+            obj.__tablename__,
+            obj.id,
+            operation,
+            old_values,
+            new_values,
+            changed_at,
+        )
 
-# Error Handlers
-@app.errorhandler(FinancialSystemError)
-def handle_financial_system_error(e):
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            stage(obj, "INSERT", None, _audit_snapshot(obj))
+    for obj in session.dirty:
+        if isinstance(obj, AUDITED_MODELS) and session.is_modified(obj):
+            old_values, new_values = _audit_changes(obj)
+            if new_values:
+                stage(obj, "UPDATE", old_values, new_values)
+    for obj in session.deleted:
+        if isinstance(obj, AUDITED_MODELS):
+            stage(obj, "DELETE", _audit_snapshot(obj), None)
+
+
+@event.listens_for(db.session, "after_commit")
+def _enqueue_audit_records(session):
     """
-    Handle custom financial system errors.
+    Hand the committed audit records to the background writer.
     """
-    logger.error(f"FinancialSystemError: {e.detail}", exc_info=True)
-    return jsonify(e.to_dict()), e.status_code
+    records = session.info.pop("audit_pending", None)
+    if not records:
+        return
+    if not audit_writer.running:
+        audit_writer.start(db.engine)
+    audit_writer.enqueue(records)
 
 
-@app.errorhandler(RequestValidationError)
-def handle_validation_error(e):
+@event.listens_for(db.session, "after_transaction_create")
+def _mark_audit_savepoint(session, transaction):
     """
-    Handle validation errors.
+    Note how many audit records were staged when a savepoint begins, so
+    rolling it back only discards the ones staged inside it.
     """
-    logger.error(f"RequestValidationError: {e.detail}", exc_info=True)
-    return jsonify(e.to_dict()), e.status_code
+    if transaction.nested:
+        marks = session.info.setdefault("audit_savepoints", {})
+        marks[transaction] = len(session.info.get("audit_pending", ()))
 
 
-@app.errorhandler(404)
-def handle_not_found(e):
+@event.listens_for(db.session, "after_transaction_end")
+def _forget_audit_savepoint(session, transaction):
+    if transaction.nested:
+        session.info.get("audit_savepoints", {}).pop(transaction, None)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _discard_audit_records(session):
     """
-    Handle 404 not found errors.
+    Drop the audit records of rolled back work: those staged since the
+    savepoint being rolled back began, or all of them when the whole
+    transaction rolls back.
     """
-    logger.error("Resource not found", exc_info=True)
-    return jsonify({"error": "Resource not found"}), 404
+    savepoint = session.get_nested_transaction()
+    mark = session.info.get("audit_savepoints", {}).get(savepoint)
+    if mark is not None:
+        del session.info.get("audit_pending", [])[mark:]
+    else:
+        session.info.pop("audit_pending", None)
 
 
-@app.errorhandler(500)
-def handle_internal_error(e):
+def _events_enabled() -> bool:
+    return app.config["EVENTS_ENABLED"] and db.engine.dialect.name == "postgresql"
+
+
+def _publish_event(event_type: str, account_ids, data: Dict[str, Any]) -> None:
     """
-    Handle 500 internal server errors.
+    Publish a live event about committed changes to the given accounts.
     """
-    logger.error("Internal server error", exc_info=True)
-    return jsonify({"error": "Internal server error"}), 500
+    if not _events_enabled():
+        return
+    if not event_publisher.running:
+        event_publisher.start(db.engine)
+    event_publisher.publish(event_type, account_ids, data)
 
 
-# Authentication Decorator
-def token_required(f):
+def _index_account_event(event: Dict[str, Any]) -> None:
     """
-    Decorator to require JWT authentication for protected endpoints.
+    Apply an account event to the autocomplete index. A reset means events
+    may have been missed, so the index is reloaded on next use.
     """
+    if event["type"] in ("account.created", "account.updated"):
+        account = event["data"]["account"]
+        account_index.upsert(account["id"], account["name"], account["type"])
+    elif event["type"] in (RESET, "accounts.imported"):
+        account_index.invalidate()
 
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        if "Authorization" in request.headers:
-            token = request.headers["Authorization"].split()[1]
 
-        if not token:
-            raise AuthorizationError("Token is missing")
+event_hub.add_listener(_index_account_event)
 
-        try:
-            data = jwt.decode(
-                token,
-                app.config["SECRET_KEY"],
-                algorithms=[app.config["JWT_ALGORITHM"]],
+
+def _publishes_posting(event_type: str):
+    """
+    Decorator for the posting services: once the transaction has committed,
+    publish it with both accounts' new balances.
+    """
+
+    def decorate(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            result = f(*args, **kwargs)
+            transaction = result["transaction"]
+            _publish_event(
+                event_type,
+                [transaction.account_id, transaction.contra_account_id],
+                {
+                    "transaction": transaction.to_dict(),
+                    "balances": {
+                        str(transaction.account_id): float(
+                            result["new_balances"]["account"]
+                        ),
+                        str(transaction.contra_account_id): float(
+                            result["new_balances"]["contra_account"]
+                        ),
+                    },
+                },
             )
-            current_user = data["sub"]
-        except InvalidTokenError:
-            raise AuthorizationError("Token is invalid")
+            return result
 
-        return f(current_user, *args, **kwargs)
+        return decorated
 
-    return decorated
+    return decorate
 
 
-# Services
-class AccountService:
+# SQLSTATEs of transactions aborted by concurrency, safe to run again
+RETRYABLE_SQLSTATES = {"40001", "40P01"}  # serialization_failure, deadlock
+
+# Raised when an amount or a balance moved by it does not fit its column
+NUMERIC_VALUE_OUT_OF_RANGE = "22003"
+AMOUNT_OUT_OF_RANGE = "Amount or resulting balance out of range"
+
+# Raised by accounting.check_period_open for postings and voids dated in a
+# closed period
+PERIOD_CLOSED = "AC423"
+
+write_conflicts: Dict[str, Dict[str, int]] = {}
+_write_conflicts_lock = threading.Lock()
+
+
+def _write_conflict(error: SQLAlchemyError) -> Optional["WriteConflictError"]:
     """
-    Service class for account-related operations.
+    Return the error to raise when a database error is a deadlock or a
+    serialization failure, None otherwise.
     """
+    orig = getattr(error, "orig", None)
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if isinstance(error, DBAPIError) and code in RETRYABLE_SQLSTATES:
+        return WriteConflictError()
+    return None
 
-    @staticmethod
-    def create_account(data: dict) -> Account:
-        """
-        Create a new account with the provided data.
-        """
-        try:
-            validated_data = AccountCreate(**data).dict()
-        except ValidationError as e:
-            raise RequestValidationError(str(e))
 
-        account = Account(
-            name=validated_data["name"],
-            type=validated_data["type"],
-            description=validated_data.get("description"),
-            opening_balance=validated_data["opening_balance"],
-            current_balance=validated_data["opening_balance"],
-        )
+def _causes(error: Optional[BaseException]) -> Iterator[BaseException]:
+    """
+    Yield an error and the chain of errors that caused it.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
 
-        try:
-            db.session.add(account)
-            db.session.commit()
-            logger.info(f"Created account: {account.id}")
-            return account
-        except IntegrityError:
-            db.session.rollback()
-            raise RequestValidationError(
-                "Account creation failed due to database constraints"
-            )
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            logger.error(f"Error creating account: {str(e)}")
-            raise FinancialSystemError("Failed to create account")
 
-    @staticmethod
-    def get_account(account_id: str) -> Account:
-        """
-        Retrieve an account by its ID.
-        """
-        try:
-            account = db.session.execute(
-                select(Account).where(Account.id == account_id)
-            ).scalar_one_or_none()
+def _caused_by(error: Optional[BaseException], sqlstate: str) -> Optional[DBAPIError]:
+    """
+    Return the database error with the given SQLSTATE when it is the error
+    or among its causes, None otherwise.
+    """
+    for cause in _causes(error):
+        if isinstance(cause, DBAPIError):
+            orig = cause.orig
+            code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+            if code == sqlstate:
+                return cause
+    return None
 
-            if not account:
-                raise NotFoundError("Account not found")
-            return account
-        except SQLAlchemyError as e:
-            logger.error(f"Error fetching account: {str(e)}")
-            raise FinancialSystemError("Failed to fetch account")
 
-    @staticmethod
-    def update_account(account_id: str, data: dict) -> Account:
-        """
-        Update an existing account with new data.
-        """
-        try:
-            validated_data = AccountUpdate(**data).dict(exclude_unset=True)
-        except ValidationError as e:
-            raise RequestValidationError(str(e))
+def _amount_out_of_range(error: Optional[BaseException]) -> bool:
+    """
+    Whether an error was caused by an amount or balance that does not fit
+    its column, found by the database or when converting to minor units.
+    """
+    return _caused_by(error, NUMERIC_VALUE_OUT_OF_RANGE) is not None or any(
+        isinstance(cause, AmountOutOfRange) for cause in _causes(error)
+    )
 
-        try:
-            account = AccountService.get_account(account_id)
 
-            for key, value in validated_data.items():
-                setattr(account, key, value)
+def _count_write_conflict(operation: str, outcome: str) -> None:
+    with _write_conflicts_lock:
+        counts = write_conflicts.setdefault(operation, {"retries": 0, "aborted": 0})
+        counts[outcome] += 1
 
-            db.session.commit()
-            logger.info(f"Updated account: {account.id}")
-            return account
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            logger.error(f"Error updating account: {str(e)}")
-            raise FinancialSystemError("Failed to update account")
 
-    @staticmethod
-    def list_accounts(
-        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
-    ) -> List[Account]:
-        """
-        List accounts, optionally filtered by type or name, with pagination.
-        """
-        try:
-            query = select(Account)
-
-            if filters:
-                conditions = []
-                if "type" in filters:
-                    conditions.append(Account.type == filters["type"])
-                if "name" in filters:
-                    conditions.append(Account.name.ilike(f"%{filters['name']}%"))
-
-                if conditions:
-                    query = query.where(and_(*conditions))
-
-            accounts = db.session.execute(query).scalars().all()
-            # Pagination
-            start = (page - 1) * per_page
-            end = start + per_page
-            return accounts[start:end]
-        except SQLAlchemyError as e:
-            logger.error(f"Error listing accounts: {str(e)}")
-            raise FinancialSystemError("Failed to list accounts")
+def _begin_write() -> None:
+    """
+    Start the session's transaction at WRITE_ISOLATION_LEVEL. A write that
+    joins a transaction already in progress keeps that transaction's level.
+    """
+    level = app.config["WRITE_ISOLATION_LEVEL"]
+    if (
+        level != "READ COMMITTED"
+        and db.engine.dialect.name == "postgresql"
+        and not db.session().in_transaction()
+    ):
+        db.session.connection(execution_options={"isolation_level": level})
 
 
-class TransactionService:
+def _retries_conflicts(operation: str):
     """
-    Service class for transaction-related operations.
+    Decorator for the write services: run the operation at the configured
+    isolation level and, when it is aborted by a deadlock or serialization
+    failure, roll back and run it again after a jittered exponential
+    backoff, up to WRITE_RETRY_ATTEMPTS attempts. Retries and aborts are
+    counted per operation in write_conflicts.
     """
 
-    @staticmethod
-    def record_transaction(data: dict) -> dict:
-        """
-        Record a new transaction and update account balances.
-        """
-        try:
-            validated_data = TransactionCreate(**data).dict()
-        except ValidationError as e:
-            raise RequestValidationError(str(e))
+    def decorate(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            attempts = max(1, app.config["WRITE_RETRY_ATTEMPTS"])
+            base = app.config["WRITE_RETRY_BASE_DELAY_MS"] / 1000
+            cap = app.config["WRITE_RETRY_MAX_DELAY_MS"] / 1000
+            for attempt in range(1, attempts + 1):
+                _begin_write()
+                try:
+                    return f(*args, **kwargs)
+                except WriteConflictError:
+                    db.session.rollback()
+                    if attempt == attempts:
+                        _count_write_conflict(operation, "aborted")
+                        logger.warning(
+                            f"{operation} aborted after {attempts} conflicting attempts"
+                        )
+                        raise
+                    _count_write_conflict(operation, "retries")
+                    time.sleep(random.uniform(0, min(cap, base * 2 ** (attempt - 1))))
 
-        try:
-            # Get accounts with locking
-            account = db.session.execute(
-                select(Account)
-                .where(Account.id == validated_data["account_id"])
-                .with_for_update()
-            ).scalar_one_or_none()
+        return decorated
 
-            contra_account = db.session.execute(
-                select(Account)
-                .where(Account.id == validated_data["contra_account_id"])
-                .with_for_update()
-            ).scalar_one_or_none()
+    return decorate
 
-            if not account or not contra_account:
-                raise NotFoundError("One or both accounts not found")
 
-            # Check sufficient funds for asset/liability accounts
-            if account.type in ["ASSET", "LIABILITY"]:
-                new_balance = account.current_balance + validated_data["amount"]
-                if new_balance < 0:
-                    raise InsufficientFundsError()
+# Pydantic Models for Validation
+class AccountCreate(BaseModel):
+    """
+    Pydantic model for validating account creation requests.
+    """
 
-            # Create transaction
-            transaction = Transaction(
-                account_id=validated_data["account_id"],
-                contra_account_id=validated_data["contra_account_id"],
-                transaction_date=validated_data["transaction_date"],
-                amount=validated_data["amount"],
-                description=validated_data.get("description"),
-                reference_number=validated_data.get("reference_number"),
-            )
+    name: str = Field(..., max_length=255)
+    type: str = Field(
+        ..., pattern="^(INCOME|EXPENSE|ASSET|LIABILITY)$"
+    )  # <-- changed here
+    description: Optional[str] = None
+    opening_balance: Decimal = Field(
+        ..., decimal_places=4, ge=-MAX_AMOUNT, le=MAX_AMOUNT
+    )
 
-            # Update balances
-            account.current_balance += validated_data["amount"]
-            contra_account.current_balance -= validated_data["amount"]
 
-            db.session.add(transaction)
-            db.session.commit()
+class AccountUpdate(BaseModel):
+    """
+    Pydantic model for validating account update requests.
+    """
 
-            logger.info(f"Recorded transaction: {transaction.id}")
+    name: Optional[str] = Field(None, max_length=255)
+    description: Optional[str] = None
 
-            return {
-                "transaction": transaction,
-                "new_balances": {
-                    "account": account.current_balance,
-                    "contra_account": contra_account.current_balance,
-                },
-            }
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            logger.error(f"Error recording transaction: {str(e)}")
-            raise FinancialSystemError("Failed to record transaction")
 
-    @staticmethod
-    def void_transaction(transaction_id: str) -> dict:
+class TransactionCreate(BaseModel):
+    """
+    Pydantic model for validating transaction creation requests.
+    """
+
+    account_id: str = Field(..., min_length=36, max_length=36)
+    contra_account_id: str = Field(..., min_length=36, max_length=36)
+    transaction_date: date
+    amount: Decimal = Field(..., gt=0, le=MAX_AMOUNT, decimal_places=4)
+    description: Optional[str] = Field(None, max_length=500)
+    reference_number: Optional[str] = Field(None, max_length=100)
+
+    @validator("contra_account_id")
+    def accounts_must_differ(cls, v, values):
         """
-        Void (reverse) a transaction and update account balances.
+        Ensure that the account and contra account are not the same.
         """
-        try:
-            # 1. Lock the transaction row
-            transaction = db.session.execute(
-                select(Transaction)
-                .where(Transaction.id == transaction_id)
-                .with_for_update()
-            ).scalar_one_or_none()
+        if "account_id" in values and v == values["account_id"]:
+            raise ValueError("Account and contra account must be different")
+        return v
 
-            if not transaction:
-                raise NotFoundError("Transaction not found")
 
-            if transaction.is_void:
-                raise RequestValidationError("Transaction already voided")
+class JournalLeg(BaseModel):
+    """
+    Pydantic model for one leg of a journal entry: a debit as a positive
+    amount, a credit as a negative one.
+    """
 
-            # 2. Lock the related accounts
-            account = db.session.execute(
-                select(Account)
-                .where(Account.id == transaction.account_id)
-                .with_for_update()
-            ).scalar_one_or_none()
+    account_id: str = Field(..., min_length=36, max_length=36)
+    amount: Decimal = Field(..., ge=-MAX_AMOUNT, le=MAX_AMOUNT, decimal_places=4)
 
-            contra_account = db.session.execute(
-                select(Account)
-                .where(Account.id == transaction.contra_account_id)
-                .with_for_update()
-            ).scalar_one_or_none()
+    @validator("account_id")
+    def account_id_must_be_uuid(cls, v):
+        """
+        Ensure that the account id is a UUID.
+        """
+        return str(UUID(v))
 
-            # 3. Update balances and void
-            account.current_balance -= transaction.amount
-            contra_account.current_balance += transaction.amount
-            transaction.is_void = True
+    @validator("amount")
+    def amount_must_not_be_zero(cls, v):
+        """
+        Ensure that every leg moves a balance.
+        """
+        if v == 0:
+            raise ValueError("Leg amount must not be zero")
+        return v
 
-            db.session.commit()
-            logger.info(f"Voided transaction: {transaction.id}")
 
-            return {
-                "transaction": transaction,
-                "new_balances": {
-                    "account": account.current_balance,
-                    "contra_account": contra_account.current_balance,
-                },
-            }
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            logger.error(f"Error voiding transaction: {str(e)}")
-            raise FinancialSystemError("Failed to void transaction")
+class JournalEntryCreate(BaseModel):
+    """
+    Pydantic model for validating journal entry requests.
+    """
 
-    @staticmethod
-    def get_transaction(transaction_id: str) -> Transaction:
+    entry_date: date
+    description: Optional[str] = Field(None, max_length=500)
+    reference_number: Optional[str] = Field(None, max_length=100)
+    legs: List[JournalLeg] = Field(..., min_length=2, max_length=100)
+
+    @validator("legs")
+    def legs_must_balance(cls, v):
         """
-        Retrieve a transaction by its ID.
+        Ensure that the legs sum to zero with one leg per account.
         """
-        try:
-            transaction = db.session.execute(
-                select(Transaction)
-                .where(Transaction.id == transaction_id)
-                .options(
-                    joinedload(Transaction.account),
-                    joinedload(Transaction.contra_account),
-                )
-            ).scalar_one_or_none()
+        if sum(leg.amount for leg in v) != 0:
+            raise ValueError("Legs must sum to zero")
+        if len({leg.account_id for leg in v}) != len(v):
+            raise ValueError("Each account may appear in one leg only")
+        return v
 
-            if not transaction:
-                raise NotFoundError("Transaction not found")
-            return transaction
-        except SQLAlchemyError as e:
-            logger.error(f"Error fetching transaction: {str(e)}")
-            raise FinancialSystemError("Failed to fetch transaction")
 
-    @staticmethod
-    def list_transactions(
-        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
-    ) -> List[Transaction]:
-        """
-        List transactions, optionally filtered by account, date, or void status,
-        with pagination.
-        """
-        try:
-            query = (
-                select(Transaction)
-                .options(
-                    joinedload(Transaction.account),
-                    joinedload(Transaction.contra_account),
-                )
-                .order_by(
-                    Transaction.transaction_date.desc(), Transaction.created_at.desc()
-                )
-            )
+class JobCreate(BaseModel):
+    """
+    Pydantic model for validating job submissions.
+    """
 
-            if filters:
-                conditions = []
-                if "account_id" in filters:
-                    conditions.append(
-                        or_(
-                            Transaction.account_id == filters["account_id"],
-                            Transaction.contra_account_id == filters["account_id"],
-                        )
-                    )
-                if "start_date" in filters:
-                    conditions.append(
-                        Transaction.transaction_date >= filters["start_date"]
-                    )
-                if "end_date" in filters:
-                    conditions.append(
-                        Transaction.transaction_date <= filters["end_date"]
-                    )
-                if "is_void" in filters:
-                    conditions.append(Transaction.is_void == filters["is_void"])
+    kind: str = Field(
+        ..., pattern="^(profit_loss|trial_balance|ledger|reconciliation)$"
+    )
+    params: Dict[str, Any] = Field(default_factory=dict)
+    max_attempts: Optional[int] = Field(None, ge=1, le=10)
 
-                if conditions:
-                    query = query.where(and_(*conditions))
 
-            if filters and "limit" in filters:
-                query = query.limit(filters["limit"])
+class PeriodClose(BaseModel):
+    """
+    Pydantic model for validating period closes.
+    """
 
-            transactions = db.session.execute(query).scalars().unique().all()
-            # Pagination
-            start = (page - 1) * per_page
-            end = start + per_page
-            return transactions[start:end]
-        except SQLAlchemyError as e:
-            logger.error(f"Error listing transactions: {str(e)}")
-            raise FinancialSystemError("Failed to list transactions")
+    period_end: date
 
 
-class ReportService:
+# Custom Exceptions
+class FinancialSystemError(Exception):
     """
-    Service class for generating financial reports.
+    Base exception class for financial system errors.
     """
 
-    @staticmethod
-    def generate_balance_report(report_date: Optional[date] = None) -> Dict[str, Any]:
-        """
-        Generate a balance report for all accounts as of a given date.
-        """
-        if not report_date:
-            report_date = date.today()
+    status_code = 500
+    detail = "An unexpected error occurred"
 
-        try:
-            # Get all accounts with their current balances
-            accounts = (
-                db.session.execute(select(Account).order_by(Account.type, Account.name))
-                .scalars()
-                .all()
-            )
+    def __init__(self, detail=None, status_code=None):
+        super().__init__()
+        if detail is not None:
+            self.detail = detail
+        if status_code is not None:
+            self.status_code = status_code
 
-            # Calculate totals by type
-            totals = {
-                "INCOME": Decimal("0.00"),
-                "EXPENSE": Decimal("0.00"),
-                "ASSET": Decimal("0.00"),
-                "LIABILITY": Decimal("0.00"),
-            }
+    def to_dict(self):
+        """
+        Serialize the error to a dictionary for JSON responses.
+        """
+        return {"error": self.detail}
 
-            for account in accounts:
-                totals[account.type] += account.current_balance
 
-            # Calculate net worth (Assets - Liabilities)
-            net_worth = totals["ASSET"] - totals["LIABILITY"]
+class RequestValidationError(FinancialSystemError):
+    """
+    Exception for validation errors.
+    """
 
-            return {
-                "report_date": report_date.isoformat(),
-                "accounts": [account.to_dict() for account in accounts],
-                "totals": {k: float(v) for k, v in totals.items()},
-                "net_worth": float(net_worth),
-            }
+    status_code = 400
+    detail = "Validation error"
+
+
+class InsufficientFundsError(FinancialSystemError):
+    """
+    Exception for insufficient funds during a transaction.
+    """
+
+    status_code = 402
+    detail = "Insufficient funds"
+
+
+class NotFoundError(FinancialSystemError):
+    """
+    Exception for resources not found.
+    """
+
+    status_code = 404
+    detail = "Resource not found"
+
+
+class WriteConflictError(FinancialSystemError):
+    """
+    Exception for writes still aborted by deadlocks or serialization
+    failures after every retry.
+    """
+
+    status_code = 503
+    detail = "Concurrent update conflict, please retry"
+
+
+class DeadlineExceededError(FinancialSystemError):
+    """
+    Exception for requests that ran out of their time budget.
+    """
+
+    status_code = 504
+    detail = "Request deadline exceeded"
+
+
+class PeriodClosedError(FinancialSystemError):
+    """
+    Exception for postings and voids dated in a closed period.
+    """
+
+    status_code = 409
+    detail = "Period is closed"
+
+
+class AuthorizationError(FinancialSystemError):
+    """
+    Exception for authorization errors.
+    """
+
+    status_code = 403
+    detail = "Authorization error"
+
+
+# Error Handlers
+@app.errorhandler(FinancialSystemError)
+def handle_financial_system_error(e):
+    """
+    Handle custom financial system errors.
+    """
+    closed = _caused_by(e, PERIOD_CLOSED)
+    if not isinstance(e, DeadlineExceededError) and _statement_timed_out(e):
+        e = DeadlineExceededError()
+    elif _amount_out_of_range(e):
+        e = RequestValidationError(AMOUNT_OUT_OF_RANGE)
+    elif closed is not None:
+        e = PeriodClosedError(closed.orig.diag.message_primary)
+    if isinstance(e, DeadlineExceededError):
+        _count_request_timeout()
+    logger.error(f"FinancialSystemError: {e.detail}", exc_info=True)
+    return jsonify(e.to_dict()), e.status_code
+
+
+@app.errorhandler(RequestValidationError)
+def handle_validation_error(e):
+    """
+    Handle validation errors.
+    """
+    logger.error(f"RequestValidationError: {e.detail}", exc_info=True)
+    return jsonify(e.to_dict()), e.status_code
+
+
+@app.errorhandler(404)
+def handle_not_found(e):
+    """
+    Handle 404 not found errors.
+    """
+    logger.error("Resource not found", exc_info=True)
+    return jsonify({"error": "Resource not found"}), 404
+
+
+@app.errorhandler(500)
+def handle_internal_error(e):
+    """
+    Handle 500 internal server errors.
+    """
+    logger.error("Internal server error", exc_info=True)
+    return jsonify({"error": "Internal server error"}), 500
+
+
+# Request deadlines
+# Time budgets in milliseconds of the endpoints that differ from
+# REQUEST_TIMEOUT_MS, overridden by REQUEST_TIMEOUTS; 0 means no limit.
+# The ledger streams for as long as the client reads it.
+DEFAULT_REQUEST_TIMEOUTS = {
+    "generate_profit_loss_report": 30000,
+    "generate_trial_balance": 30000,
+    "generate_balance_report": 15000,
+    "get_account_statement": 15000,
+    "import_csv": 120000,
+    "reconcile_balances": 120000,
+    "generate_ledger": 0,
+    "stream_events": 0,
+}
+
+QUERY_CANCELED = "57014"  # raised by statement_timeout
+
+request_timeouts: Dict[str, int] = {}
+_request_timeouts_lock = threading.Lock()
+
+
+def _request_budget_ms(endpoint: Optional[str]) -> int:
+    """
+    Return the time budget of an endpoint in milliseconds, 0 for no limit.
+    """
+    overrides = app.config["REQUEST_TIMEOUTS"]
+    if endpoint in overrides:
+        return overrides[endpoint]
+    return DEFAULT_REQUEST_TIMEOUTS.get(endpoint, app.config["REQUEST_TIMEOUT_MS"])
+
+
+def _client_deadline_ms(value: str) -> float:
+    """
+    Parse an X-Request-Deadline header, either the milliseconds the client
+    will wait or an ISO 8601 timestamp with a time zone, into the
+    milliseconds left.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        deadline = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        deadline = None
+    if deadline is None or deadline.tzinfo is None:
+        raise RequestValidationError(
+            "X-Request-Deadline must be milliseconds or an ISO 8601 timestamp "
+            "with a time zone"
+        )
+    return (deadline - datetime.now(timezone.utc)).total_seconds() * 1000
+
+
+def _remaining_ms() -> Optional[int]:
+    """
+    Return the milliseconds left before the current request's deadline, or
+    None outside a request or without a deadline. Raises
+    DeadlineExceededError once it has passed.
+    """
+    if not has_request_context() or g.get("deadline") is None:
+        return None
+    remaining = int((g.deadline - time.monotonic()) * 1000)
+    if remaining <= 0:
+        raise DeadlineExceededError()
+    return remaining
+
+
+def _apply_statement_timeout(connection) -> None:
+    """
+    Limit the statements of the connection's current transaction to the
+    time left before the request's deadline.
+    """
+    remaining = _remaining_ms()
+    if remaining is not None and connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT set_config('statement_timeout', :ms, true)"),
+            {"ms": str(remaining)},
+        )
+
+
+def _statement_timed_out(error: BaseException) -> bool:
+    """
+    Whether an error was caused by a statement cancelled by the request's
+    statement_timeout.
+    """
+    if not has_request_context() or g.get("deadline") is None:
+        return False
+    return _caused_by(error, QUERY_CANCELED) is not None
+
+
+def _count_request_timeout() -> None:
+    endpoint = request.endpoint if has_request_context() else None
+    with _request_timeouts_lock:
+        key = endpoint or "unknown"
+        request_timeouts[key] = request_timeouts.get(key, 0) + 1
+
+
+@app.before_request
+def start_request_deadline():
+    """
+    Set the request's deadline from its endpoint's budget, shortened by an
+    X-Request-Deadline header, and apply it to a transaction already open.
+    """
+    g.deadline = None
+    budget = _request_budget_ms(request.endpoint)
+    header = request.headers.get("X-Request-Deadline")
+    if header:
+        client_budget = _client_deadline_ms(header)
+        budget = client_budget if budget <= 0 else min(budget, client_budget)
+        if budget <= 0:
+            raise DeadlineExceededError()
+    if budget > 0:
+        g.deadline = time.monotonic() + budget / 1000
+        if db.session().in_transaction():
+            _apply_statement_timeout(db.session.connection())
+
+
+@event.listens_for(db.session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    """
+    Cap statement_timeout of every transaction a request begins at the time
+    left before its deadline, so PostgreSQL cancels the query that would
+    overrun it.
+    """
+    _apply_statement_timeout(connection)
+
+
+# Authentication Decorator
+def token_required(f):
+    """
+    Decorator to require JWT authentication for protected endpoints.
+    """
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = None
+        if "Authorization" in request.headers:
+            token = request.headers["Authorization"].split()[1]
+
+        current_user = _authenticate(token)
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+
+def _authenticate(token: Optional[str]) -> str:
+    """
+    Decode a JWT and return the user it was issued to.
+    """
+    if not token:
+        raise AuthorizationError("Token is missing")
+
+    try:
+        data = jwt.decode(
+            token,
+            app.config["SECRET_KEY"],
+            algorithms=[app.config["JWT_ALGORITHM"]],
+        )
+        current_user = data["sub"]
+    except InvalidTokenError:
+        raise AuthorizationError("Token is invalid")
+
+    g.current_user = current_user
+    return current_user
+
+
+# Services
+class AccountService:
+    """
+    Service class for account-related operations.
+    """
+
+    @staticmethod
+    @_retries_conflicts("create_account")
+    def create_account(data: dict) -> Account:
+        """
+        Create a new account with the provided data.
+        """
+        try:
+            validated_data = AccountCreate(**data).dict()
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+
+        account = Account(
+            name=validated_data["name"],
+            type=validated_data["type"],
+            description=validated_data.get("description"),
+            opening_balance=validated_data["opening_balance"],
+            current_balance=validated_data["opening_balance"],
+        )
+
+        try:
+            db.session.add(account)
+            db.session.commit()
+            logger.info(f"Created account: {account.id}")
+            account_index.upsert(account.id, account.name, account.type)
+            _publish_event(
+                "account.created", [account.id], {"account": account.to_dict()}
+            )
+            return account
+        except IntegrityError:
+            db.session.rollback()
+            raise RequestValidationError(
+                "Account creation failed due to database constraints"
+            )
         except SQLAlchemyError as e:
-            logger.error(f"Error generating balance report: {str(e)}")
-            raise FinancialSystemError("Failed to generate balance report")
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error creating account: {str(e)}")
+            raise FinancialSystemError("Failed to create account")
 
     @staticmethod
-    def generate_profit_loss_report(start_date: date, end_date: date) -> dict:
+    def get_account(account_id: str) -> Account:
         """
-        Generate a profit and loss report for a date range.
+        Retrieve an account by its ID.
         """
         try:
-            # Query income and expense transactions
-            income_result = db.session.execute(
-                select(func.sum(Transaction.amount).label("total"))
-                .join(Transaction.account)
-                .where(
-                    Account.type == "INCOME",
-                    Transaction.transaction_date.between(start_date, end_date),
-                    Transaction.is_void.is_(False),
-                )
-            ).scalar_one()
-            income = income_result if income_result is not None else Decimal("0.00")
-            print(f"Debug statement:{income}")
-            expenses_result = db.session.execute(
-                select(func.sum(Transaction.amount).label("total"))
-                .join(Transaction.contra_account)
-                .where(
-                    Account.type == "EXPENSE",
-                    Transaction.transaction_date.between(start_date, end_date),
-                    Transaction.is_void.is_(False),
-                )
-            ).scalar_one()
+            account = db.session.execute(
+                select(Account).where(Account.id == account_id)
+            ).scalar_one_or_none()
+
+            if not account:
+                raise NotFoundError("Account not found")
+            return account
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching account: {str(e)}")
+            raise FinancialSystemError("Failed to fetch account")
+
+    @staticmethod
+    @_retries_conflicts("update_account")
+    def update_account(account_id: str, data: dict) -> Account:
+        """
+        Update an existing account with new data.
+        """
+        try:
+            validated_data = AccountUpdate(**data).dict(exclude_unset=True)
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+
+        try:
+            account = AccountService.get_account(account_id)
+
+            for key, value in validated_data.items():
+                setattr(account, key, value)
+
+            db.session.commit()
+            logger.info(f"Updated account: {account.id}")
+            account_index.upsert(account.id, account.name, account.type)
+            _publish_event(
+                "account.updated", [account.id], {"account": account.to_dict()}
+            )
+            return account
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error updating account: {str(e)}")
+            raise FinancialSystemError("Failed to update account")
+
+    @staticmethod
+    def list_query(
+        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
+    ):
+        """
+        Build the SELECT used by list_accounts for the given filters and page.
+        """
+        query = select(Account)
+
+        if filters:
+            conditions = []
+            if "type" in filters:
+                conditions.append(Account.type == filters["type"])
+            if "name" in filters:
+                conditions.append(Account.name.ilike(f"%{filters['name']}%"))
+
+            if conditions:
+                query = query.where(and_(*conditions))
+
+        return (
+            query.order_by(Account.name, Account.id)
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
+
+    @staticmethod
+    def list_accounts(
+        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
+    ) -> List[Account]:
+        """
+        List accounts, optionally filtered by type or name, with pagination.
+        """
+        try:
+            query = AccountService.list_query(filters, page, per_page)
+            return db.session.execute(query).scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error listing accounts: {str(e)}")
+            raise FinancialSystemError("Failed to list accounts")
+
+    @staticmethod
+    def suggest(
+        prefix: str, limit: int = 10, account_type: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Suggest accounts whose name, or a word of it, starts with prefix.
+        Served from the in-process account index, which is loaded on first
+        use and reloaded after ACCOUNT_INDEX_MAX_AGE seconds or whenever
+        account events may have been missed.
+        """
+        if _events_enabled() and not event_hub.running:
+            # Listen before loading, so no change slips between the two
+            event_hub.start(db.engine)
+        try:
+            account_index.ensure(
+                lambda: db.session.execute(
+                    select(Account.id, Account.name, Account.type)
+                ).all(),
+                app.config["ACCOUNT_INDEX_MAX_AGE"],
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error loading account index: {str(e)}")
+            raise FinancialSystemError("Failed to load account suggestions")
+        return account_index.suggest(prefix, limit, account_type)
+
+    @staticmethod
+    def count_by_type() -> Dict[str, int]:
+        """
+        Count accounts per account type.
+        """
+        try:
+            counts = {
+                account_type: 0
+                for account_type in ("ASSET", "LIABILITY", "INCOME", "EXPENSE")
+            }
+            rows = db.session.execute(
+                select(Account.type, func.count()).group_by(Account.type)
+            )
+            counts.update({account_type: count for account_type, count in rows})
+            return counts
+        except SQLAlchemyError as e:
+            logger.error(f"Error counting accounts: {str(e)}")
+            raise FinancialSystemError("Failed to count accounts")
+
+
+class TransactionService:
+    """
+    Service class for transaction-related operations.
+
+    On PostgreSQL postings and voids go through the accounting.post_transaction
+    and accounting.void_transaction functions, which lock, check and write in
+    a single round trip. The ORM implementation below is kept for other
+    databases and for POSTING_FUNCTION_ENABLED=false; on the psycopg (3)
+    driver its writes are sent in one pipeline instead of one round trip per
+    statement. With GROUP_COMMIT_ENABLED concurrent postings are batched into
+    shared commits by posting_committer.
+    """
+
+    # Amounts in and out are typed so they convert like the mapped columns
+    POSTED_AMOUNTS = {
+        "amount": AMOUNT,
+        "account_balance": AMOUNT,
+        "contra_account_balance": AMOUNT,
+    }
+    POST_TRANSACTION = (
+        text(
+            "SELECT * FROM accounting.post_transaction("
+            ":account_id, :contra_account_id, :transaction_date, :amount, "
+            ":description, :reference_number)"
+        )
+        .bindparams(bindparam("amount", type_=AMOUNT))
+        .columns(**POSTED_AMOUNTS)
+    )
+    VOID_TRANSACTION = text("SELECT * FROM accounting.void_transaction(:id)").columns(
+        **POSTED_AMOUNTS
+    )
+
+    # SQLSTATEs raised by the posting functions
+    POSTING_ERRORS = {
+        "AC404": NotFoundError,
+        "AC402": InsufficientFundsError,
+        "AC409": RequestValidationError,
+        PERIOD_CLOSED: PeriodClosedError,
+    }
+
+    @staticmethod
+    def _use_posting_function() -> bool:
+        return (
+            app.config["POSTING_FUNCTION_ENABLED"]
+            and db.engine.dialect.name == "postgresql"
+        )
+
+    @staticmethod
+    def _call_posting_function(statement, params: dict, operation: str) -> dict:
+        """
+        Run a posting function, stage its audit records and commit. Returns
+        the same shape as the ORM implementation.
+        """
+        try:
+            row = db.session.execute(statement, params).mappings().one()
+            TransactionService._stage_posting_audit(row, operation)
+            db.session.commit()
+        except DBAPIError as e:
+            db.session.rollback()
+            raise TransactionService._posting_error(e, operation)
+        return TransactionService._posted(row, operation)
+
+    @staticmethod
+    def _posting_error(error: DBAPIError, operation: str) -> FinancialSystemError:
+        """
+        Map a posting function failure to the service exception to raise.
+        """
+        code = getattr(error.orig, "pgcode", None) or getattr(
+            error.orig, "sqlstate", None
+        )
+        conflict = _write_conflict(error)
+        if conflict:
+            return conflict
+        if code == NUMERIC_VALUE_OUT_OF_RANGE:
+            return RequestValidationError(AMOUNT_OUT_OF_RANGE)
+        if code in TransactionService.POSTING_ERRORS:
+            return TransactionService.POSTING_ERRORS[code](
+                error.orig.diag.message_primary
+            )
+        logger.error(f"Error in posting function: {str(error)}")
+        return FinancialSystemError(f"Failed to {operation.lower()} transaction")
+
+    @staticmethod
+    def _posted(row, operation: str) -> dict:
+        """
+        Finish a committed posting function call in the calling session.
+        """
+        # Sessions keep loaded state across commits, so bring copies of the
+        # written rows that this session already holds up to date
+        identity_map = db.session.identity_map
+        for side in ("account", "contra_account"):
+            cached = identity_map.get(
+                db.session.identity_key(Account, row[f"{side}_id"])
+            )
+            if cached is not None:
+                set_committed_value(cached, "current_balance", row[f"{side}_balance"])
+        cached = identity_map.get(db.session.identity_key(Transaction, row["id"]))
+        if cached is not None:
+            set_committed_value(cached, "is_void", row["is_void"])
+
+        logger.info(f"{operation.capitalize()} transaction: {row['id']}")
+        return TransactionService._posting_result(row)
+
+    @staticmethod
+    def _posting_result(row) -> dict:
+        """
+        Build the service result from a posted transaction row carrying the
+        account names and new balances.
+        """
+        transaction = Transaction(
+            # The posting functions only write transactions outside entries
+            **{c.key: row.get(c.key) for c in Transaction.__mapper__.columns},
+            account=Account(id=row["account_id"], name=row["account_name"]),
+            contra_account=Account(
+                id=row["contra_account_id"], name=row["contra_account_name"]
+            ),
+        )
+        return {
+            "transaction": transaction,
+            "new_balances": {
+                "account": row["account_balance"],
+                "contra_account": row["contra_account_balance"],
+            },
+        }
+
+    @staticmethod
+    def _use_pipeline() -> bool:
+        return app.config["PSYCOPG_PIPELINE"] and db.engine.dialect.driver == "psycopg"
+
+    @staticmethod
+    def _execute_pipelined(statements) -> List[List[Dict[str, Any]]]:
+        """
+        Send the statements to the server in one psycopg pipeline, inside the
+        session's transaction, and return the rows each one produced.
+        SQLAlchemy cannot read results while a pipeline is open, so the
+        statements are compiled here and run on the DBAPI connection, with
+        parameters and returned columns converted by their column types.
+        """
+        connection = db.session.connection()
+        dialect = connection.dialect
+        dbapi_connection = connection.connection.dbapi_connection
+        compiled = [statement.compile(dialect=dialect) for statement in statements]
+        try:
+            with dbapi_connection.pipeline() as pipeline:
+                cursors = []
+                for statement in compiled:
+                    params = {}
+                    for name, value in statement.params.items():
+                        process = (
+                            statement.binds[name]
+                            .type.dialect_impl(dialect)
+                            .bind_processor(dialect)
+                        )
+                        params[name] = process(value) if process else value
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute(str(statement), params)
+                    cursors.append(cursor)
+                pipeline.sync()
+                results = []
+                for statement, cursor in zip(statements, cursors):
+                    if cursor.description is None:
+                        results.append([])
+                        continue
+                    types = {c.name: c.type for c in statement.exported_columns}
+                    names, processors = [], []
+                    for column in cursor.description:
+                        names.append(column.name)
+                        column_type = types.get(column.name)
+                        processors.append(
+                            column_type.dialect_impl(dialect).result_processor(
+                                dialect, column.type_code
+                            )
+                            if column_type is not None
+                            else None
+                        )
+                    results.append(
+                        [
+                            {
+                                name: process(value) if process else value
+                                for name, process, value in zip(names, processors, r)
+                            }
+                            for r in cursor.fetchall()
+                        ]
+                    )
+                return results
+        except dbapi_connection.Error as e:
+            raise DBAPIError(str(compiled[0]), None, e)
+
+    @staticmethod
+    def _lock_accounts(*account_ids) -> Dict[str, Account]:
+        """
+        Lock the given accounts in id order, so concurrent postings on the
+        same pair cannot deadlock, and return them keyed by id.
+        """
+        accounts = db.session.execute(
+            select(Account)
+            .where(Account.id.in_(account_ids))
+            .order_by(Account.id)
+            .with_for_update()
+        ).scalars()
+        return {str(account.id): account for account in accounts}
+
+    @staticmethod
+    def _stage_posting_audit(
+        row, operation: str, changed_by: Optional[str] = None
+    ) -> None:
+        """
+        Stage the audit records the ORM flush would have produced for a
+        posting function call.
+        """
+        amount = row["amount"]
+        if operation == "RECORD":
+            new_values = {
+                c.key: _audit_value(row.get(c.key))
+                for c in Transaction.__mapper__.columns
+            }
+            _stage_audit_record(
+                db.session,
+                "transactions",
+                row["id"],
+                "INSERT",
+                None,
+                new_values,
+                changed_by=changed_by,
+            )
+            deltas = (amount, -amount)
+        else:
+            _stage_audit_record(
+                db.session,
+                "transactions",
+                row["id"],
+                "UPDATE",
+                {"is_void": False},
+                {"is_void": True},
+                changed_by=changed_by,
+            )
+            deltas = (-amount, amount)
+
+        for side, delta in zip(("account", "contra_account"), deltas):
+            balance = row[f"{side}_balance"]
+            _stage_audit_record(
+                db.session,
+                "accounts",
+                row[f"{side}_id"],
+                "UPDATE",
+                {"current_balance": _audit_value(balance - delta)},
+                {"current_balance": _audit_value(balance)},
+                changed_by=changed_by,
+            )
+
+    @staticmethod
+    def _post_batch(items: List[dict]) -> List[Any]:
+        """
+        Record a batch of queued postings in one database transaction: the
+        group commit path of record_transaction. Every account in the batch
+        is locked up front in id order, so batches cannot deadlock with each
+        other or with single postings. Each posting runs in its own
+        savepoint, in arrival order; a failing posting becomes that caller's
+        error and the others are still committed.
+
+        The batch runs on the committer thread, outside any request, so each
+        item carries its caller's user for the audit records and its
+        request's deadline. A posting whose deadline passed while it waited
+        is not applied, and statement_timeout stops the batch once the last
+        of its callers has given up.
+        """
+        with app.app_context():
+            _begin_write()
+            account_ids = set()
+            for item in items:
+                for key in ("account_id", "contra_account_id"):
+                    try:
+                        account_ids.add(UUID(item["posting"][key]))
+                    except ValueError:
+                        pass  # fails in its own savepoint below
+            deadlines = [item["deadline"] for item in items]
+            try:
+                if None not in deadlines and db.engine.dialect.name == "postgresql":
+                    remaining = int((max(deadlines) - time.monotonic()) * 1000)
+                    db.session.execute(
+                        text("SELECT set_config('statement_timeout', :ms, true)"),
+                        {"ms": str(max(remaining, 1))},
+                    )
+                db.session.execute(
+                    select(Account.id)
+                    .where(Account.id.in_(sorted(account_ids)))
+                    .order_by(Account.id)
+                    .with_for_update()
+                )
+                outcomes: List[Any] = []
+                for item in items:
+                    deadline = item["deadline"]
+                    if deadline is not None and deadline <= time.monotonic():
+                        outcomes.append(DeadlineExceededError())
+                        continue
+                    savepoint = db.session.begin_nested()
+                    try:
+                        row = (
+                            db.session.execute(
+                                TransactionService.POST_TRANSACTION, item["posting"]
+                            )
+                            .mappings()
+                            .one()
+                        )
+                        savepoint.commit()
+                    except DBAPIError as e:
+                        savepoint.rollback()
+                        if _caused_by(e, QUERY_CANCELED) is not None:
+                            outcomes.append(DeadlineExceededError())
+                        else:
+                            outcomes.append(
+                                TransactionService._posting_error(e, "RECORD")
+                            )
+                        continue
+                    TransactionService._stage_posting_audit(
+                        row, "RECORD", changed_by=item["changed_by"]
+                    )
+                    outcomes.append(dict(row))
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                if _caused_by(e, QUERY_CANCELED) is not None:
+                    raise DeadlineExceededError()
+                # Every caller then retries on its own
+                conflict = _write_conflict(e)
+                if conflict:
+                    raise conflict
+                logger.error(f"Error recording transaction batch: {str(e)}")
+                raise FinancialSystemError("Failed to record transaction")
+            return outcomes
+
+    @staticmethod
+    @_publishes_posting("transaction.recorded")
+    @_retries_conflicts("record_transaction")
+    def record_transaction(data: dict) -> dict:
+        """
+        Record a new transaction and update account balances.
+        """
+        try:
+            validated_data = TransactionCreate(**data).dict()
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+
+        if TransactionService._use_posting_function():
+            if app.config["GROUP_COMMIT_ENABLED"]:
+                _remaining_ms()  # fail before queueing if already too late
+                row = posting_committer.submit(
+                    {
+                        "posting": validated_data,
+                        "changed_by": _current_actor(),
+                        "deadline": g.get("deadline")
+                        if has_request_context()
+                        else None,
+                    }
+                )
+                return TransactionService._posted(row, "RECORD")
+            return TransactionService._call_posting_function(
+                TransactionService.POST_TRANSACTION, validated_data, "RECORD"
+            )
+
+        try:
+            # Get accounts with locking
+            accounts = TransactionService._lock_accounts(
+                validated_data["account_id"], validated_data["contra_account_id"]
+            )
+            account = accounts.get(validated_data["account_id"])
+            contra_account = accounts.get(validated_data["contra_account_id"])
+
+            if not account or not contra_account:
+                raise NotFoundError("One or both accounts not found")
+
+            # Check sufficient funds for asset/liability accounts
+            if account.type in ["ASSET", "LIABILITY"]:
+                new_balance = account.current_balance + validated_data["amount"]
+                if new_balance < 0:
+                    raise InsufficientFundsError()
+
+            if TransactionService._use_pipeline():
+                return TransactionService._record_pipelined(
+                    validated_data, account, contra_account
+                )
+
+            # Create transaction
+            transaction = Transaction(
+                account=account,
+                contra_account=contra_account,
+                transaction_date=validated_data["transaction_date"],
+                amount=validated_data["amount"],
+                description=validated_data.get("description"),
+                reference_number=validated_data.get("reference_number"),
+            )
+
+            # Update balances
+            account.current_balance += validated_data["amount"]
+            contra_account.current_balance -= validated_data["amount"]
+
+            db.session.add(transaction)
+            db.session.commit()
+
+            logger.info(f"Recorded transaction: {transaction.id}")
+
+            return {
+                "transaction": transaction,
+                "new_balances": {
+                    "account": account.current_balance,
+                    "contra_account": contra_account.current_balance,
+                },
+            }
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error recording transaction: {str(e)}")
+            raise FinancialSystemError("Failed to record transaction")
+
+    @staticmethod
+    @_publishes_posting("transaction.voided")
+    @_retries_conflicts("void_transaction")
+    def void_transaction(transaction_id: str) -> dict:
+        """
+        Void (reverse) a transaction and update account balances.
+        """
+        if TransactionService._use_posting_function():
+            return TransactionService._call_posting_function(
+                TransactionService.VOID_TRANSACTION, {"id": transaction_id}, "VOID"
+            )
+
+        try:
+            # 1. Lock the transaction row and both accounts, in id order, in
+            # one statement
+            rows = db.session.execute(
+                select(Transaction, Account)
+                .join(
+                    Account,
+                    or_(
+                        Account.id == Transaction.account_id,
+                        Account.id == Transaction.contra_account_id,
+                    ),
+                )
+                .where(Transaction.id == transaction_id)
+                .order_by(Account.id)
+                .with_for_update()
+            ).all()
+
+            if not rows:
+                raise NotFoundError("Transaction not found")
+            transaction = rows[0][0]
+
+            if transaction.is_void:
+                raise RequestValidationError("Transaction already voided")
+
+            # 2. Update balances and void
+            accounts = {str(account.id): account for _, account in rows}
+            account = accounts[str(transaction.account_id)]
+            contra_account = accounts[str(transaction.contra_account_id)]
+            # The response names both accounts; attach the rows just locked
+            # instead of lazy loading them again after commit
+            set_committed_value(transaction, "account", account)
+            set_committed_value(transaction, "contra_account", contra_account)
+
+            if TransactionService._use_pipeline():
+                return TransactionService._void_pipelined(
+                    transaction, account, contra_account
+                )
+
+            account.current_balance -= transaction.amount
+            contra_account.current_balance += transaction.amount
+            transaction.is_void = True
+
+            db.session.commit()
+            logger.info(f"Voided transaction: {transaction.id}")
+
+            return {
+                "transaction": transaction,
+                "new_balances": {
+                    "account": account.current_balance,
+                    "contra_account": contra_account.current_balance,
+                },
+            }
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error voiding transaction: {str(e)}")
+            raise FinancialSystemError("Failed to void transaction")
+
+    @staticmethod
+    def _move_balances(account, contra_account, amount) -> List[Any]:
+        """
+        Pipelined counterpart of the ORM balance updates: returns the UPDATE
+        statements and marks the new balances as loaded on both accounts.
+        """
+        statements = []
+        for target, delta in ((account, amount), (contra_account, -amount)):
+            statements.append(
+                update(Account)
+                .where(Account.id == target.id)
+                .values(current_balance=Account.current_balance + delta)
+            )
+            set_committed_value(
+                target, "current_balance", target.current_balance + delta
+            )
+        return statements
+
+    @staticmethod
+    def _record_pipelined(data: dict, account, contra_account) -> dict:
+        """
+        Write a transaction whose accounts are already locked and checked:
+        both balance updates and the insert go out in one pipeline.
+        """
+        try:
+            statements = TransactionService._move_balances(
+                account, contra_account, data["amount"]
+            )
+            statements.append(
+                insert(Transaction)
+                .values(
+                    account_id=data["account_id"],
+                    contra_account_id=data["contra_account_id"],
+                    transaction_date=data["transaction_date"],
+                    amount=data["amount"],
+                    description=data.get("description"),
+                    reference_number=data.get("reference_number"),
+                )
+                .returning(*Transaction.__mapper__.columns)
+            )
+            *_, (inserted,) = TransactionService._execute_pipelined(statements)
+            row = {
+                **inserted,
+                "account_name": account.name,
+                "contra_account_name": contra_account.name,
+                "account_balance": account.current_balance,
+                "contra_account_balance": contra_account.current_balance,
+            }
+            TransactionService._stage_posting_audit(row, "RECORD")
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error recording transaction: {str(e)}")
+            raise FinancialSystemError("Failed to record transaction")
+
+        logger.info(f"Recorded transaction: {row['id']}")
+        return TransactionService._posting_result(row)
+
+    @staticmethod
+    def _void_pipelined(transaction, account, contra_account) -> dict:
+        """
+        Void a transaction whose row and accounts are already locked: the
+        balance reversals and the void flag go out in one pipeline.
+        """
+        try:
+            statements = TransactionService._move_balances(
+                account, contra_account, -transaction.amount
+            )
+            statements.append(
+                update(Transaction)
+                .where(
+                    Transaction.id == transaction.id,
+                    Transaction.transaction_date == transaction.transaction_date,
+                )
+                .values(is_void=True)
+            )
+            TransactionService._execute_pipelined(statements)
+            set_committed_value(transaction, "is_void", True)
+            row = {
+                **{
+                    c.key: getattr(transaction, c.key)
+                    for c in Transaction.__mapper__.columns
+                },
+                "account_name": account.name,
+                "contra_account_name": contra_account.name,
+                "account_balance": account.current_balance,
+                "contra_account_balance": contra_account.current_balance,
+            }
+            TransactionService._stage_posting_audit(row, "VOID")
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error voiding transaction: {str(e)}")
+            raise FinancialSystemError("Failed to void transaction")
+
+        logger.info(f"Voided transaction: {row['id']}")
+        return TransactionService._posting_result(row)
+
+    @staticmethod
+    def get_transaction(transaction_id: str) -> Transaction:
+        """
+        Retrieve a transaction by its ID.
+        """
+        try:
+            transaction = db.session.execute(
+                select(Transaction)
+                .where(Transaction.id == transaction_id)
+                .options(
+                    joinedload(Transaction.account),
+                    joinedload(Transaction.contra_account),
+                )
+            ).scalar_one_or_none()
+
+            if not transaction:
+                raise NotFoundError("Transaction not found")
+            return transaction
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching transaction: {str(e)}")
+            raise FinancialSystemError("Failed to fetch transaction")
+
+    @staticmethod
+    def list_query(
+        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
+    ):
+        """
+        Build the SELECT used by list_transactions for the given filters and
+        page. Returns None when the page lies beyond the requested limit.
+        """
+        filters = filters or {}
+        offset = (page - 1) * per_page
+        count = per_page
+        if "limit" in filters:
+            count = min(count, int(filters["limit"]) - offset)
+        if count <= 0:
+            return None
+
+        conditions = []
+        if "start_date" in filters:
+            conditions.append(Transaction.transaction_date >= filters["start_date"])
+        if "end_date" in filters:
+            conditions.append(Transaction.transaction_date <= filters["end_date"])
+        if "is_void" in filters:
+            conditions.append(Transaction.is_void == filters["is_void"])
+
+        if "account_id" in filters:
+            # Each side of the account match walks its own (account, date)
+            # index in order; the branches are disjoint because a transaction
+            # never uses the same account on both sides.
+            branches = [
+                select(Transaction)
+                .where(column == filters["account_id"], *conditions)
+                .order_by(
+                    Transaction.transaction_date.desc(), Transaction.created_at.desc()
+                )
+                .limit(offset + count)
+                for column in (Transaction.account_id, Transaction.contra_account_id)
+            ]
+            matched = union_all(*branches).subquery()
+            entity = aliased(Transaction, matched)
+            query = select(entity).options(
+                joinedload(entity.account), joinedload(entity.contra_account)
+            )
+        else:
+            entity = Transaction
+            query = (
+                select(Transaction)
+                .where(*conditions)
+                .options(
+                    joinedload(Transaction.account),
+                    joinedload(Transaction.contra_account),
+                )
+            )
+
+        return (
+            query.order_by(entity.transaction_date.desc(), entity.created_at.desc())
+            .offset(offset)
+            .limit(count)
+        )
+
+    @staticmethod
+    def list_transactions(
+        filters: Optional[Dict[str, Any]] = None, page: int = 1, per_page: int = 20
+    ) -> List[Transaction]:
+        """
+        List transactions, optionally filtered by account, date, or void status,
+        with pagination.
+        """
+        try:
+            query = TransactionService.list_query(filters, page, per_page)
+            if query is None:
+                return []
+            return db.session.execute(query).scalars().unique().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error listing transactions: {str(e)}")
+            raise FinancialSystemError("Failed to list transactions")
+
+    @staticmethod
+    def search_query(
+        q: str,
+        filters: Optional[Dict[str, Any]] = None,
+        exact: bool = False,
+        after: Optional[tuple] = None,
+        limit: int = 20,
+    ):
+        """
+        Build the search SELECT: transactions whose reference_number equals q
+        (exact), or whose search_vector matches q as a web search query,
+        ranked with reference matches weighted above description matches.
+        Ordered by (rank, transaction_date, id) descending; after is the
+        last such key of the previous page.
+        """
+        filters = filters or {}
+        conditions = []
+        if "account_id" in filters:
+            conditions.append(
+                or_(
+                    Transaction.account_id == filters["account_id"],
+                    Transaction.contra_account_id == filters["account_id"],
+                )
+            )
+        if "start_date" in filters:
+            conditions.append(Transaction.transaction_date >= filters["start_date"])
+        if "end_date" in filters:
+            conditions.append(Transaction.transaction_date <= filters["end_date"])
+        if "is_void" in filters:
+            conditions.append(Transaction.is_void == filters["is_void"])
+
+        if exact:
+            rank = cast(literal(1.0), REAL)
+            conditions.append(Transaction.reference_number == q)
+        else:
+            search_vector = Transaction.__table__.c.search_vector
+            tsquery = func.websearch_to_tsquery(
+                literal_column("'simple'::regconfig"), q
+            )
+            rank = func.ts_rank_cd(search_vector, tsquery)
+            conditions.append(search_vector.op("@@")(tsquery))
+
+        key = (rank, Transaction.transaction_date, Transaction.id)
+        if after is not None:
+            after_rank, after_date, after_id = after
+            conditions.append(
+                tuple_(*key) < tuple_(cast(after_rank, REAL), after_date, after_id)
+            )
+        return (
+            select(Transaction, rank.label("rank"))
+            .where(*conditions)
+            .options(
+                joinedload(Transaction.account), joinedload(Transaction.contra_account)
+            )
+            .order_by(*(column.desc() for column in key))
+            .limit(limit)
+        )
+
+    @staticmethod
+    def search_transactions(
+        q: str,
+        filters: Optional[Dict[str, Any]] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Search transactions by reference number or description text. A query
+        that is exactly some transaction's reference_number is answered from
+        the reference index alone; otherwise the full-text index is used.
+        Pages are keyset paginated with a signed cursor.
+        """
+        q = (q or "").strip()
+        if not q:
+            raise RequestValidationError("q is required")
+        filters = filters or {}
+        scope = [q, sorted((k, str(v)) for k, v in filters.items())]
+        cursors = URLSafeSerializer(app.config["SECRET_KEY"], salt="transaction-search")
+        try:
+            if cursor:
+                try:
+                    state = cursors.loads(cursor)
+                except BadSignature:
+                    raise RequestValidationError("Invalid search cursor")
+                if state["scope"] != json.loads(json.dumps(scope)):
+                    raise RequestValidationError("Cursor belongs to a different search")
+                exact = state["exact"]
+                after_rank, after_date, after_id = state["after"]
+                after = (after_rank, date.fromisoformat(after_date), UUID(after_id))
+                rows = db.session.execute(
+                    TransactionService.search_query(q, filters, exact, after, limit + 1)
+                ).all()
+            else:
+                rows = []
+                exact = len(q) <= 100 and not any(c.isspace() for c in q)
+                if exact:
+                    rows = db.session.execute(
+                        TransactionService.search_query(
+                            q, filters, True, None, limit + 1
+                        )
+                    ).all()
+                    exact = bool(rows)
+                if not exact:
+                    rows = db.session.execute(
+                        TransactionService.search_query(
+                            q, filters, False, None, limit + 1
+                        )
+                    ).all()
+        except SQLAlchemyError as e:
+            logger.error(f"Error searching transactions: {str(e)}")
+            raise FinancialSystemError("Failed to search transactions")
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last, last_rank = page[-1]
+            next_cursor = cursors.dumps(
+                {
+                    "scope": scope,
+                    "exact": exact,
+                    "after": [
+                        last_rank,
+                        last.transaction_date.isoformat(),
+                        str(last.id),
+                    ],
+                }
+            )
+        return {
+            "match": "reference" if exact else "text",
+            "results": [
+                {**transaction.to_dict(), "rank": rank} for transaction, rank in page
+            ],
+            "next_cursor": next_cursor,
+        }
+
+
+# Concurrent postings in this process share one commit when
+# GROUP_COMMIT_ENABLED is set; see TransactionService._post_batch
+posting_committer = GroupCommitter(
+    TransactionService._post_batch,
+    max_batch=app.config["GROUP_COMMIT_MAX_BATCH"],
+    max_wait=app.config["GROUP_COMMIT_MAX_WAIT_MS"] / 1000,
+)
+atexit.register(posting_committer.close)
+
+
+class JournalEntryService:
+    """
+    Service class for multi-leg journal entries.
+
+    An entry's legs are signed amounts that sum to zero. Debits are positive
+    and move an account's balance like the account side of a transaction;
+    credits are negative and move it like the contra side. The entry is
+    stored as a journal_entries row plus two-leg transactions that each
+    pair a debit with a credit, at most one fewer than the legs. The
+    ledger, reports, reconciliation, period locks and the change feed
+    therefore read entries like any other posting.
+
+    Posting locks every account once, in id order. The transactions are
+    inserted in one multi-row statement and the balances moved in one
+    UPDATE.
+    """
+
+    @staticmethod
+    def pair_legs(legs: Dict[UUID, Decimal]) -> List[tuple]:
+        """
+        Split balanced legs, keyed by account id, into (account id, contra
+        account id, amount) postings by matching debits with credits in
+        turn.
+        """
+        debits = [
+            [account_id, amount] for account_id, amount in legs.items() if amount > 0
+        ]
+        credits = [
+            [account_id, -amount] for account_id, amount in legs.items() if amount < 0
+        ]
+        pairs = []
+        while debits and credits:
+            debit, credit = debits[0], credits[0]
+            amount = min(debit[1], credit[1])
+            pairs.append((debit[0], credit[0], amount))
+            debit[1] -= amount
+            credit[1] -= amount
+            if not debit[1]:
+                debits.pop(0)
+            if not credit[1]:
+                credits.pop(0)
+        return pairs
+
+    @staticmethod
+    def get_journal_entry(entry_id: str) -> JournalEntry:
+        """
+        Retrieve a journal entry with its transactions by its ID.
+        """
+        try:
+            entry = (
+                db.session.execute(
+                    select(JournalEntry)
+                    .where(JournalEntry.id == entry_id)
+                    .options(
+                        joinedload(JournalEntry.transactions).joinedload(
+                            Transaction.account
+                        ),
+                        joinedload(JournalEntry.transactions).joinedload(
+                            Transaction.contra_account
+                        ),
+                    )
+                )
+                .unique()
+                .scalar_one_or_none()
+            )
+
+            if not entry:
+                raise NotFoundError("Journal entry not found")
+            return entry
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching journal entry: {str(e)}")
+            raise FinancialSystemError("Failed to fetch journal entry")
+
+    @staticmethod
+    @_retries_conflicts("post_journal_entry")
+    def post_journal_entry(data: dict) -> Dict[str, Any]:
+        """
+        Post a balanced multi-leg journal entry and update the balance of
+        every account it moves. Returns the entry and the new balances by
+        account id.
+        """
+        try:
+            validated = JournalEntryCreate(**data)
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+        legs = {UUID(leg.account_id): leg.amount for leg in validated.legs}
+
+        try:
+            accounts = TransactionService._lock_accounts(*sorted(legs))
+            missing = sorted(str(a) for a in legs if str(a) not in accounts)
+            if missing:
+                raise NotFoundError(f"Accounts not found: {', '.join(missing)}")
+
+            # The check record_transaction applies to the account side
+            for account_id, amount in legs.items():
+                account = accounts[str(account_id)]
+                if (
+                    amount > 0
+                    and account.type in ["ASSET", "LIABILITY"]
+                    and account.current_balance + amount < 0
+                ):
+                    raise InsufficientFundsError()
+
+            entry = JournalEntry(
+                entry_date=validated.entry_date,
+                description=validated.description,
+                reference_number=validated.reference_number,
+            )
+            db.session.add(entry)
+            db.session.flush()
+
+            rows = (
+                db.session.execute(
+                    insert(Transaction)
+                    .values(
+                        [
+                            {
+                                "account_id": account_id,
+                                "contra_account_id": contra_account_id,
+                                "transaction_date": validated.entry_date,
+                                "amount": amount,
+                                "description": validated.description,
+                                "reference_number": validated.reference_number,
+                                "journal_entry_id": entry.id,
+                            }
+                            for account_id, contra_account_id, amount in (
+                                JournalEntryService.pair_legs(legs)
+                            )
+                        ]
+                    )
+                    .returning(*Transaction.__mapper__.columns)
+                )
+                .mappings()
+                .all()
+            )
+            change = case(
+                {
+                    account_id: literal(amount, AMOUNT)
+                    for account_id, amount in legs.items()
+                },
+                value=Account.id,
+            )
+            balances = dict(
+                db.session.execute(
+                    update(Account)
+                    .where(Account.id.in_(legs))
+                    .values(
+                        current_balance=Account.current_balance + change,
+                        updated_at=func.now(),
+                    )
+                    .returning(Account.id, Account.current_balance)
+                    .execution_options(synchronize_session=False)
+                ).all()
+            )
+
+            # Stage the audit records the ORM flush would have produced
+            for row in rows:
+                _stage_audit_record(
+                    db.session,
+                    "transactions",
+                    row["id"],
+                    "INSERT",
+                    None,
+                    {
+                        c.key: _audit_value(row[c.key])
+                        for c in Transaction.__mapper__.columns
+                    },
+                )
+            for account_id, balance in balances.items():
+                _stage_audit_record(
+                    db.session,
+                    "accounts",
+                    account_id,
+                    "UPDATE",
+                    {"current_balance": _audit_value(balance - legs[account_id])},
+                    {"current_balance": _audit_value(balance)},
+                )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            conflict = _write_conflict(e)
+            if conflict:
+                raise conflict
+            logger.error(f"Error posting journal entry: {str(e)}")
+            raise FinancialSystemError("Failed to post journal entry")
+
+        # Bring the locked accounts the session holds up to date
+        for account_id, balance in balances.items():
+            set_committed_value(accounts[str(account_id)], "current_balance", balance)
+        logger.info(f"Posted journal entry: {entry.id}")
+
+        _publish_event(
+            "journal_entry.posted",
+            list(balances),
+            # NOTIFY payloads are small: clients fetch the entry by its id
+            {
+                "journal_entry_id": str(entry.id),
+                "balances": {str(a): float(b) for a, b in balances.items()},
+            },
+        )
+        return {"journal_entry": entry, "new_balances": balances}
+
+
+class ReportService:
+    """
+    Service class for generating financial reports.
+
+    In the ledger and trial balance the account side of a transaction is
+    the debit and the contra side the credit, matching how postings move
+    current_balance. Balances as of a date are derived from the balances
+    frozen by the first period close on or after it, or else from
+    current_balance, by backing out later movements, so only the ledger
+    between the date and that anchor is read. Reports reaching into an
+    archived period are rejected.
+
+    The balance, trial balance and profit and loss reports are answered by
+    the analytics engine instead when analytics is True or, by default,
+    when ANALYTICS_ENABLED is set.
+    """
+
+    @staticmethod
+    def generate_balance_report(
+        report_date: Optional[date] = None, analytics: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a balance report for all accounts as of a given date. Each
+        account's balance at the end of that day is its "balance".
+        """
+        if not report_date:
+            report_date = date.today()
+
+        try:
+            PeriodService.require_unarchived(report_date + timedelta(days=1))
+            # Get all accounts with their current balances
+            accounts = (
+                db.session.execute(select(Account).order_by(Account.type, Account.name))
+                .scalars()
+                .all()
+            )
+            if _use_analytics(analytics):
+                balances = AnalyticsService.columns().balances(report_date)
+            else:
+                anchor = PeriodService.close_on_or_after(report_date)
+                legs = ReportService.legs_query(report_date + timedelta(days=1), anchor)
+                moved = dict(
+                    db.session.execute(
+                        select(legs.c.account_id, func.sum(legs.c.delta)).group_by(
+                            legs.c.account_id
+                        )
+                    ).all()
+                )
+                if anchor is None:
+                    anchored = {
+                        account.id: account.current_balance for account in accounts
+                    }
+                else:
+                    closing = PeriodService.closing_balances_query(anchor)
+                    anchored = dict(db.session.execute(select(closing)).all())
+                balances = {
+                    str(account.id): anchored[account.id]
+                    - moved.get(account.id, Decimal("0"))
+                    for account in accounts
+                }
+            as_of = {
+                str(account.id): balances.get(str(account.id), account.current_balance)
+                for account in accounts
+            }
+
+            # Calculate totals by type
+            totals = {
+                "INCOME": Decimal("0.00"),
+                "EXPENSE": Decimal("0.00"),
+                "ASSET": Decimal("0.00"),
+                "LIABILITY": Decimal("0.00"),
+            }
+
+            for account in accounts:
+                totals[account.type] += as_of[str(account.id)]
+
+            # Calculate net worth (Assets - Liabilities)
+            net_worth = totals["ASSET"] - totals["LIABILITY"]
+
+            return {
+                "report_date": report_date.isoformat(),
+                "accounts": [
+                    {**account.to_dict(), "balance": float(as_of[str(account.id)])}
+                    for account in accounts
+                ],
+                "totals": {k: float(v) for k, v in totals.items()},
+                "net_worth": float(net_worth),
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Error generating balance report: {str(e)}")
+            raise FinancialSystemError("Failed to generate balance report")
+
+    @staticmethod
+    def profit_loss_total_query(
+        account_type: str, start_date: date, end_date: date, by_month: bool = False
+    ):
+        """
+        Build the SELECT summing non-void transactions for one side of the
+        profit and loss report. Income is taken from the account side and
+        expenses from the contra side of each transaction. by_month adds a
+        "month" column and one row per month with transactions.
+        """
+        if account_type == "INCOME":
+            side = Transaction.account
+        else:
+            side = Transaction.contra_account
+        if by_month:
+            month = func.date_trunc("month", Transaction.transaction_date)
+            return (
+                ReportService.profit_loss_total_query(
+                    account_type, start_date, end_date
+                )
+                .add_columns(month.label("month"))
+                .group_by(month)
+            )
+        return (
+            select(func.sum(Transaction.amount).label("total"))
+            .join(side)
+            .where(
+                Account.type == account_type,
+                Transaction.transaction_date.between(start_date, end_date),
+                # "= false" rather than "IS FALSE" so the planner can match
+                # the partial index on non-void transactions
+                Transaction.is_void == false(),
+            )
+        )
+
+    @staticmethod
+    def legs_query(
+        start_date: date,
+        end_date: Optional[date] = None,
+        account_id: Optional[str] = None,
+        detail: bool = False,
+    ):
+        """
+        Build a subquery with one row per side of each non-void transaction
+        dated from start_date (to end_date), optionally for one account:
+        debit, credit and the signed delta it applies to the account. Without
+        detail the columns are all covered by the partial index on non-void
+        transactions.
+        """
+        conditions = [
+            Transaction.is_void == false(),
+            Transaction.transaction_date >= start_date,
+        ]
+        if end_date is not None:
+            conditions.append(Transaction.transaction_date <= end_date)
+        zero = literal(Decimal("0"), Transaction.amount.type)
+
+        def side(account_id_column, counterpart_id, debit, credit, delta):
+            columns = [
+                account_id_column.label("account_id"),
+                Transaction.transaction_date.label("transaction_date"),
+                debit.label("debit"),
+                credit.label("credit"),
+                delta.label("delta"),
+            ]
+            if detail:
+                columns += [
+                    Transaction.id.label("transaction_id"),
+                    Transaction.created_at.label("created_at"),
+                    Transaction.description.label("description"),
+                    Transaction.reference_number.label("reference_number"),
+                    counterpart_id.label("counterpart_id"),
+                ]
+            query = select(*columns).where(*conditions)
+            if account_id:
+                query = query.where(account_id_column == account_id)
+            return query
+
+        return union_all(
+            side(
+                Transaction.account_id,
+                Transaction.contra_account_id,
+                Transaction.amount,
+                zero,
+                Transaction.amount,
+            ),
+            side(
+                Transaction.contra_account_id,
+                Transaction.account_id,
+                zero,
+                Transaction.amount,
+                -Transaction.amount,
+            ),
+        ).subquery("legs")
+
+    @staticmethod
+    def ledger_query(
+        start_date: date, end_date: date, account_id: Optional[str] = None
+    ):
+        """
+        Build the general ledger SELECT: every leg in the range with the
+        account's running balance, computed by a window over the legs on top
+        of the balance as of start_date. That balance is carried forward from
+        the latest period close before start_date, or backed out of
+        current_balance without one.
+        """
+        day_before = start_date - timedelta(days=1)
+        close = PeriodService.close_on_or_before(day_before)
+        opening = select(Account.id, Account.name, Account.type)
+        if close is None:
+            movements = ReportService.legs_query(start_date, account_id=account_id)
+            balance = Account.current_balance
+            opening_balance = balance - func.coalesce(func.sum(movements.c.delta), 0)
+        else:
+            movements = ReportService.legs_query(
+                close + timedelta(days=1), day_before, account_id
+            )
+            closing = PeriodService.closing_balances_query(close)
+            opening = opening.join(closing, closing.c.account_id == Account.id)
+            balance = closing.c.balance
+            opening_balance = balance + func.coalesce(func.sum(movements.c.delta), 0)
+        opening = opening.add_columns(
+            opening_balance.label("opening_balance")
+        ).outerjoin(movements, movements.c.account_id == Account.id)
+        if account_id:
+            opening = opening.where(Account.id == account_id)
+        opening = opening.group_by(Account.id, balance).subquery("opening")
+
+        legs = ReportService.legs_query(start_date, end_date, account_id, detail=True)
+        counterpart = aliased(Account)
+        order = (legs.c.transaction_date, legs.c.created_at, legs.c.transaction_id)
+        running = opening.c.opening_balance + func.sum(legs.c.delta).over(
+            partition_by=legs.c.account_id, order_by=order, rows=(None, 0)
+        )
+        return (
+            select(
+                opening.c.id.label("account_id"),
+                opening.c.name.label("account_name"),
+                opening.c.type.label("account_type"),
+                opening.c.opening_balance,
+                legs.c.transaction_id,
+                legs.c.transaction_date,
+                legs.c.description,
+                legs.c.reference_number,
+                legs.c.counterpart_id,
+                counterpart.name.label("counterpart_name"),
+                legs.c.debit,
+                legs.c.credit,
+                running.label("running_balance"),
+            )
+            .join_from(legs, opening, opening.c.id == legs.c.account_id)
+            .join(counterpart, counterpart.id == legs.c.counterpart_id)
+            .order_by(opening.c.name, opening.c.id, *order)
+        )
+
+    @staticmethod
+    def stream_ledger(
+        start_date: date, end_date: date, account_id: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Run the ledger query and return an iterator over the JSON document,
+        one chunk per page of LEDGER_PAGE_SIZE rows fetched from a
+        server-side cursor, so the whole ledger is never held in memory.
+        """
+        if account_id:
+            AccountService.get_account(account_id)
+        PeriodService.require_unarchived(start_date)
+        page_size = app.config["LEDGER_PAGE_SIZE"]
+        try:
+            result = db.session.execute(
+                ReportService.ledger_query(
+                    start_date, end_date, account_id
+                ).execution_options(yield_per=page_size)
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error generating ledger: {str(e)}")
+            raise FinancialSystemError("Failed to generate ledger")
+
+        def generate() -> Iterator[str]:
+            totals = {"debits": Decimal("0"), "credits": Decimal("0")}
+            section: Optional[Dict[str, Any]] = None
+            yield json.dumps(
+                {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()}
+            )[:-1] + ', "accounts": ['
+            try:
+                for page in result.mappings().partitions():
+                    parts = []
+                    for row in page:
+                        if (
+                            section is None
+                            or section["account_id"] != row["account_id"]
+                        ):
+                            if section is not None:
+                                parts.append(ReportService._close_section(section))
+                                parts.append(", ")
+                            section = {
+                                "account_id": row["account_id"],
+                                "debits": Decimal("0"),
+                                "credits": Decimal("0"),
+                            }
+                            parts.append(ReportService._open_section(row))
+                        else:
+                            parts.append(", ")
+                        parts.append(json.dumps(ReportService._ledger_entry(row)))
+                        section["debits"] += row["debit"]
+                        section["credits"] += row["credit"]
+                        section["closing_balance"] = row["running_balance"]
+                        totals["debits"] += row["debit"]
+                        totals["credits"] += row["credit"]
+                    yield "".join(parts)
+            except SQLAlchemyError as e:
+                # The response has started; the truncated body signals failure
+                logger.error(f"Error streaming ledger: {str(e)}")
+                raise
+            finally:
+                result.close()
+
+            if section is not None:
+                yield ReportService._close_section(section)
+            yield "], " + json.dumps(
+                {
+                    "total_debits": float(totals["debits"]),
+                    "total_credits": float(totals["credits"]),
+                    "balanced": totals["debits"] == totals["credits"],
+                }
+            )[1:]
+
+        return generate()
+
+    @staticmethod
+    def _open_section(row) -> str:
+        """
+        Start an account's section of the streamed ledger.
+        """
+        header = {
+            "account_id": str(row["account_id"]),
+            "name": row["account_name"],
+            "type": row["account_type"],
+            "opening_balance": float(row["opening_balance"]),
+        }
+        return json.dumps(header)[:-1] + ', "entries": ['
+
+    @staticmethod
+    def _close_section(section: Dict[str, Any]) -> str:
+        """
+        End an account's section of the streamed ledger with its totals.
+        """
+        summary = {
+            "total_debits": float(section["debits"]),
+            "total_credits": float(section["credits"]),
+            "closing_balance": float(section["closing_balance"]),
+        }
+        return "], " + json.dumps(summary)[1:]
+
+    @staticmethod
+    def _ledger_entry(row) -> Dict[str, Any]:
+        """
+        Serialize one ledger row.
+        """
+        return {
+            "transaction_id": str(row["transaction_id"]),
+            "transaction_date": row["transaction_date"].isoformat(),
+            "description": row["description"],
+            "reference_number": row["reference_number"],
+            "counterpart_id": str(row["counterpart_id"]),
+            "counterpart_name": row["counterpart_name"],
+            "debit": float(row["debit"]),
+            "credit": float(row["credit"]),
+            "running_balance": float(row["running_balance"]),
+        }
+
+    @staticmethod
+    def movement_query(account_id, start_date: date, end_date: Optional[date] = None):
+        """
+        Build the SELECT summing an account's balance movements between two
+        dates, both inclusive.
+        """
+        legs = ReportService.legs_query(start_date, end_date, account_id)
+        return select(func.coalesce(func.sum(legs.c.delta), 0))
+
+    @staticmethod
+    def balance_as_of(account: Account, day: date) -> Decimal:
+        """
+        Return an account's balance at the end of day. Starts from the
+        nearest anchor, a balance_history snapshot or the current balance,
+        and applies only the movements in between.
+        """
+        nearest = union_all(
+            select(BalanceHistory.balance_date, BalanceHistory.balance)
+            .where(
+                BalanceHistory.account_id == account.id,
+                BalanceHistory.balance_date <= day,
+            )
+            .order_by(BalanceHistory.balance_date.desc())
+            .limit(1),
+            select(BalanceHistory.balance_date, BalanceHistory.balance)
+            .where(
+                BalanceHistory.account_id == account.id,
+                BalanceHistory.balance_date > day,
+            )
+            .order_by(BalanceHistory.balance_date)
+            .limit(1),
+        )
+        snapshot = min(
+            db.session.execute(nearest).all(),
+            key=lambda row: abs((row.balance_date - day).days),
+            default=None,
+        )
+        one_day = timedelta(days=1)
+
+        # current_balance acts as a snapshot taken today
+        if snapshot is None or abs((snapshot.balance_date - day).days) > abs(
+            (date.today() - day).days
+        ):
+            moved = ReportService.movement_query(account.id, day + one_day)
+            return account.current_balance - db.session.execute(moved).scalar_one()
+        if snapshot.balance_date <= day:
+            moved = ReportService.movement_query(
+                account.id, snapshot.balance_date + one_day, day
+            )
+            return snapshot.balance + db.session.execute(moved).scalar_one()
+        moved = ReportService.movement_query(
+            account.id, day + one_day, snapshot.balance_date
+        )
+        return snapshot.balance - db.session.execute(moved).scalar_one()
+
+    @staticmethod
+    def upsert_snapshots(balances) -> int:
+        """
+        Write the (account id, date, balance) rows of a SELECT to
+        balance_history, replacing existing snapshots. Returns the number of
+        rows written, counted from RETURNING: the driver's rowcount is not
+        reliable for INSERT ... SELECT (psycopg 3 reports -1).
+        """
+        statement = pg_insert(BalanceHistory).from_select(
+            ["account_id", "balance_date", "balance"], balances
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["account_id", "balance_date"],
+            set_={"balance": statement.excluded.balance, "created_at": func.now()},
+        )
+        written = statement.returning(literal(1)).cte("written")
+        return db.session.execute(
+            select(func.count()).select_from(written)
+        ).scalar_one()
+
+    @staticmethod
+    def snapshot_balances(balance_date: date) -> int:
+        """
+        Record every account's closing balance for balance_date in
+        balance_history, replacing existing snapshots for that day. Returns
+        the number of snapshots written. Days in a closed period keep the
+        balances frozen by the close.
+        """
+        closed = PeriodService.closed_through()
+        if closed is not None and balance_date <= closed:
+            raise RequestValidationError(
+                f"Balances through {closed.isoformat()} are frozen by the period close"
+            )
+        legs = ReportService.legs_query(balance_date + timedelta(days=1))
+        balances = (
+            select(
+                Account.id,
+                literal(balance_date),
+                Account.current_balance - func.coalesce(func.sum(legs.c.delta), 0),
+            )
+            .outerjoin(legs, legs.c.account_id == Account.id)
+            .group_by(Account.id)
+        )
+        try:
+            # Postings wait while the snapshots are taken, so none can commit
+            # between reading balances and the trigger adjusting snapshots
+            db.session.execute(
+                text(
+                    "LOCK TABLE accounting.balance_history IN SHARE ROW EXCLUSIVE MODE"
+                )
+            )
+            written = ReportService.upsert_snapshots(balances)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error snapshotting balances: {str(e)}")
+            raise FinancialSystemError("Failed to snapshot balances")
+        logger.info(f"Snapshotted {written} balances for {balance_date}")
+        return written
+
+    @staticmethod
+    def statement_query(
+        account_id,
+        start_date: date,
+        end_date: date,
+        balance: Decimal,
+        after: Optional[tuple] = None,
+        limit: int = 100,
+    ):
+        """
+        Build the SELECT for one page of an account statement: the next
+        limit entries after the keyset position, each with its running
+        balance computed by a window on top of the balance before the page.
+        """
+        legs = ReportService.legs_query(start_date, end_date, account_id, detail=True)
+        order = (legs.c.transaction_date, legs.c.created_at, legs.c.transaction_id)
+        page = select(legs).order_by(*order).limit(limit)
+        if after:
+            page = page.where(tuple_(*order) > tuple_(*after))
+        page = page.subquery("page")
+
+        counterpart = aliased(Account)
+        order = (page.c.transaction_date, page.c.created_at, page.c.transaction_id)
+        running = literal(balance, Transaction.amount.type) + func.sum(
+            page.c.delta
+        ).over(order_by=order, rows=(None, 0))
+        return (
+            select(
+                page,
+                counterpart.name.label("counterpart_name"),
+                running.label("running_balance"),
+            )
+            .join(counterpart, counterpart.id == page.c.counterpart_id)
+            .order_by(*order)
+        )
+
+    @staticmethod
+    def _statement_cursors() -> URLSafeSerializer:
+        return URLSafeSerializer(app.config["SECRET_KEY"], salt="account-statement")
+
+    @staticmethod
+    def generate_statement(
+        account_id: str,
+        start_date: date,
+        end_date: date,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Generate one page of an account statement. The signed cursor carries
+        the keyset position and running balance, so later pages neither
+        rescan earlier entries nor recompute the opening balance.
+        """
+        account = AccountService.get_account(account_id)
+        scope = [str(account.id), start_date.isoformat(), end_date.isoformat()]
+        cursors = ReportService._statement_cursors()
+        try:
+            if cursor:
+                try:
+                    state = cursors.loads(cursor)
+                except BadSignature:
+                    raise RequestValidationError("Invalid statement cursor")
+                if state["scope"] != scope:
+                    raise RequestValidationError(
+                        "Cursor belongs to a different statement"
+                    )
+                opening = Decimal(state["opening"])
+                closing = Decimal(state["closing"])
+                balance = Decimal(state["balance"])
+                after_date, after_created, after_id = state["after"]
+                after = (
+                    date.fromisoformat(after_date),
+                    datetime.fromisoformat(after_created),
+                    UUID(after_id),
+                )
+            else:
+                PeriodService.require_unarchived(start_date)
+                opening = ReportService.balance_as_of(
+                    account, start_date - timedelta(days=1)
+                )
+                closing = ReportService.balance_as_of(account, end_date)
+                balance, after = opening, None
+
+            rows = (
+                db.session.execute(
+                    ReportService.statement_query(
+                        account.id, start_date, end_date, balance, after, limit + 1
+                    )
+                )
+                .mappings()
+                .all()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error generating statement: {str(e)}")
+            raise FinancialSystemError("Failed to generate statement")
+
+        entries = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = entries[-1]
+            next_cursor = cursors.dumps(
+                {
+                    "scope": scope,
+                    "opening": str(opening),
+                    "closing": str(closing),
+                    "balance": str(last["running_balance"]),
+                    "after": [
+                        last["transaction_date"].isoformat(),
+                        last["created_at"].isoformat(),
+                        str(last["transaction_id"]),
+                    ],
+                }
+            )
+        return {
+            "account": account.to_dict(),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "opening_balance": float(opening),
+            "closing_balance": float(closing),
+            "entries": [ReportService._ledger_entry(row) for row in entries],
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def trial_balance_query(
+        start_date: date, end_date: date, anchor: Optional[date] = None
+    ):
+        """
+        Build the trial balance as one grouped SELECT: per account, the
+        balance as of start_date, debits and credits within the range and the
+        closing balance at end_date. Balances are backed out of those frozen
+        by the period close through anchor, on or after end_date, or of
+        current_balance without one.
+        """
+        legs = ReportService.legs_query(start_date, anchor)
+        in_range = legs.c.transaction_date <= end_date
+
+        def total(column, *conditions):
+            return func.coalesce(func.sum(column).filter(*conditions), 0)
+
+        query = select(Account.id, Account.name, Account.type)
+        balance = Account.current_balance
+        if anchor is not None:
+            closing = PeriodService.closing_balances_query(anchor)
+            query = query.join(closing, closing.c.account_id == Account.id)
+            balance = closing.c.balance
+        return (
+            query.add_columns(
+                (balance - total(legs.c.delta)).label("opening_balance"),
+                total(legs.c.debit, in_range).label("debits"),
+                total(legs.c.credit, in_range).label("credits"),
+                (
+                    balance - total(legs.c.delta, legs.c.transaction_date > end_date)
+                ).label("closing_balance"),
+            )
+            .outerjoin(legs, legs.c.account_id == Account.id)
+            .group_by(Account.id, balance)
+            .order_by(Account.type, Account.name, Account.id)
+        )
+
+    @staticmethod
+    def generate_trial_balance(
+        start_date: date, end_date: date, analytics: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a trial balance for a date range. Total debits and credits
+        tie out because every posting has one of each.
+        """
+        PeriodService.require_unarchived(start_date)
+        if _use_analytics(analytics):
+            rows = sorted(
+                AnalyticsService.columns().account_totals(start_date, end_date),
+                key=lambda row: (row["type"], row["name"], row["account_id"]),
+            )
+        else:
+            try:
+                rows = [
+                    {
+                        "account_id": str(row.id),
+                        "name": row.name,
+                        "type": row.type,
+                        "opening_balance": row.opening_balance,
+                        "debits": row.debits,
+                        "credits": row.credits,
+                        "closing_balance": row.closing_balance,
+                    }
+                    for row in db.session.execute(
+                        ReportService.trial_balance_query(
+                            start_date,
+                            end_date,
+                            PeriodService.close_on_or_after(end_date),
+                        )
+                    )
+                ]
+            except SQLAlchemyError as e:
+                logger.error(f"Error generating trial balance: {str(e)}")
+                raise FinancialSystemError("Failed to generate trial balance")
+
+        total_debits = sum((row["debits"] for row in rows), Decimal("0"))
+        total_credits = sum((row["credits"] for row in rows), Decimal("0"))
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "accounts": [
+                {
+                    **row,
+                    **{
+                        key: float(row[key])
+                        for key in (
+                            "opening_balance",
+                            "debits",
+                            "credits",
+                            "closing_balance",
+                        )
+                    },
+                }
+                for row in rows
+            ],
+            "total_debits": float(total_debits),
+            "total_credits": float(total_credits),
+            "balanced": total_debits == total_credits,
+        }
+
+    @staticmethod
+    def profit_loss_totals(
+        start_date: date,
+        end_date: date,
+        periods: Optional[List[date]] = None,
+        analytics: Optional[bool] = None,
+    ) -> tuple:
+        """
+        Return the income and expense totals for a date range as Decimals,
+        with the (income, expenses) of each period starting on the given
+        dates when periods are passed.
+        """
+        PeriodService.require_unarchived(start_date)
+        if _use_analytics(analytics):
+            income, expenses, by_period = AnalyticsService.columns().profit_loss(
+                start_date, end_date, periods
+            )
+        else:
+            try:
+                # Query income and expense transactions
+                income_result = db.session.execute(
+                    ReportService.profit_loss_total_query(
+                        "INCOME", start_date, end_date
+                    )
+                ).scalar_one()
+                income = income_result if income_result is not None else Decimal("0.00")
+                print(f"Debug statement:{income}")
+                expenses_result = db.session.execute(
+                    ReportService.profit_loss_total_query(
+                        "EXPENSE", start_date, end_date
+                    )
+                ).scalar_one()
+
+                expenses = (
+                    expenses_result if expenses_result is not None else Decimal("0.00")
+                )
+                print(f"Debug Expense statement:{expenses_result}")
+                by_period = []
+                if periods:
+                    monthly = {
+                        account_type: {
+                            (row.month.year, row.month.month): row.total
+                            for row in db.session.execute(
+                                ReportService.profit_loss_total_query(
+                                    account_type, start_date, end_date, by_month=True
+                                )
+                            )
+                        }
+                        for account_type in ("INCOME", "EXPENSE")
+                    }
+                    by_period = [
+                        tuple(
+                            monthly[account_type].get(
+                                (day.year, day.month), Decimal("0.00")
+                            )
+                            for account_type in ("INCOME", "EXPENSE")
+                        )
+                        for day in periods
+                    ]
+            except SQLAlchemyError as e:
+                logger.error(f"Error generating profit/loss report: {str(e)}")
+                raise FinancialSystemError("Failed to generate profit/loss report")
+        return income, expenses, by_period
+
+    @staticmethod
+    def profit_loss_dict(
+        start_date: date, end_date: date, income: Decimal, expenses: Decimal
+    ) -> Dict[str, Any]:
+        """
+        Serialize profit and loss totals for a date range.
+        """
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "total_income": float(income),
+            "total_expenses": float(expenses),
+            "net_profit_loss": float(income - expenses),
+        }
+
+    @staticmethod
+    def generate_profit_loss_report(
+        start_date: date,
+        end_date: date,
+        bucket: Optional[str] = None,
+        analytics: Optional[bool] = None,
+    ) -> dict:
+        """
+        Generate a profit and loss report for a date range. With bucket
+        "month" the totals are also broken down by calendar month.
+        """
+        periods = month_starts(start_date, end_date) if bucket == "month" else None
+        income, expenses, by_period = ReportService.profit_loss_totals(
+            start_date, end_date, periods, analytics
+        )
+        report = ReportService.profit_loss_dict(start_date, end_date, income, expenses)
+        if periods:
+            ends = [day - timedelta(days=1) for day in periods[1:]] + [end_date]
+            report["buckets"] = [
+                ReportService.profit_loss_dict(
+                    first, last, period_income, period_expenses
+                )
+                for first, last, (period_income, period_expenses) in zip(
+                    periods, ends, by_period
+                )
+            ]
+        return report
+
+    @staticmethod
+    def _dashboard_section(build, timeout: float) -> Any:
+        """
+        Build one dashboard section in its own application context, and so on
+        its own session and pooled connection, with statement_timeout capped
+        at the section's budget.
+        """
+        with app.app_context():
+            if db.engine.dialect.name == "postgresql":
+                db.session.execute(
+                    text("SELECT set_config('statement_timeout', :ms, true)"),
+                    {"ms": str(max(1, int(timeout * 1000)))},
+                )
+            return build()
+
+    @staticmethod
+    def generate_dashboard(
+        start_date: date, end_date: date, recent: int = 10
+    ) -> Dict[str, Any]:
+        """
+        Generate the dashboard: balances, profit and loss for the period,
+        recent transactions and account counts. The sections are queried
+        concurrently and each has DASHBOARD_QUERY_TIMEOUT seconds, or what is
+        left of the request's deadline if that is shorter; a section
+        that fails or runs out of time is returned as null and named in
+        "errors" instead of failing the whole dashboard.
+        """
+        timeout = app.config["DASHBOARD_QUERY_TIMEOUT"]
+        remaining = _remaining_ms()
+        if remaining is not None:
+            timeout = min(timeout, remaining / 1000)
+        sections = {
+            "balances": ReportService.generate_balance_report,
+            "profit_loss": lambda: ReportService.generate_profit_loss_report(
+                start_date, end_date
+            ),
+            "recent_transactions": lambda: [
+                t.to_dict() for t in TransactionService.list_transactions({}, 1, recent)
+            ],
+            "account_counts": AccountService.count_by_type,
+        }
+
+        deadline = time.monotonic() + timeout
+        futures = {
+            name: dashboard_executor.submit(
+                ReportService._dashboard_section, build, timeout
+            )
+            for name, build in sections.items()
+        }
+        dashboard: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, future in futures.items():
+            try:
+                dashboard[name] = future.result(
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except FutureTimeoutError:
+                future.cancel()
+                logger.warning(f"Dashboard section {name} exceeded {timeout}s")
+                dashboard[name], errors[name] = None, "Timed out"
+            except FinancialSystemError as e:
+                dashboard[name], errors[name] = None, e.detail
+            except Exception as e:
+                logger.error(f"Error building dashboard section {name}: {str(e)}")
+                dashboard[name], errors[name] = None, "Failed to load"
+        dashboard["errors"] = errors
+        return dashboard
+
+
+class ChangeService:
+    """
+    Service class for the change feed, read from accounting.change_outbox.
+
+    A position in the feed is the (txid, id) of the last outbox row read.
+    Rows are returned in that order, and only those of transactions older
+    than every transaction still running: a change committed later always
+    sorts after the positions already handed out, so following the feed
+    never skips one. A long-running write transaction holds the feed back
+    until it finishes.
+    """
+
+    # Transaction ids below this have all committed or rolled back
+    HORIZON = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+    @staticmethod
+    def _tokens() -> URLSafeSerializer:
+        return URLSafeSerializer(app.config["SECRET_KEY"], salt="changes")
+
+    @staticmethod
+    def changes_query(after: Optional[List[int]], limit: int):
+        """
+        Build the SELECT of up to limit outbox rows after a position, in
+        feed order.
+        """
+        query = select(Change).where(Change.txid < ChangeService.HORIZON)
+        if after:
+            query = query.where(
+                tuple_(Change.txid, Change.id)
+                > tuple_(literal(after[0]), literal(after[1]))
+            )
+        return query.order_by(Change.txid, Change.id).limit(limit)
+
+    @staticmethod
+    def list_changes(since: Optional[str] = None, limit: int = 500) -> Dict[str, Any]:
+        """
+        Return the account and transaction changes after the since token, or
+        from the start of the feed, with the token to continue from. Changes
+        to the same record within a page are collapsed into one entry with
+        its current state, placed at its last change. since="now" returns no
+        changes and a token for the current end of the feed; take it before
+        a full download, then follow the feed from there.
+        """
+        if db.engine.dialect.name != "postgresql":
+            raise FinancialSystemError("The change feed is not available", 503)
+        tokens = ChangeService._tokens()
+        after = None
+        try:
+            if since == "now":
+                horizon = db.session.execute(select(ChangeService.HORIZON)).scalar()
+                return {
+                    "changes": [],
+                    "next": tokens.dumps([horizon, 0]),
+                    "has_more": False,
+                }
+            if since:
+                try:
+                    after = [int(part) for part in tokens.loads(since)]
+                except (BadSignature, TypeError, ValueError):
+                    raise RequestValidationError("Invalid since token")
+
+            rows = (
+                db.session.execute(ChangeService.changes_query(after, limit + 1))
+                .scalars()
+                .all()
+            )
+            page = rows[:limit]
+
+            latest: Dict[Any, Change] = {}
+            for change in page:
+                latest.pop((change.entity, change.entity_id), None)
+                latest[(change.entity, change.entity_id)] = change
+            ids = {"account": [], "transaction": []}
+            for entity, entity_id in latest:
+                ids[entity].append(entity_id)
+            current: Dict[Any, Dict[str, Any]] = {}
+            for model, entity in ((Account, "account"), (Transaction, "transaction")):
+                if ids[entity]:
+                    for record in db.session.execute(
+                        select(model).where(model.id.in_(ids[entity]))
+                    ).scalars():
+                        current[(entity, str(record.id))] = record.to_dict()
+        except SQLAlchemyError as e:
+            logger.error(f"Error reading changes: {str(e)}")
+            raise FinancialSystemError("Failed to read changes")
+
+        position = [page[-1].txid, page[-1].id] if page else after or [0, 0]
+        return {
+            "changes": [
+                {
+                    "entity": change.entity,
+                    "id": str(change.entity_id),
+                    "operation": change.operation,
+                    "changed_at": change.changed_at.isoformat(),
+                    "data": current.get((change.entity, str(change.entity_id))),
+                }
+                for change in latest.values()
+            ],
+            "next": tokens.dumps(position),
+            "has_more": len(rows) > limit,
+        }
+
+
+def _use_analytics(analytics: Optional[bool] = None) -> bool:
+    """
+    Whether a report is answered by the analytics engine: as asked, or by
+    default when ANALYTICS_ENABLED is set. The engine needs PostgreSQL.
+    """
+    if analytics is None:
+        analytics = app.config["ANALYTICS_ENABLED"]
+    return analytics and db.engine.dialect.name == "postgresql"
+
+
+ledger_columns: Optional[LedgerColumns] = None
+_ledger_columns_lock = threading.Lock()
+_ledger_refreshed_at = 0.0
+
+
+class AnalyticsService:
+    """
+    Service class for the analytics engine, a columnar copy of the ledger
+    held by each process (see analytics.LedgerColumns) that answers the
+    balance, trial balance and profit and loss reports without querying
+    the ledger.
+
+    The copy starts from the snapshot at ANALYTICS_SNAPSHOT_PATH, written
+    by "flask analytics snapshot", or from a full read of the ledger. It is
+    brought up to date from the change feed before a report when it is
+    older than ANALYTICS_REFRESH_INTERVAL seconds. Balances are derived
+    from opening balances and postings, like reconciliation's expected
+    balances; "flask analytics verify" compares the reports with SQL.
+    """
+
+    PAGE_SIZE = 10000
+
+    @staticmethod
+    def columns(max_age: Optional[float] = None) -> LedgerColumns:
+        """
+        Return the ledger copy, loading it or applying recent changes first
+        when it is older than max_age seconds (ANALYTICS_REFRESH_INTERVAL by
+        default).
+        """
+        global ledger_columns, _ledger_refreshed_at
+        if max_age is None:
+            max_age = app.config["ANALYTICS_REFRESH_INTERVAL"]
+        with _ledger_columns_lock:
+            try:
+                if ledger_columns is None:
+                    columns = LedgerColumns.open(app.config["ANALYTICS_SNAPSHOT_PATH"])
+                    ledger_columns = columns or AnalyticsService._load()
+                    _ledger_refreshed_at = 0.0
+                if time.monotonic() - _ledger_refreshed_at >= max_age:
+                    AnalyticsService._refresh(ledger_columns)
+                    _ledger_refreshed_at = time.monotonic()
+            except SQLAlchemyError as e:
+                logger.error(f"Error loading the analytics engine: {str(e)}")
+                raise FinancialSystemError("Failed to load the analytics engine")
+            return ledger_columns
+
+    @staticmethod
+    def reset() -> None:
+        """
+        Drop the ledger copy; the next report loads it again.
+        """
+        global ledger_columns
+        with _ledger_columns_lock:
+            ledger_columns = None
+
+    @staticmethod
+    def _account_rows(account_ids=None):
+        query = select(Account.id, Account.name, Account.type, Account.opening_balance)
+        if account_ids is not None:
+            query = query.where(Account.id.in_(account_ids))
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def _transaction_rows(transaction_ids=None, archived: bool = False):
+        def rows(model):
+            return select(
+                model.id,
+                model.account_id,
+                model.contra_account_id,
+                model.transaction_date,
+                model.amount,
+                model.is_void,
+            )
+
+        query = rows(Transaction)
+        if transaction_ids is not None:
+            query = query.where(Transaction.id.in_(transaction_ids))
+        if archived:
+            query = union_all(query, rows(ArchivedTransaction))
+        return db.session.execute(
+            query.execution_options(yield_per=AnalyticsService.PAGE_SIZE)
+        )
+
+    @staticmethod
+    def _load() -> LedgerColumns:
+        """
+        Read the whole ledger, archived periods included. The feed position
+        is taken first, so changes committed during the read are applied
+        again by the next refresh.
+        """
+        columns = LedgerColumns()
+        horizon = db.session.execute(select(ChangeService.HORIZON)).scalar()
+        columns.position = [horizon, 0]
+        columns.add_accounts(AnalyticsService._account_rows())
+        columns.add_transactions(AnalyticsService._transaction_rows(archived=True))
+        db.session.commit()
+        logger.info(f"Loaded {len(columns)} transactions into the analytics engine")
+        return columns
+
+    @staticmethod
+    def _refresh(columns: LedgerColumns) -> None:
+        """
+        Apply the change feed after the copy's position.
+        """
+        while True:
+            changes = (
+                db.session.execute(
+                    ChangeService.changes_query(
+                        columns.position, AnalyticsService.PAGE_SIZE
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            if not changes:
+                break
+            accounts = {c.entity_id for c in changes if c.entity == "account"}
+            inserted = [
+                c.entity_id
+                for c in changes
+                if c.entity == "transaction" and c.operation == "INSERT"
+            ]
+            voided = [c.entity_id for c in changes if c.operation == "VOID"]
+            transactions = (
+                AnalyticsService._transaction_rows(inserted).all() if inserted else []
+            )
+            # A posting can reach the feed before the account it references
+            for row in transactions:
+                for account_id in (row.account_id, row.contra_account_id):
+                    if not columns.has_account(account_id):
+                        accounts.add(str(account_id))
+            if accounts:
+                columns.add_accounts(AnalyticsService._account_rows(accounts))
+            columns.add_transactions(transactions)
+            columns.void(voided)
+            columns.position = [changes[-1].txid, changes[-1].id]
+            if len(changes) < AnalyticsService.PAGE_SIZE:
+                break
+        db.session.commit()
+
+    @staticmethod
+    def write_snapshot() -> LedgerColumns:
+        """
+        Bring the ledger copy up to date and write it to
+        ANALYTICS_SNAPSHOT_PATH, for processes to start from.
+        """
+        columns = AnalyticsService.columns(max_age=0)
+        columns.save(app.config["ANALYTICS_SNAPSHOT_PATH"])
+        return columns
+
+    @staticmethod
+    def verify(start_date: date, end_date: date) -> List[str]:
+        """
+        Generate the balance, trial balance and monthly profit and loss
+        reports with SQL and with the engine, and return the names of the
+        ones that differ.
+        """
+        AnalyticsService.columns(max_age=0)
+        reports = {
+            "balance": lambda analytics: ReportService.generate_balance_report(
+                end_date, analytics=analytics
+            ),
+            "trial_balance": lambda analytics: ReportService.generate_trial_balance(
+                start_date, end_date, analytics=analytics
+            ),
+            "profit_loss": lambda analytics: ReportService.generate_profit_loss_report(
+                start_date, end_date, "month", analytics=analytics
+            ),
+        }
+
+        def comparable(report: Dict[str, Any]) -> Dict[str, Any]:
+            # Row order follows the database collation in SQL
+            if "accounts" in report:
+                report["accounts"] = sorted(
+                    report["accounts"],
+                    key=lambda account: account.get("account_id") or account["id"],
+                )
+            return report
+
+        return [
+            name
+            for name, build in reports.items()
+            if comparable(build(False)) != comparable(build(True))
+        ]
+
+
+class ImportService:
+    """
+    Service class for bulk CSV imports streamed through PostgreSQL COPY.
+
+    Rows are copied as text into a temporary staging table, validated with
+    set-based UPDATEs and merged into the ledger with one INSERT, plus one
+    balance UPDATE for transactions. The rows these return are staged as
+    audit records. Invalid rows are skipped and reported back by CSV line
+    number.
+    """
+
+    UUID_PATTERN = (
+        "^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+    )
+    DATE_PATTERN = "^[1-9][0-9]{3}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])$"
+    AMOUNT_PATTERN = "^[0-9]{1,15}([.][0-9]{1,4})?$"
+    SIGNED_AMOUNT_PATTERN = "^-?[0-9]{1,15}([.][0-9]{1,4})?$"
+
+    COLUMNS = {
+        "accounts": {
+            "allowed": ("id", "name", "type", "description", "opening_balance"),
+            "required": ("name", "type", "opening_balance"),
+        },
+        "transactions": {
+            "allowed": (
+                "account_id",
+                "contra_account_id",
+                "transaction_date",
+                "amount",
+                "description",
+                "reference_number",
+            ),
+            "required": (
+                "account_id",
+                "contra_account_id",
+                "transaction_date",
+                "amount",
+            ),
+        },
+    }
+
+    ACCOUNT_VALIDATION = """
+        UPDATE import_staging s SET error = v.error
+        FROM (
+            SELECT line_no, CASE
+                WHEN id IS NOT NULL AND id !~ :uuid_re THEN 'Invalid id'
+                WHEN name IS NULL OR btrim(name) = '' THEN 'Name is required'
+                WHEN length(name) > 255 THEN 'Name exceeds 255 characters'
+                WHEN type IS NULL
+                    OR type NOT IN ('INCOME', 'EXPENSE', 'ASSET', 'LIABILITY')
+                    THEN 'Invalid account type'
+                WHEN opening_balance IS NULL OR opening_balance !~ :signed_amount_re
+                    THEN 'Invalid opening_balance'
+                WHEN abs(opening_balance::numeric) > :max_amount
+                    THEN 'opening_balance out of range'
+            END AS error
+            FROM import_staging
+        ) v
+        WHERE v.error IS NOT NULL AND s.line_no = v.line_no
+    """
+
+    ACCOUNT_REFERENCE_VALIDATION = """
+        UPDATE import_staging s SET error = 'Duplicate id'
+        FROM (
+            SELECT line_no FROM (
+                SELECT line_no, count(*) OVER (PARTITION BY lower(id)) AS n
+                FROM import_staging
+                WHERE error IS NULL AND id IS NOT NULL
+            ) d
+            WHERE d.n > 1
+            UNION
+            SELECT st.line_no FROM import_staging st
+            JOIN accounting.accounts a ON a.id = st.id::uuid
+            WHERE st.error IS NULL AND st.id IS NOT NULL
+        ) dup
+        WHERE s.line_no = dup.line_no
+    """
+
+    ACCOUNT_MERGE = """
+        INSERT INTO accounting.accounts
+            (id, name, type, description, opening_balance, current_balance)
+        SELECT
+            COALESCE(id::uuid, gen_random_uuid()),
+            name,
+            type,
+            description,
+            opening_balance::numeric(19, 4) * :amount_scale,
+            opening_balance::numeric(19, 4) * :amount_scale
+        FROM import_staging
+        WHERE error IS NULL
+        ORDER BY line_no
+        RETURNING {returning}
+    """
+
+    TRANSACTION_VALIDATION = """
+        UPDATE import_staging s SET error = v.error
+        FROM (
+            SELECT line_no, CASE
+                WHEN account_id IS NULL OR account_id !~ :uuid_re
+                    THEN 'Invalid account_id'
+                WHEN contra_account_id IS NULL OR contra_account_id !~ :uuid_re
+                    THEN 'Invalid contra_account_id'
+                WHEN lower(account_id) = lower(contra_account_id)
+                    THEN 'Account and contra account must be different'
+                WHEN transaction_date IS NULL OR transaction_date !~ :date_re
+                    THEN 'Invalid transaction_date'
+                WHEN substr(transaction_date, 9, 2)::int > extract(day FROM (
+                    make_date(
+                        substr(transaction_date, 1, 4)::int,
+                        substr(transaction_date, 6, 2)::int,
+                        1
+                    ) + interval '1 month - 1 day'
+                )) THEN 'Invalid transaction_date'
+                WHEN transaction_date::date <= (
+                    SELECT max(period_end) FROM accounting.closed_periods
+                ) THEN 'Period is closed'
+                WHEN amount IS NULL OR amount !~ :amount_re THEN 'Invalid amount'
+                WHEN amount::numeric <= 0 THEN 'Amount must be positive'
+                WHEN amount::numeric > :max_amount THEN 'Amount out of range'
+                WHEN length(description) > 500
+                    THEN 'Description exceeds 500 characters'
+                WHEN length(reference_number) > 100
+                    THEN 'Reference number exceeds 100 characters'
+            END AS error
+            FROM import_staging
+        ) v
+        WHERE v.error IS NOT NULL AND s.line_no = v.line_no
+    """
+
+    TRANSACTION_REFERENCE_VALIDATION = """
+        UPDATE import_staging s SET error = 'Account not found'
+        WHERE s.error IS NULL
+          AND (
+            NOT EXISTS (
+                SELECT 1 FROM accounting.accounts a WHERE a.id = s.account_id::uuid
+            )
+            OR NOT EXISTS (
+                SELECT 1 FROM accounting.accounts a
+                WHERE a.id = s.contra_account_id::uuid
+            )
+          )
+    """
+
+    TRANSACTION_LOCK = """
+        SELECT id FROM accounting.accounts
+        WHERE id IN (
+            SELECT account_id::uuid FROM import_staging WHERE error IS NULL
+            UNION
+            SELECT contra_account_id::uuid FROM import_staging WHERE error IS NULL
+        )
+        ORDER BY id
+        FOR UPDATE
+    """
+
+    TRANSACTION_MERGE = """
+        INSERT INTO accounting.transactions
+            (account_id, contra_account_id, transaction_date, amount,
+             description, reference_number)
+        SELECT
+            account_id::uuid,
+            contra_account_id::uuid,
+            transaction_date::date,
+            amount::numeric(19, 4) * :amount_scale,
+            description,
+            reference_number
+        FROM import_staging
+        WHERE error IS NULL
+        ORDER BY line_no
+        RETURNING {returning}
+    """
+
+    BALANCE_MERGE = """
+        UPDATE accounting.accounts a
+        SET current_balance = a.current_balance + d.delta,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT id, SUM(delta) AS delta
+            FROM (
+                SELECT
+                    account_id::uuid AS id,
+                    amount::numeric(19, 4) * :amount_scale AS delta
+                FROM import_staging WHERE error IS NULL
+                UNION ALL
+                SELECT
+                    contra_account_id::uuid,
+                    -amount::numeric(19, 4) * :amount_scale
+                FROM import_staging WHERE error IS NULL
+            ) deltas
+            GROUP BY id
+        ) d
+        JOIN accounting.accounts old ON old.id = d.id
+        WHERE a.id = d.id
+        RETURNING a.id, old.current_balance AS old_balance, a.current_balance
+    """
+
+    @staticmethod
+    def _read_header(kind: str, stream) -> List[str]:
+        """
+        Consume the CSV header line and validate it against the import kind.
+        """
+        line = stream.readline()
+        if isinstance(line, bytes):
+            line = line.decode("utf-8-sig")
+        header = next(csv.reader([line]), [])
+        columns = [name.strip().lower() for name in header]
+
+        spec = ImportService.COLUMNS[kind]
+        unknown = sorted(set(columns) - set(spec["allowed"]))
+        missing = sorted(set(spec["required"]) - set(columns))
+        if unknown or missing or len(set(columns)) != len(columns):
+            raise RequestValidationError(
+                f"Invalid CSV header for {kind} import "
+                f"(unknown: {unknown}, missing: {missing})"
+            )
+        return columns
+
+    @staticmethod
+    def _stage(kind: str, stream) -> None:
+        """
+        Create the staging table and COPY the CSV body into it.
+        """
+        columns = ImportService._read_header(kind, stream)
+        staging_columns = ", ".join(
+            f"{name} TEXT" for name in ImportService.COLUMNS[kind]["allowed"]
+        )
+        db.session.execute(
+            text(
+                "CREATE TEMP TABLE import_staging ("
+                "line_no BIGINT GENERATED ALWAYS AS IDENTITY, "
+                f"{staging_columns}, error TEXT) ON COMMIT DROP"
+            )
+        )
+        dbapi = db.session.get_bind().dialect.dbapi
+        cursor = db.session.connection().connection.cursor()
+        copy_sql = (
+            f"COPY import_staging ({', '.join(columns)}) "  # nosec B608
+            "FROM STDIN WITH (FORMAT csv)"
+        )
+        try:
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(copy_sql, stream)
+            else:
+                with cursor.copy(copy_sql) as copy:
+                    while chunk := stream.read(65536):
+                        copy.write(chunk)
+        except dbapi.Error as e:
+            raise RequestValidationError(f"Malformed CSV: {str(e).strip()}")
+        finally:
+            cursor.close()
+        db.session.execute(text("ANALYZE import_staging"))
+
+    @staticmethod
+    def _merge(sql: str, model, params: Dict[str, Any]) -> List[Any]:
+        """
+        Run a merge statement returning the rows it inserted and stage their
+        audit records, which the ORM flush would otherwise have produced.
+        """
+        columns = list(model.__mapper__.columns)
+        statement = text(
+            sql.format(returning=", ".join(c.name for c in columns))
+        ).columns(*columns)
+        rows = db.session.execute(statement, params).mappings().all()
+        for row in rows:
+            _stage_audit_record(
+                db.session,
+                model.__tablename__,
+                row["id"],
+                "INSERT",
+                None,
+                {c.key: _audit_value(row[c.name]) for c in columns},
+            )
+        return rows
+
+    @staticmethod
+    def _report(kind: str, imported: int, max_errors: int) -> Dict[str, Any]:
+        """
+        Summarise the import, listing rejected rows by CSV line number.
+        """
+        rejected = db.session.execute(
+            text("SELECT count(*) FROM import_staging WHERE error IS NOT NULL")
+        ).scalar_one()
+        errors = db.session.execute(
+            text(
+                "SELECT line_no + 1 AS line, error FROM import_staging "
+                "WHERE error IS NOT NULL ORDER BY line_no LIMIT :limit"
+            ),
+            {"limit": max_errors},
+        ).all()
+        return {
+            "kind": kind,
+            "imported": imported,
+            "rejected": rejected,
+            "errors": [{"line": line, "error": error} for line, error in errors],
+        }
+
+    @staticmethod
+    def import_csv(
+        kind: str, stream, atomic: bool = False, max_errors: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Import accounts or transactions from a CSV stream.
+
+        When ``atomic`` is set nothing is written unless every row is valid.
+        """
+        if kind not in ImportService.COLUMNS:
+            raise NotFoundError(f"Unknown import kind: {kind}")
+
+        params = {
+            "uuid_re": ImportService.UUID_PATTERN,
+            "date_re": ImportService.DATE_PATTERN,
+            "amount_re": ImportService.AMOUNT_PATTERN,
+            "signed_amount_re": ImportService.SIGNED_AMOUNT_PATTERN,
+            "max_amount": MAX_AMOUNT,
+        }
+        try:
+            ImportService._stage(kind, stream)
+            if kind == "accounts":
+                db.session.execute(text(ImportService.ACCOUNT_VALIDATION), params)
+                db.session.execute(text(ImportService.ACCOUNT_REFERENCE_VALIDATION))
+            else:
+                db.session.execute(text(ImportService.TRANSACTION_VALIDATION), params)
+                db.session.execute(text(ImportService.TRANSACTION_REFERENCE_VALIDATION))
+
+            valid = db.session.execute(
+                text("SELECT count(*) FROM import_staging WHERE error IS NULL")
+            ).scalar_one()
+            report = ImportService._report(kind, 0, max_errors)
+
+            if atomic and report["rejected"]:
+                db.session.rollback()
+                return report
+
+            scale = {"amount_scale": AMOUNT_SCALE}
+            if kind == "accounts":
+                ImportService._merge(ImportService.ACCOUNT_MERGE, Account, scale)
+            else:
+                db.session.execute(text(ImportService.TRANSACTION_LOCK))
+                ImportService._merge(
+                    ImportService.TRANSACTION_MERGE, Transaction, scale
+                )
+                balances = db.session.execute(
+                    text(ImportService.BALANCE_MERGE).columns(
+                        Account.id,
+                        literal_column("old_balance", AMOUNT),
+                        Account.current_balance,
+                    ),
+                    scale,
+                )
+                for account_id, old_balance, balance in balances:
+                    _stage_audit_record(
+                        db.session,
+                        "accounts",
+                        account_id,
+                        "UPDATE",
+                        {"current_balance": _audit_value(old_balance)},
+                        {"current_balance": _audit_value(balance)},
+                    )
+            db.session.commit()
+            if kind == "accounts":
+                account_index.invalidate()
+                _publish_event("accounts.imported", [], {"imported": valid})
+
+            report["imported"] = valid
+            logger.info(f"Imported {valid} {kind} rows, rejected {report['rejected']}")
+            return report
+        except FinancialSystemError:
+            db.session.rollback()
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error importing {kind}: {str(e)}")
+            raise RequestValidationError(f"Failed to import {kind}: malformed CSV")
+
+
+class ReconciliationService:
+    """
+    Service class for checking stored balances against the ledger.
+
+    The expected balance of an account is its opening balance plus the sum of
+    non-void transactions where it is the account, minus the sum of those
+    where it is the contra account. Once a period is closed the sums start
+    from the account's balance frozen at the latest close, so only the open
+    period is read.
+    """
+
+    # The first row carries the number of accounts checked, the remaining
+    # rows are the accounts whose stored balance has drifted.
+    EXPECTED_BALANCES = """
+        WITH closed AS (
+            SELECT max(period_end) AS period_end FROM accounting.closed_periods
+        ),
+        expected AS (
+            SELECT
+                a.id,
+                a.name,
+                a.current_balance,
+                COALESCE(h.balance, a.opening_balance) + COALESCE(m.movement, 0)
+                    AS expected
+            FROM accounting.accounts a
+            LEFT JOIN accounting.balance_history h
+                ON h.account_id = a.id
+                AND h.balance_date = (SELECT period_end FROM closed)
+            LEFT JOIN (
+                SELECT id, SUM(delta) AS movement
+                FROM (
+                    SELECT account_id AS id, amount AS delta
+                    FROM accounting.transactions
+                    WHERE is_void = FALSE AND {account_scope}
+                      AND transaction_date > {closed}
+                    UNION ALL
+                    SELECT contra_account_id AS id, -amount AS delta
+                    FROM accounting.transactions
+                    WHERE is_void = FALSE AND {contra_scope}
+                      AND transaction_date > {closed}
+                ) legs
+                GROUP BY id
+            ) m ON m.id = a.id
+            WHERE {scope}
+        )
+        SELECT NULL::uuid AS id, NULL AS name, NULL::numeric AS current_balance,
+               NULL::numeric AS expected, count(*) AS checked
+        FROM expected
+        UNION ALL
+        SELECT id, name, current_balance, expected, NULL
+        FROM expected
+        WHERE current_balance <> expected
+    """
+
+    SCOPES = {
+        "range": (
+            "{column} >= CAST(:lo AS uuid) "
+            "AND (CAST(:hi AS uuid) IS NULL OR {column} < CAST(:hi AS uuid))"
+        ),
+        "ids": "{column} = ANY(CAST(:ids AS uuid[]))",
+    }
+
+    # Accounts updated, or on either side of a transaction recorded, voided
+    # or otherwise updated since the given time. Voids and updates are read
+    # from the change outbox: a void that flips is_void without moving the
+    # balances leaves the account rows untouched.
+    TOUCHED_ACCOUNTS = """
+        SELECT id FROM accounting.accounts WHERE updated_at >= :since
+        UNION
+        SELECT account_id FROM accounting.transactions WHERE created_at >= :since
+        UNION
+        SELECT contra_account_id FROM accounting.transactions
+        WHERE created_at >= :since
+        UNION
+        SELECT unnest(ARRAY[t.account_id, t.contra_account_id])
+        FROM accounting.change_outbox o
+        JOIN accounting.transactions t ON t.id = o.entity_id
+        WHERE o.entity = 'transaction' AND o.operation <> 'INSERT'
+          AND o.changed_at >= :since
+    """
+
+    # Result types of EXPECTED_BALANCES, so balances load as amounts
+    BALANCE_TYPES = {"current_balance": AMOUNT, "expected": AMOUNT}
+
+    @staticmethod
+    def _expected_balances_query(kind: str):
+        scope = ReconciliationService.SCOPES[kind]
+        return text(
+            ReconciliationService.EXPECTED_BALANCES.format(
+                scope=scope.format(column="a.id"),
+                account_scope=scope.format(column="account_id"),
+                contra_scope=scope.format(column="contra_account_id"),
+                closed="COALESCE((SELECT period_end FROM closed), '-infinity')",
+            )
+        )
+
+    @staticmethod
+    def _uuid_ranges(parts: int) -> List[Dict[str, str]]:
+        """
+        Split the UUID key space into contiguous, equally sized ranges.
+        """
+        bounds = [UUID(int=(i << 128) // parts) for i in range(parts)]
+        ranges = []
+        for i, lo in enumerate(bounds):
+            hi = bounds[i + 1] if i + 1 < parts else None
+            ranges.append({"lo": str(lo), "hi": str(hi) if hi else None})
+        return ranges
+
+    @staticmethod
+    def _check_unit(engine, kind: str, params: Dict[str, Any]):
+        """
+        Run the expected-balance query for one unit of work on its own
+        connection. Returns (checked, drifted rows).
+        """
+        query = ReconciliationService._expected_balances_query(kind).columns(
+            **ReconciliationService.BALANCE_TYPES
+        )
+        with engine.connect() as conn:
+            rows = conn.execute(query, params).all()
+        return rows[0].checked, rows[1:]
+
+    @staticmethod
+    def _last_run_started_at() -> Optional[datetime]:
+        return db.session.execute(
+            select(func.max(ReconciliationRun.started_at)).where(
+                ReconciliationRun.finished_at.isnot(None)
+            )
+        ).scalar_one()
+
+    @staticmethod
+    def _repair(account_ids: List[str]) -> int:
+        """
+        Reset drifted balances to the ledger value, staging an audit record
+        of each change. The accounts are locked in id order first so the
+        expected balance is computed from a snapshot that includes every
+        committed posting against them.
+        """
+        if not account_ids:
+            return 0
+        params = {"ids": sorted(account_ids)}
+        db.session.execute(
+            text(
+                "SELECT id FROM accounting.accounts "
+                "WHERE id = ANY(CAST(:ids AS uuid[])) ORDER BY id FOR UPDATE"
+            ),
+            params,
+        )
+        rows = db.session.execute(
+            ReconciliationService._expected_balances_query("ids").columns(
+                **ReconciliationService.BALANCE_TYPES
+            ),
+            params,
+        ).all()
+        repaired = 0
+        for row in rows[1:]:
+            db.session.execute(
+                update(Account)
+                .where(Account.id == row.id)
+                .values(current_balance=row.expected)
+            )
+            _stage_audit_record(
+                db.session,
+                "accounts",
+                row.id,
+                "UPDATE",
+                {"current_balance": _audit_value(row.current_balance)},
+                {"current_balance": _audit_value(row.expected)},
+            )
+            repaired += 1
+        return repaired
+
+    @staticmethod
+    def reconcile(
+        repair: bool = False, incremental: bool = False, workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Compare every stored balance (or only those touched since the last
+        run) with the ledger, optionally repairing any drift.
+        """
+        workers = workers or app.config["RECONCILIATION_WORKERS"]
+        try:
+            started_at = db.session.execute(select(func.clock_timestamp())).scalar_one()
+
+            since = None
+            if incremental:
+                last_started = ReconciliationService._last_run_started_at()
+                if last_started is not None:
+                    since = last_started - timedelta(
+                        seconds=app.config["RECONCILIATION_OVERLAP_SECONDS"]
+                    )
+
+            if since is not None:
+                touched = [
+                    str(account_id)
+                    for account_id in db.session.execute(
+                        text(ReconciliationService.TOUCHED_ACCOUNTS),
+                        {"since": since},
+                    ).scalars()
+                ]
+                chunk = max(1, -(-len(touched) // workers))
+                kind = "ids"
+                units = [
+                    {"ids": touched[i : i + chunk]}
+                    for i in range(0, len(touched), chunk)
+                ]
+            else:
+                kind = "range"
+                units = ReconciliationService._uuid_ranges(workers)
+
+            engine = db.engine
+            checked, drifted = 0, []
+            with ThreadPoolExecutor(max_workers=max(1, len(units))) as pool:
+                for unit_checked, unit_drifted in pool.map(
+                    lambda params: ReconciliationService._check_unit(
+                        engine, kind, params
+                    ),
+                    units,
+                ):
+                    checked += unit_checked
+                    drifted.extend(unit_drifted)
+
+            repaired = 0
+            if repair:
+                repaired = ReconciliationService._repair(
+                    [str(row.id) for row in drifted]
+                )
+
+            run = ReconciliationRun(
+                started_at=started_at,
+                finished_at=datetime.now(timezone.utc),
+                mode="incremental" if since is not None else "full",
+                accounts_checked=checked,
+                accounts_drifted=len(drifted),
+                accounts_repaired=repaired,
+            )
+            db.session.add(run)
+            db.session.commit()
+
+            logger.info(
+                f"Reconciliation checked {checked} accounts, "
+                f"{len(drifted)} drifted, {repaired} repaired"
+            )
+            return {
+                "mode": run.mode,
+                "since": since.isoformat() if since else None,
+                "accounts_checked": checked,
+                "accounts_drifted": len(drifted),
+                "accounts_repaired": repaired,
+                "total_drift": float(
+                    sum((row.current_balance - row.expected for row in drifted), 0)
+                ),
+                "drift": [
+                    {
+                        "account_id": str(row.id),
+                        "name": row.name,
+                        "current_balance": float(row.current_balance),
+                        "expected_balance": float(row.expected),
+                        "drift": float(row.current_balance - row.expected),
+                    }
+                    for row in drifted
+                ],
+            }
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error reconciling balances: {str(e)}")
+            raise FinancialSystemError("Failed to reconcile balances")
+
+
+class PeriodService:
+    """
+    Service class for closing accounting periods.
+
+    A period is closed through its last day. Closing freezes every
+    account's balance at that day in balance_history, derived from the
+    previous close and the period's postings, and locks the period: the
+    accounting.check_period_open trigger rejects postings dated in it and
+    voids of its transactions on every write path. Reports, as-of balances
+    and reconciliation start from the frozen balances instead of the first
+    transaction.
+
+    Archiving a close also moves the transactions through it to
+    accounting.transactions_archive, so the ledger only holds the open
+    period. Reports that would read archived transactions are rejected.
+    """
+
+    ARCHIVE = """
+        WITH moved AS (
+            DELETE FROM accounting.transactions
+            WHERE transaction_date <= :period_end
+            RETURNING *
+        )
+        INSERT INTO accounting.transactions_archive SELECT * FROM moved
+    """
+
+    @staticmethod
+    def list_periods() -> List[ClosedPeriod]:
+        """
+        List the closed periods, latest first.
+        """
+        try:
+            return (
+                db.session.execute(
+                    select(ClosedPeriod).order_by(ClosedPeriod.period_end.desc())
+                )
+                .scalars()
+                .all()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error listing closed periods: {str(e)}")
+            raise FinancialSystemError("Failed to list closed periods")
+
+    @staticmethod
+    def closed_through(archived: bool = False) -> Optional[date]:
+        """
+        Return the last day of the latest closed period, or of the latest
+        archived one, if any.
+        """
+        query = select(func.max(ClosedPeriod.period_end))
+        if archived:
+            query = query.where(ClosedPeriod.archived == true())
+        return db.session.execute(query).scalar_one()
+
+    @staticmethod
+    def close_on_or_after(day: date) -> Optional[date]:
+        """
+        Return the last day of the first closed period ending on or after
+        day, the nearest frozen balances a balance as of day can start from.
+        """
+        return db.session.execute(
+            select(func.min(ClosedPeriod.period_end)).where(
+                ClosedPeriod.period_end >= day
+            )
+        ).scalar_one()
+
+    @staticmethod
+    def close_on_or_before(day: date) -> Optional[date]:
+        """
+        Return the last day of the latest closed period ending on or before
+        day, whose frozen balances a balance as of day can be carried forward
+        from.
+        """
+        return db.session.execute(
+            select(func.max(ClosedPeriod.period_end)).where(
+                ClosedPeriod.period_end <= day
+            )
+        ).scalar_one()
+
+    @staticmethod
+    def require_unarchived(first_day: date) -> None:
+        """
+        Reject a report that reads transactions dated from first_day when
+        some of them are archived.
+        """
+        archived = PeriodService.closed_through(archived=True)
+        if archived is not None and first_day <= archived:
+            raise RequestValidationError(
+                f"Transactions through {archived.isoformat()} are archived"
+            )
+
+    @staticmethod
+    def closing_balances_query(period_end: Optional[date]):
+        """
+        Build a subquery of every account's balance at the end of a closed
+        period: the balance frozen by the close, or the opening balance for
+        accounts opened since. Without period_end every account starts from
+        its opening balance.
+        """
+        balance = Account.opening_balance
+        query = select(Account.id.label("account_id"))
+        if period_end is not None:
+            balance = func.coalesce(BalanceHistory.balance, balance)
+            query = query.outerjoin(
+                BalanceHistory,
+                and_(
+                    BalanceHistory.account_id == Account.id,
+                    BalanceHistory.balance_date == period_end,
+                ),
+            )
+        return query.add_columns(balance.label("balance")).subquery("closing")
+
+    @staticmethod
+    def close_period(period_end: date, archive: bool = False) -> Dict[str, Any]:
+        """
+        Close the period through period_end: freeze every account's balance
+        at that day and lock the period against postings and voids. With
+        archive the transactions through period_end are also moved to the
+        archive table. Returns the close with the number of balances frozen
+        and transactions archived.
+        """
+        try:
+            # Closes run one at a time. Backdated postings and voids lock
+            # closed_periods too (accounting.fence_period_close), so they
+            # wait for the close to commit and the close for those in
+            # flight: none can land in the period after its balances are
+            # taken. Postings dated today go on while the period closes
+            db.session.execute(
+                text("LOCK TABLE accounting.closed_periods IN SHARE ROW EXCLUSIVE MODE")
+            )
+            # A posting dated yesterday skips the fence when its transaction
+            # began yesterday, and it may not have committed yet
+            today = db.session.execute(select(func.current_date())).scalar_one()
+            if period_end >= today - timedelta(days=1):
+                raise RequestValidationError(
+                    "Only periods that ended before yesterday can be closed"
+                )
+            previous = PeriodService.closed_through()
+            if previous is not None and period_end <= previous:
+                raise RequestValidationError(
+                    f"Period already closed through {previous.isoformat()}"
+                )
+
+            start = previous + timedelta(days=1) if previous else date.min
+            legs = ReportService.legs_query(start, period_end)
+            opening = PeriodService.closing_balances_query(previous)
+            balances = (
+                select(
+                    opening.c.account_id,
+                    literal(period_end),
+                    opening.c.balance + func.coalesce(func.sum(legs.c.delta), 0),
+                )
+                .outerjoin(legs, legs.c.account_id == opening.c.account_id)
+                .group_by(opening.c.account_id, opening.c.balance)
+            )
+            frozen = ReportService.upsert_snapshots(balances)
+
+            period = ClosedPeriod(period_end=period_end, archived=archive)
+            db.session.add(period)
+            archived = 0
+            if archive:
+                archived = db.session.execute(
+                    text(PeriodService.ARCHIVE), {"period_end": period_end}
+                ).rowcount
+            db.session.commit()
+        except RequestValidationError:
+            db.session.rollback()
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error closing period: {str(e)}")
+            raise FinancialSystemError("Failed to close period")
+
+        logger.info(
+            f"Closed period through {period_end}: {frozen} balances frozen, "
+            f"{archived} transactions archived"
+        )
+        return {
+            **period.to_dict(),
+            "balances_frozen": frozen,
+            "transactions_archived": archived,
+        }
+
+
+class PartitionService:
+    """
+    Service class for managing the date-range partitions of the transactions
+    table.
+    """
+
+    @staticmethod
+    def ensure_partitions(
+        months_ahead: Optional[int] = None, start: Optional[date] = None
+    ) -> List[str]:
+        """
+        Create any missing partitions from ``start`` (default today) up to
+        ``months_ahead`` months in the future. Returns the new partition names.
+        """
+        if months_ahead is None:
+            months_ahead = app.config["PARTITION_MONTHS_AHEAD"]
+        start = start or date.today()
+        years, month = divmod(start.month - 1 + months_ahead, 12)
+        end = date(start.year + years, month + 1, 1)
+        try:
+            created = (
+                db.session.execute(
+                    text(
+                        "SELECT accounting.ensure_transaction_partitions("
+                        ":start, :end, :granularity)"
+                    ),
+                    {
+                        "start": start,
+                        "end": end,
+                        "granularity": app.config["PARTITION_GRANULARITY"],
+                    },
+                )
+                .scalars()
+                .all()
+            )
+            db.session.commit()
+            if created:
+                logger.info(f"Created transaction partitions: {', '.join(created)}")
+            return created
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error creating partitions: {str(e)}")
+            raise FinancialSystemError("Failed to create partitions")
+
+    @staticmethod
+    def list_partitions() -> List[Dict[str, Any]]:
+        """
+        List the attached partitions with their bounds and estimated size.
+        """
+        try:
+            rows = db.session.execute(
+                text(
+                    """
+                    SELECT
+                        c.relname AS name,
+                        pg_get_expr(c.relpartbound, c.oid) AS bounds,
+                        GREATEST(c.reltuples, 0)::bigint AS estimated_rows,
+                        pg_total_relation_size(c.oid) AS total_bytes
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'accounting.transactions'::regclass
+                    ORDER BY c.relname
+                    """
+                )
+            ).all()
+            return [dict(row._mapping) for row in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"Error listing partitions: {str(e)}")
+            raise FinancialSystemError("Failed to list partitions")
+
+    @staticmethod
+    def detach_partition(name: str, concurrently: bool = False) -> None:
+        """
+        Detach a partition from the transactions table. The detached table is
+        kept as a standalone archive table; its rows no longer appear in any
+        ledger query.
+        """
+        partitions = {p["name"] for p in PartitionService.list_partitions()}
+        if name not in partitions or name == "transactions_default":
+            raise NotFoundError(f"Partition not found: {name}")
+
+        statement = text(
+            "ALTER TABLE accounting.transactions "
+            f'DETACH PARTITION accounting."{name}"'  # nosec B608
+            + (" CONCURRENTLY" if concurrently else "")
+        )
+        try:
+            if concurrently:
+                # DETACH ... CONCURRENTLY cannot run inside a transaction block
+                db.session.rollback()
+                with db.engine.connect().execution_options(
+                    isolation_level="AUTOCOMMIT"
+                ) as conn:
+                    conn.execute(statement)
+            else:
+                db.session.execute(statement)
+                db.session.commit()
+            logger.info(f"Detached transaction partition: {name}")
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error detaching partition: {str(e)}")
+            raise FinancialSystemError("Failed to detach partition")
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a running job once its cancellation has been requested.
+    """
+
+
+class JobRun:
+    """
+    Progress reporting for the job a worker is running. A heartbeat thread
+    touches the job row on its own connection every JOB_HEARTBEAT_INTERVAL
+    seconds, so jobs of crashed workers can be told apart from slow ones,
+    and notices cancellation requests.
+    """
+
+    # Minimum seconds between progress writes
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, job_id, engine):
+        self.job_id = job_id
+        self.engine = engine
+        self.cancelled = threading.Event()
+        self._stopped = threading.Event()
+        self._last_write = 0.0
+        self._thread = threading.Thread(
+            target=self._beat, name=f"job-heartbeat-{job_id}", daemon=True
+        )
+
+    def __enter__(self):
+        """
+        Start sending heartbeats.
+        """
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Stop sending heartbeats.
+        """
+        self._stopped.set()
+        self._thread.join()
+
+    def _touch(self, progress: Optional[float] = None) -> None:
+        values: Dict[str, Any] = {"heartbeat_at": func.now()}
+        if progress is not None:
+            values["progress"] = progress
+        with self.engine.begin() as conn:
+            cancel = conn.execute(
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(**values)
+                .returning(Job.cancel_requested)
+            ).scalar()
+        if cancel:
+            self.cancelled.set()
+
+    def _beat(self) -> None:
+        while not self._stopped.wait(app.config["JOB_HEARTBEAT_INTERVAL"]):
+            try:
+                self._touch()
+            except SQLAlchemyError as e:
+                logger.warning(f"Job {self.job_id} heartbeat failed: {str(e)}")
+
+    def progress(self, fraction: float) -> None:
+        """
+        Record the completed fraction of the job and stop it if it has been
+        cancelled.
+        """
+        now = time.monotonic()
+        if fraction >= 1 or now - self._last_write >= self.PROGRESS_INTERVAL:
+            self._last_write = now
+            self._touch(round(min(fraction, 1.0) * 100, 2))
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+
+class JobService:
+    """
+    Service class for background report and export jobs.
+
+    Jobs are rows in accounting.jobs. Workers claim the oldest runnable job
+    with FOR UPDATE SKIP LOCKED, so any number of them can poll the table
+    without blocking each other, and write the result to a JSON file under
+    JOB_RESULT_DIR. Failed jobs are retried with exponential backoff up to
+    their max_attempts; finished jobs and their files are removed after
+    JOB_RESULT_TTL_HOURS.
+    """
+
+    @staticmethod
+    def enqueue(data: dict, created_by: str) -> Job:
+        """
+        Validate and queue a new job.
+        """
+        try:
+            validated_data = JobCreate(**data).dict()
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+        if validated_data["kind"] != "reconciliation":
+            _report_date_range(validated_data["params"])
+
+        job = Job(
+            kind=validated_data["kind"],
+            params=validated_data["params"],
+            max_attempts=validated_data["max_attempts"]
+            or app.config["JOB_MAX_ATTEMPTS"],
+            created_by=created_by,
+        )
+        try:
+            db.session.add(job)
+            db.session.commit()
+            logger.info(f"Queued {job.kind} job: {job.id}")
+            return job
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error queueing job: {str(e)}")
+            raise FinancialSystemError("Failed to queue job")
+
+    @staticmethod
+    def get_job(job_id: str, created_by: str, for_update: bool = False) -> Job:
+        """
+        Retrieve one of a user's jobs by its ID.
+        """
+        try:
+            query = select(Job).where(Job.id == job_id, Job.created_by == created_by)
+            if for_update:
+                query = query.with_for_update()
+            job = db.session.execute(query).scalar_one_or_none()
+            if not job:
+                raise NotFoundError("Job not found")
+            return job
+        except SQLAlchemyError as e:
+            logger.error(f"Error fetching job: {str(e)}")
+            raise FinancialSystemError("Failed to fetch job")
+
+    @staticmethod
+    def list_jobs(created_by: str, limit: int = 50) -> List[Job]:
+        """
+        List a user's most recent jobs.
+        """
+        try:
+            return (
+                db.session.execute(
+                    select(Job)
+                    .where(Job.created_by == created_by)
+                    .order_by(Job.created_at.desc())
+                    .limit(limit)
+                )
+                .scalars()
+                .all()
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Error listing jobs: {str(e)}")
+            raise FinancialSystemError("Failed to list jobs")
+
+    @staticmethod
+    def cancel(job_id: str, created_by: str) -> Job:
+        """
+        Cancel a job. A queued job is cancelled at once; a running job is
+        flagged and stops at its next progress report.
+        """
+        job = JobService.get_job(job_id, created_by, for_update=True)
+        try:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = datetime.now(timezone.utc)
+            elif job.status == "running":
+                job.cancel_requested = True
+            else:
+                db.session.rollback()
+                raise RequestValidationError(f"Job is already {job.status}")
+            db.session.commit()
+            return job
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error cancelling job: {str(e)}")
+            raise FinancialSystemError("Failed to cancel job")
+
+    @staticmethod
+    def claim_next() -> Optional[Job]:
+        """
+        Mark the oldest runnable job as running and return it, skipping jobs
+        other workers are claiming at the same moment.
+        """
+        runnable = (
+            select(Job.id)
+            .where(Job.status == "queued", Job.run_after <= func.now())
+            .order_by(Job.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        try:
+            job = db.session.execute(
+                update(Job)
+                .where(Job.id == runnable)
+                .values(
+                    status="running",
+                    attempts=Job.attempts + 1,
+                    progress=0,
+                    error=None,
+                    started_at=func.now(),
+                    heartbeat_at=func.now(),
+                )
+                .returning(Job)
+            ).scalar_one_or_none()
+            db.session.commit()
+            return job
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error claiming job: {str(e)}")
+            raise FinancialSystemError("Failed to claim job")
+
+    @staticmethod
+    def run_job(job: Job) -> str:
+        """
+        Run a claimed job, write its result file and record the outcome.
+        Returns the job's new status.
+        """
+        os.makedirs(app.config["JOB_RESULT_DIR"], exist_ok=True)
+        path = os.path.abspath(
+            os.path.join(app.config["JOB_RESULT_DIR"], f"{job.id}.json")
+        )
+        partial = f"{path}.part"
+        values: Dict[str, Any] = {"finished_at": func.now()}
+        try:
+            with JobRun(job.id, db.engine) as run:
+                with open(partial, "w", encoding="utf-8") as out:
+                    getattr(JobService, f"_run_{job.kind}")(job.params, out, run)
+                run.progress(1)
+            os.replace(partial, path)
+            values.update(status="succeeded", result_path=path)
+            logger.info(f"Job {job.id} succeeded")
+        except JobCancelled:
+            values.update(status="cancelled")
+            logger.info(f"Job {job.id} cancelled")
+        except Exception as e:
+            error = e.detail if isinstance(e, FinancialSystemError) else str(e)
+            if job.attempts < job.max_attempts:
+                delay = app.config["JOB_RETRY_DELAY"] * 2 ** (job.attempts - 1)
+                values.update(
+                    status="queued",
+                    run_after=func.now() + timedelta(seconds=delay),
+                    finished_at=None,
+                )
+            else:
+                values.update(status="failed")
+            values["error"] = error
+            logger.error(f"Job {job.id} attempt {job.attempts} failed: {error}")
+        finally:
+            db.session.rollback()
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        try:
+            db.session.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == "running")
+                .values(**values)
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error recording job {job.id} outcome: {str(e)}")
+            raise FinancialSystemError("Failed to record job outcome")
+        return values["status"]
+
+    @staticmethod
+    def _run_profit_loss(params: Dict[str, Any], out, run: JobRun) -> None:
+        """
+        Profit and loss over a range of any length, one calendar year at a
+        time.
+        """
+        start_date, end_date = _report_date_range(params)
+        years = range(start_date.year, end_date.year + 1)
+        income, expenses = Decimal("0"), Decimal("0")
+        periods = []
+        for done, year in enumerate(years, start=1):
+            first = max(start_date, date(year, 1, 1))
+            last = min(end_date, date(year, 12, 31))
+            # Totals are summed as Decimals and only rounded when serialized
+            year_income, year_expenses, _ = ReportService.profit_loss_totals(
+                first, last
+            )
+            income += year_income
+            expenses += year_expenses
+            periods.append(
+                ReportService.profit_loss_dict(first, last, year_income, year_expenses)
+            )
+            run.progress(done / len(years))
+        json.dump(
+            {
+                **ReportService.profit_loss_dict(
+                    start_date, end_date, income, expenses
+                ),
+                "years": periods,
+            },
+            out,
+        )
+
+    @staticmethod
+    def _run_trial_balance(params: Dict[str, Any], out, run: JobRun) -> None:
+        """
+        Trial balance for the range.
+        """
+        start_date, end_date = _report_date_range(params)
+        json.dump(ReportService.generate_trial_balance(start_date, end_date), out)
+
+    @staticmethod
+    def _run_ledger(params: Dict[str, Any], out, run: JobRun) -> None:
+        """
+        Full general ledger export, written page by page as it streams.
+        """
+        start_date, end_date = _report_date_range(params)
+        account_id = params.get("account_id")
+        legs = db.session.execute(
+            select(func.count()).select_from(
+                ReportService.legs_query(start_date, end_date, account_id)
+            )
+        ).scalar_one()
+        # Header, one chunk per page, then the closing chunks
+        chunks = -(-legs // app.config["LEDGER_PAGE_SIZE"]) + 3
+        for done, chunk in enumerate(
+            ReportService.stream_ledger(start_date, end_date, account_id), start=1
+        ):
+            out.write(chunk)
+            run.progress(min(done / chunks, 0.99))
+
+    @staticmethod
+    def _run_reconciliation(params: Dict[str, Any], out, run: JobRun) -> None:
+        """
+        Balance reconciliation, optionally incremental or repairing drift.
+        """
+        json.dump(
+            ReconciliationService.reconcile(
+                repair=bool(params.get("repair")),
+                incremental=bool(params.get("incremental")),
+            ),
+            out,
+        )
+
+    @staticmethod
+    def requeue_stale() -> int:
+        """
+        Requeue running jobs whose worker stopped sending heartbeats, or fail
+        them when they are out of attempts.
+        """
+        finished = or_(Job.cancel_requested, Job.attempts >= Job.max_attempts)
+        try:
+            requeued = db.session.execute(
+                update(Job)
+                .where(
+                    Job.status == "running",
+                    Job.heartbeat_at
+                    < func.now() - timedelta(seconds=app.config["JOB_STALE_SECONDS"]),
+                )
+                .values(
+                    status=case(
+                        (Job.cancel_requested, "cancelled"),
+                        (Job.attempts >= Job.max_attempts, "failed"),
+                        else_="queued",
+                    ),
+                    error="Worker stopped responding",
+                    finished_at=case((finished, func.now()), else_=None),
+                )
+            ).rowcount
+            db.session.commit()
+            if requeued:
+                logger.warning(f"Recovered {requeued} jobs from unresponsive workers")
+            return requeued
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error requeueing stale jobs: {str(e)}")
+            raise FinancialSystemError("Failed to requeue stale jobs")
+
+    @staticmethod
+    def cleanup(ttl_hours: Optional[int] = None) -> int:
+        """
+        Delete jobs that finished more than ttl_hours ago, with their result
+        files.
+        """
+        if ttl_hours is None:
+            ttl_hours = app.config["JOB_RESULT_TTL_HOURS"]
+        try:
+            paths = (
+                db.session.execute(
+                    delete(Job)
+                    .where(Job.finished_at < func.now() - timedelta(hours=ttl_hours))
+                    .returning(Job.result_path)
+                )
+                .scalars()
+                .all()
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Error cleaning up jobs: {str(e)}")
+            raise FinancialSystemError("Failed to clean up jobs")
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+        if paths:
+            logger.info(f"Removed {len(paths)} finished jobs")
+        return len(paths)
+
+    @staticmethod
+    def work(
+        stop: Optional[threading.Event] = None,
+        maintenance: bool = True,
+        burst: bool = False,
+    ) -> int:
+        """
+        Claim and run jobs until stopped, or with burst until the queue is
+        empty. With maintenance, stale jobs are requeued and expired ones
+        cleaned up every JOB_MAINTENANCE_INTERVAL seconds. Returns the
+        number of jobs run.
+        """
+        stop = stop or threading.Event()
+        last_maintenance, ran = None, 0
+        while not stop.is_set():
+            try:
+                if maintenance and (
+                    last_maintenance is None
+                    or time.monotonic() - last_maintenance
+                    >= app.config["JOB_MAINTENANCE_INTERVAL"]
+                ):
+                    last_maintenance = time.monotonic()
+                    JobService.requeue_stale()
+                    JobService.cleanup()
+                job = JobService.claim_next()
+                if job is not None:
+                    JobService.run_job(job)
+                    ran += 1
+            except FinancialSystemError:
+                job = None
+            finally:
+                db.session.remove()
+            if job is None:
+                if burst:
+                    break
+                stop.wait(app.config["JOB_POLL_INTERVAL"])
+        return ran
+
+
+# API Endpoints
+
+
+@app.route("/api/accounts", methods=["POST"])
+@token_required
+def create_account(current_user):
+    """
+    API endpoint to create a new account.
+    """
+    try:
+        data = request.get_json()
+        account = AccountService.create_account(data)
+        return jsonify(account.to_dict()), 201
+    except RequestValidationError as e:
+        return jsonify(e.to_dict()), e.status_code
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in create_account: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/accounts/<account_id>", methods=["GET"])
+@token_required
+def get_account(current_user, account_id):
+    """
+    API endpoint to retrieve an account by ID.
+    """
+    try:
+        account = AccountService.get_account(account_id)
+        return jsonify(account.to_dict())
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in get_account: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/accounts/<account_id>", methods=["PUT"])
+@token_required
+def update_account(current_user, account_id):
+    """
+    API endpoint to update an account.
+    """
+    try:
+        data = request.get_json()
+        account = AccountService.update_account(account_id, data)
+        return jsonify(account.to_dict())
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in update_account: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/accounts/suggest", methods=["GET"])
+@token_required
+def suggest_accounts(current_user):
+    """
+    API endpoint for account name autocomplete.
+    """
+    try:
+        limit = request.args.get("limit", 10, type=int)
+        if not 1 <= limit <= 50:
+            raise RequestValidationError("limit must be between 1 and 50")
+        account_type = request.args.get("type")
+        if account_type is not None and account_type not in (
+            "ASSET",
+            "LIABILITY",
+            "INCOME",
+            "EXPENSE",
+        ):
+            raise RequestValidationError("Invalid account type")
+        suggestions = AccountService.suggest(
+            request.args.get("prefix", ""), limit, account_type
+        )
+        return jsonify(suggestions)
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in suggest_accounts: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/accounts", methods=["GET"])
+@token_required
+def list_accounts(current_user):
+    """
+    API endpoint to list accounts with optional filters and pagination.
+    """
+    try:
+        filters = request.args.to_dict()
+        page = int(filters.pop("page", 1))
+        per_page = int(filters.pop("per_page", 20))
+        accounts = AccountService.list_accounts(filters, page, per_page)
+        return jsonify([account.to_dict() for account in accounts])
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in list_accounts: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/transactions", methods=["POST"])
+@token_required
+def record_transaction(current_user):
+    """
+    API endpoint to record a new transaction.
+    """
+    try:
+        data = request.get_json()
+        result = TransactionService.record_transaction(data)
+        return (
+            jsonify(
+                {
+                    "transaction": result["transaction"].to_dict(),
+                    "new_balances": {
+                        "account": float(result["new_balances"]["account"]),
+                        "contra_account": float(
+                            result["new_balances"]["contra_account"]
+                        ),
+                    },
+                }
+            ),
+            201,
+        )
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in record_transaction: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/transactions/<transaction_id>/void", methods=["POST"])
+@token_required
+def void_transaction(current_user, transaction_id):
+    """
+    API endpoint to void (reverse) a transaction.
+    """
+    try:
+        result = TransactionService.void_transaction(transaction_id)
+        return jsonify(
+            {
+                "transaction": result["transaction"].to_dict(),
+                "new_balances": {
+                    "account": float(result["new_balances"]["account"]),
+                    "contra_account": float(result["new_balances"]["contra_account"]),
+                },
+            }
+        )
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in void_transaction: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/transactions/<transaction_id>", methods=["GET"])
+@token_required
+def get_transaction(current_user, transaction_id):
+    """
+    API endpoint to retrieve a transaction by ID.
+    """
+    try:
+        transaction = TransactionService.get_transaction(transaction_id)
+        return jsonify(transaction.to_dict())
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in get_transaction: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/journal-entries", methods=["POST"])
+@token_required
+def post_journal_entry(current_user):
+    """
+    API endpoint to post a balanced multi-leg journal entry.
+    """
+    try:
+        data = request.get_json()
+        result = JournalEntryService.post_journal_entry(data)
+        return (
+            jsonify(
+                {
+                    "journal_entry": result["journal_entry"].to_dict(),
+                    "new_balances": {
+                        str(account_id): float(balance)
+                        for account_id, balance in result["new_balances"].items()
+                    },
+                }
+            ),
+            201,
+        )
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in post_journal_entry: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/journal-entries/<entry_id>", methods=["GET"])
+@token_required
+def get_journal_entry(current_user, entry_id):
+    """
+    API endpoint to retrieve a journal entry and its transactions by ID.
+    """
+    try:
+        entry = JournalEntryService.get_journal_entry(entry_id)
+        return jsonify(entry.to_dict())
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in get_journal_entry: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/transactions/search", methods=["GET"])
+@token_required
+def search_transactions(current_user):
+    """
+    API endpoint to search transactions by description text or reference
+    number, with the list filters and keyset pagination.
+    """
+    try:
+        filters = {}
+        if "account_id" in request.args:
+            filters["account_id"] = request.args["account_id"]
+        for name in ("start_date", "end_date"):
+            if name in request.args:
+                filters[name] = datetime.strptime(request.args[name], "%Y-%m-%d").date()
+        if "is_void" in request.args:
+            filters["is_void"] = request.args["is_void"].lower() == "true"
+        limit = request.args.get("limit", 20, type=int)
+        if not 1 <= limit <= 100:
+            raise RequestValidationError("limit must be between 1 and 100")
+        results = TransactionService.search_transactions(
+            request.args.get("q", ""), filters, request.args.get("cursor"), limit
+        )
+        return jsonify(results)
+    except FinancialSystemError as e:
+        raise e
+    except ValueError:
+        raise RequestValidationError("Dates must be in YYYY-MM-DD format")
+    except Exception as e:
+        logger.error(f"Unexpected error in search_transactions: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/transactions", methods=["GET"])
+@token_required
+def list_transactions(current_user):
+    """
+    API endpoint to list transactions with optional filters and pagination.
+    """
+    try:
+        filters = request.args.to_dict()
+        page = int(filters.pop("page", 1))
+        per_page = int(filters.pop("per_page", 20))
+        # Convert date strings to date objects if present
+        if "start_date" in filters:
+            filters["start_date"] = datetime.strptime(
+                filters["start_date"], "%Y-%m-%d"
+            ).date()
+        if "end_date" in filters:
+            filters["end_date"] = datetime.strptime(
+                filters["end_date"], "%Y-%m-%d"
+            ).date()
+        transactions = TransactionService.list_transactions(filters, page, per_page)
+        return jsonify([t.to_dict() for t in transactions])
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in list_transactions: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/changes", methods=["GET"])
+@token_required
+def list_changes(current_user):
+    """
+    API endpoint to sync incrementally: account and transaction inserts,
+    updates and voids since a token returned by an earlier call.
+    """
+    try:
+        limit = request.args.get("limit", 500, type=int)
+        if not 1 <= limit <= 1000:
+            raise RequestValidationError("limit must be between 1 and 1000")
+        return jsonify(ChangeService.list_changes(request.args.get("since"), limit))
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in list_changes: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/reports/balance", methods=["GET"])
+@token_required
+def generate_balance_report(current_user):
+    """
+    API endpoint to generate a balance report.
+    """
+    try:
+        report_date = request.args.get("date")
+        if report_date:
+            report_date = datetime.strptime(report_date, "%Y-%m-%d").date()
+
+        report = ReportService.generate_balance_report(report_date)
+        return jsonify(report)
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in generate_balance_report: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
+
+
+@app.route("/api/reports/profit-loss", methods=["GET"])
+@token_required
+def generate_profit_loss_report(current_user):
+    """
+    API endpoint to generate a profit and loss report, optionally broken
+    down by month with bucket=month.
+    """
+    try:
+        start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date()
+        bucket = request.args.get("bucket")
+        if bucket not in (None, "month"):
+            raise RequestValidationError("bucket must be month")
 
-            expenses = (
-                expenses_result if expenses_result is not None else Decimal("0.00")
-            )
-            print(f"Debug Expense statement:{expenses_result}")
-            # Calculate profit/loss
-            profit_loss = income - expenses
+        report = ReportService.generate_profit_loss_report(start_date, end_date, bucket)
+        return jsonify(report)
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in generate_profit_loss_report: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
 
-            return {
-                "start_date": start_date.isoformat(),
-                "end_date": end_date.isoformat(),
-                "total_income": float(income),
-                "total_expenses": float(expenses),
-                "net_profit_loss": float(profit_loss),
-            }
-        except SQLAlchemyError as e:
-            logger.error(f"Error generating profit/loss report: {str(e)}")
-            raise FinancialSystemError("Failed to generate profit/loss report")
+
+@app.route("/api/reports/dashboard", methods=["GET"])
+@token_required
+def generate_dashboard(current_user):
+    """
+    API endpoint to generate the dashboard in a single request. The profit
+    and loss period defaults to the month to date.
+    """
+    try:
+        if "start_date" in request.args or "end_date" in request.args:
+            start_date, end_date = _report_date_range()
+        else:
+            end_date = date.today()
+            start_date = end_date.replace(day=1)
+        return jsonify(ReportService.generate_dashboard(start_date, end_date))
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in generate_dashboard: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
 
 
-# API Endpoints
+def _report_date_range(args=None):
+    """
+    Read the required start_date and end_date of a report from the query
+    arguments, or from the given mapping.
+    """
+    args = request.args if args is None else args
+    try:
+        start_date = datetime.strptime(args["start_date"], "%Y-%m-%d").date()
+        end_date = datetime.strptime(args["end_date"], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        raise RequestValidationError(
+            "start_date and end_date are required in YYYY-MM-DD format"
+        )
+    if end_date < start_date:
+        raise RequestValidationError("end_date must not be before start_date")
+    return start_date, end_date
 
 
-@app.route("/api/accounts", methods=["POST"])
+@app.route("/api/accounts/<account_id>/statement", methods=["GET"])
 @token_required
-def create_account(current_user):
+def get_account_statement(current_user, account_id):
     """
-    API endpoint to create a new account.
+    API endpoint to generate a page of an account statement.
     """
     try:
-        data = request.get_json()
-        account = AccountService.create_account(data)
-        return jsonify(account.to_dict()), 201
-    except RequestValidationError as e:
-        return jsonify(e.to_dict()), e.status_code
+        start_date, end_date = _report_date_range()
+        limit = request.args.get("limit", 100, type=int)
+        if not 1 <= limit <= 1000:
+            raise RequestValidationError("limit must be between 1 and 1000")
+        statement = ReportService.generate_statement(
+            account_id, start_date, end_date, request.args.get("cursor"), limit
+        )
+        return jsonify(statement)
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in create_account: {str(e)}")
+        logger.error(f"Unexpected error in get_account_statement: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/accounts/<account_id>", methods=["GET"])
+@app.route("/api/reports/ledger", methods=["GET"])
 @token_required
-def get_account(current_user, account_id):
+def generate_ledger(current_user):
     """
-    API endpoint to retrieve an account by ID.
+    API endpoint to stream the general ledger with running balances.
     """
     try:
-        account = AccountService.get_account(account_id)
-        return jsonify(account.to_dict())
+        start_date, end_date = _report_date_range()
+        chunks = ReportService.stream_ledger(
+            start_date, end_date, request.args.get("account_id")
+        )
+        return Response(stream_with_context(chunks), mimetype="application/json")
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in get_account: {str(e)}")
+        logger.error(f"Unexpected error in generate_ledger: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/accounts/<account_id>", methods=["PUT"])
+@app.route("/api/reports/trial-balance", methods=["GET"])
 @token_required
-def update_account(current_user, account_id):
+def generate_trial_balance(current_user):
     """
-    API endpoint to update an account.
+    API endpoint to generate a trial balance.
     """
     try:
-        data = request.get_json()
-        account = AccountService.update_account(account_id, data)
-        return jsonify(account.to_dict())
+        start_date, end_date = _report_date_range()
+        return jsonify(ReportService.generate_trial_balance(start_date, end_date))
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in update_account: {str(e)}")
+        logger.error(f"Unexpected error in generate_trial_balance: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/accounts", methods=["GET"])
+@app.route("/api/jobs", methods=["POST"])
 @token_required
-def list_accounts(current_user):
+def create_job(current_user):
     """
-    API endpoint to list accounts with optional filters and pagination.
+    API endpoint to queue a background report or export job.
     """
     try:
-        filters = request.args.to_dict()
-        page = int(filters.pop("page", 1))
-        per_page = int(filters.pop("per_page", 20))
-        accounts = AccountService.list_accounts(filters, page, per_page)
-        return jsonify([account.to_dict() for account in accounts])
+        job = JobService.enqueue(request.get_json() or {}, current_user)
+        return jsonify(job.to_dict()), 202
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in list_accounts: {str(e)}")
+        logger.error(f"Unexpected error in create_job: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/transactions", methods=["POST"])
+@app.route("/api/jobs", methods=["GET"])
 @token_required
-def record_transaction(current_user):
+def list_jobs(current_user):
     """
-    API endpoint to record a new transaction.
+    API endpoint to list the current user's recent jobs.
     """
     try:
-        data = request.get_json()
-        result = TransactionService.record_transaction(data)
-        return (
-            jsonify(
-                {
-                    "transaction": result["transaction"].to_dict(),
-                    "new_balances": {
-                        "account": float(result["new_balances"]["account"]),
-                        "contra_account": float(
-                            result["new_balances"]["contra_account"]
-                        ),
-                    },
-                }
-            ),
-            201,
-        )
+        return jsonify([job.to_dict() for job in JobService.list_jobs(current_user)])
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in record_transaction: {str(e)}")
+        logger.error(f"Unexpected error in list_jobs: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/transactions/<transaction_id>/void", methods=["POST"])
+@app.route("/api/jobs/<job_id>", methods=["GET"])
 @token_required
-def void_transaction(current_user, transaction_id):
+def get_job(current_user, job_id):
     """
-    API endpoint to void (reverse) a transaction.
+    API endpoint to retrieve a job's status and progress.
     """
     try:
-        result = TransactionService.void_transaction(transaction_id)
-        return jsonify(
-            {
-                "transaction": result["transaction"].to_dict(),
-                "new_balances": {
-                    "account": float(result["new_balances"]["account"]),
-                    "contra_account": float(result["new_balances"]["contra_account"]),
-                },
-            }
-        )
+        return jsonify(JobService.get_job(job_id, current_user).to_dict())
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in void_transaction: {str(e)}")
+        logger.error(f"Unexpected error in get_job: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/transactions/<transaction_id>", methods=["GET"])
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
 @token_required
-def get_transaction(current_user, transaction_id):
+def cancel_job(current_user, job_id):
     """
-    API endpoint to retrieve a transaction by ID.
+    API endpoint to cancel a queued or running job.
     """
     try:
-        transaction = TransactionService.get_transaction(transaction_id)
-        return jsonify(transaction.to_dict())
+        return jsonify(JobService.cancel(job_id, current_user).to_dict())
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in get_transaction: {str(e)}")
+        logger.error(f"Unexpected error in cancel_job: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/transactions", methods=["GET"])
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
 @token_required
-def list_transactions(current_user):
+def get_job_result(current_user, job_id):
     """
-    API endpoint to list transactions with optional filters and pagination.
+    API endpoint to download a finished job's result. Range requests are
+    supported, so large exports can be resumed.
     """
     try:
-        filters = request.args.to_dict()
-        page = int(filters.pop("page", 1))
-        per_page = int(filters.pop("per_page", 20))
-        # Convert date strings to date objects if present
-        if "start_date" in filters:
-            filters["start_date"] = datetime.strptime(
-                filters["start_date"], "%Y-%m-%d"
-            ).date()
-        if "end_date" in filters:
-            filters["end_date"] = datetime.strptime(
-                filters["end_date"], "%Y-%m-%d"
-            ).date()
-        transactions = TransactionService.list_transactions(filters, page, per_page)
-        return jsonify([t.to_dict() for t in transactions])
+        job = JobService.get_job(job_id, current_user)
+        if job.status != "succeeded" or not os.path.exists(job.result_path or ""):
+            raise NotFoundError("Job result not available")
+        return send_file(
+            job.result_path,
+            mimetype="application/json",
+            as_attachment=True,
+            download_name=f"{job.kind}-{job.id}.json",
+            conditional=True,
+        )
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in list_transactions: {str(e)}")
+        logger.error(f"Unexpected error in get_job_result: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/reports/balance", methods=["GET"])
+@app.route("/api/events", methods=["GET"])
+def stream_events():
+    """
+    API endpoint streaming live transaction and balance events as
+    Server-Sent Events. EventSource cannot send headers, so the token may
+    also be passed as the access_token query argument. Optional accounts
+    (comma separated ids) limits the stream to those accounts; the
+    Last-Event-ID header or last_event_id argument resumes after an event.
+    """
+    token = None
+    if "Authorization" in request.headers:
+        token = request.headers["Authorization"].split()[1]
+    _authenticate(token or request.args.get("access_token"))
+    if not _events_enabled():
+        raise FinancialSystemError("Live events are not available", 503)
+
+    accounts = [a for a in request.args.get("accounts", "").split(",") if a]
+    try:
+        accounts = [str(UUID(account_id)) for account_id in accounts]
+    except ValueError:
+        raise RequestValidationError("accounts must be account ids")
+    if not event_hub.running:
+        event_hub.start(db.engine)
+    subscription = event_hub.subscribe(
+        accounts,
+        request.headers.get("Last-Event-ID") or request.args.get("last_event_id"),
+    )
+    heartbeat = app.config["EVENTS_HEARTBEAT_INTERVAL"]
+
+    def generate() -> Iterator[str]:
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=heartbeat)
+                yield format_sse(event) if event else ": heartbeat\n\n"
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/metrics", methods=["GET"])
 @token_required
-def generate_balance_report(current_user):
+def get_metrics(current_user):
     """
-    API endpoint to generate a balance report.
+    API endpoint exposing internal runtime metrics.
+    """
+    return jsonify(
+        {
+            "audit": audit_writer.stats(),
+            "events": {
+                "listening": event_hub.running,
+                "subscribers": event_hub.subscriber_count(),
+            },
+            "group_commit": posting_committer.stats(),
+            "write_conflicts": write_conflicts,
+            "request_timeouts": request_timeouts,
+            "analytics": {
+                "enabled": app.config["ANALYTICS_ENABLED"],
+                "transactions": len(ledger_columns) if ledger_columns else 0,
+            },
+            "account_index": {
+                "accounts": len(account_index),
+                "loaded": not account_index.stale(),
+            },
+        }
+    )
+
+
+@app.route("/api/import/<kind>", methods=["POST"])
+@token_required
+def import_csv(current_user, kind):
+    """
+    API endpoint to bulk import accounts or transactions from a CSV upload.
     """
     try:
-        report_date = request.args.get("date")
-        if report_date:
-            report_date = datetime.strptime(report_date, "%Y-%m-%d").date()
+        upload = request.files.get("file")
+        stream = upload.stream if upload else request.stream
+        atomic = request.args.get("atomic", "false").lower() == "true"
+        report = ImportService.import_csv(kind, stream, atomic=atomic)
+        return jsonify(report)
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in import_csv: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
 
-        report = ReportService.generate_balance_report(report_date)
+
+@app.route("/api/reconciliation", methods=["POST"])
+@token_required
+def reconcile_balances(current_user):
+    """
+    API endpoint to reconcile stored balances against the ledger.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        # Each worker holds a pooled connection for the whole run
+        workers = data.get("workers")
+        most = app.config["RECONCILIATION_WORKERS"]
+        if workers is not None and (
+            not isinstance(workers, int)
+            or isinstance(workers, bool)
+            or not 1 <= workers <= most
+        ):
+            raise RequestValidationError(
+                f"workers must be an integer between 1 and {most}"
+            )
+        report = ReconciliationService.reconcile(
+            repair=bool(data.get("repair", False)),
+            incremental=bool(data.get("incremental", False)),
+            workers=workers,
+        )
         return jsonify(report)
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in generate_balance_report: {str(e)}")
+        logger.error(f"Unexpected error in reconcile_balances: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
-@app.route("/api/reports/profit-loss", methods=["GET"])
+@app.route("/api/periods", methods=["GET"])
 @token_required
-def generate_profit_loss_report(current_user):
+def list_periods(current_user):
     """
-    API endpoint to generate a profit and loss report.
+    API endpoint to list closed periods.
     """
     try:
-        start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date()
-        end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date()
+        return jsonify([period.to_dict() for period in PeriodService.list_periods()])
+    except FinancialSystemError as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Unexpected error in list_periods: {str(e)}")
+        raise FinancialSystemError("Unexpected error occurred")
 
-        report = ReportService.generate_profit_loss_report(start_date, end_date)
-        return jsonify(report)
+
+@app.route("/api/periods", methods=["POST"])
+@token_required
+def close_period(current_user):
+    """
+    API endpoint to close the period through a date. Archiving is left to
+    "flask periods close --archive".
+    """
+    try:
+        try:
+            data = PeriodClose(**(request.get_json(silent=True) or {}))
+        except ValidationError as e:
+            raise RequestValidationError(str(e))
+        return jsonify(PeriodService.close_period(data.period_end)), 201
     except FinancialSystemError as e:
         raise e
     except Exception as e:
-        logger.error(f"Unexpected error in generate_profit_loss_report: {str(e)}")
+        logger.error(f"Unexpected error in close_period: {str(e)}")
         raise FinancialSystemError("Unexpected error occurred")
 
 
@@ -1083,6 +5951,263 @@ def health_check():
     return jsonify({"status": "healthy"}), 200
 
 
+# CLI Commands
+@app.cli.command("import-csv")
+@click.argument("kind", type=click.Choice(sorted(ImportService.COLUMNS)))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--atomic", is_flag=True, help="Reject the whole file on any error.")
+def import_csv_command(kind, path, atomic):
+    """
+    Bulk import accounts or transactions from a CSV file.
+    """
+    with open(path, "rb") as fh:
+        report = ImportService.import_csv(kind, fh, atomic=atomic)
+    click.echo(json.dumps(report, indent=2))
+
+
+@app.cli.command("reconcile")
+@click.option("--repair", is_flag=True, help="Reset drifted balances.")
+@click.option(
+    "--incremental", is_flag=True, help="Only accounts touched since last run."
+)
+@click.option("--workers", type=int, default=None, help="Parallel connections.")
+def reconcile_command(repair, incremental, workers):
+    """
+    Reconcile stored account balances against the transaction ledger.
+    """
+    report = ReconciliationService.reconcile(
+        repair=repair, incremental=incremental, workers=workers
+    )
+    click.echo(json.dumps(report, indent=2))
+
+
+@app.cli.command("snapshot-balances")
+@click.option(
+    "--date",
+    "balance_date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Day to snapshot (default: yesterday).",
+)
+def snapshot_balances_command(balance_date):
+    """
+    Record closing balances in balance_history to seed account statements.
+    """
+    day = balance_date.date() if balance_date else date.today() - timedelta(days=1)
+    written = ReportService.snapshot_balances(day)
+    click.echo(f"Snapshotted {written} balances for {day.isoformat()}")
+
+
+@app.cli.group("analytics")
+def analytics_cli():
+    """
+    Manage the in-memory analytics engine.
+    """
+
+
+@analytics_cli.command("snapshot")
+def analytics_snapshot_command():
+    """
+    Write the ledger snapshot the analytics engine starts from.
+    """
+    columns = AnalyticsService.write_snapshot()
+    click.echo(
+        f"Wrote {len(columns)} transactions to {app.config['ANALYTICS_SNAPSHOT_PATH']}"
+    )
+
+
+@analytics_cli.command("verify")
+@click.option("--start-date", type=click.DateTime(formats=["%Y-%m-%d"]), required=True)
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), required=True)
+def analytics_verify_command(start_date, end_date):
+    """
+    Check the analytics engine's reports against the SQL reports.
+    """
+    differing = AnalyticsService.verify(start_date.date(), end_date.date())
+    if differing:
+        raise click.ClickException(f"Reports differ: {', '.join(differing)}")
+    click.echo("Analytics reports match SQL")
+
+
+@app.cli.group("partitions")
+def partitions_cli():
+    """
+    Manage date-range partitions of the transactions table.
+    """
+
+
+@partitions_cli.command("list")
+def partitions_list_command():
+    """
+    List transaction partitions.
+    """
+    click.echo(json.dumps(PartitionService.list_partitions(), indent=2))
+
+
+@partitions_cli.command("ensure")
+@click.option("--months-ahead", type=int, default=None)
+@click.option("--from-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None)
+def partitions_ensure_command(months_ahead, from_date):
+    """
+    Create missing partitions up to N months ahead.
+    """
+    start = from_date.date() if from_date else None
+    created = PartitionService.ensure_partitions(months_ahead, start)
+    click.echo("\n".join(created) or "No partitions created")
+
+
+@partitions_cli.command("detach")
+@click.argument("name")
+@click.option("--concurrently", is_flag=True, help="Use DETACH ... CONCURRENTLY.")
+def partitions_detach_command(name, concurrently):
+    """
+    Detach a partition, keeping it as a standalone archive table.
+    """
+    PartitionService.detach_partition(name, concurrently)
+    click.echo(f"Detached {name}")
+
+
+@app.cli.group("periods")
+def periods_cli():
+    """
+    Close accounting periods.
+    """
+
+
+@periods_cli.command("list")
+def periods_list_command():
+    """
+    List closed periods.
+    """
+    periods = [period.to_dict() for period in PeriodService.list_periods()]
+    click.echo(json.dumps(periods, indent=2))
+
+
+@periods_cli.command("close")
+@click.argument("period_end", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option(
+    "--archive", is_flag=True, help="Move the period's transactions to the archive."
+)
+def periods_close_command(period_end, archive):
+    """
+    Close the period through PERIOD_END, freezing balances and locking it
+    against postings and voids.
+    """
+    closed = PeriodService.close_period(period_end.date(), archive)
+    click.echo(
+        f"Closed through {closed['period_end']}: "
+        f"{closed['balances_frozen']} balances frozen, "
+        f"{closed['transactions_archived']} transactions archived"
+    )
+
+
+@app.cli.group("jobs")
+def jobs_cli():
+    """
+    Run and maintain the background job queue.
+    """
+
+
+def _job_worker_process(index: int, burst: bool) -> None:
+    """
+    Run one job worker process until it receives SIGTERM, finishing the job
+    in progress first.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    # Ctrl-C reaches the whole process group; the parent turns it into SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    with app.app_context():
+        # Connections inherited from the parent must not be shared
+        db.engine.dispose(close=False)
+        try:
+            JobService.work(stop, maintenance=index == 0, burst=burst)
+        finally:
+            audit_writer.close()
+
+
+@jobs_cli.command("worker")
+@click.option("--processes", type=int, default=None, help="Worker processes.")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty.")
+def jobs_worker_command(processes, burst):
+    """
+    Run a pool of job worker processes.
+    """
+    processes = processes or app.config["JOB_WORKERS"]
+    db.engine.dispose()
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(
+            target=_job_worker_process, args=(index, burst), name=f"job-worker-{index}"
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    click.echo(f"Started {processes} job workers")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+@jobs_cli.command("cleanup")
+@click.option("--ttl-hours", type=int, default=None)
+def jobs_cleanup_command(ttl_hours):
+    """
+    Requeue jobs of unresponsive workers and delete expired jobs.
+    """
+    requeued = JobService.requeue_stale()
+    removed = JobService.cleanup(ttl_hours)
+    click.echo(f"Requeued {requeued} stale jobs, removed {removed} expired jobs")
+
+
+# Background maintenance
+_partition_maintainer: Optional[threading.Thread] = None
+_partition_maintainer_lock = threading.Lock()
+
+
+def _partition_maintenance_loop():
+    """
+    Periodically create upcoming transaction partitions.
+    """
+    while True:
+        with app.app_context():
+            try:
+                PartitionService.ensure_partitions()
+            except Exception as e:
+                logger.error(f"Partition maintenance failed: {str(e)}")
+            finally:
+                db.session.remove()
+        time.sleep(app.config["PARTITION_MAINTENANCE_INTERVAL"])
+
+
+@app.before_request
+def start_partition_maintenance():
+    """
+    Start the partition maintenance thread on the first request.
+    """
+    global _partition_maintainer
+    if _partition_maintainer is not None:
+        return
+    if app.config["PARTITION_MAINTENANCE_INTERVAL"] <= 0:
+        return
+    if db.engine.dialect.name != "postgresql":
+        return
+    with _partition_maintainer_lock:
+        if _partition_maintainer is None:
+            _partition_maintainer = threading.Thread(
+                target=_partition_maintenance_loop,
+                name="partition-maintenance",
+                daemon=True,
+            )
+            _partition_maintainer.start()
+
+
 # Database initialization
 def init_db():
     """
@@ -0,0 +1,275 @@
+"""Background writer that batches audit records into accounting.audit_log."""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+# Queue markers used to wake the writer thread
+_FLUSH = object()
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Buffers audit records in memory and writes them to the audit table in
+    batches from a single background thread.
+
+    Batches are written with one multi-row INSERT. When the database cannot
+    be reached the batch is appended to a local spool file (fsync'ed) and
+    replayed ahead of the next batch once the database is available again.
+    Every record gets an entry_id when queued; a replay skips the ids already
+    in the table, so a crash between a replay's commit and the spool's
+    removal does not write a record twice.
+    """
+
+    def __init__(
+        self,
+        table,
+        spool_path: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 100000,
+    ):
+        self.table = table
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.engine = None
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._spool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "flushed_total": 0,
+            "spooled_total": 0,
+            "failed_flushes": 0,
+            "flush_count": 0,
+            "flush_ms_total": 0.0,
+            "last_flush_ms": None,
+            "max_flush_ms": None,
+            "last_flush_at": None,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine) -> None:
+        """
+        Bind the writer to an engine and start the background thread.
+        """
+        self.engine = engine
+        if self.running:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Queue audit records for the next batch. Never blocks the caller: if
+        the in-memory queue is full the records go straight to the spool.
+        """
+        overflow = []
+        for record in records:
+            record.setdefault("entry_id", str(uuid4()))
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                overflow.append(record)
+        if overflow:
+            self._spool(overflow)
+
+    def flush(self) -> None:
+        """
+        Block until every record queued so far is written or spooled.
+        """
+        if not self.running:
+            self._drain_inline()
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Flush outstanding records and stop the background thread.
+        """
+        if not self.running:
+            self._drain_inline()
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)  # type: ignore[union-attr]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return queue depth, spool size and flush latency figures.
+        """
+        with self._stats_lock:
+            data = dict(self._stats)
+        count = data.pop("flush_count")
+        total_ms = data.pop("flush_ms_total")
+        data["avg_flush_ms"] = round(total_ms / count, 3) if count else None
+        data["queue_depth"] = self._queue.qsize()
+        data["spool_pending"] = self._spool_size()
+        data["running"] = self.running
+        return data
+
+    # Writer thread
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+            else:
+                if item is _FLUSH or item is _STOP:
+                    self._queue.task_done()
+
+            if item is _FLUSH or item is _STOP:
+                self._write_and_ack(batch)
+                batch, deadline = [], None
+                if item is _STOP:
+                    return
+                continue
+
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.batch_size:
+                self._write_and_ack(batch)
+                batch, deadline = [], None
+
+    def _write_and_ack(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            if batch or self._spool_size():
+                self._write(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drain_inline(self) -> None:
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _FLUSH and item is not _STOP:
+                batch.append(item)
+            self._queue.task_done()
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if self.engine is None:
+            self._spool(batch)
+            return
+
+        started = time.perf_counter()
+        try:
+            self._replay_spool()
+            if batch:
+                with self.engine.begin() as conn:
+                    conn.execute(self.table.insert(), batch)
+        except SQLAlchemyError as e:
+            logger.warning(f"Audit flush failed, spooling {len(batch)} records: {e}")
+            with self._stats_lock:
+                self._stats["failed_flushes"] += 1
+            self._spool(batch)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats["flushed_total"] += len(batch)
+            self._stats["flush_count"] += 1
+            self._stats["flush_ms_total"] += elapsed_ms
+            self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+            self._stats["max_flush_ms"] = round(
+                max(elapsed_ms, self._stats["max_flush_ms"] or 0), 3
+            )
+            self._stats["last_flush_at"] = datetime.now(timezone.utc).isoformat()
+
+    # Spool file
+
+    def _spool(self, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        with self._spool_lock:
+            os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as fh:
+                for record in records:
+                    fh.write(json.dumps(_to_spool(record)) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+        with self._stats_lock:
+            self._stats["spooled_total"] += len(records)
+
+    def _spool_size(self) -> int:
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return 0
+            with open(self.spool_path, encoding="utf-8") as fh:
+                return sum(1 for _ in fh)
+
+    def _replay_spool(self) -> None:
+        """
+        Insert spooled records not written yet and remove the spool file.
+        Raises on database errors so the file is left untouched for the next
+        attempt.
+        """
+        entry_id = self.table.c.entry_id
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return
+            with open(self.spool_path, encoding="utf-8") as fh:
+                records = [_from_spool(json.loads(line)) for line in fh if line.strip()]
+            with self.engine.begin() as conn:  # type: ignore[union-attr]
+                for i in range(0, len(records), self.batch_size):
+                    batch = records[i : i + self.batch_size]
+                    # Left by a replay that committed before the file was
+                    # removed
+                    written = {
+                        str(e)
+                        for e in conn.execute(
+                            select(entry_id).where(
+                                entry_id.in_([r["entry_id"] for r in batch])
+                            )
+                        ).scalars()
+                    }
+                    batch = [r for r in batch if r["entry_id"] not in written]
+                    if batch:
+                        conn.execute(self.table.insert(), batch)
+            os.remove(self.spool_path)
+        logger.info(f"Replayed {len(records)} spooled audit records")
+        with self._stats_lock:
+            self._stats["flushed_total"] += len(records)
+
+
+def _to_spool(record: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(record)
+    if isinstance(data.get("changed_at"), datetime):
+        data["changed_at"] = data["changed_at"].isoformat()
+    return data
+
+
+def _from_spool(data: Dict[str, Any]) -> Dict[str, Any]:
+    # Spooled before records carried an entry_id
+    data.setdefault("entry_id", str(uuid4()))
+    if isinstance(data.get("changed_at"), str):
+        data["changed_at"] = datetime.fromisoformat(data["changed_at"])
+    return data
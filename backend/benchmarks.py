@@ -0,0 +1,341 @@
+"""
+In-process microbenchmarks for the CPU-bound hot paths of app.py.
+
+Runs without a database: models are built in memory and request handling is
+exercised through test request contexts. Each run is appended to a JSONL
+history file and compared with the median of the previous runs on the same
+host; a benchmark slower than that by more than the threshold is reported as
+a regression.
+
+Usage:
+    python benchmarks.py                      # run everything and record
+    python benchmarks.py account_to_dict --no-record
+    python benchmarks.py --threshold 15 --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+import jwt
+from flask import jsonify
+from sqlalchemy.dialects import postgresql
+
+from app import (
+    Account,
+    Transaction,
+    TransactionCreate,
+    TransactionService,
+    app,
+    token_required,
+)
+
+BENCHMARKS: Dict[str, Callable[[], Any]] = {}
+
+DEFAULT_HISTORY_PATH = os.environ.get(
+    "BENCH_HISTORY_PATH", os.path.join(app.instance_path, "benchmark_history.jsonl")
+)
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark. The decorated function is a context manager that
+    prepares its inputs and yields the callable to time.
+    """
+
+    def register(fn):
+        BENCHMARKS[name] = contextmanager(fn)
+        return fn
+
+    return register
+
+
+# Fixtures
+
+
+def make_accounts(count: int) -> List[Account]:
+    """
+    Build unsaved Account objects.
+    """
+    now = datetime.now(timezone.utc)
+    return [
+        Account(
+            id=uuid4(),
+            name=f"Account {i:05d}",
+            type=("ASSET", "LIABILITY", "INCOME", "EXPENSE")[i % 4],
+            description="Benchmark account",
+            opening_balance=Decimal("1000.0000"),
+            current_balance=Decimal("1234.5600"),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def make_transactions(count: int) -> List[Transaction]:
+    """
+    Build unsaved Transaction objects with both accounts loaded.
+    """
+    accounts = make_accounts(50)
+    now = datetime.now(timezone.utc)
+    transactions = []
+    for i in range(count):
+        account = accounts[i % len(accounts)]
+        contra = accounts[(i + 7) % len(accounts)]
+        transactions.append(
+            Transaction(
+                id=uuid4(),
+                account_id=account.id,
+                account=account,
+                contra_account_id=contra.id,
+                contra_account=contra,
+                transaction_date=date.today() - timedelta(days=i % 365),
+                amount=Decimal("125.5000"),
+                description="Benchmark transaction",
+                reference_number=f"BENCH-{i:06d}",
+                is_void=False,
+                created_at=now,
+            )
+        )
+    return transactions
+
+
+def make_payloads(count: int) -> List[Dict[str, Any]]:
+    """
+    Build request bodies for POST /api/transactions.
+    """
+    return [
+        {
+            "account_id": str(uuid4()),
+            "contra_account_id": str(uuid4()),
+            "transaction_date": date.today().isoformat(),
+            "amount": f"{(i % 5000) + 1}.25",
+            "description": "Benchmark payload",
+            "reference_number": f"REF-{i:06d}",
+        }
+        for i in range(count)
+    ]
+
+
+# Benchmarks
+
+
+@benchmark("account_to_dict")
+def _account_to_dict() -> Iterator[Callable[[], Any]]:
+    accounts = make_accounts(1000)
+    yield lambda: [a.to_dict() for a in accounts]
+
+
+@benchmark("transaction_to_dict")
+def _transaction_to_dict() -> Iterator[Callable[[], Any]]:
+    transactions = make_transactions(1000)
+    yield lambda: [t.to_dict() for t in transactions]
+
+
+@benchmark("transaction_create_validation")
+def _transaction_create() -> Iterator[Callable[[], Any]]:
+    payloads = make_payloads(1000)
+    yield lambda: [TransactionCreate(**p).dict() for p in payloads]
+
+
+@benchmark("token_required_decode")
+def _token_required() -> Iterator[Callable[[], Any]]:
+    token = jwt.encode(
+        {"sub": "bench", "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+        app.config["SECRET_KEY"],
+        algorithm=app.config["JWT_ALGORITHM"],
+    )
+    view = token_required(lambda current_user: current_user)
+    with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+        yield view
+
+
+@benchmark("jsonify_transactions")
+def _jsonify() -> Iterator[Callable[[], Any]]:
+    rows = [t.to_dict() for t in make_transactions(5000)]
+    with app.test_request_context():
+        yield lambda: jsonify(rows).get_data()
+
+
+@benchmark("list_transactions_page")
+def _list_page() -> Iterator[Callable[[], Any]]:
+    # The CPU side of GET /api/transactions: build and compile the page
+    # query, then serialize one page of results.
+    page = make_transactions(20)
+    filters = {"account_id": str(page[0].account_id), "start_date": date(2024, 1, 1)}
+    dialect = postgresql.dialect()
+
+    def run():
+        query = TransactionService.list_query(filters, 3, 20)
+        query.compile(dialect=dialect)
+        return jsonify([t.to_dict() for t in page]).get_data()
+
+    with app.test_request_context():
+        yield run
+
+
+# Runner
+
+
+def time_benchmark(name: str, repeat: int = 5, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    Time one benchmark. The number of calls per round is calibrated so a
+    round lasts at least min_time seconds; figures are per call.
+    """
+    with BENCHMARKS[name]() as fn:
+        fn()  # warm caches
+        number = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+            number *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed) + 1)
+
+        rounds = [elapsed / number]
+        for _ in range(repeat - 1):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            rounds.append((time.perf_counter() - started) / number)
+
+    return {
+        "median_us": round(statistics.median(rounds) * 1e6, 3),
+        "min_us": round(min(rounds) * 1e6, 3),
+        "number": number,
+        "rounds": repeat,
+    }
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """
+    Read all recorded runs from the history file.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def append_history(path: str, entry: Dict[str, Any]) -> None:
+    """
+    Append one run to the history file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(entry) + "\n")
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, Any]],
+    history: List[Dict[str, Any]],
+    threshold: float,
+    window: int = 5,
+    host: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Compare results with the median of the last `window` recorded runs from
+    the same host. Returns the benchmarks slower than that by more than
+    `threshold` percent.
+    """
+    host = host or platform.node()
+    regressions = {}
+    for name, result in results.items():
+        previous = [
+            entry["results"][name]["median_us"]
+            for entry in history
+            if entry.get("host") == host and name in entry.get("results", {})
+        ][-window:]
+        if not previous:
+            continue
+        baseline = statistics.median(previous)
+        change = (result["median_us"] - baseline) / baseline * 100
+        if change > threshold:
+            regressions[name] = {
+                "baseline_us": baseline,
+                "median_us": result["median_us"],
+                "change_pct": round(change, 1),
+            }
+    return regressions
+
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Run hot-path microbenchmarks.")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.environ.get("BENCH_REGRESSION_THRESHOLD", 10)),
+        help="Percent slowdown against history reported as a regression",
+    )
+    parser.add_argument("--window", type=int, default=5)
+    parser.add_argument(
+        "--no-record", action="store_true", help="Do not append to the history"
+    )
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--list", action="store_true", help="List benchmarks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """
+    Run the selected benchmarks, report regressions and record the run.
+    """
+    args = parse_args(argv)
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        print(f"Unknown benchmarks: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    results = {}
+    for name in args.names or BENCHMARKS:
+        results[name] = time_benchmark(name, args.repeat, args.min_time)
+        print(
+            f"{name:32} {results[name]['median_us']:>12.1f} us/call "
+            f"(min {results[name]['min_us']:.1f}, x{results[name]['number']})"
+        )
+
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, args.threshold, args.window)
+    for name, info in regressions.items():
+        print(
+            f"REGRESSION {name}: {info['median_us']:.1f} us vs "
+            f"{info['baseline_us']:.1f} us ({info['change_pct']:+.1f}%)"
+        )
+
+    if not args.no_record:
+        append_history(
+            args.history,
+            {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "host": platform.node(),
+                "python": platform.python_version(),
+                "results": results,
+            },
+        )
+
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
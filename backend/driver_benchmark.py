@@ -0,0 +1,199 @@
+"""
+Compare the psycopg2 and psycopg (3) database drivers on the service hot paths.
+
+Each driver runs in its own interpreter, because the engine is created from
+DATABASE_URL when app.py is imported. A worker posts and voids transactions
+between two dedicated accounts (so balances net out), and times account and
+transaction lookups and an account-filtered list page. Latencies are wall
+clock per call, including network round trips, so run it against a database
+on a real network to see the benefit of pipelining.
+
+Usage:
+    python driver_benchmark.py                      # both drivers, 500 calls
+    python driver_benchmark.py --iterations 2000 --drivers psycopg
+    python driver_benchmark.py --json results.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess  # nosec B404
+import sys
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List
+
+DRIVERS = ("psycopg2", "psycopg")
+
+ACCOUNT_NAMES = ("driver-bench-asset", "driver-bench-contra")
+
+
+def driver_url(url: str, driver: str) -> str:
+    """
+    Return the database URL with its driver replaced.
+    """
+    scheme, rest = url.split("://", 1)
+    return f"{scheme.split('+')[0]}+{driver}://{rest}"
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Reduce per-call timings in seconds to milliseconds statistics.
+    """
+    ordered = sorted(samples)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def run_operations(iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Time the service operations with the driver of the current DATABASE_URL.
+    Must run inside an application context.
+    """
+    from app import AccountService, TransactionService, app, db
+
+    ids = []
+    for name in ACCOUNT_NAMES:
+        found = AccountService.list_accounts({"name": name}, 1, 1)
+        if found:
+            ids.append(str(found[0].id))
+        else:
+            ids.append(
+                str(
+                    AccountService.create_account(
+                        {"name": name, "type": "ASSET", "opening_balance": "1000000"}
+                    ).id
+                )
+            )
+    db.session.remove()
+
+    payload = {
+        "account_id": ids[0],
+        "contra_account_id": ids[1],
+        "transaction_date": date.today().isoformat(),
+        "amount": "1.0000",
+        "description": "Driver benchmark",
+    }
+    posted: List[str] = []
+
+    def post():
+        posted.append(
+            str(TransactionService.record_transaction(payload)["transaction"].id)
+        )
+
+    def void():
+        TransactionService.void_transaction(posted.pop())
+
+    def post_orm():
+        app.config["POSTING_FUNCTION_ENABLED"] = False
+        try:
+            post()
+        finally:
+            app.config["POSTING_FUNCTION_ENABLED"] = True
+
+    def void_orm():
+        app.config["POSTING_FUNCTION_ENABLED"] = False
+        try:
+            void()
+        finally:
+            app.config["POSTING_FUNCTION_ENABLED"] = True
+
+    operations: Dict[str, Callable[[], Any]] = {
+        "get_account": lambda: AccountService.get_account(ids[0]).to_dict(),
+        "post_transaction": post,
+        "get_transaction": lambda: TransactionService.get_transaction(
+            posted[-1]
+        ).to_dict(),
+        "list_account_page": lambda: [
+            t.to_dict()
+            for t in TransactionService.list_transactions({"account_id": ids[0]})
+        ],
+        "void_transaction": void,
+        "post_transaction_orm": post_orm,
+        "void_transaction_orm": void_orm,
+    }
+
+    samples: Dict[str, List[float]] = {name: [] for name in operations}
+    for _ in range(iterations):
+        for name, operation in operations.items():
+            started = time.perf_counter()
+            operation()
+            db.session.remove()
+            samples[name].append(time.perf_counter() - started)
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def run_driver(driver: str, iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Run the worker for one driver in a child interpreter and return its
+    results.
+    """
+    env = dict(os.environ)
+    env["DATABASE_URL"] = driver_url(env["DATABASE_URL"], driver)
+    output = subprocess.run(  # nosec B603
+        [sys.executable, __file__, "--worker", "--iterations", str(iterations)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(results: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    """
+    Format a side-by-side table of p50 latencies per operation.
+    """
+    drivers = list(results)
+    lines = [f"{'operation':24}" + "".join(f"{d + ' p50 ms':>18}" for d in drivers)]
+    for operation in next(iter(results.values())):
+        cells = "".join(f"{results[d][operation]['p50_ms']:>18.3f}" for d in drivers)
+        lines.append(f"{operation:24}{cells}")
+    if set(DRIVERS) <= set(drivers):
+        lines.append("")
+        for operation in results[DRIVERS[0]]:
+            before = results[DRIVERS[0]][operation]["p50_ms"]
+            after = results[DRIVERS[1]][operation]["p50_ms"]
+            lines.append(f"{operation:24}{(after - before) / before * 100:>+17.1f}%")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Compare database drivers.")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--drivers", nargs="+", choices=DRIVERS, default=DRIVERS)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """
+    Benchmark the selected drivers and print the comparison.
+    """
+    args = parse_args(argv)
+    if args.worker:
+        from app import app
+
+        with app.app_context():
+            print(json.dumps(run_operations(args.iterations)))
+        return 0
+
+    results = {driver: run_driver(driver, args.iterations) for driver in args.drivers}
+    print(report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
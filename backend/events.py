@@ -0,0 +1,396 @@
+"""Live ledger events: sent with PostgreSQL NOTIFY, fanned out to subscribers."""
+import json
+import logging
+import queue
+import select
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "accounting_events"
+
+# Sent to a subscriber whose position in the event stream was lost; the
+# client should reload what it displays
+RESET = "reset"
+
+# NOTIFY rejects payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7999
+
+_STOP = object()
+
+
+class EventPublisher:
+    """
+    Sends events with NOTIFY from a single background thread, so a request
+    never waits for it. Queued events are sent in one statement per batch.
+    Live events are best effort: a batch that cannot be sent is dropped and
+    listeners resynchronise from the reset they receive on reconnect. An
+    event too large for NOTIFY is replaced by a reset, so it cannot take
+    the rest of its batch down with it.
+    """
+
+    NOTIFY = text(
+        "SELECT pg_notify(:channel, payload) "
+        "FROM unnest(CAST(:payloads AS text[])) WITH ORDINALITY AS p(payload, n) "
+        "ORDER BY n"
+    )
+
+    def __init__(self, channel: str = CHANNEL, batch_size: int = 100):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.engine = None
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine) -> None:
+        """
+        Bind the publisher to an engine and start the background thread.
+        """
+        self.engine = engine
+        if self.running:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="event-publisher", daemon=True
+        )
+        self._thread.start()
+
+    def publish(
+        self, event_type: str, account_ids: Iterable[str], data: Dict[str, Any]
+    ) -> str:
+        """
+        Queue an event about the given accounts. Returns its id.
+        """
+        event_id = uuid4().hex
+        event = {
+            "id": event_id,
+            "type": event_type,
+            "account_ids": [str(account_id) for account_id in account_ids],
+            "data": data,
+        }
+        if len(json.dumps(event).encode()) > MAX_PAYLOAD_BYTES:
+            logger.warning(f"Event {event_type} is too large to send, sent a reset")
+            event = {"id": event_id, "type": RESET, "account_ids": [], "data": {}}
+        self._queue.put(event)
+        return event_id
+
+    def flush(self) -> None:
+        """
+        Block until every event queued so far has been sent or dropped.
+        """
+        self._queue.join()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Send outstanding events and stop the background thread.
+        """
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)  # type: ignore[union-attr]
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            events = [event for event in batch if event is not _STOP]
+            try:
+                if events:
+                    self._send(events)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(events) < len(batch):
+                return
+
+    def _send(self, events: List[Dict[str, Any]]) -> None:
+        try:
+            with self.engine.begin() as conn:  # type: ignore[union-attr]
+                conn.execute(
+                    self.NOTIFY,
+                    {
+                        "channel": self.channel,
+                        "payloads": [json.dumps(event) for event in events],
+                    },
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Dropped {len(events)} events: {e}")
+
+
+class Subscription:
+    """
+    One subscriber's bounded queue of events, optionally limited to a set
+    of accounts. A subscriber that falls behind is reset instead of
+    holding back the others.
+    """
+
+    def __init__(self, account_ids: Optional[Set[str]], max_queue: int):
+        self.account_ids = account_ids
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+
+    def wants(self, event: Dict[str, Any]) -> bool:
+        return self.account_ids is None or bool(
+            self.account_ids.intersection(event["account_ids"])
+        )
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an event without blocking. On overflow the backlog is replaced
+        by a reset.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.reset()
+
+    def reset(self) -> None:
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put_nowait({"id": None, "type": RESET, "data": {}})
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to timeout seconds for the next event.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    Holds one LISTEN connection per process and fans the notifications out
+    to subscribers, indexed by account so an event only visits the
+    subscriptions that want it. The most recent events are kept so that a
+    reconnecting client can resume after the last event id it received.
+
+    Every listener receives notifications in commit order, so the position
+    of an event id in the buffer is the same in every process.
+    """
+
+    def __init__(
+        self,
+        channel: str = CHANNEL,
+        buffer_size: int = 1000,
+        max_queue: int = 256,
+        poll_interval: float = 1.0,
+    ):
+        self.channel = channel
+        self.max_queue = max_queue
+        self.poll_interval = poll_interval
+        self.engine = None
+        self._buffer: "deque[Dict[str, Any]]" = deque(maxlen=buffer_size)
+        self._by_account: Dict[str, Set[Subscription]] = {}
+        self._all: Set[Subscription] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine, wait: float = 5.0) -> None:
+        """
+        Start the listener thread and wait until it is listening.
+        """
+        self.engine = engine
+        with self._lock:
+            if self.running:
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="event-listener", daemon=True
+            )
+            self._thread.start()
+        self._listening.wait(wait)
+
+    def stop(self) -> None:
+        """
+        Stop the listener thread.
+        """
+        self._stopped.set()
+        if self.running:
+            self._thread.join()  # type: ignore[union-attr]
+
+    def subscribe(
+        self,
+        account_ids: Optional[Iterable[str]] = None,
+        last_event_id: Optional[str] = None,
+    ) -> Subscription:
+        """
+        Register a subscriber for all events or for the given accounts. With
+        last_event_id the buffered events after it are queued first; if that
+        event is no longer buffered the subscriber starts with a reset.
+        """
+        accounts = set(account_ids) if account_ids else None
+        subscription = Subscription(accounts, self.max_queue)
+        with self._lock:
+            if last_event_id:
+                ids = [event["id"] for event in self._buffer]
+                if last_event_id in ids:
+                    missed = list(self._buffer)[ids.index(last_event_id) + 1 :]
+                    for event in missed:
+                        if subscription.wants(event):
+                            subscription.offer(event)
+                else:
+                    subscription.reset()
+            if accounts is None:
+                self._all.add(subscription)
+            else:
+                for account_id in accounts:
+                    self._by_account.setdefault(account_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a subscriber.
+        """
+        with self._lock:
+            self._all.discard(subscription)
+            for account_id in subscription.account_ids or ():
+                subscribers = self._by_account.get(account_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_account[account_id]
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call callback with every event received, and with a reset event when
+        notifications may have been lost. Callbacks run on the listener
+        thread and must not block.
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(
+                self._all.union(*self._by_account.values())
+                if self._by_account
+                else self._all
+            )
+
+    def dispatch(self, event: Dict[str, Any]) -> None:
+        """
+        Buffer an event and queue it for every interested subscriber. A
+        published reset resets every subscriber.
+        """
+        if event["type"] == RESET:
+            self._reset_all()
+            return
+        with self._lock:
+            self._buffer.append(event)
+            targets = set(self._all)
+            for account_id in event["account_ids"]:
+                targets.update(self._by_account.get(account_id, ()))
+            listeners = list(self._listeners)
+        for subscription in targets:
+            subscription.offer(event)
+        self._notify(listeners, event)
+
+    def _reset_all(self) -> None:
+        with self._lock:
+            self._buffer.clear()
+            targets = self._all.union(*self._by_account.values())
+            listeners = list(self._listeners)
+        for subscription in targets:
+            subscription.reset()
+        self._notify(listeners, {"id": None, "type": RESET, "data": {}})
+
+    @staticmethod
+    def _notify(listeners, event: Dict[str, Any]) -> None:
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception(f"Event listener failed on {event['type']}")
+
+    # Listener thread
+
+    def _run(self) -> None:
+        delay = self.poll_interval
+        connected_before = False
+        while not self._stopped.is_set():
+            connection = None
+            try:
+                connection = self.engine.raw_connection()  # type: ignore[union-attr]
+                driver_connection = connection.driver_connection
+                # Keep the listener out of the pool, which opens a replacement
+                connection.detach()
+                driver_connection.autocommit = True
+                cursor = driver_connection.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                cursor.close()
+                if connected_before:
+                    # Notifications sent while disconnected are lost
+                    self._reset_all()
+                connected_before = True
+                self._listening.set()
+                delay = self.poll_interval
+                self._listen(driver_connection)
+            except Exception as e:
+                logger.warning(f"Event listener disconnected: {e}")
+                self._stopped.wait(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:  # nosec B110
+                        pass
+
+    def _listen(self, driver_connection) -> None:
+        if hasattr(driver_connection, "poll"):
+            # psycopg2
+            while not self._stopped.is_set():
+                if select.select([driver_connection], [], [], self.poll_interval)[0]:
+                    driver_connection.poll()
+                    while driver_connection.notifies:
+                        self._receive(driver_connection.notifies.pop(0).payload)
+        else:
+            # psycopg (3)
+            while not self._stopped.is_set():
+                for notify in driver_connection.notifies(timeout=self.poll_interval):
+                    self._receive(notify.payload)
+                    if self._stopped.is_set():
+                        break
+
+    def _receive(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignored malformed event payload")
+            return
+        self.dispatch(event)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Format an event as a Server-Sent Events message.
+    """
+    lines = [f"event: {event['type']}"]
+    if event.get("id"):
+        lines.insert(0, f"id: {event['id']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return "\n".join(lines) + "\n\n"
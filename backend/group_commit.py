@@ -0,0 +1,147 @@
+"""Group commit: apply concurrent submissions together in one transaction."""
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Pending:
+    __slots__ = ("item", "done", "result", "error")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitter:
+    """
+    Gathers items submitted from many threads and hands them to apply_batch
+    from a single background thread, so one commit covers many callers.
+
+    A batch is closed when it holds max_batch items or max_wait seconds
+    after its first item arrived. With max_wait 0 a batch is whatever queued
+    up while the previous one was being applied, which adds no latency when
+    idle. apply_batch returns one outcome per item, in order: a result, or
+    an exception instance to raise in that item's caller. If apply_batch
+    itself raises, every caller in the batch gets that exception.
+    """
+
+    def __init__(
+        self,
+        apply_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch: int = 32,
+        max_wait: float = 0.002,
+    ):
+        self.apply_batch = apply_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Start the background thread.
+        """
+        with self._start_lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="group-commit", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, item: Any) -> Any:
+        """
+        Queue an item and block until its batch has been applied. Returns
+        the item's result or raises its error.
+        """
+        if not self.running:
+            self.start()
+        pending = _Pending(item)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Apply the queued items and stop the background thread.
+        """
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)  # type: ignore[union-attr]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return counters for monitoring.
+        """
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": (
+                round(self._items / self._batches, 2) if self._batches else 0
+            ),
+            "largest_batch": self._largest,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def _collect(self) -> List[Any]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pending = [p for p in batch if p is not _STOP]
+            if pending:
+                self._apply(pending)
+            if len(pending) < len(batch):
+                return
+
+    def _apply(self, pending: List[_Pending]) -> None:
+        try:
+            outcomes = list(self.apply_batch([p.item for p in pending]))
+            if len(outcomes) != len(pending):
+                raise RuntimeError(
+                    f"apply_batch returned {len(outcomes)} outcomes "
+                    f"for {len(pending)} items"
+                )
+        except BaseException as e:
+            logger.error(f"Group commit of {len(pending)} items failed: {e}")
+            outcomes = [e] * len(pending)
+
+        self._batches += 1
+        self._items += len(pending)
+        self._largest = max(self._largest, len(pending))
+        for p, outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                p.error = outcome
+            else:
+                p.result = outcome
+            p.done.set()
@@ -0,0 +1,87 @@
+"""Exact conversion between Decimal amounts and integer minor units."""
+from decimal import Decimal, InvalidOperation
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, Numeric
+from sqlalchemy.sql import operators
+from sqlalchemy.types import TypeDecorator
+
+# Amounts carry four decimal places, the scale of DECIMAL(19,4)
+SCALE = 4
+MINOR_UNITS = 10**SCALE
+
+# Largest amount a BIGINT holds at that scale: 922337203685477.5807
+MAX_MINOR_UNITS = 2**63 - 1
+MAX_AMOUNT = Decimal(MAX_MINOR_UNITS).scaleb(-SCALE)
+
+_SCALING_OPERATORS = {operators.mul, operators.truediv, operators.floordiv}
+_AMOUNT_OPERATORS = {operators.add, operators.sub, operators.neg} | _SCALING_OPERATORS
+
+
+class AmountOutOfRange(ValueError):
+    """
+    Raised when an amount has more than SCALE decimal places or does not fit
+    in a BIGINT of minor units.
+    """
+
+
+def to_minor_units(amount: Any) -> int:
+    """
+    Convert an amount to minor units without rounding.
+    """
+    try:
+        minor = Decimal(amount).scaleb(SCALE)
+        exact = minor == minor.to_integral_value()
+    except (InvalidOperation, TypeError, ValueError):
+        raise AmountOutOfRange(f"Invalid amount: {amount!r}")
+    if not exact:
+        raise AmountOutOfRange(f"Amount has more than {SCALE} decimal places")
+    minor = int(minor)
+    if not -MAX_MINOR_UNITS - 1 <= minor <= MAX_MINOR_UNITS:
+        raise AmountOutOfRange("Amount out of range")
+    return minor
+
+
+def from_minor_units(value: Any) -> Decimal:
+    """
+    Convert minor units back to an amount with SCALE decimal places.
+    Accepts integers and the integral Decimals PostgreSQL returns for
+    SUM(bigint).
+    """
+    return Decimal(value).scaleb(-SCALE)
+
+
+class MinorUnits(TypeDecorator):
+    """
+    An amount column stored as a BIGINT of minor units. Values bound and
+    loaded are Decimals, as with Numeric(19, 4), so the storage can change
+    without touching the code that reads and writes amounts.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[int]:
+        return None if value is None else to_minor_units(value)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[Decimal]:
+        return None if value is None else from_minor_units(value)
+
+    class comparator_factory(BigInteger.Comparator):
+        """
+        Keeps the type through arithmetic, so computed amounts load as
+        Decimals too.
+        """
+
+        def _adapt_expression(self, op, other_comparator):
+            # Sums, differences and scalings of amounts are amounts
+            if op in _AMOUNT_OPERATORS:
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
+
+    def coerce_compared_value(self, op, value):
+        # A literal added to or compared with an amount is an amount; one
+        # that scales it is a plain number
+        if op in _SCALING_OPERATORS:
+            return Numeric()
+        return self
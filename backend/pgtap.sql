@@ -134,10 +134,11 @@ SELECT plan(9);
 
 SELECT indexes_are('accounting', 'transactions', ARRAY[
     'transactions_pkey',
-    'idx_transactions_account_id',
-    'idx_transactions_contra_account_id',
-    'idx_transactions_date',
-    'idx_transactions_void_status'
+    'idx_transactions_account_date',
+    'idx_transactions_contra_account_date',
+    'idx_transactions_date_created',
+    'idx_transactions_active_date',
+    'idx_transactions_created_at'
 ], 'Transactions table should have correct indexes');
 
 SELECT indexes_are('accounting', 'balance_history', ARRAY[
@@ -149,7 +150,8 @@ SELECT indexes_are('accounting', 'balance_history', ARRAY[
 SELECT indexes_are('accounting', 'accounts', ARRAY[
     'accounts_pkey',
     'idx_accounts_type',
-    'idx_accounts_name'
+    'idx_accounts_name',
+    'idx_accounts_updated_at'
 ], 'Accounts table should have correct indexes');
 
 SELECT * FROM finish();
@@ -0,0 +1,205 @@
+"""
+Measure concurrent posting throughput and latency with and without group commit.
+
+Worker threads post transactions between a set of dedicated accounts as fast
+as they can, first with each posting committing on its own and then through
+the group committer with each batch setting. Throughput is postings per
+second of wall clock; latencies are per posting, including the wait for the
+batch to fill. Run it against a database whose commits are durable
+(synchronous_commit on, real disk) to see the effect of sharing commits.
+
+Usage:
+    python posting_benchmark.py                       # 12 threads, 200 each
+    python posting_benchmark.py --threads 32 --postings 500
+    python posting_benchmark.py --batches 16:0 32:2 64:5 --json results.json
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from driver_benchmark import summarize
+
+ACCOUNT_PREFIX = "posting-bench-"
+
+
+def parse_batch(value: str) -> Tuple[int, float]:
+    """
+    Parse a MAX_BATCH:MAX_WAIT_MS setting.
+    """
+    size, _, wait = value.partition(":")
+    return int(size), float(wait or 0)
+
+
+def ensure_accounts(count: int) -> List[str]:
+    """
+    Return the ids of the benchmark accounts, creating missing ones.
+    """
+    from app import AccountService
+
+    ids = []
+    for i in range(count):
+        name = f"{ACCOUNT_PREFIX}{i:03d}"
+        found = AccountService.list_accounts({"name": name}, 1, 1)
+        if found:
+            ids.append(str(found[0].id))
+        else:
+            account = AccountService.create_account(
+                {"name": name, "type": "ASSET", "opening_balance": "1000000000"}
+            )
+            ids.append(str(account.id))
+    return ids
+
+
+def run_mode(
+    account_ids: List[str],
+    threads: int,
+    postings: int,
+    batch: Optional[Tuple[int, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Post from concurrent threads, with group commit when batch is given as
+    (max_batch, max_wait_ms). Returns throughput and latency statistics.
+    """
+    from app import TransactionService, app, db, posting_committer
+
+    previous = (
+        app.config["GROUP_COMMIT_ENABLED"],
+        posting_committer.max_batch,
+        posting_committer.max_wait,
+    )
+    app.config["GROUP_COMMIT_ENABLED"] = batch is not None
+    if batch is not None:
+        posting_committer.max_batch = batch[0]
+        posting_committer.max_wait = batch[1] / 1000
+    before = posting_committer.stats()
+
+    samples: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        local = []
+        with app.app_context():
+            start.wait()
+            for _ in range(postings):
+                account_id, contra_id = rng.sample(account_ids, 2)
+                payload = {
+                    "account_id": account_id,
+                    "contra_account_id": contra_id,
+                    "transaction_date": date.today().isoformat(),
+                    "amount": "1.0000",
+                    "description": "Posting benchmark",
+                }
+                started = time.perf_counter()
+                try:
+                    TransactionService.record_transaction(payload)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                local.append(time.perf_counter() - started)
+                db.session.remove()
+        with lock:
+            samples.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    try:
+        for thread in workers:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        app.config["GROUP_COMMIT_ENABLED"] = previous[0]
+        posting_committer.max_batch, posting_committer.max_wait = previous[1:]
+
+    after = posting_committer.stats()
+    batches = after["batches"] - before["batches"]
+    result = {
+        **summarize(samples),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(samples) / elapsed, 1),
+        "commits": batches if batch is not None else len(samples),
+    }
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def report(results: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Format a table with one line per mode.
+    """
+    lines = [
+        f"{'mode':18}{'postings/s':>12}{'commits':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}"
+    ]
+    for mode, r in results.items():
+        lines.append(
+            f"{mode:18}{r['per_second']:>12.1f}{r['commits']:>10}"
+            f"{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['errors']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def run(
+    threads: int, postings: int, accounts: int, batches: List[Tuple[int, float]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark individual commits and each group commit setting.
+    """
+    from app import app
+
+    with app.app_context():
+        account_ids = ensure_accounts(accounts)
+        results = {"individual": run_mode(account_ids, threads, postings)}
+        for size, wait in batches:
+            results[f"group {size}/{wait:g}ms"] = run_mode(
+                account_ids, threads, postings, (size, wait)
+            )
+    return results
+
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark concurrent postings.")
+    parser.add_argument("--threads", type=int, default=12)
+    parser.add_argument("--postings", type=int, default=200, help="Per thread")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument(
+        "--batches",
+        nargs="+",
+        type=parse_batch,
+        default=[(32, 0.0), (32, 2.0)],
+        metavar="MAX_BATCH:MAX_WAIT_MS",
+    )
+    parser.add_argument("--json", help="Also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """
+    Run the benchmark and print the comparison.
+    """
+    args = parse_args(argv)
+    results = run(args.threads, args.postings, args.accounts, args.batches)
+    print(report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Tests for the in-memory account name index."""
+from account_index import AccountIndex
+
+
+def names(suggestions):
+    """
+    Return the account names of a list of suggestions.
+    """
+    return [s["name"] for s in suggestions]
+
+
+def make_index():
+    """
+    Return an index loaded with four accounts.
+    """
+    index = AccountIndex()
+    index.load(
+        [
+            ("1", "Cash at bank", "ASSET"),
+            ("2", "Petty cash", "ASSET"),
+            ("3", "Cashback income", "INCOME"),
+            ("4", "Rent", "EXPENSE"),
+        ]
+    )
+    return index
+
+
+def test_whole_name_matches_come_first():
+    """
+    Names starting with the prefix rank ahead of word matches.
+    """
+    index = make_index()
+    assert names(index.suggest("CASH")) == [
+        "Cash at bank",
+        "Cashback income",
+        "Petty cash",
+    ]
+    assert names(index.suggest("cash", limit=1)) == ["Cash at bank"]
+    assert names(index.suggest("cash", account_type="INCOME")) == ["Cashback income"]
+    assert names(index.suggest("  petty   C")) == ["Petty cash"]
+    assert index.suggest("zzz") == []
+
+
+def test_updates_replace_old_keys():
+    """
+    Renames and removals drop the keys of the old name.
+    """
+    index = make_index()
+    index.upsert("4", "Office rent", "EXPENSE")
+    index.upsert("5", "Rental income", "INCOME")
+    assert names(index.suggest("rent")) == ["Rental income", "Office rent"]
+    assert names(index.suggest("off")) == ["Office rent"]
+    index.remove("2")
+    assert names(index.suggest("petty")) == []
+    assert len(index) == 4
+
+
+def test_changes_during_load_are_replayed():
+    """
+    Changes made while a snapshot loads win over the snapshot.
+    """
+    index = AccountIndex()
+    assert index.stale()
+
+    def load_rows():
+        # Committed after the snapshot was read
+        index.upsert("1", "Cash on hand", "ASSET")
+        return [("1", "Cash", "ASSET"), ("2", "Rent", "EXPENSE")]
+
+    index.ensure(load_rows)
+    assert not index.stale()
+    assert names(index.suggest("cash")) == ["Cash on hand"]
+
+    index.ensure(lambda: [])  # fresh, not reloaded
+    assert len(index) == 2
+    index.invalidate()
+    assert index.stale()
+    index.ensure(lambda: [("3", "Bank", "ASSET")])
+    assert names(index.suggest("")) == ["Bank"]
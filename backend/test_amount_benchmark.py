@@ -0,0 +1,14 @@
+"""Tests for the amount storage benchmark."""
+from amount_benchmark import STORAGES, WORKLOADS, report, run
+
+
+def test_run_compares_storages():
+    """
+    Every workload is timed for both storages.
+    """
+    results = run(rows=2000, accounts=10, repeat=2, load_rows=100)
+    assert set(results) == {*WORKLOADS, "load_amounts"}
+    for result in results.values():
+        assert set(result) == set(STORAGES)
+        assert all(timing["calls"] == 2 for timing in result.values())
+    assert "speedup" in report(results)
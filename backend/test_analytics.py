@@ -0,0 +1,130 @@
+"""Tests for the NumPy ledger columns behind the analytics engine."""
+from datetime import date
+from decimal import Decimal
+from uuid import uuid4
+
+from analytics import LedgerColumns, from_minor, month_starts, to_minor
+
+BANK, RENT, SALARY = str(uuid4()), str(uuid4()), str(uuid4())
+
+
+def make_columns():
+    """
+    Return columns holding three accounts and four transactions.
+    """
+    columns = LedgerColumns()
+    columns.add_accounts(
+        [
+            (BANK, "Bank", "ASSET", Decimal("1000.0000")),
+            (RENT, "Rent income", "INCOME", Decimal("0")),
+            (SALARY, "Salaries", "EXPENSE", Decimal("0")),
+        ]
+    )
+    ids = [str(uuid4()) for _ in range(4)]
+    columns.add_transactions(
+        [
+            (ids[0], RENT, BANK, date(2024, 2, 1), Decimal("500.0000"), False),
+            (ids[1], RENT, BANK, date(2024, 1, 1), Decimal("500.0000"), False),
+            (ids[2], BANK, SALARY, date(2024, 1, 15), Decimal("120.5000"), False),
+            (ids[3], RENT, BANK, date(2024, 1, 20), Decimal("99.0000"), True),
+        ]
+    )
+    return columns, ids
+
+
+def test_minor_units_round_trip():
+    """
+    Amounts convert to minor units and back exactly.
+    """
+    assert to_minor(Decimal("12.3456")) == 123456
+    assert from_minor(123456) == Decimal("12.3456")
+    assert str(from_minor(-5)) == "-0.0005"
+
+
+def test_month_starts_clip_to_range():
+    """
+    Period starts are clipped to the requested range.
+    """
+    assert month_starts(date(2024, 1, 15), date(2024, 3, 1)) == [
+        date(2024, 1, 15),
+        date(2024, 2, 1),
+        date(2024, 3, 1),
+    ]
+    assert month_starts(date(2024, 1, 15), date(2024, 1, 31)) == [date(2024, 1, 15)]
+
+
+def test_balances_and_account_totals():
+    """
+    Balances and totals match the ledger, ignoring voids.
+    """
+    columns, ids = make_columns()
+    assert len(columns) == 4
+    balances = columns.balances(date(2024, 1, 31))
+    # Account side debits, contra side credits; the void posting is ignored
+    assert balances[BANK] == Decimal("1000.0000") - 500 + Decimal("120.5")
+    assert balances[RENT] == Decimal("500.0000")
+    assert balances[SALARY] == Decimal("-120.5000")
+
+    totals = {
+        row["account_id"]: row
+        for row in columns.account_totals(date(2024, 2, 1), date(2024, 2, 29))
+    }
+    assert totals[BANK]["opening_balance"] == Decimal("620.5000")
+    assert totals[BANK]["credits"] == Decimal("500.0000")
+    assert totals[BANK]["closing_balance"] == Decimal("120.5000")
+    assert totals[RENT]["debits"] == Decimal("500.0000")
+
+
+def test_profit_loss_by_period():
+    """
+    Profit and loss is split into the requested periods.
+    """
+    columns, ids = make_columns()
+    periods = month_starts(date(2024, 1, 1), date(2024, 3, 31))
+    income, expenses, by_period = columns.profit_loss(
+        date(2024, 1, 1), date(2024, 3, 31), periods
+    )
+    assert (income, expenses) == (Decimal("1000.0000"), Decimal("120.5000"))
+    assert by_period == [
+        (Decimal("500.0000"), Decimal("120.5000")),
+        (Decimal("500.0000"), Decimal("0.0000")),
+        (Decimal("0.0000"), Decimal("0.0000")),
+    ]
+
+
+def test_updates_keep_rows_sorted_and_unique():
+    """
+    Added rows stay sorted, duplicates are ignored.
+    """
+    columns, ids = make_columns()
+    added = columns.add_transactions(
+        [
+            (ids[0], RENT, BANK, date(2024, 2, 1), Decimal("500.0000"), False),
+            (str(uuid4()), RENT, BANK, date(2023, 12, 31), Decimal("1.0000"), False),
+        ]
+    )
+    assert added == 1
+    assert columns.void([ids[1], str(uuid4())]) == 1
+    income, _, _ = columns.profit_loss(date(2023, 12, 1), date(2024, 1, 31))
+    assert income == Decimal("1.0000")
+
+
+def test_snapshot_round_trip(tmp_path):
+    """
+    A saved snapshot reopens with the same rows and position.
+    """
+    columns, ids = make_columns()
+    columns.position = [42, 7]
+    path = str(tmp_path / "ledger.npy")
+    columns.save(path)
+
+    opened = LedgerColumns.open(path)
+    assert opened is not None and len(opened) == 4
+    assert opened.position == [42, 7]
+    assert opened.balances(date(2024, 3, 1)) == columns.balances(date(2024, 3, 1))
+    # Voids on the mapped rows stay private to the process
+    assert opened.void([ids[0]]) == 1
+    assert LedgerColumns.open(path).balances(date(2024, 3, 1))[RENT] == Decimal(
+        "1000.0000"
+    )
+    assert LedgerColumns.open(str(tmp_path / "missing.npy")) is None
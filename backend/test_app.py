@@ -1,13 +1,19 @@
+import io
 import json
 import os
+import threading
+import time
 import warnings
-from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from uuid import uuid4
 
 import pytest
-from flask import Flask
+from flask import Flask, g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 
 warnings.filterwarnings(
     "ignore", message="Using the in-memory storage for tracking rate limits*"
@@ -20,9 +26,33 @@ warnings.filterwarnings(
 )
 
 # Import the app and db from your backend
-from app import Account, Transaction, User
+from app import (
+    AMOUNT_OUT_OF_RANGE,
+    MAX_AMOUNT,
+    Account,
+    AnalyticsService,
+    ArchivedTransaction,
+    AuditLog,
+    BalanceHistory,
+    ClosedPeriod,
+    DeadlineExceededError,
+    FinancialSystemError,
+    InsufficientFundsError,
+    Job,
+    JobService,
+    PartitionService,
+    PeriodService,
+    ReconciliationService,
+    ReportService,
+    RequestValidationError,
+    Transaction,
+    TransactionService,
+    User,
+    _begin_write,
+    _publish_event,
+)
 from app import app as flask_app
-from app import db
+from app import audit_writer, db, posting_committer, request_timeouts, write_conflicts
 
 # --- Pytest Fixtures ---
 
@@ -118,11 +148,65 @@ def contra_account(client, auth_token):
     return resp.get_json()
 
 
+@pytest.fixture
+def partitioned(app):
+    # Partitioning tests need the schema from database/init.sql
+    if (
+        db.engine.dialect.name != "postgresql"
+        or not db.session.execute(
+            db.text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass('accounting.transactions')"
+            )
+        ).scalar()
+    ):
+        pytest.skip("accounting.transactions is not partitioned")
+
+
 # --- Helper for Auth Header ---
 def auth_header(token):
     return {"Authorization": f"Bearer {token}"}
 
 
+# --- Helpers for query plans ---
+def explain(query, options="FORMAT JSON"):
+    sql = query.compile(
+        dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    return db.session.execute(db.text(f"EXPLAIN ({options}) {sql}")).scalar_one()[0]
+
+
+def scanned_relations(plan):
+    node = plan.get("Plan", plan)
+    found = {node["Relation Name"]} if "Relation Name" in node else set()
+    for child in node.get("Plans", []):
+        found |= scanned_relations(child)
+    return found
+
+
+def transaction_partitions(relations):
+    return {r for r in relations if r.startswith("transactions")}
+
+
+@contextmanager
+def captured_statements():
+    # SQL sent by the request under test; the audit writer and the event
+    # publisher write from their own background threads and are left out, as
+    # is the statement_timeout each request sets for its deadline
+    statements = []
+    thread = threading.get_ident()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread and "statement_timeout" not in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+
 # --- Test Cases ---
 
 
@@ -191,7 +275,7 @@ def test_update_account_success(client, auth_token, account):
 
 
 def test_list_accounts(client, auth_token, account):
-    resp = client.get("/api/accounts", headers=auth_header(auth_token))
+    resp = client.get("/api/accounts?per_page=1000", headers=auth_header(auth_token))
     assert resp.status_code == 200
     data = resp.get_json()
     assert isinstance(data, list)
@@ -261,6 +345,457 @@ def test_void_transaction_not_found(client, auth_token):
     assert "error" in resp.get_json()
 
 
+def test_void_transaction_twice_rejected(client, auth_token, account, contra_account):
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "5.0000",
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    tx_id = resp.get_json()["transaction"]["id"]
+    url = f"/api/transactions/{tx_id}/void"
+    assert client.post(url, headers=auth_header(auth_token)).status_code == 200
+    resp = client.post(url, headers=auth_header(auth_token))
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Transaction already voided"
+
+
+def test_amounts_out_of_range_rejected(client, auth_token, contra_account):
+    too_large = str(MAX_AMOUNT + Decimal("0.0001"))
+    resp = client.post(
+        "/api/accounts",
+        json={"name": "Huge", "type": "ASSET", "opening_balance": too_large},
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 400
+
+    resp = client.post(
+        "/api/accounts",
+        json={"name": "Full", "type": "INCOME", "opening_balance": str(MAX_AMOUNT)},
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 201
+    full = resp.get_json()
+    tx_data = {
+        "account_id": full["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": too_large,
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 400
+
+    # The amount fits but the balance it moves does not, on either path
+    tx_data["amount"] = "1.0000"
+    for posting_function in (True, False):
+        flask_app.config["POSTING_FUNCTION_ENABLED"] = posting_function
+        try:
+            resp = client.post(
+                "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+            )
+        finally:
+            flask_app.config["POSTING_FUNCTION_ENABLED"] = True
+        assert resp.status_code == 400
+        assert resp.get_json()["error"] == AMOUNT_OUT_OF_RANGE
+    balance = db.session.execute(
+        db.select(Account.current_balance).where(Account.id == full["id"])
+    ).scalar_one()
+    assert balance == MAX_AMOUNT
+    # Beyond what the analytics engine's float64 sums hold exactly
+    db.session.execute(db.delete(Account).where(Account.id == full["id"]))
+    db.session.commit()
+
+
+def test_posting_function_single_round_trip(
+    client, auth_token, account, contra_account, partitioned
+):
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "12.5000",
+    }
+    with captured_statements() as statements:
+        resp = client.post(
+            "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+        )
+    assert resp.status_code == 201
+    assert len(statements) == 1
+    assert "accounting.post_transaction" in statements[0]
+    data = resp.get_json()
+    assert data["transaction"]["account_name"] == "Cash"
+    assert data["new_balances"] == {"account": 1012.5, "contra_account": 487.5}
+
+    tx_id = data["transaction"]["id"]
+    with captured_statements() as statements:
+        resp = client.post(
+            f"/api/transactions/{tx_id}/void", headers=auth_header(auth_token)
+        )
+    assert len(statements) == 1
+    assert resp.get_json()["new_balances"] == {
+        "account": 1000.0,
+        "contra_account": 500.0,
+    }
+
+    audit_writer.flush()
+    entries = (
+        db.session.query(AuditLog)
+        .filter(AuditLog.record_id.in_([tx_id, account["id"]]))
+        .order_by(AuditLog.id)
+        .all()
+    )
+    assert [(e.table_name, e.operation) for e in entries] == [
+        ("accounts", "INSERT"),
+        ("transactions", "INSERT"),
+        ("accounts", "UPDATE"),
+        ("transactions", "UPDATE"),
+        ("accounts", "UPDATE"),
+    ]
+    assert entries[2].new_values == {"current_balance": "1012.5000"}
+
+
+def test_record_transaction_orm_path(client, auth_token, account, contra_account):
+    flask_app.config["POSTING_FUNCTION_ENABLED"] = False
+    try:
+        tx_data = {
+            "account_id": account["id"],
+            "contra_account_id": contra_account["id"],
+            "transaction_date": date.today().isoformat(),
+            "amount": "20.0000",
+        }
+        resp = client.post(
+            "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+        )
+        assert resp.status_code == 201
+        data = resp.get_json()
+        assert data["new_balances"]["account"] == 1020.0
+        assert data["transaction"]["contra_account_name"] == "Bank"
+
+        resp = client.post(
+            f"/api/transactions/{data['transaction']['id']}/void",
+            headers=auth_header(auth_token),
+        )
+        assert resp.status_code == 200
+        assert resp.get_json()["transaction"]["is_void"] is True
+        assert resp.get_json()["new_balances"] == {
+            "account": 1000.0,
+            "contra_account": 500.0,
+        }
+    finally:
+        flask_app.config["POSTING_FUNCTION_ENABLED"] = True
+
+
+def test_account_writes_do_not_reload(client, auth_token, account_data):
+    with captured_statements() as statements:
+        resp = client.post(
+            "/api/accounts", json=account_data, headers=auth_header(auth_token)
+        )
+    assert resp.status_code == 201
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT") and "RETURNING" in statements[0]
+    created = resp.get_json()
+
+    with captured_statements() as statements:
+        resp = client.put(
+            f"/api/accounts/{created['id']}",
+            json={"description": "Petty cash"},
+            headers=auth_header(auth_token),
+        )
+    assert resp.status_code == 200
+    assert [s.split()[0] for s in statements] == ["SELECT", "UPDATE"]
+    assert "RETURNING" in statements[1]
+    assert resp.get_json()["updated_at"] >= created["updated_at"]
+
+
+def test_orm_transaction_writes_do_not_reload(
+    client, auth_token, account, contra_account
+):
+    flask_app.config["POSTING_FUNCTION_ENABLED"] = False
+    try:
+        tx_data = {
+            "account_id": account["id"],
+            "contra_account_id": contra_account["id"],
+            "transaction_date": date.today().isoformat(),
+            "amount": "15.0000",
+        }
+        with captured_statements() as statements:
+            resp = client.post(
+                "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+            )
+        assert resp.status_code == 201
+        # One locking SELECT; the response needs nothing more from the server
+        assert [s.split()[0] for s in statements].count("SELECT") == 1
+        assert len(statements) <= 4
+        data = resp.get_json()["transaction"]
+        assert data["account_name"] == "Cash" and data["created_at"]
+
+        with captured_statements() as statements:
+            resp = client.post(
+                f"/api/transactions/{data['id']}/void",
+                headers=auth_header(auth_token),
+            )
+        assert resp.status_code == 200
+        # The transaction row and both accounts are locked by one SELECT
+        assert [s.split()[0] for s in statements].count("SELECT") == 1
+        assert len(statements) <= 4
+        assert resp.get_json()["transaction"]["contra_account_name"] == "Bank"
+    finally:
+        flask_app.config["POSTING_FUNCTION_ENABLED"] = True
+
+
+def test_posting_function_refreshes_loaded_accounts(
+    client, auth_token, account, contra_account
+):
+    cash = db.session.get(Account, account["id"])
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "30.0000",
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 201
+    assert cash.current_balance == Decimal("1030.0000")
+
+
+def test_group_commit_batches_concurrent_postings(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    overdrawn = client.post(
+        "/api/accounts",
+        json={"name": "Overdrawn", "type": "ASSET", "opening_balance": "-100"},
+        headers=auth_header(auth_token),
+    ).get_json()
+    monkeypatch.setitem(flask_app.config, "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(posting_committer, "max_wait", 0.2)
+    before = posting_committer.stats()
+
+    payloads = [
+        {
+            "account_id": account["id"],
+            "contra_account_id": contra_account["id"],
+            "transaction_date": date.today().isoformat(),
+            "amount": "1.0000",
+            "description": f"Grouped {i}",
+        }
+        for i in range(4)
+    ]
+    payloads.append({**payloads[0], "account_id": overdrawn["id"]})
+    outcomes = {}
+
+    def post(i, payload):
+        with flask_app.app_context():
+            try:
+                outcomes[i] = TransactionService.record_transaction(payload)
+            except Exception as e:
+                outcomes[i] = e
+
+    threads = [threading.Thread(target=post, args=p) for p in enumerate(payloads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(outcomes.pop(4), InsufficientFundsError)
+    assert sorted(o["transaction"].description for o in outcomes.values()) == [
+        f"Grouped {i}" for i in range(4)
+    ]
+    stats = posting_committer.stats()
+    assert stats["items"] - before["items"] == 5
+    assert stats["batches"] - before["batches"] < 5
+    resp = client.get(f"/api/accounts/{account['id']}", headers=auth_header(auth_token))
+    assert Decimal(resp.get_json()["current_balance"]) == Decimal("1004.0000")
+
+
+def test_group_commit_keeps_the_callers_user_and_deadline(
+    account, contra_account, monkeypatch
+):
+    monkeypatch.setitem(flask_app.config, "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(posting_committer, "max_wait", 0.2)
+    payload = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "1.0000",
+    }
+    # The last deadline passes while the batch waits for more postings
+    now = time.monotonic()
+    deadlines = [None, now + 10, now + 0.05]
+    outcomes = {}
+
+    def post(i, deadline):
+        with flask_app.test_request_context():
+            g.current_user = f"clerk-{i}"
+            g.deadline = deadline
+            try:
+                outcomes[i] = TransactionService.record_transaction(payload)
+            except Exception as e:
+                outcomes[i] = e
+
+    threads = [threading.Thread(target=post, args=d) for d in enumerate(deadlines)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(outcomes.pop(2), DeadlineExceededError)
+    audit_writer.flush()
+    for i, outcome in outcomes.items():
+        tx_id = str(outcome["transaction"].id)
+        entry = db.session.execute(
+            db.select(AuditLog).where(AuditLog.record_id == tx_id)
+        ).scalar_one()
+        assert entry.changed_by == f"clerk-{i}"
+    balance = db.session.get(Account, account["id"], populate_existing=True)
+    assert balance.current_balance == Decimal("1002.0000")
+
+
+def test_group_commit_audits_postings_around_a_failed_one(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    overdrawn = client.post(
+        "/api/accounts",
+        json={"name": "Overdrawn", "type": "ASSET", "opening_balance": "-100"},
+        headers=auth_header(auth_token),
+    ).get_json()
+    monkeypatch.setitem(flask_app.config, "GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(posting_committer, "max_wait", 0.3)
+    payload = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "1.0000",
+    }
+    payloads = [payload, {**payload, "account_id": overdrawn["id"]}, payload]
+    outcomes = {}
+
+    def post(i, payload):
+        with flask_app.test_request_context():
+            g.current_user = f"clerk-{i}"
+            try:
+                outcomes[i] = TransactionService.record_transaction(payload)
+            except Exception as e:
+                outcomes[i] = e
+
+    # Queued in order, so the failing posting's savepoint rolls back
+    # between the other two
+    threads = []
+    for args in enumerate(payloads):
+        threads.append(threading.Thread(target=post, args=args))
+        threads[-1].start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(outcomes.pop(1), InsufficientFundsError)
+    audit_writer.flush()
+    for i, outcome in outcomes.items():
+        entries = db.session.execute(
+            db.select(AuditLog).where(
+                AuditLog.record_id == str(outcome["transaction"].id)
+            )
+        ).scalars()
+        assert [e.changed_by for e in entries] == [f"clerk-{i}"]
+
+
+def deadlock_error():
+    class Deadlock(Exception):
+        pgcode = "40P01"
+
+    return DBAPIError("SELECT 1", None, Deadlock("deadlock detected"))
+
+
+def test_write_conflicts_are_retried(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    calls = []
+    call_posting_function = TransactionService._call_posting_function
+
+    def conflicting(statement, params, operation):
+        calls.append(operation)
+        if len(calls) <= 2:
+            db.session.rollback()
+            raise TransactionService._posting_error(deadlock_error(), operation)
+        return call_posting_function(statement, params, operation)
+
+    monkeypatch.setattr(TransactionService, "_call_posting_function", conflicting)
+    before = dict(write_conflicts.get("record_transaction", {"retries": 0}))
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "10.0000",
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 201
+    assert len(calls) == 3
+    assert write_conflicts["record_transaction"]["retries"] == before["retries"] + 2
+
+    # Out of attempts: reported as a retryable conflict, not a 500
+    calls.clear()
+    monkeypatch.setitem(flask_app.config, "WRITE_RETRY_ATTEMPTS", 2)
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 503
+    assert len(calls) == 2
+    resp = client.get("/api/metrics", headers=auth_header(auth_token))
+    assert resp.get_json()["write_conflicts"]["record_transaction"]["aborted"] >= 1
+
+
+@pytest.mark.parametrize("isolation", ["READ COMMITTED", "SERIALIZABLE"])
+def test_opposing_concurrent_postings(
+    client, auth_token, account, contra_account, monkeypatch, isolation
+):
+    monkeypatch.setitem(flask_app.config, "WRITE_ISOLATION_LEVEL", isolation)
+    monkeypatch.setitem(flask_app.config, "WRITE_RETRY_ATTEMPTS", 20)
+    with flask_app.app_context():
+        _begin_write()
+        level = db.session.execute(db.text("SHOW transaction_isolation")).scalar()
+        assert level == isolation.lower()
+        db.session.rollback()
+
+    start = threading.Barrier(6)
+    errors = []
+
+    def post(i):
+        first, second = (account, contra_account)[:: 1 if i % 2 else -1]
+        with flask_app.app_context():
+            start.wait()
+            for _ in range(3):
+                try:
+                    TransactionService.void_transaction(
+                        TransactionService.record_transaction(
+                            {
+                                "account_id": first["id"],
+                                "contra_account_id": second["id"],
+                                "transaction_date": date.today().isoformat(),
+                                "amount": "1.0000",
+                            }
+                        )["transaction"].id
+                    )
+                except Exception as e:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    resp = client.get(f"/api/accounts/{account['id']}", headers=auth_header(auth_token))
+    assert Decimal(resp.get_json()["current_balance"]) == Decimal("1000.0000")
+
+
 def test_get_transaction_success(client, auth_token, account, contra_account):
     tx_data = {
         "account_id": account["id"],
@@ -296,6 +831,76 @@ def test_list_transactions(client, auth_token, account, contra_account):
     assert any("id" in t for t in data)
 
 
+def test_search_transactions(client, auth_token, account, contra_account):
+    token = uuid4().hex[:12]
+    for i, description in enumerate(
+        [f"Office chairs {token}", f"Office desk {token}", f"Chairs {token} refund"]
+    ):
+        client.post(
+            "/api/transactions",
+            json={
+                "account_id": account["id"],
+                "contra_account_id": contra_account["id"],
+                "transaction_date": (date.today() - timedelta(days=i)).isoformat(),
+                "amount": "5.0000",
+                "description": description,
+                "reference_number": f"INV-{token}-{i}",
+            },
+            headers=auth_header(auth_token),
+        )
+
+    resp = client.get(
+        f"/api/transactions/search?q=chairs {token}", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["match"] == "text"
+    assert sorted(t["description"] for t in data["results"]) == [
+        f"Chairs {token} refund",
+        f"Office chairs {token}",
+    ]
+    ranks = [t["rank"] for t in data["results"]]
+    assert ranks == sorted(ranks, reverse=True)
+
+    # A reference number is answered by exact match
+    resp = client.get(
+        f"/api/transactions/search?q=INV-{token}-1", headers=auth_header(auth_token)
+    )
+    data = resp.get_json()
+    assert data["match"] == "reference"
+    assert [t["description"] for t in data["results"]] == [f"Office desk {token}"]
+
+    # Filters combine with the search
+    resp = client.get(
+        f"/api/transactions/search?q={token}&start_date={date.today().isoformat()}",
+        headers=auth_header(auth_token),
+    )
+    assert [t["description"] for t in resp.get_json()["results"]] == [
+        f"Office chairs {token}"
+    ]
+
+    # Keyset pages cover every match once
+    seen, cursor = [], None
+    while True:
+        url = f"/api/transactions/search?q={token}&limit=2"
+        if cursor:
+            url += f"&cursor={cursor}"
+        data = client.get(url, headers=auth_header(auth_token)).get_json()
+        seen += [t["id"] for t in data["results"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 3
+
+    resp = client.get(
+        f"/api/transactions/search?q=other&cursor={cursor or 'x'}",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 400
+    resp = client.get("/api/transactions/search?q=", headers=auth_header(auth_token))
+    assert resp.status_code == 400
+
+
 def test_generate_balance_report(client, auth_token, account):
     resp = client.get("/api/reports/balance", headers=auth_header(auth_token))
     assert resp.status_code == 200
@@ -326,6 +931,1315 @@ def test_generate_profit_loss_report(client, auth_token, account, contra_account
     assert "total_expenses" in data
 
 
+def post_transaction(client, token, account_id, contra_account_id, amount, day):
+    resp = client.post(
+        "/api/transactions",
+        json={
+            "account_id": account_id,
+            "contra_account_id": contra_account_id,
+            "transaction_date": day.isoformat(),
+            "amount": amount,
+        },
+        headers=auth_header(token),
+    )
+    assert resp.status_code == 201
+    return resp.get_json()["transaction"]
+
+
+def test_ledger_running_balances(client, auth_token, account, contra_account):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    cash, bank = account["id"], contra_account["id"]
+    post_transaction(
+        client, auth_token, cash, bank, "10.0000", today - timedelta(days=5)
+    )
+    post_transaction(client, auth_token, cash, bank, "100.0000", yesterday)
+    post_transaction(client, auth_token, bank, cash, "30.0000", today)
+    voided = post_transaction(client, auth_token, cash, bank, "7.0000", today)
+    client.post(
+        f"/api/transactions/{voided['id']}/void", headers=auth_header(auth_token)
+    )
+
+    resp = client.get(
+        f"/api/reports/ledger?start_date={yesterday}&end_date={today}"
+        f"&account_id={cash}",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    data = json.loads(resp.get_data())
+    (section,) = data["accounts"]
+    assert section["opening_balance"] == 1010.0
+    assert [
+        (e["debit"], e["credit"], e["running_balance"]) for e in section["entries"]
+    ] == [(100.0, 0.0, 1110.0), (0.0, 30.0, 1080.0)]
+    assert section["entries"][0]["counterpart_name"] == "Bank"
+    assert section["closing_balance"] == 1080.0
+    assert (section["total_debits"], section["total_credits"]) == (100.0, 30.0)
+
+
+def test_full_ledger_ties_out_across_pages(client, auth_token, account, contra_account):
+    today = date.today()
+    for amount in ("1.0000", "2.0000", "3.0000"):
+        post_transaction(
+            client, auth_token, account["id"], contra_account["id"], amount, today
+        )
+    flask_app.config["LEDGER_PAGE_SIZE"] = 2
+    try:
+        resp = client.get(
+            f"/api/reports/ledger?start_date={today}&end_date={today}",
+            headers=auth_header(auth_token),
+        )
+    finally:
+        flask_app.config["LEDGER_PAGE_SIZE"] = 1000
+    data = json.loads(resp.get_data())
+    assert data["balanced"] is True
+    assert data["total_debits"] == data["total_credits"] > 0
+    for section in data["accounts"]:
+        balance = Decimal(str(section["opening_balance"]))
+        for entry in section["entries"]:
+            balance += Decimal(str(entry["debit"])) - Decimal(str(entry["credit"]))
+            assert float(balance) == entry["running_balance"]
+        assert float(balance) == section["closing_balance"]
+
+
+def test_account_statement_pages(client, auth_token, account, contra_account):
+    today = date.today()
+    cash, bank = account["id"], contra_account["id"]
+    post_transaction(client, auth_token, cash, bank, "50.0000", today - timedelta(9))
+    for days_ago, amount in ((3, "10.0000"), (2, "20.0000"), (1, "30.0000")):
+        post_transaction(
+            client, auth_token, cash, bank, amount, today - timedelta(days_ago)
+        )
+    post_transaction(client, auth_token, bank, cash, "5.0000", today)
+
+    url = (
+        f"/api/accounts/{cash}/statement?start_date={today - timedelta(3)}"
+        f"&end_date={today}&limit=2"
+    )
+    entries, cursor = [], None
+    while True:
+        resp = client.get(
+            url + (f"&cursor={cursor}" if cursor else ""),
+            headers=auth_header(auth_token),
+        )
+        assert resp.status_code == 200
+        page = resp.get_json()
+        assert page["opening_balance"] == 1050.0
+        assert page["closing_balance"] == 1105.0
+        entries += page["entries"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert [e["running_balance"] for e in entries] == [1060.0, 1080.0, 1110.0, 1105.0]
+    assert entries[-1]["credit"] == 5.0
+
+    resp = client.get(
+        url + f"&cursor={cursor or 'forged'}", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 400
+
+
+def test_statement_seeded_from_snapshot(
+    client, auth_token, account, contra_account, partitioned
+):
+    today = date.today()
+    cash, bank = account["id"], contra_account["id"]
+    post_transaction(client, auth_token, cash, bank, "100.0000", today - timedelta(30))
+    accounts = db.session.execute(db.select(db.func.count(Account.id))).scalar_one()
+    assert ReportService.snapshot_balances(today - timedelta(20)) == accounts
+    snapshot = db.session.execute(
+        db.select(BalanceHistory).where(
+            BalanceHistory.account_id == cash,
+            BalanceHistory.balance_date == today - timedelta(20),
+        )
+    ).scalar_one()
+    assert snapshot.balance == Decimal("1100.0000")
+
+    # A back-dated posting moves the snapshots dated after it
+    post_transaction(client, auth_token, cash, bank, "1.0000", today - timedelta(25))
+    db.session.refresh(snapshot)
+    assert snapshot.balance == Decimal("1101.0000")
+
+    # The opening balance comes from the snapshot, not a replay from the start
+    db.session.execute(
+        db.update(BalanceHistory)
+        .where(BalanceHistory.id == snapshot.id)
+        .values(balance=Decimal("5000.0000"))
+    )
+    db.session.commit()
+    resp = client.get(
+        f"/api/accounts/{cash}/statement?start_date={today - timedelta(19)}"
+        f"&end_date={today}",
+        headers=auth_header(auth_token),
+    )
+    assert resp.get_json()["opening_balance"] == 5000.0
+
+
+def test_trial_balance(client, auth_token, account, contra_account):
+    today = date.today()
+    cash, bank = account["id"], contra_account["id"]
+    post_transaction(client, auth_token, cash, bank, "40.0000", today)
+    post_transaction(client, auth_token, bank, cash, "15.0000", today)
+    post_transaction(client, auth_token, cash, bank, "5.0000", today + timedelta(1))
+
+    resp = client.get(
+        f"/api/reports/trial-balance?start_date={today}&end_date={today}",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["balanced"] is True
+    assert data["total_debits"] == data["total_credits"]
+    rows = {row["account_id"]: row for row in data["accounts"]}
+    assert rows[cash]["opening_balance"] == 1000.0
+    assert (rows[cash]["debits"], rows[cash]["credits"]) == (40.0, 15.0)
+    assert rows[cash]["closing_balance"] == 1025.0
+    assert rows[bank]["closing_balance"] == 475.0
+
+
+def test_journal_entry_posts_all_legs_at_once(
+    client, auth_token, account, contra_account
+):
+    today = date.today()
+    cash, bank = account["id"], contra_account["id"]
+    fees, interest = [
+        client.post(
+            "/api/accounts",
+            json={"name": name, "type": "INCOME", "opening_balance": "0"},
+            headers=auth_header(auth_token),
+        ).get_json()["id"]
+        for name in ("Fees", "Interest")
+    ]
+    legs = [
+        {"account_id": cash, "amount": "130.0000"},
+        {"account_id": bank, "amount": "-100.0000"},
+        {"account_id": fees, "amount": "-20.0000"},
+        {"account_id": interest, "amount": "-10.0000"},
+    ]
+    with captured_statements() as statements:
+        resp = client.post(
+            "/api/journal-entries",
+            json={
+                "entry_date": today.isoformat(),
+                "description": "Split",
+                "legs": legs,
+            },
+            headers=auth_header(auth_token),
+        )
+    assert resp.status_code == 201
+    # One lock, the header, one multi-row insert and one balance update
+    assert sum("FOR UPDATE" in s for s in statements) == 1
+    assert (
+        sum(s.startswith("INSERT INTO accounting.transactions") for s in statements)
+        == 1
+    )
+    assert sum(s.startswith("UPDATE accounting.accounts") for s in statements) == 1
+    data = resp.get_json()
+    assert data["new_balances"] == {
+        cash: 1130.0,
+        bank: 400.0,
+        fees: -20.0,
+        interest: -10.0,
+    }
+    entry = data["journal_entry"]
+    assert [(leg["account_id"], leg["amount"]) for leg in entry["legs"]] == [
+        (cash, 130.0),
+        (bank, -100.0),
+        (fees, -20.0),
+        (interest, -10.0),
+    ]
+    assert len(entry["transactions"]) == 3
+
+    resp = client.get(
+        f"/api/journal-entries/{entry['id']}", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 200
+    assert resp.get_json() == entry
+
+    # The member transactions read like any other posting
+    resp = client.get(
+        f"/api/transactions?account_id={cash}", headers=auth_header(auth_token)
+    )
+    assert {t["id"] for t in resp.get_json()} >= {
+        t["id"] for t in entry["transactions"]
+    }
+    resp = client.get(
+        f"/api/reports/trial-balance?start_date={today}&end_date={today}",
+        headers=auth_header(auth_token),
+    )
+    report = resp.get_json()
+    assert report["balanced"] is True
+    rows = {row["account_id"]: row for row in report["accounts"]}
+    assert rows[cash]["debits"] == 130.0
+    assert rows[fees]["closing_balance"] == -20.0
+
+
+def test_journal_entry_validation(client, auth_token, account, contra_account):
+    cash, bank = account["id"], contra_account["id"]
+
+    def post(legs):
+        return client.post(
+            "/api/journal-entries",
+            json={"entry_date": date.today().isoformat(), "legs": legs},
+            headers=auth_header(auth_token),
+        )
+
+    for legs in (
+        [{"account_id": cash, "amount": "10"}, {"account_id": bank, "amount": "-9"}],
+        [{"account_id": cash, "amount": "10"}, {"account_id": cash, "amount": "-10"}],
+        [{"account_id": cash, "amount": "0"}, {"account_id": bank, "amount": "0"}],
+        [{"account_id": cash, "amount": "10"}],
+    ):
+        assert post(legs).status_code == 400
+    resp = post(
+        [
+            {"account_id": cash, "amount": "10"},
+            {"account_id": str(uuid4()), "amount": "-10"},
+        ]
+    )
+    assert resp.status_code == 404
+    assert db.session.get(Account, cash).current_balance == Decimal("1000.0000")
+
+    resp = client.get(
+        f"/api/journal-entries/{uuid4()}", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 404
+
+
+def test_reports_require_a_date_range(client, auth_token):
+    for report in ("ledger", "trial-balance"):
+        resp = client.get(f"/api/reports/{report}", headers=auth_header(auth_token))
+        assert resp.status_code == 400
+        resp = client.get(
+            f"/api/reports/{report}?start_date=2024-02-01&end_date=2024-01-01",
+            headers=auth_header(auth_token),
+        )
+        assert resp.status_code == 400
+
+
+def test_dashboard(client, auth_token, account, contra_account):
+    today = date.today()
+    post_transaction(
+        client, auth_token, account["id"], contra_account["id"], "25", today
+    )
+
+    resp = client.get("/api/reports/dashboard", headers=auth_header(auth_token))
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["errors"] == {}
+    assert data["profit_loss"]["start_date"] == today.replace(day=1).isoformat()
+    recent = [t["account_id"] for t in data["recent_transactions"]]
+    assert account["id"] in recent
+    assert data["account_counts"]["ASSET"] >= 2
+    balances = {a["id"]: a for a in data["balances"]["accounts"]}
+    assert balances[account["id"]]["current_balance"] == 1025.0
+
+
+def test_dashboard_returns_partial_result(client, auth_token, monkeypatch):
+    def slow_report(start_date, end_date):
+        time.sleep(1)
+
+    monkeypatch.setitem(flask_app.config, "DASHBOARD_QUERY_TIMEOUT", 0.3)
+    monkeypatch.setattr(ReportService, "generate_profit_loss_report", slow_report)
+
+    started = time.monotonic()
+    resp = client.get("/api/reports/dashboard", headers=auth_header(auth_token))
+    assert time.monotonic() - started < 1
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["profit_loss"] is None
+    assert data["errors"] == {"profit_loss": "Timed out"}
+    assert data["balances"] is not None and data["account_counts"] is not None
+
+
+def test_changes_feed(client, auth_token):
+    headers = auth_header(auth_token)
+    resp = client.get("/api/changes?since=now", headers=headers)
+    assert resp.status_code == 200
+    since = resp.get_json()["next"]
+
+    ids = []
+    for name in ("Feed cash", "Feed rent"):
+        resp = client.post(
+            "/api/accounts",
+            json={"name": name, "type": "ASSET", "opening_balance": "100.0000"},
+            headers=headers,
+        )
+        ids.append(resp.get_json()["id"])
+    resp = client.post(
+        "/api/transactions",
+        json={
+            "account_id": ids[0],
+            "contra_account_id": ids[1],
+            "transaction_date": date.today().isoformat(),
+            "amount": "25.0000",
+        },
+        headers=headers,
+    )
+    transaction_id = resp.get_json()["transaction"]["id"]
+    client.put(
+        f"/api/accounts/{ids[0]}", json={"name": "Feed cash float"}, headers=headers
+    )
+
+    # One record per page: every change is delivered once, in order
+    seen, token = [], since
+    while True:
+        resp = client.get(f"/api/changes?since={token}&limit=1", headers=headers)
+        data = resp.get_json()
+        seen += [(c["entity"], c["id"], c["operation"]) for c in data["changes"]]
+        token = data["next"]
+        if not data["has_more"]:
+            break
+    assert seen[:3] == [
+        ("account", ids[0], "INSERT"),
+        ("account", ids[1], "INSERT"),
+        ("transaction", transaction_id, "INSERT"),
+    ]
+    # The posting's balance updates, then the rename
+    assert sorted(seen[3:5]) == sorted(
+        [("account", ids[0], "UPDATE"), ("account", ids[1], "UPDATE")]
+    )
+    assert seen[5:] == [("account", ids[0], "UPDATE")]
+
+    # A whole page collapses each record to its current state
+    client.post(f"/api/transactions/{transaction_id}/void", headers=headers)
+    data = client.get(f"/api/changes?since={since}", headers=headers).get_json()
+    changes = {(c["entity"], c["id"]): c for c in data["changes"]}
+    assert len(changes) == len(data["changes"]) == 3
+    assert changes[("transaction", transaction_id)]["operation"] == "VOID"
+    assert changes[("transaction", transaction_id)]["data"]["is_void"] is True
+    assert changes[("account", ids[0])]["data"]["name"] == "Feed cash float"
+    assert changes[("account", ids[0])]["data"]["current_balance"] == 100.0
+
+    data = client.get(f"/api/changes?since={data['next']}", headers=headers)
+    assert data.get_json()["changes"] == []
+    resp = client.get("/api/changes?since=bogus", headers=headers)
+    assert resp.status_code == 400
+
+
+def test_analytics_reports_match_sql(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("the analytics engine reads the PostgreSQL change feed")
+    headers = auth_header(auth_token)
+    AnalyticsService.reset()
+    AnalyticsService.columns()
+
+    # Changes after loading reach the engine through the change feed
+    income = client.post(
+        "/api/accounts",
+        json={"name": "Analytics rent", "type": "INCOME", "opening_balance": "0"},
+        headers=headers,
+    ).get_json()
+    today = date.today()
+    postings = [
+        (income["id"], account["id"], today - timedelta(days=40), "300.0000"),
+        (income["id"], account["id"], today, "45.5000"),
+        (account["id"], contra_account["id"], today - timedelta(days=3), "12.2500"),
+    ]
+    for account_id, contra_id, day, amount in postings:
+        resp = client.post(
+            "/api/transactions",
+            json={
+                "account_id": account_id,
+                "contra_account_id": contra_id,
+                "transaction_date": day.isoformat(),
+                "amount": amount,
+            },
+            headers=headers,
+        )
+        assert resp.status_code == 201
+    voided = resp.get_json()["transaction"]["id"]
+    client.post(f"/api/transactions/{voided}/void", headers=headers)
+
+    start, end = today - timedelta(days=60), today
+    assert AnalyticsService.verify(start, end) == []
+    report = ReportService.generate_profit_loss_report(
+        start, end, "month", analytics=True
+    )
+    # The buckets are floats, so their sum only matches the total to the cent
+    assert sum(b["total_income"] for b in report["buckets"]) == pytest.approx(
+        report["total_income"], abs=0.005
+    )
+    ours = {
+        row["account_id"]: row
+        for row in ReportService.generate_trial_balance(start, end, analytics=True)[
+            "accounts"
+        ]
+    }
+    assert ours[income["id"]]["debits"] == 345.5
+    assert ours[account["id"]]["credits"] == 345.5
+    assert ours[account["id"]]["debits"] == 0
+
+    monkeypatch.setitem(flask_app.config, "ANALYTICS_ENABLED", True)
+    resp = client.get(
+        f"/api/reports/profit-loss?start_date={start}&end_date={end}&bucket=month",
+        headers=headers,
+    )
+    assert resp.get_json() == report
+    monkeypatch.setitem(flask_app.config, "ANALYTICS_ENABLED", False)
+    resp = client.get(
+        f"/api/reports/profit-loss?start_date={start}&end_date={end}&bucket=week",
+        headers=headers,
+    )
+    assert resp.status_code == 400
+
+
+def test_request_deadline_cancels_slow_query(client, auth_token, monkeypatch):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("statement_timeout needs PostgreSQL")
+
+    def slow_list(filters, page, per_page):
+        try:
+            db.session.execute(db.text("SELECT pg_sleep(2)"))
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise FinancialSystemError("Failed to list transactions")
+
+    monkeypatch.setattr(TransactionService, "list_transactions", slow_list)
+    monkeypatch.setitem(
+        flask_app.config, "REQUEST_TIMEOUTS", {"list_transactions": 200}
+    )
+    before = request_timeouts.get("list_transactions", 0)
+
+    started = time.monotonic()
+    resp = client.get("/api/transactions", headers=auth_header(auth_token))
+    assert time.monotonic() - started < 1.5
+    assert resp.status_code == 504
+    assert resp.get_json() == {"error": "Request deadline exceeded"}
+
+    # A client deadline shortens the endpoint's budget
+    monkeypatch.setitem(flask_app.config, "REQUEST_TIMEOUTS", {})
+    started = time.monotonic()
+    resp = client.get(
+        "/api/transactions",
+        headers={**auth_header(auth_token), "X-Request-Deadline": "200"},
+    )
+    assert time.monotonic() - started < 1.5
+    assert resp.status_code == 504
+
+    resp = client.get("/api/metrics", headers=auth_header(auth_token))
+    assert resp.get_json()["request_timeouts"]["list_transactions"] == before + 2
+
+
+def test_request_deadline_header(client, auth_token):
+    headers = auth_header(auth_token)
+    resp = client.get(
+        "/api/accounts", headers={**headers, "X-Request-Deadline": "soon"}
+    )
+    assert resp.status_code == 400
+
+    resp = client.get(
+        "/api/accounts",
+        headers={**headers, "X-Request-Deadline": "2000-01-01T00:00:00Z"},
+    )
+    assert resp.status_code == 504
+
+    deadline = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat()
+    for value in ("30000", deadline):
+        resp = client.get(
+            "/api/accounts", headers={**headers, "X-Request-Deadline": value}
+        )
+        assert resp.status_code == 200
+
+
+@pytest.fixture
+def job_results(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, "JOB_RESULT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def submit_job(client, token, kind, **params):
+    resp = client.post(
+        "/api/jobs", json={"kind": kind, "params": params}, headers=auth_header(token)
+    )
+    assert resp.status_code == 202
+    return resp.get_json()
+
+
+def test_job_runs_and_serves_result_with_ranges(
+    client, auth_token, account, contra_account, job_results
+):
+    today = date.today()
+    post_transaction(
+        client, auth_token, account["id"], contra_account["id"], "5", today
+    )
+    job = submit_job(
+        client,
+        auth_token,
+        "profit_loss",
+        start_date=f"{today.year - 1}-01-01",
+        end_date=today.isoformat(),
+    )
+    assert job["status"] == "queued"
+
+    assert JobService.work(maintenance=False, burst=True) >= 1
+    resp = client.get(f"/api/jobs/{job['id']}", headers=auth_header(auth_token))
+    finished = resp.get_json()
+    assert (finished["status"], finished["progress"]) == ("succeeded", 100.0)
+    assert finished["attempts"] == 1
+
+    resp = client.get(finished["result_url"], headers=auth_header(auth_token))
+    assert resp.status_code == 200
+    report = json.loads(resp.data)
+    assert [y["start_date"] for y in report["years"]] == [
+        f"{today.year - 1}-01-01",
+        f"{today.year}-01-01",
+    ]
+
+    headers = {**auth_header(auth_token), "Range": "bytes=0-9"}
+    resp = client.get(finished["result_url"], headers=headers)
+    assert resp.status_code == 206
+    assert resp.data == json.dumps(report).encode()[:10]
+
+
+def test_profit_loss_job_sums_years_exactly(client, auth_token, account, job_results):
+    income = client.post(
+        "/api/accounts",
+        json={"name": "Job income", "type": "INCOME", "opening_balance": "0"},
+        headers=auth_header(auth_token),
+    ).get_json()["id"]
+    # Each year's total is off as a float; their float sum is off further
+    posted = [
+        post_transaction(client, auth_token, income, account["id"], amount, day)
+        for amount, day in (
+            ("100000000000000.0080", date(2009, 6, 1)),
+            ("0.0080", date(2010, 6, 1)),
+        )
+    ]
+    job = submit_job(
+        client,
+        auth_token,
+        "profit_loss",
+        start_date="2009-01-01",
+        end_date="2010-12-31",
+    )
+    assert JobService.work(maintenance=False, burst=True) >= 1
+    resp = client.get(f"/api/jobs/{job['id']}", headers=auth_header(auth_token))
+    resp = client.get(resp.get_json()["result_url"], headers=auth_header(auth_token))
+    report = json.loads(resp.data)
+    total, _, _ = ReportService.profit_loss_totals(date(2009, 1, 1), date(2010, 12, 31))
+    assert report["total_income"] == float(total)
+
+    # Balances this large are off in the float analytics engine too
+    for tx in posted:
+        client.post(
+            f"/api/transactions/{tx['id']}/void", headers=auth_header(auth_token)
+        )
+
+
+def test_job_validation(client, auth_token):
+    for body in (
+        {"kind": "shell"},
+        {"kind": "ledger", "params": {"start_date": "2024-01-01"}},
+        {"kind": "trial_balance", "params": {"start_date": 1, "end_date": 2}},
+    ):
+        resp = client.post("/api/jobs", json=body, headers=auth_header(auth_token))
+        assert resp.status_code == 400
+
+
+def test_job_cancellation(client, auth_token, job_results):
+    params = {"start_date": "2024-01-01", "end_date": "2024-12-31"}
+    queued = submit_job(client, auth_token, "trial_balance", **params)
+    resp = client.post(
+        f"/api/jobs/{queued['id']}/cancel", headers=auth_header(auth_token)
+    )
+    assert resp.get_json()["status"] == "cancelled"
+    resp = client.post(
+        f"/api/jobs/{queued['id']}/cancel", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 400
+
+    running = submit_job(client, auth_token, "ledger", **params)
+    job = JobService.claim_next()
+    assert str(job.id) == running["id"]
+    resp = client.post(
+        f"/api/jobs/{running['id']}/cancel", headers=auth_header(auth_token)
+    )
+    assert resp.get_json()["cancel_requested"] is True
+    assert JobService.run_job(job) == "cancelled"
+    assert not list(job_results.iterdir())
+
+
+def test_failed_job_is_retried_then_fails(client, auth_token, job_results, monkeypatch):
+    def broken_report(start_date, end_date):
+        raise RuntimeError("report crashed")
+
+    monkeypatch.setattr(ReportService, "generate_trial_balance", broken_report)
+    resp = client.post(
+        "/api/jobs",
+        json={
+            "kind": "trial_balance",
+            "params": {"start_date": "2024-01-01", "end_date": "2024-01-31"},
+            "max_attempts": 2,
+        },
+        headers=auth_header(auth_token),
+    )
+    job_id = resp.get_json()["id"]
+
+    assert JobService.run_job(JobService.claim_next()) == "queued"
+    job = db.session.get(Job, job_id, populate_existing=True)
+    assert (job.attempts, job.error) == (1, "report crashed")
+    assert job.run_after > job.started_at
+
+    job.run_after = job.started_at
+    db.session.commit()
+    assert JobService.run_job(JobService.claim_next()) == "failed"
+    resp = client.get(f"/api/jobs/{job_id}", headers=auth_header(auth_token))
+    assert resp.get_json()["result_url"] is None
+
+
+def test_stale_and_expired_jobs(client, auth_token, job_results):
+    params = {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    stale = submit_job(client, auth_token, "trial_balance", **params)
+    job = JobService.claim_next()
+    job.heartbeat_at = datetime.now() - timedelta(hours=1)
+    db.session.commit()
+    assert JobService.requeue_stale() == 1
+    assert db.session.get(Job, stale["id"], populate_existing=True).status == "queued"
+
+    assert JobService.work(maintenance=False, burst=True) >= 1
+    job = db.session.get(Job, stale["id"], populate_existing=True)
+    assert os.path.exists(job.result_path)
+    job.finished_at = job.finished_at - timedelta(days=2)
+    db.session.commit()
+    assert JobService.cleanup() >= 1
+    assert db.session.get(Job, stale["id"], populate_existing=True) is None
+    assert not os.path.exists(job.result_path)
+
+
+def test_account_changes_are_audited(client, auth_token, account, user):
+    update = {"name": "Audited Cash"}
+    client.put(
+        f"/api/accounts/{account['id']}", json=update, headers=auth_header(auth_token)
+    )
+    audit_writer.flush()
+    entries = (
+        db.session.query(AuditLog)
+        .filter_by(table_name="accounts", record_id=account["id"])
+        .order_by(AuditLog.id)
+        .all()
+    )
+    assert [e.operation for e in entries] == ["INSERT", "UPDATE"]
+    assert entries[1].old_values["name"] == "Cash"
+    assert entries[1].new_values["name"] == "Audited Cash"
+    assert entries[1].changed_by == user.username
+
+
+def test_suggest_accounts(client, auth_token):
+    token = uuid4().hex[:8]
+    created = [
+        client.post(
+            "/api/accounts",
+            json={"name": name, "type": "ASSET", "opening_balance": "0"},
+            headers=auth_header(auth_token),
+        ).get_json()
+        for name in (f"Zq{token} cash", f"Petty zq{token}")
+    ]
+    resp = client.get(
+        f"/api/accounts/suggest?prefix=ZQ{token}", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 200
+    assert [s["name"] for s in resp.get_json()] == [
+        f"Zq{token} cash",
+        f"Petty zq{token}",
+    ]
+
+    # Renamed here, and in another process (seen through its event)
+    client.put(
+        f"/api/accounts/{created[0]['id']}",
+        json={"name": f"Zr{token} cash"},
+        headers=auth_header(auth_token),
+    )
+    db.session.execute(
+        db.text("UPDATE accounting.accounts SET name = :name WHERE id = :id"),
+        {"name": f"Zr{token} petty", "id": created[1]["id"]},
+    )
+    db.session.commit()
+    account = db.session.get(Account, created[1]["id"], populate_existing=True)
+    _publish_event("account.updated", [account.id], {"account": account.to_dict()})
+    deadline = time.monotonic() + 5
+    while True:
+        suggestions = client.get(
+            f"/api/accounts/suggest?prefix=zr{token}&limit=5",
+            headers=auth_header(auth_token),
+        ).get_json()
+        if len(suggestions) == 2 or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert [s["name"] for s in suggestions] == [f"Zr{token} cash", f"Zr{token} petty"]
+
+    resp = client.get(
+        "/api/accounts/suggest?prefix=a&type=CASH", headers=auth_header(auth_token)
+    )
+    assert resp.status_code == 400
+
+
+def test_metrics_expose_audit_writer(client, auth_token):
+    resp = client.get("/api/metrics", headers=auth_header(auth_token))
+    assert resp.status_code == 200
+    assert "queue_depth" in resp.get_json()["audit"]
+
+
+def read_events(stream, count):
+    events = []
+    while len(events) < count:
+        chunk = next(stream).decode()
+        if chunk.startswith(("retry:", ":")):
+            continue
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_events_stream_posting_changes(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    monkeypatch.setitem(flask_app.config, "EVENTS_HEARTBEAT_INTERVAL", 5)
+    resp = client.get(
+        f"/api/events?accounts={account['id']}&access_token={auth_token}",
+        buffered=False,
+    )
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    stream = iter(resp.response)
+    assert next(stream).decode().startswith("retry:")
+
+    posted = post_transaction(
+        client, auth_token, account["id"], contra_account["id"], "30", date.today()
+    )
+    client.post(
+        f"/api/transactions/{posted['id']}/void", headers=auth_header(auth_token)
+    )
+    client.put(
+        f"/api/accounts/{account['id']}",
+        json={"name": "Live Cash"},
+        headers=auth_header(auth_token),
+    )
+    recorded, voided, updated = read_events(stream, 3)
+    resp.close()
+
+    assert recorded[1] == "transaction.recorded"
+    assert recorded[2]["transaction"]["id"] == posted["id"]
+    assert recorded[2]["balances"] == {
+        account["id"]: 1030.0,
+        contra_account["id"]: 470.0,
+    }
+    assert voided[1] == "transaction.voided"
+    assert voided[2]["balances"][account["id"]] == 1000.0
+    assert (updated[1], updated[2]["account"]["name"]) == (
+        "account.updated",
+        "Live Cash",
+    )
+
+    # Resuming replays what came after the last event received
+    resp = client.get(
+        f"/api/events?accounts={account['id']}",
+        headers={**auth_header(auth_token), "Last-Event-ID": recorded[0]},
+        buffered=False,
+    )
+    stream = iter(resp.response)
+    assert [event[0] for event in read_events(stream, 2)] == [voided[0], updated[0]]
+    resp.close()
+
+
+def test_events_stream_large_journal_entries(client, auth_token, monkeypatch):
+    monkeypatch.setitem(flask_app.config, "EVENTS_HEARTBEAT_INTERVAL", 5)
+    accounts = [
+        client.post(
+            "/api/accounts",
+            json={"name": f"Leg {i}", "type": "INCOME", "opening_balance": "0"},
+            headers=auth_header(auth_token),
+        ).get_json()["id"]
+        for i in range(60)
+    ]
+    resp = client.get(
+        f"/api/events?accounts={accounts[0]}&access_token={auth_token}",
+        buffered=False,
+    )
+    stream = iter(resp.response)
+    assert next(stream).decode().startswith("retry:")
+
+    legs = [{"account_id": a, "amount": "-1.0000"} for a in accounts[1:]]
+    legs.append({"account_id": accounts[0], "amount": "59.0000"})
+    entry = client.post(
+        "/api/journal-entries",
+        json={"entry_date": date.today().isoformat(), "legs": legs},
+        headers=auth_header(auth_token),
+    ).get_json()["journal_entry"]
+    ((_, event_type, data),) = read_events(stream, 1)
+    resp.close()
+
+    assert event_type == "journal_entry.posted"
+    assert data["journal_entry_id"] == entry["id"]
+    assert len(data["balances"]) == 60
+    assert data["balances"][accounts[0]] == 59.0
+
+
+def test_events_require_a_token(client):
+    assert client.get("/api/events").status_code == 403
+    resp = client.get("/api/events?access_token=nope")
+    assert resp.status_code == 403
+
+
+def test_import_accounts_csv(client, auth_token, user):
+    token = uuid4().hex[:8]
+    body = (
+        "name,type,opening_balance,description\n"
+        "Imported Rent,INCOME,0,Rent income\n"
+        "Imported Bad,UNKNOWN,0,\n"
+        f"Imported Bank {token},ASSET,250.5,\n"
+    )
+    resp = client.post(
+        "/api/import/accounts",
+        data={"file": (io.BytesIO(body.encode()), "accounts.csv")},
+        content_type="multipart/form-data",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["imported"] == 2
+    assert data["rejected"] == 1
+    assert data["errors"] == [{"line": 3, "error": "Invalid account type"}]
+
+    bank = db.session.execute(
+        db.select(Account).where(Account.name == f"Imported Bank {token}")
+    ).scalar_one()
+    audit_writer.flush()
+    entry = db.session.execute(
+        db.select(AuditLog).where(AuditLog.record_id == str(bank.id))
+    ).scalar_one()
+    assert (entry.table_name, entry.operation) == ("accounts", "INSERT")
+    assert entry.new_values["current_balance"] == "250.5000"
+    assert entry.changed_by == user.username
+
+
+def test_import_transactions_csv_updates_balances(
+    client, auth_token, account, contra_account
+):
+    body = (
+        "account_id,contra_account_id,transaction_date,amount,reference_number\n"
+        f"{account['id']},{contra_account['id']},2024-01-31,10.25,A1\n"
+        f"{account['id']},{contra_account['id']},2024-02-30,5,A2\n"
+        f"{account['id']},{account['id']},2024-03-01,5,A3\n"
+        f"{contra_account['id']},{uuid4()},2024-03-01,5,A4\n"
+        f"{contra_account['id']},{account['id']},2024-03-02,-1,A5\n"
+        f"{contra_account['id']},{account['id']},2024-03-02,4.75,A6\n"
+    )
+    resp = client.post(
+        "/api/import/transactions",
+        data=body,
+        content_type="text/csv",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["imported"] == 2
+    assert [e["line"] for e in data["errors"]] == [3, 4, 5, 6]
+
+    resp = client.get(f"/api/accounts/{account['id']}", headers=auth_header(auth_token))
+    assert resp.get_json()["current_balance"] == 1000 + 10.25 - 4.75
+
+    imported = db.session.execute(
+        db.select(Transaction.id).where(
+            Transaction.account_id.in_([account["id"], contra_account["id"]]),
+            Transaction.reference_number.in_(["A1", "A6"]),
+        )
+    ).scalars()
+    audit_writer.flush()
+    inserts = db.session.execute(
+        db.select(AuditLog.operation).where(
+            AuditLog.table_name == "transactions",
+            AuditLog.record_id.in_([str(i) for i in imported]),
+        )
+    ).scalars()
+    assert list(inserts) == ["INSERT", "INSERT"]
+    updates = {
+        e.record_id: (e.old_values, e.new_values)
+        for e in db.session.execute(
+            db.select(AuditLog).where(
+                AuditLog.record_id.in_([account["id"], contra_account["id"]]),
+                AuditLog.operation == "UPDATE",
+            )
+        ).scalars()
+    }
+    assert updates == {
+        account["id"]: (
+            {"current_balance": "1000.0000"},
+            {"current_balance": "1005.5000"},
+        ),
+        contra_account["id"]: (
+            {"current_balance": "500.0000"},
+            {"current_balance": "494.5000"},
+        ),
+    }
+
+
+def test_import_rejects_unknown_columns(client, auth_token):
+    resp = client.post(
+        "/api/import/accounts",
+        data="name,type,balance\nX,ASSET,1\n",
+        content_type="text/csv",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 400
+
+
+def test_reconciliation_detects_and_repairs_drift(
+    client, auth_token, account, contra_account, monkeypatch
+):
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": date.today().isoformat(),
+        "amount": "40.0000",
+        "description": "Reconcile me",
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    tx_id = resp.get_json()["transaction"]["id"]
+    db.session.execute(
+        db.update(Account)
+        .where(Account.id == account["id"])
+        .values(current_balance=Account.current_balance + 5)
+    )
+    db.session.commit()
+
+    resp = client.post(
+        "/api/reconciliation",
+        json={"incremental": True, "workers": 2},
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    drift = {d["account_id"]: d for d in data["drift"]}
+    assert drift[account["id"]]["drift"] == 5.0
+    assert drift[account["id"]]["expected_balance"] == 1040.0
+    assert contra_account["id"] not in drift
+
+    resp = client.post(
+        "/api/reconciliation", json={"repair": True}, headers=auth_header(auth_token)
+    )
+    assert resp.get_json()["mode"] == "full"
+    assert resp.get_json()["accounts_repaired"] >= 1
+    resp = client.get(f"/api/accounts/{account['id']}", headers=auth_header(auth_token))
+    assert resp.get_json()["current_balance"] == 1040.0
+    audit_writer.flush()
+    repair = db.session.execute(
+        db.select(AuditLog)
+        .where(AuditLog.record_id == account["id"], AuditLog.operation == "UPDATE")
+        .order_by(AuditLog.id.desc())
+        .limit(1)
+    ).scalar_one()
+    assert (repair.old_values, repair.new_values) == (
+        {"current_balance": "1045.0000"},
+        {"current_balance": "1040.0000"},
+    )
+
+    # A void that leaves the balances alone is found by the next incremental
+    # run, though neither account changed since the last one
+    monkeypatch.setitem(flask_app.config, "RECONCILIATION_OVERLAP_SECONDS", 0)
+    db.session.execute(
+        db.update(Transaction).where(Transaction.id == tx_id).values(is_void=True)
+    )
+    db.session.commit()
+    resp = client.post(
+        "/api/reconciliation",
+        json={"incremental": True, "repair": True},
+        headers=auth_header(auth_token),
+    )
+    data = resp.get_json()
+    assert data["mode"] == "incremental"
+    drift = {d["account_id"]: d["drift"] for d in data["drift"]}
+    assert drift[contra_account["id"]] == -40.0
+
+
+def test_reconciliation_rejects_bad_worker_counts(client, auth_token):
+    most = flask_app.config["RECONCILIATION_WORKERS"]
+    for workers in ("4", 0, most + 1, True, 1.5):
+        resp = client.post(
+            "/api/reconciliation",
+            json={"workers": workers},
+            headers=auth_header(auth_token),
+        )
+        assert resp.status_code == 400
+        assert resp.get_json()["error"] == (
+            f"workers must be an integer between 1 and {most}"
+        )
+
+
+def test_list_transactions_prunes_to_month_partition(app, partitioned):
+    month_start = date.today().replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    query = TransactionService.list_query(
+        {"start_date": month_start, "end_date": next_month - timedelta(days=1)}
+    )
+    relations = transaction_partitions(scanned_relations(explain(query)))
+    assert relations == {f"transactions_{month_start:%Y_%m}"}
+
+
+def test_profit_loss_prunes_to_range_partitions(app, partitioned):
+    PartitionService.ensure_partitions(start=date(2024, 1, 1), months_ahead=3)
+    query = ReportService.profit_loss_total_query(
+        "INCOME", date(2024, 2, 1), date(2024, 3, 31)
+    )
+    relations = transaction_partitions(scanned_relations(explain(query)))
+    assert relations == {"transactions_2024_02", "transactions_2024_03"}
+
+
+@pytest.fixture
+def june_2019_partition(app, partitioned):
+    # The partition outlives the test; fold its rows back into the default
+    # partition and drop it, so the test can create it again on the next run
+    yield "transactions_2019_06"
+    db.session.rollback()
+    PartitionService.detach_partition("transactions_2019_06")
+    columns = ", ".join(c.name for c in Transaction.__mapper__.columns)
+    db.session.execute(
+        db.text("SELECT set_config('accounting.moving_rows', 'on', true)")
+    )
+    db.session.execute(
+        db.text(
+            f"INSERT INTO accounting.transactions ({columns})"
+            f" SELECT {columns} FROM accounting.transactions_2019_06"
+        )
+    )
+    db.session.execute(db.text("DROP TABLE accounting.transactions_2019_06"))
+    db.session.commit()
+
+
+def test_partition_created_for_rows_in_default(
+    client, auth_token, account, contra_account, june_2019_partition
+):
+    tx_data = {
+        "account_id": account["id"],
+        "contra_account_id": contra_account["id"],
+        "transaction_date": "2019-06-15",
+        "amount": "1.0000",
+        "description": "Old entry",
+    }
+    resp = client.post(
+        "/api/transactions", json=tx_data, headers=auth_header(auth_token)
+    )
+    tx_id = resp.get_json()["transaction"]["id"]
+    resp = client.post(
+        "/api/journal-entries",
+        json={
+            "entry_date": "2019-06-20",
+            "legs": [
+                {"account_id": account["id"], "amount": "2.0000"},
+                {"account_id": contra_account["id"], "amount": "-2.0000"},
+            ],
+        },
+        headers=auth_header(auth_token),
+    )
+    entry = resp.get_json()["journal_entry"]
+
+    created = PartitionService.ensure_partitions(start=date(2019, 6, 1), months_ahead=0)
+    assert created == [june_2019_partition]
+    location = db.session.execute(
+        db.text(
+            "SELECT tableoid::regclass::text FROM accounting.transactions WHERE id = :id"
+        ),
+        {"id": tx_id},
+    ).scalar_one()
+    assert location == f"accounting.{june_2019_partition}"
+    # Moved rows keep their link to the journal entry
+    resp = client.get(
+        f"/api/journal-entries/{entry['id']}", headers=auth_header(auth_token)
+    )
+    assert resp.get_json()["transactions"] == entry["transactions"]
+    assert len(entry["transactions"]) == 1
+
+
+@pytest.fixture
+def closed_periods(app, partitioned):
+    # A close locks every earlier date for the tests that follow; undo it,
+    # moving archived rows back without firing the ledger triggers
+    yield
+    db.session.rollback()
+    db.session.execute(
+        db.text("SELECT set_config('accounting.moving_rows', 'on', true)")
+    )
+    db.session.execute(
+        db.text(
+            "INSERT INTO accounting.transactions (id, account_id, contra_account_id,"
+            " transaction_date, amount, description, reference_number, is_void,"
+            " created_at, created_by)"
+            " SELECT id, account_id, contra_account_id, transaction_date, amount,"
+            " description, reference_number, is_void, created_at, created_by"
+            " FROM accounting.transactions_archive"
+        )
+    )
+    db.session.execute(db.delete(ArchivedTransaction))
+    db.session.execute(
+        db.delete(BalanceHistory).where(
+            BalanceHistory.balance_date.in_(db.select(ClosedPeriod.period_end))
+        )
+    )
+    db.session.execute(db.delete(ClosedPeriod))
+    db.session.commit()
+
+
+def test_period_close_freezes_balances_and_locks_the_period(
+    client, auth_token, account, contra_account, closed_periods
+):
+    cash, bank = account["id"], contra_account["id"]
+    first = post_transaction(
+        client, auth_token, cash, bank, "100.0000", date(2012, 3, 1)
+    )
+    post_transaction(client, auth_token, cash, bank, "50.0000", date(2012, 11, 15))
+    post_transaction(client, auth_token, cash, bank, "25.0000", date(2013, 2, 1))
+
+    resp = client.post(
+        "/api/periods",
+        json={"period_end": "2012-12-31"},
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 201
+    accounts = db.session.execute(db.select(db.func.count(Account.id))).scalar_one()
+    assert resp.get_json()["balances_frozen"] == accounts
+    frozen = db.session.execute(
+        db.select(BalanceHistory.balance).where(
+            BalanceHistory.account_id == cash,
+            BalanceHistory.balance_date == date(2012, 12, 31),
+        )
+    ).scalar_one()
+    assert frozen == Decimal("1150.0000")
+
+    # Postings and voids in the period are rejected on every write path
+    for posting_function in (True, False):
+        flask_app.config["POSTING_FUNCTION_ENABLED"] = posting_function
+        try:
+            resp = client.post(
+                "/api/transactions",
+                json={
+                    "account_id": cash,
+                    "contra_account_id": bank,
+                    "transaction_date": "2012-12-31",
+                    "amount": "1.0000",
+                },
+                headers=auth_header(auth_token),
+            )
+            assert resp.status_code == 409
+            assert resp.get_json()["error"] == "Period closed through 2012-12-31"
+            resp = client.post(
+                f"/api/transactions/{first['id']}/void",
+                headers=auth_header(auth_token),
+            )
+            assert resp.status_code == 409
+        finally:
+            flask_app.config["POSTING_FUNCTION_ENABLED"] = True
+    post_transaction(client, auth_token, cash, bank, "1.0000", date(2013, 1, 1))
+
+    resp = client.post(
+        "/api/periods",
+        json={"period_end": "2012-06-30"},
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 400
+    with pytest.raises(RequestValidationError):
+        ReportService.snapshot_balances(date(2012, 6, 30))
+
+    # Reports back out movements from the frozen balances
+    frozen_report = ReportService.generate_balance_report(date(2012, 12, 31))
+    balances = {a["id"]: a["balance"] for a in frozen_report["accounts"]}
+    assert balances[cash] == 1150.0
+    report = ReportService.generate_balance_report(date(2012, 6, 30))
+    assert {a["id"]: a["balance"] for a in report["accounts"]}[cash] == 1100.0
+    trial = ReportService.generate_trial_balance(date(2012, 1, 1), date(2012, 12, 31))
+    row = next(r for r in trial["accounts"] if r["account_id"] == cash)
+    assert (row["opening_balance"], row["closing_balance"]) == (1000.0, 1150.0)
+    assert trial["balanced"]
+
+    # The ledger carries the frozen balances forward to its start
+    resp = client.get(
+        "/api/reports/ledger?start_date=2013-02-01&end_date=2013-02-28"
+        f"&account_id={cash}",
+        headers=auth_header(auth_token),
+    )
+    (section,) = json.loads(resp.get_data())["accounts"]
+    assert (section["opening_balance"], section["closing_balance"]) == (1151.0, 1176.0)
+
+    resp = client.get("/api/periods", headers=auth_header(auth_token))
+    assert resp.get_json()[0]["period_end"] == "2012-12-31"
+
+
+def test_archived_period_leaves_the_ledger(
+    client, auth_token, account, contra_account, closed_periods
+):
+    cash, bank = account["id"], contra_account["id"]
+    old = post_transaction(client, auth_token, cash, bank, "100.0000", date(2014, 5, 1))
+    post_transaction(client, auth_token, cash, bank, "10.0000", date(2015, 2, 1))
+
+    closed = PeriodService.close_period(date(2014, 12, 31), archive=True)
+    assert closed["archived"] and closed["transactions_archived"] >= 1
+    assert db.session.get(ArchivedTransaction, old["id"]).amount == Decimal("100.0000")
+    assert (
+        db.session.execute(
+            db.select(Transaction.id).where(Transaction.id == old["id"])
+        ).first()
+        is None
+    )
+
+    # Balances start from the close, so the archived rows are not needed
+    report = ReportService.generate_balance_report()
+    assert {a["id"]: a["balance"] for a in report["accounts"]}[cash] == 1110.0
+    drifted = {d["account_id"] for d in ReconciliationService.reconcile()["drift"]}
+    assert not drifted & {cash, bank}
+    trial = ReportService.generate_trial_balance(date(2015, 1, 1), date(2015, 12, 31))
+    row = next(r for r in trial["accounts"] if r["account_id"] == cash)
+    assert (row["opening_balance"], row["closing_balance"]) == (1100.0, 1110.0)
+
+    resp = client.get(
+        "/api/reports/trial-balance?start_date=2014-01-01&end_date=2015-12-31",
+        headers=auth_header(auth_token),
+    )
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "Transactions through 2014-12-31 are archived"
+
+
+def test_period_close_only_holds_up_backdated_postings(
+    client, auth_token, account, contra_account
+):
+    if db.engine.dialect.name != "postgresql":
+        pytest.skip("the close fence is a PostgreSQL trigger")
+    cash, bank = account["id"], contra_account["id"]
+    posted = post_transaction(client, auth_token, cash, bank, "5.0000", date.today())
+    backdated = {
+        "account_id": cash,
+        "contra_account_id": bank,
+        "day": date.today() - timedelta(days=1),
+        "id": posted["id"],
+    }
+
+    with db.engine.connect() as closing, db.engine.connect() as other:
+        # What close_period holds until it commits
+        closing.execute(
+            db.text("LOCK TABLE accounting.closed_periods IN SHARE ROW EXCLUSIVE MODE")
+        )
+        post_transaction(client, auth_token, cash, bank, "1.0000", date.today())
+
+        for statement in (
+            "INSERT INTO accounting.transactions"
+            " (account_id, contra_account_id, transaction_date, amount)"
+            " VALUES (:account_id, :contra_account_id, :day, 1)",
+            "UPDATE accounting.transactions SET is_void = TRUE WHERE id = :id",
+        ):
+            other.execute(db.text("SET LOCAL lock_timeout = '100ms'"))
+            with pytest.raises(DBAPIError) as raised:
+                other.execute(db.text(statement), backdated)
+            assert "lock timeout" in str(raised.value)
+            other.rollback()
+        closing.rollback()
+
+    with pytest.raises(RequestValidationError):
+        PeriodService.close_period(date.today() - timedelta(days=1))
+
+
 def test_auth_required(client, account):
     # No token
     resp = client.get(f"/api/accounts/{account['id']}")
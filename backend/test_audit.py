@@ -0,0 +1,166 @@
+"""Tests for the background audit writer."""
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    event,
+    func,
+    select,
+)
+
+import audit
+from audit import AuditWriter
+
+metadata = MetaData()
+audit_log = Table(
+    "audit_log",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("table_name", String(100), nullable=False),
+    Column("record_id", String(36), nullable=False),
+    Column("operation", String(10), nullable=False),
+    Column("old_values", JSON),
+    Column("new_values", JSON),
+    Column("changed_by", String(100), nullable=False),
+    Column("changed_at", DateTime(timezone=True)),
+    Column("entry_id", String(36), unique=True),
+    schema="accounting",
+)
+
+
+def make_engine(path):
+    """
+    Return a SQLite engine with an accounting schema and audit table.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def attach_schema(dbapi_conn, record):
+        dbapi_conn.execute(f"ATTACH DATABASE '{path}.accounting' AS accounting")
+
+    metadata.create_all(engine)
+    return engine
+
+
+def make_record(operation="INSERT"):
+    """
+    Return one audit record for an account.
+    """
+    return {
+        "table_name": "accounts",
+        "record_id": str(uuid4()),
+        "operation": operation,
+        "old_values": None,
+        "new_values": {"name": "Cash", "current_balance": "10.0000"},
+        "changed_by": "tester",
+        "changed_at": datetime.now(timezone.utc),
+    }
+
+
+def count_rows(engine):
+    """
+    Return the number of audit rows written.
+    """
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(audit_log)).scalar_one()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    A SQLite engine holding the audit table.
+    """
+    return make_engine(tmp_path / "audit.db")
+
+
+@pytest.fixture
+def writer(tmp_path):
+    """
+    An audit writer spooling to a temporary file.
+    """
+    w = AuditWriter(
+        audit_log, spool_path=str(tmp_path / "spool.jsonl"), flush_interval=0.05
+    )
+    yield w
+    w.close()
+
+
+def test_flush_writes_batch(writer, engine):
+    """
+    A flush writes every queued record in one batch.
+    """
+    writer.start(engine)
+    writer.enqueue([make_record() for _ in range(25)])
+    writer.flush()
+    assert count_rows(engine) == 25
+    stats = writer.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["flushed_total"] == 25
+    assert stats["last_flush_ms"] is not None
+
+
+def test_batches_are_flushed_by_interval(writer, engine):
+    """
+    Records are written once the flush interval passes.
+    """
+    writer.start(engine)
+    writer.enqueue([make_record()])
+    deadline = time.monotonic() + 2
+    while count_rows(engine) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert count_rows(engine) == 1
+
+
+def test_unreachable_database_spools_and_replays(writer, engine, tmp_path):
+    """
+    Records are spooled while the database is down and replayed later.
+    """
+    writer.start(create_engine(f"sqlite:///{tmp_path}/missing/dir/audit.db"))
+    writer.enqueue([make_record() for _ in range(3)])
+    writer.flush()
+    stats = writer.stats()
+    assert stats["spool_pending"] == 3
+    assert stats["failed_flushes"] == 1
+
+    writer.engine = engine
+    writer.enqueue([make_record("UPDATE")])
+    writer.flush()
+    assert count_rows(engine) == 4
+    assert writer.stats()["spool_pending"] == 0
+
+
+def test_replay_interrupted_before_spool_removal_writes_once(writer, engine):
+    """
+    A replay that committed but crashed before removing the spool is not
+    written again.
+    """
+    writer.enqueue([make_record() for _ in range(3)])
+    writer.flush()
+    assert writer.stats()["spool_pending"] == 3
+
+    def crash(path):
+        raise OSError("crashed before removing the spool")
+
+    writer.engine = engine
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(audit.os, "remove", crash)
+        writer.enqueue([make_record()])
+        with pytest.raises(OSError):
+            writer.flush()
+    assert count_rows(engine) == 3
+    assert writer.stats()["spool_pending"] == 3
+
+    writer.enqueue([make_record()])
+    writer.flush()
+    assert count_rows(engine) == 4
+    assert writer.stats()["spool_pending"] == 0
@@ -0,0 +1,53 @@
+"""Tests for the hot-path microbenchmarks."""
+import platform
+
+from benchmarks import append_history, find_regressions, main, time_benchmark
+
+
+def history_entry(median_us, host=None):
+    """
+    Return a history entry with one benchmark result.
+    """
+    return {
+        "host": host or platform.node(),
+        "results": {"account_to_dict": {"median_us": median_us}},
+    }
+
+
+def test_time_benchmark_reports_per_call_figures():
+    """
+    Timings are reported per call.
+    """
+    result = time_benchmark("token_required_decode", repeat=2, min_time=0.01)
+    assert result["median_us"] > 0
+    assert result["min_us"] <= result["median_us"]
+    assert result["number"] >= 1
+
+
+def test_find_regressions_uses_recent_runs_from_same_host():
+    """
+    Regressions compare with recent runs on the same host only.
+    """
+    history = [history_entry(50.0)] + [history_entry(100.0) for _ in range(5)]
+    history.append(history_entry(10.0, host="elsewhere"))
+    results = {"account_to_dict": {"median_us": 112.0}}
+    assert find_regressions(results, history, threshold=15) == {}
+    regressions = find_regressions(results, history, threshold=10)
+    assert regressions["account_to_dict"]["baseline_us"] == 100.0
+    assert regressions["account_to_dict"]["change_pct"] == 12.0
+
+
+def test_main_records_history_and_fails_on_regression(tmp_path):
+    """
+    Runs are recorded and a regression fails the command.
+    """
+    path = tmp_path / "history.jsonl"
+    args = ["account_to_dict", "--repeat", "1", "--min-time", "0.01"]
+    assert main(args + ["--history", str(path)]) == 0
+    assert len(path.read_text().splitlines()) == 1
+
+    for _ in range(3):
+        append_history(str(path), history_entry(0.001))
+    failing = ["--history", str(path), "--no-record", "--fail-on-regression"]
+    assert main(args + failing) == 1
+    assert len(path.read_text().splitlines()) == 4
@@ -0,0 +1,41 @@
+"""Tests for the database driver benchmark."""
+import pytest
+
+from driver_benchmark import DRIVERS, driver_url, report, run_driver, summarize
+
+
+def test_driver_url_swaps_the_driver():
+    """
+    The driver of a database URL is replaced.
+    """
+    url = "postgresql+psycopg2://postgres@/apt_test?host=/tmp/pgdata"
+    assert driver_url(url, "psycopg") == (
+        "postgresql+psycopg://postgres@/apt_test?host=/tmp/pgdata"
+    )
+    assert driver_url("postgresql://db/app", "psycopg2") == (
+        "postgresql+psycopg2://db/app"
+    )
+
+
+def test_summarize_and_report():
+    """
+    Timings are summarized and compared between drivers.
+    """
+    stats = summarize([0.001, 0.002, 0.003, 0.004])
+    assert stats == {"calls": 4, "mean_ms": 2.5, "p50_ms": 3.0, "p95_ms": 3.0}
+    results = {
+        "psycopg2": {"get_account": {"p50_ms": 2.0}},
+        "psycopg": {"get_account": {"p50_ms": 1.5}},
+    }
+    assert "-25.0%" in report(results)
+
+
+@pytest.mark.parametrize("driver", DRIVERS)
+def test_run_driver(driver):
+    """
+    Each installed driver runs every workload.
+    """
+    pytest.importorskip(driver)
+    results = run_driver(driver, iterations=2)
+    assert results["post_transaction_orm"]["calls"] == 2
+    assert all(stats["p50_ms"] > 0 for stats in results.values())
@@ -0,0 +1,103 @@
+"""Tests for the live event hub."""
+from events import MAX_PAYLOAD_BYTES, RESET, EventHub, EventPublisher, format_sse
+
+
+def make_event(event_id, *account_ids):
+    """
+    Return a transaction event touching the given accounts.
+    """
+    return {
+        "id": event_id,
+        "type": "transaction.recorded",
+        "account_ids": list(account_ids),
+        "data": {"amount": 1.0},
+    }
+
+
+def drain(subscription):
+    """
+    Return the events waiting for a subscription.
+    """
+    events = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def test_dispatch_filters_by_account():
+    """
+    Subscribers only get events for their accounts.
+    """
+    hub = EventHub()
+    everything = hub.subscribe()
+    cash = hub.subscribe(["cash"])
+    hub.dispatch(make_event("1", "cash", "bank"))
+    hub.dispatch(make_event("2", "rent", "bank"))
+    assert [e["id"] for e in drain(everything)] == ["1", "2"]
+    assert [e["id"] for e in drain(cash)] == ["1"]
+    assert hub.subscriber_count() == 2
+
+    hub.unsubscribe(cash)
+    hub.dispatch(make_event("3", "cash"))
+    assert drain(cash) == []
+    assert hub.subscriber_count() == 1
+
+
+def test_resume_after_last_event_id():
+    """
+    Subscribers resume after the last event they saw, or are reset.
+    """
+    hub = EventHub(buffer_size=3)
+    for event_id in "1234":
+        hub.dispatch(make_event(event_id, "cash" if event_id != "3" else "rent"))
+
+    resumed = hub.subscribe(["cash"], last_event_id="2")
+    assert [e["id"] for e in drain(resumed)] == ["4"]
+
+    # Event 1 has left the buffer, so the gap cannot be replayed
+    expired = hub.subscribe(last_event_id="1")
+    assert [e["type"] for e in drain(expired)] == [RESET]
+
+
+def test_slow_subscriber_is_reset():
+    """
+    A subscriber whose queue overflows gets a reset event.
+    """
+    hub = EventHub(max_queue=2)
+    slow = hub.subscribe()
+    for event_id in "123":
+        hub.dispatch(make_event(event_id, "cash"))
+    assert [e["type"] for e in drain(slow)] == [RESET]
+
+
+def test_oversized_event_is_published_as_a_reset():
+    """
+    An event NOTIFY would reject is replaced by a reset for everyone.
+    """
+    publisher = EventPublisher()
+    publisher.publish("small", ["cash"], {"amount": 1.0})
+    publisher.publish("large", ["cash"], {"memo": "x" * MAX_PAYLOAD_BYTES})
+    small, large = publisher._queue.get_nowait(), publisher._queue.get_nowait()
+    assert small["type"] == "small"
+    assert (large["type"], large["data"]) == (RESET, {})
+
+    hub = EventHub()
+    cash = hub.subscribe(["cash"])
+    hub.dispatch(small)
+    hub.dispatch(large)
+    assert [e["type"] for e in drain(cash)] == [RESET]
+
+
+def test_format_sse():
+    """
+    Events are framed as Server-Sent Events.
+    """
+    message = format_sse(make_event("abc", "cash"))
+    assert message == (
+        'id: abc\nevent: transaction.recorded\ndata: {"amount": 1.0}\n\n'
+    )
+    assert format_sse({"id": None, "type": RESET, "data": {}}) == (
+        "event: reset\ndata: {}\n\n"
+    )
@@ -0,0 +1,69 @@
+"""Tests for the group committer."""
+import threading
+
+import pytest
+
+from group_commit import GroupCommitter
+
+
+def submit_concurrently(committer, items):
+    """
+    Submit each item from its own thread and return the outcomes.
+    """
+    results = {}
+
+    def submit(item):
+        try:
+            results[item] = committer.submit(item)
+        except Exception as e:
+            results[item] = e
+
+    threads = [threading.Thread(target=submit, args=(item,)) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_items_share_batches_and_get_their_own_outcome():
+    """
+    Concurrent items share batches and each gets its own result.
+    """
+    batches = []
+
+    def apply_batch(items):
+        batches.append(list(items))
+        return [ValueError(i) if i % 5 == 0 else i * 10 for i in items]
+
+    committer = GroupCommitter(apply_batch, max_batch=4, max_wait=0.05)
+    results = submit_concurrently(committer, range(1, 11))
+    committer.close()
+
+    assert {i: r for i, r in results.items() if i % 5} == {
+        i: i * 10 for i in range(1, 11) if i % 5
+    }
+    assert all(isinstance(results[i], ValueError) for i in (5, 10))
+    assert sorted(i for batch in batches for i in batch) == list(range(1, 11))
+    assert max(len(batch) for batch in batches) <= 4
+    stats = committer.stats()
+    assert stats["items"] == 10 and stats["batches"] == len(batches) < 10
+
+
+def test_failed_batch_fails_every_caller():
+    """
+    A failed batch raises in every caller.
+    """
+
+    def apply_batch(items):
+        raise RuntimeError("commit failed")
+
+    committer = GroupCommitter(apply_batch, max_wait=0.01)
+    results = submit_concurrently(committer, [1, 2, 3])
+    committer.close()
+    assert all(isinstance(r, RuntimeError) for r in results.values())
+
+    committer = GroupCommitter(lambda items: [], max_wait=0)
+    with pytest.raises(RuntimeError, match="0 outcomes for 1 items"):
+        committer.submit(1)
+    committer.close()
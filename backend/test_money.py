@@ -0,0 +1,69 @@
+"""Tests for the minor-unit amount type."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, func, select
+from sqlalchemy.dialects import postgresql
+
+from money import (
+    MAX_AMOUNT,
+    MAX_MINOR_UNITS,
+    AmountOutOfRange,
+    MinorUnits,
+    from_minor_units,
+    to_minor_units,
+)
+
+
+def test_conversion_is_exact():
+    """
+    Amounts convert to minor units and back without rounding.
+    """
+    assert to_minor_units(Decimal("12.3456")) == 123456
+    assert to_minor_units("-0.0001") == -1
+    assert to_minor_units(Decimal("1E+3")) == 10_000_000
+    assert to_minor_units(MAX_AMOUNT) == MAX_MINOR_UNITS
+    assert from_minor_units(123456) == Decimal("12.3456")
+    assert str(from_minor_units(0)) == "0.0000"
+    # PostgreSQL returns SUM(bigint) as numeric
+    assert from_minor_units(Decimal("250000")) == Decimal("25.0000")
+
+
+@pytest.mark.parametrize(
+    "amount",
+    ["0.00001", MAX_AMOUNT + Decimal("0.0001"), -MAX_AMOUNT - 1, "NaN", "abc"],
+)
+def test_conversion_rejects_what_does_not_fit(amount):
+    """
+    Amounts that do not fit are rejected.
+    """
+    with pytest.raises(AmountOutOfRange):
+        to_minor_units(amount)
+
+
+def test_expressions_keep_the_amount_type():
+    """
+    Arithmetic on amounts keeps the amount type.
+    """
+    table = Table(
+        "legs", MetaData(), Column("amount", MinorUnits()), Column("n", Integer)
+    )
+    amount = table.c.amount
+    for expression in (
+        amount + Decimal("1.5"),
+        amount - amount,
+        -amount,
+        amount * table.c.n,
+        func.sum(amount) - func.sum(amount),
+    ):
+        assert isinstance(expression.type, MinorUnits)
+
+    compiled = select(amount + Decimal("1.5"), amount * 2).compile(
+        dialect=postgresql.dialect()
+    )
+    processed = []
+    for name, value in compiled.params.items():
+        process = compiled.binds[name].type.bind_processor(compiled.dialect)
+        processed.append(process(value) if process else value)
+    # Added amounts are converted, scale factors are not
+    assert sorted(processed) == [2, 15000]
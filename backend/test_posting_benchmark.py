@@ -0,0 +1,23 @@
+"""Tests for the posting throughput benchmark."""
+from posting_benchmark import parse_batch, report, run
+
+
+def test_parse_batch():
+    """
+    Batch settings parse from size and wait.
+    """
+    assert parse_batch("32:2.5") == (32, 2.5)
+    assert parse_batch("16") == (16, 0.0)
+
+
+def test_run_compares_modes():
+    """
+    Group commit needs fewer commits than individual postings.
+    """
+    results = run(threads=4, postings=5, accounts=4, batches=[(8, 5.0)])
+    assert set(results) == {"individual", "group 8/5ms"}
+    for result in results.values():
+        assert result["calls"] == 20 and result["errors"] == 0
+    assert results["individual"]["commits"] == 20
+    assert results["group 8/5ms"]["commits"] < 20
+    assert "postings/s" in report(results)
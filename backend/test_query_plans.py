@@ -0,0 +1,455 @@
+"""
+Query-plan regression tests.
+
+Seeds a ledger shaped like production (skewed account activity, two years of
+history, a few voided rows) into the PostgreSQL database configured through
+DATABASE_URL, runs EXPLAIN (ANALYZE, BUFFERS) for the service queries and
+asserts which indexes they use and how many rows and buffers they touch.
+A failure here means a schema or query change made a hot path scan more
+than it used to.
+"""
+import os
+import warnings
+from datetime import date, timedelta
+
+import pytest
+
+warnings.filterwarnings(
+    "ignore", message="Using the in-memory storage for tracking rate limits*"
+)
+warnings.filterwarnings(
+    "ignore", category=DeprecationWarning, module="pythonjsonlogger"
+)
+warnings.filterwarnings(
+    "ignore", message="Pydantic V1 style `@validator` validators are deprecated*"
+)
+
+from app import db  # noqa: E402
+from app import (  # noqa: E402
+    AccountService,
+    ReconciliationService,
+    ReportService,
+    TransactionService,
+)
+from app import app as flask_app  # noqa: E402
+
+SEED_PREFIX = "plan-seed-"
+SEED_ACCOUNTS = int(os.environ.get("PLAN_SEED_ACCOUNTS", 200))
+SEED_TRANSACTIONS = int(os.environ.get("PLAN_SEED_TRANSACTIONS", 100000))
+SEED_DAYS = 700
+
+TRANSACTION_INDEXES = {
+    "account": "idx_transactions_account_date",
+    "contra": "idx_transactions_contra_account_date",
+    "recent": "idx_transactions_date_created",
+    "active": "idx_transactions_active_date",
+    "created": "idx_transactions_created_at",
+    "search": "idx_transactions_search",
+    "reference": "idx_transactions_reference_number",
+}
+
+# Account activity follows a power law: a handful of accounts (cash, bank,
+# payroll) appear on most transactions. Voided rows are rare.
+SEED_ACCOUNTS_SQL = """
+    INSERT INTO accounting.accounts (name, type, opening_balance, current_balance)
+    SELECT :prefix || lpad(g::text, 5, '0'),
+           (ARRAY['ASSET', 'LIABILITY', 'INCOME', 'EXPENSE'])[1 + g % 4],
+           0, 0
+    FROM generate_series(1, :accounts) g
+"""
+
+SEED_TRANSACTIONS_SQL = """
+    WITH seeded AS (
+        SELECT array_agg(id ORDER BY name) AS ids, count(*)::int AS n
+        FROM accounting.accounts
+        WHERE name LIKE :prefix || '%'
+    ),
+    picks AS (
+        SELECT floor(power(random(), 3) * s.n)::int AS a,
+               1 + floor(random() * (s.n - 1))::int AS step,
+               (random() * :days)::int AS age,
+               random() AS r
+        FROM seeded s, generate_series(1, :transactions)
+    )
+    INSERT INTO accounting.transactions (
+        account_id, contra_account_id, transaction_date, amount,
+        description, reference_number, is_void, created_at
+    )
+    SELECT s.ids[1 + p.a],
+           s.ids[1 + (p.a + p.step) % s.n],
+           CURRENT_DATE - p.age,
+           round((1 + p.r * 999)::numeric, 2),
+           'Seeded transaction',
+           'REF-' || lpad((p.r * 1000000)::int::text, 7, '0'),
+           p.r < 0.02,
+           (CURRENT_DATE - p.age) + make_interval(secs => p.r * 86400)
+    FROM picks p, seeded s
+"""
+
+SEED_BALANCES_SQL = """
+    UPDATE accounting.accounts a
+    SET current_balance = a.opening_balance + m.movement
+    FROM (
+        SELECT id, SUM(delta) AS movement
+        FROM (
+            SELECT account_id AS id, amount AS delta
+            FROM accounting.transactions WHERE is_void = FALSE
+            UNION ALL
+            SELECT contra_account_id, -amount
+            FROM accounting.transactions WHERE is_void = FALSE
+        ) legs
+        GROUP BY id
+    ) m
+    WHERE m.id = a.id AND a.name LIKE :prefix || '%'
+"""
+
+
+@pytest.fixture(scope="module")
+def app():
+    """
+    The application bound to the configured PostgreSQL database.
+    """
+    flask_app.config["TESTING"] = True
+    flask_app.config["RATELIMIT_ENABLED"] = False
+    with flask_app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            pytest.skip("query plans are only checked against PostgreSQL")
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture(scope="module")
+def seeded(app):
+    """
+    Seed the ledger once and return the busiest and quietest accounts.
+    """
+    params = {"prefix": SEED_PREFIX}
+    existing = db.session.execute(
+        db.text("SELECT count(*) FROM accounting.accounts WHERE name LIKE :p || '%'"),
+        {"p": SEED_PREFIX},
+    ).scalar_one()
+    if not existing:
+        db.session.execute(
+            db.text(SEED_ACCOUNTS_SQL), {**params, "accounts": SEED_ACCOUNTS}
+        )
+        db.session.execute(db.text("SELECT setseed(0.42)"))
+        db.session.execute(
+            db.text(SEED_TRANSACTIONS_SQL),
+            {**params, "transactions": SEED_TRANSACTIONS, "days": SEED_DAYS},
+        )
+        db.session.execute(db.text(SEED_BALANCES_SQL), params)
+        db.session.commit()
+    # Fresh statistics and a visibility map, as autovacuum would leave them.
+    # Also on later runs: rows the other suites wrote since then would
+    # otherwise leave stale statistics and heap fetches behind
+    db.session.rollback()
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(db.text("VACUUM (ANALYZE) accounting.accounts"))
+        conn.execute(db.text("VACUUM (ANALYZE) accounting.transactions"))
+
+    rows = db.session.execute(
+        db.text(
+            """
+            SELECT a.id::text
+            FROM accounting.accounts a
+            JOIN accounting.transactions t ON t.account_id = a.id
+            WHERE a.name LIKE :prefix || '%'
+            GROUP BY a.id
+            ORDER BY count(*) DESC
+            """
+        ),
+        params,
+    ).scalars()
+    ranked = list(rows)
+    return {"hot": ranked[0], "cold": ranked[-3:]}
+
+
+# --- Helpers ---
+
+
+def explain_analyze(query, params=None):
+    """
+    Run a query under EXPLAIN ANALYZE and return its plan.
+    """
+    if hasattr(query, "compile") and not params:
+        query = db.text(
+            str(
+                query.compile(
+                    dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+                )
+            )
+        )
+    sql = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.text}"
+    plan = db.session.execute(db.text(sql), params or {}).scalar_one()[0]
+    db.session.rollback()
+    return plan["Plan"]
+
+
+def plan_nodes(node):
+    """
+    Yield the nodes of a plan, depth first.
+    """
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def used_indexes(plan):
+    """
+    Return the names of the indexes a plan reads, with per-partition index
+    names mapped back to the index declared on the partitioned table.
+    """
+    names = {n["Index Name"] for n in plan_nodes(plan) if "Index Name" in n}
+    parents = set()
+    for name in names:
+        root = db.session.execute(
+            db.text(
+                "SELECT COALESCE(pg_partition_root(to_regclass(:name)), "
+                "to_regclass(:name))::regclass::text"
+            ),
+            {"name": f"accounting.{name}"},
+        ).scalar_one()
+        parents.add(root.split(".")[-1])
+    return parents
+
+
+def seq_scanned(plan, min_rows=500):
+    """
+    Return the transaction partitions read by a sequential scan. Partitions
+    holding only a handful of rows are ignored; a seq scan is the right plan
+    for those.
+    """
+    return {
+        n["Relation Name"]
+        for n in plan_nodes(plan)
+        if n["Node Type"] == "Seq Scan"
+        and n["Relation Name"].startswith("transactions")
+        and n["Actual Rows"] + n.get("Rows Removed by Filter", 0) >= min_rows
+    }
+
+
+def buffers(plan):
+    """
+    Return the shared buffers a plan node touched.
+    """
+    return plan["Shared Hit Blocks"] + plan["Shared Read Blocks"]
+
+
+def month_bounds():
+    """
+    Return the first and last day of last month.
+    """
+    month_start = (date.today() - timedelta(days=40)).replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return month_start, month_end
+
+
+# --- Transactions ---
+
+
+def test_recent_transactions_page(seeded):
+    """
+    The first page reads the recent transactions index.
+    """
+    plan = explain_analyze(TransactionService.list_query({}, page=1, per_page=20))
+    assert plan["Actual Rows"] == 20
+    assert TRANSACTION_INDEXES["recent"] in used_indexes(plan)
+    assert not seq_scanned(plan)
+    assert buffers(plan) <= 400
+
+
+def test_deep_page_stays_on_index(seeded):
+    """
+    A deep page still reads the index.
+    """
+    plan = explain_analyze(TransactionService.list_query({}, page=50, per_page=20))
+    assert plan["Actual Rows"] == 20
+    assert not seq_scanned(plan)
+    # OFFSET still walks the skipped rows; keyset pagination avoids this
+    assert buffers(plan) <= 3000
+
+
+def test_account_page_reads_both_account_indexes(seeded):
+    """
+    An account's page reads both account indexes.
+    """
+    query = TransactionService.list_query({"account_id": seeded["hot"]}, 1, 20)
+    plan = explain_analyze(query)
+    assert plan["Actual Rows"] == 20
+    indexes = used_indexes(plan)
+    assert {TRANSACTION_INDEXES["account"], TRANSACTION_INDEXES["contra"]} <= indexes
+    assert not seq_scanned(plan)
+    # Only the first page of each side is read, not every row of a hot account
+    assert all(n["Actual Rows"] <= 20 * 2 for n in plan_nodes(plan))
+    assert buffers(plan) <= 600
+
+
+def test_account_month_page(seeded):
+    """
+    An account's month reads its indexes without scanning.
+    """
+    month_start, month_end = month_bounds()
+    filters = {
+        "account_id": seeded["hot"],
+        "start_date": month_start,
+        "end_date": month_end,
+        "is_void": False,
+    }
+    plan = explain_analyze(TransactionService.list_query(filters, 1, 20))
+    assert plan["Actual Rows"] <= 20
+    assert used_indexes(plan) <= {
+        TRANSACTION_INDEXES["account"],
+        TRANSACTION_INDEXES["contra"],
+        "accounts_pkey",
+    }
+    assert not seq_scanned(plan)
+    assert buffers(plan) <= 200
+
+
+def test_limit_filter_caps_the_page(seeded):
+    """
+    The page size caps the rows read.
+    """
+    plan = explain_analyze(TransactionService.list_query({"limit": "25"}, 2, 20))
+    assert plan["Actual Rows"] == 5
+    assert TransactionService.list_query({"limit": "25"}, 3, 20) is None
+
+
+def test_search_reads_text_index(seeded):
+    """
+    Text search reads the full-text index.
+    """
+    reference = db.session.execute(
+        db.text(
+            "SELECT reference_number FROM accounting.transactions "
+            "WHERE reference_number LIKE 'REF-%' LIMIT 1"
+        )
+    ).scalar_one()
+    number = reference.split("-")[1]
+    plan = explain_analyze(TransactionService.search_query(number, limit=20))
+    assert TRANSACTION_INDEXES["search"] in used_indexes(plan)
+    assert not seq_scanned(plan)
+    assert buffers(plan) <= 600
+
+
+def test_search_by_reference_reads_reference_index(seeded):
+    """
+    Reference search reads the reference index.
+    """
+    reference = db.session.execute(
+        db.text(
+            "SELECT reference_number FROM accounting.transactions "
+            "WHERE reference_number LIKE 'REF-%' LIMIT 1"
+        )
+    ).scalar_one()
+    plan = explain_analyze(TransactionService.search_query(reference, exact=True))
+    assert plan["Actual Rows"] >= 1
+    assert TRANSACTION_INDEXES["reference"] in used_indexes(plan)
+    assert not seq_scanned(plan)
+    assert buffers(plan) <= 600
+
+
+# --- Accounts ---
+
+
+def test_account_page_by_name(seeded):
+    """
+    Accounts are paged by name from the name index.
+    """
+    plan = explain_analyze(AccountService.list_query({}, page=2, per_page=20))
+    assert plan["Actual Rows"] == 20
+    assert "idx_accounts_name" in used_indexes(plan)
+    assert buffers(plan) <= 50
+
+
+# --- Reports ---
+
+
+def test_profit_loss_week_is_index_only(seeded):
+    """
+    A week of profit and loss is read from the index alone.
+    """
+    week_start = date.today() - timedelta(days=30)
+    for account_type in ("INCOME", "EXPENSE"):
+        query = ReportService.profit_loss_total_query(
+            account_type, week_start, week_start + timedelta(days=6)
+        )
+        plan = explain_analyze(query)
+        assert TRANSACTION_INDEXES["active"] in used_indexes(plan)
+        assert not seq_scanned(plan)
+        only = [n for n in plan_nodes(plan) if n["Node Type"] == "Index Only Scan"]
+        assert only and all(n["Heap Fetches"] <= 50 for n in only)
+        assert buffers(plan) <= 60
+
+
+def test_profit_loss_month_reads_one_partition(seeded):
+    """
+    A month of profit and loss reads one partition.
+    """
+    month_start, month_end = month_bounds()
+    query = ReportService.profit_loss_total_query("INCOME", month_start, month_end)
+    plan = explain_analyze(query)
+    scanned = {
+        n["Relation Name"]
+        for n in plan_nodes(plan)
+        if n.get("Relation Name", "").startswith("transactions")
+    }
+    assert scanned == {f"transactions_{month_start:%Y_%m}"}
+    assert buffers(plan) <= 150
+
+
+def test_trial_balance_week_is_index_only(seeded):
+    """
+    A week of trial balance is read from the index alone.
+    """
+    week_start = date.today() - timedelta(days=6)
+    plan = explain_analyze(ReportService.trial_balance_query(week_start, date.today()))
+    assert TRANSACTION_INDEXES["active"] in used_indexes(plan)
+    assert not seq_scanned(plan)
+    only = [n for n in plan_nodes(plan) if n["Node Type"] == "Index Only Scan"]
+    assert only and all(n["Heap Fetches"] <= 50 for n in only)
+    assert buffers(plan) <= 150
+
+
+def test_account_ledger_month_reads_account_indexes(seeded):
+    """
+    An account's ledger month reads its indexes.
+    """
+    month_start, month_end = month_bounds()
+    query = ReportService.ledger_query(month_start, month_end, seeded["hot"])
+    plan = explain_analyze(query)
+    assert {
+        TRANSACTION_INDEXES["account"],
+        TRANSACTION_INDEXES["contra"],
+    } <= used_indexes(plan)
+    assert not seq_scanned(plan)
+
+
+# --- Reconciliation ---
+
+
+def test_incremental_reconciliation_reads_account_indexes(seeded):
+    """
+    Incremental reconciliation reads the account indexes.
+    """
+    query = ReconciliationService._expected_balances_query("ids")
+    plan = explain_analyze(query, {"ids": seeded["cold"]})
+    assert not seq_scanned(plan)
+    assert {
+        TRANSACTION_INDEXES["account"],
+        TRANSACTION_INDEXES["contra"],
+    } <= used_indexes(plan)
+    # Roughly one heap page per ledger row of the checked accounts
+    assert buffers(plan) <= 3000
+
+
+def test_touched_accounts_reads_created_at_index(seeded):
+    """
+    Touched accounts are found through the created_at index.
+    """
+    query = db.text(ReconciliationService.TOUCHED_ACCOUNTS)
+    since = date.today() + timedelta(days=1)
+    plan = explain_analyze(query, {"since": since})
+    assert TRANSACTION_INDEXES["created"] in used_indexes(plan)
+    assert not seq_scanned(plan)
+    assert buffers(plan) <= 300
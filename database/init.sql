@@ -59,9 +59,23 @@ COMMENT ON TABLE accounting.accounts IS 'Stores all financial accounts for the a
 COMMENT ON COLUMN accounting.accounts.type IS 'Account type: INCOME, EXPENSE, ASSET,or LIABILITY';
 COMMENT ON COLUMN accounting.accounts.opening_balance IS 'Initial balance when account was created';
 COMMENT ON COLUMN accounting.accounts.current_balance IS 'Current balance after all transactions';
+-- Multi-leg journal entries. An entry's legs are carried by the two-leg
+-- transactions that reference it, each pairing a debit with a credit, so
+-- every reader of transactions sees entries like any other posting.
+CREATE TABLE accounting.journal_entries (
+id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+entry_date DATE NOT NULL,
+description VARCHAR(500),
+reference_number VARCHAR(100),
+created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+created_by VARCHAR(100) NOT NULL DEFAULT current_user
+);
+COMMENT ON TABLE accounting.journal_entries IS 'Multi-leg journal entries, posted as the transactions referencing them';
 -- Transactions table (as per LLD specification with audit fields)
+-- Range partitioned by transaction_date; the partition key must be part of
+-- the primary key, ids are still generated with gen_random_uuid()
 CREATE TABLE accounting.transactions (
-id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+id UUID NOT NULL DEFAULT gen_random_uuid(),
 account_id UUID NOT NULL REFERENCES accounting.accounts(id),
 contra_account_id UUID NOT NULL REFERENCES accounting.accounts(id),
 transaction_date DATE NOT NULL,
@@ -71,11 +85,23 @@ reference_number VARCHAR(100),
 is_void BOOLEAN NOT NULL DEFAULT FALSE,
 created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
 created_by VARCHAR(100) NOT NULL DEFAULT current_user,
+journal_entry_id UUID REFERENCES accounting.journal_entries(id),
+-- Full-text search document: reference number weighted above description.
+-- 'simple' keeps codes and names unstemmed
+search_vector TSVECTOR GENERATED ALWAYS AS (
+setweight(to_tsvector('simple', coalesce(reference_number, '')), 'A') ||
+setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+) STORED,
+PRIMARY KEY (id, transaction_date),
 CHECK (account_id != contra_account_id)
-);
+) PARTITION BY RANGE (transaction_date);
 COMMENT ON TABLE accounting.transactions IS 'Records all financial transactions between accounts';
+-- Catch-all partition for dates outside the pre-created ranges
+CREATE TABLE accounting.transactions_default PARTITION OF accounting.transactions DEFAULT;
+COMMENT ON TABLE accounting.transactions_default IS 'Default partition for transactions outside the created date ranges';
 COMMENT ON COLUMN accounting.transactions.contra_account_id IS 'The counterparty account for the transaction';
 COMMENT ON COLUMN accounting.transactions.is_void IS 'Flag for voided/cancelled transactions';
+COMMENT ON COLUMN accounting.transactions.journal_entry_id IS 'The journal entry this transaction carries legs of, if any';
 -- Balance history table (as per LLD specification)
 CREATE TABLE accounting.balance_history (
 id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -109,27 +135,547 @@ operation VARCHAR(10) NOT NULL CHECK (operation IN ('INSERT', 'UPDATE', 'DELETE'
 old_values JSONB,
 new_values JSONB,
 changed_by VARCHAR(100) NOT NULL,
-changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+entry_id UUID
 );
 COMMENT ON TABLE accounting.audit_log IS 'Audit trail for all data modifications in the system';
 COMMENT ON COLUMN accounting.audit_log.old_values IS 'JSON representation of the record before change';
 COMMENT ON COLUMN accounting.audit_log.new_values IS 'JSON representation of the record after change';
+COMMENT ON COLUMN accounting.audit_log.entry_id IS 'Id the audit writer gives each record, so replaying its spool writes a record once';
 CREATE INDEX idx_audit_log_table_record ON accounting.audit_log(table_name, record_id);
 CREATE INDEX idx_audit_log_changed_at ON accounting.audit_log(changed_at);
+CREATE UNIQUE INDEX idx_audit_log_entry_id ON accounting.audit_log(entry_id);
+-- =============================================
+-- Ledger Reconciliation
+-- =============================================
+-- One row per reconciliation run; incremental runs start from the last one
+CREATE TABLE accounting.reconciliation_runs (
+id BIGSERIAL PRIMARY KEY,
+started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+finished_at TIMESTAMP WITH TIME ZONE,
+mode VARCHAR(20) NOT NULL CHECK (mode IN ('full', 'incremental')),
+accounts_checked INTEGER NOT NULL DEFAULT 0,
+accounts_drifted INTEGER NOT NULL DEFAULT 0,
+accounts_repaired INTEGER NOT NULL DEFAULT 0
+);
+COMMENT ON TABLE accounting.reconciliation_runs IS 'History of balance reconciliation runs against the transaction ledger';
+COMMENT ON COLUMN accounting.reconciliation_runs.started_at IS 'Database clock when the run started; incremental runs re-check changes since then';
+CREATE INDEX idx_reconciliation_runs_started_at ON accounting.reconciliation_runs(started_at);
+CREATE INDEX idx_accounts_updated_at ON accounting.accounts(updated_at);
 -- =============================================
 -- Indexes (as specified in LLD plus recommended indexes)
 -- =============================================
 -- Indexes specified in LLD
-CREATE INDEX idx_transactions_account_id ON accounting.transactions(account_id);
-CREATE INDEX idx_transactions_contra_account_id ON accounting.transactions(contra_account_id);
-CREATE INDEX idx_transactions_date ON accounting.transactions(transaction_date);
-CREATE INDEX idx_transactions_void_status ON accounting.transactions(is_void) WHERE is_void= TRUE;
 CREATE INDEX idx_balance_history_account_date ON accounting.balance_history(account_id, balance_date);
+-- Workload-matched indexes, guarded by backend/test_query_plans.py
+-- list_transactions by account: each side of the account match is read in
+-- (transaction_date DESC, created_at DESC) order from its own index
+CREATE INDEX idx_transactions_account_date ON accounting.transactions(account_id, transaction_date, created_at);
+CREATE INDEX idx_transactions_contra_account_date ON accounting.transactions(contra_account_id, transaction_date, created_at);
+-- list_transactions without an account filter
+CREATE INDEX idx_transactions_date_created ON accounting.transactions(transaction_date, created_at);
+-- Reports only read non-void rows; covering so date-range totals are index-only
+CREATE INDEX idx_transactions_active_date ON accounting.transactions(transaction_date)
+    INCLUDE (account_id, contra_account_id, amount) WHERE is_void = FALSE;
+-- search_transactions: ranked text matches, and exact reference lookups
+CREATE INDEX idx_transactions_search ON accounting.transactions USING GIN (search_vector);
+CREATE INDEX idx_transactions_reference_number ON accounting.transactions(reference_number);
+-- An entry's transactions, read back with the entry
+CREATE INDEX idx_transactions_journal_entry ON accounting.transactions(journal_entry_id)
+    WHERE journal_entry_id IS NOT NULL;
 -- Additional recommended indexes
 CREATE INDEX idx_accounts_type ON accounting.accounts(type);
 CREATE INDEX idx_transactions_created_at ON accounting.transactions(created_at);
 CREATE INDEX idx_accounts_name ON accounting.accounts(name);
 -- =============================================
+-- Transaction Partitioning
+-- =============================================
+-- Create the partition covering p_date ('month' or 'year' granularity).
+-- Rows already sitting in the default partition for that range are moved
+-- into the new partition.
+CREATE OR REPLACE FUNCTION accounting.create_transaction_partition(
+p_date DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_start DATE;
+v_end DATE;
+v_name TEXT;
+BEGIN
+IF p_granularity = 'month' THEN
+v_start := date_trunc('month', p_date)::date;
+v_end := (v_start + INTERVAL '1 month')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY_MM');
+ELSIF p_granularity = 'year' THEN
+v_start := date_trunc('year', p_date)::date;
+v_end := (v_start + INTERVAL '1 year')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY');
+ELSE
+RAISE EXCEPTION 'Unknown partition granularity: %', p_granularity;
+END IF;
+
+IF to_regclass(format('accounting.%I', v_name)) IS NOT NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (
+SELECT 1 FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end
+) THEN
+CREATE TEMP TABLE pg_temp.moved_transactions ON COMMIT DROP AS
+SELECT * FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+DELETE FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+PERFORM set_config('accounting.moving_rows', 'on', true);
+-- search_vector is generated, so the columns are listed
+INSERT INTO accounting.transactions (
+id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by, journal_entry_id
+)
+SELECT id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by, journal_entry_id
+FROM pg_temp.moved_transactions;
+PERFORM set_config('accounting.moving_rows', 'off', true);
+DROP TABLE pg_temp.moved_transactions;
+ELSE
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+END IF;
+RETURN v_name;
+END;
+$$;
+COMMENT ON FUNCTION accounting.create_transaction_partition(DATE, TEXT) IS 'Create the transactions partition covering a date, moving matching rows out of the default partition';
+-- Create every missing partition between two dates; returns the new names.
+-- Serialised with an advisory lock so concurrent callers do not collide.
+CREATE OR REPLACE FUNCTION accounting.ensure_transaction_partitions(
+p_from DATE,
+p_to DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_step INTERVAL := CASE WHEN p_granularity = 'year' THEN INTERVAL '1 year' ELSE INTERVAL '1 month' END;
+v_date DATE := date_trunc(CASE WHEN p_granularity = 'year' THEN 'year' ELSE 'month' END, p_from)::date;
+v_name TEXT;
+BEGIN
+PERFORM pg_advisory_xact_lock(hashtext('accounting.transactions partitions'));
+WHILE v_date <= p_to LOOP
+v_name := accounting.create_transaction_partition(v_date, p_granularity);
+IF v_name IS NOT NULL THEN
+RETURN NEXT v_name;
+END IF;
+v_date := (v_date + v_step)::date;
+END LOOP;
+END;
+$$;
+COMMENT ON FUNCTION accounting.ensure_transaction_partitions(DATE, DATE, TEXT) IS 'Create all missing transactions partitions between two dates';
+-- Pre-create partitions for the last two years and the next three months
+SELECT accounting.ensure_transaction_partitions(
+(CURRENT_DATE - INTERVAL '2 years')::date,
+(CURRENT_DATE + INTERVAL '3 months')::date
+);
+-- =============================================
+-- Posting Functions
+-- =============================================
+-- Post a transaction in one round trip: lock both accounts in id order (so
+-- concurrent postings cannot deadlock), check funds, insert the row and move
+-- both balances. Returns the new row with account names and balances.
+-- Raises SQLSTATE AC404 when an account is missing and AC402 on
+-- insufficient funds.
+CREATE OR REPLACE FUNCTION accounting.post_transaction(
+p_account_id UUID,
+p_contra_account_id UUID,
+p_transaction_date DATE,
+p_amount NUMERIC,
+p_description VARCHAR DEFAULT NULL,
+p_reference_number VARCHAR DEFAULT NULL
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount DECIMAL(19,4),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance DECIMAL(19,4),
+contra_account_balance DECIMAL(19,4)
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+v_row accounting.transactions%ROWTYPE;
+BEGIN
+PERFORM 1 FROM accounting.accounts a
+WHERE a.id IN (p_account_id, p_contra_account_id)
+ORDER BY a.id
+FOR UPDATE;
+
+SELECT * INTO v_account FROM accounting.accounts a WHERE a.id = p_account_id;
+SELECT * INTO v_contra FROM accounting.accounts a WHERE a.id = p_contra_account_id;
+IF v_account.id IS NULL OR v_contra.id IS NULL THEN
+RAISE EXCEPTION 'One or both accounts not found' USING ERRCODE = 'AC404';
+END IF;
+
+IF v_account.type IN ('ASSET', 'LIABILITY')
+AND v_account.current_balance + p_amount < 0 THEN
+RAISE EXCEPTION 'Insufficient funds' USING ERRCODE = 'AC402';
+END IF;
+
+INSERT INTO accounting.transactions (
+account_id, contra_account_id, transaction_date, amount, description, reference_number
+) VALUES (
+p_account_id, p_contra_account_id, p_transaction_date, p_amount, p_description, p_reference_number
+)
+RETURNING * INTO v_row;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_account_id
+RETURNING a.current_balance INTO v_account.current_balance;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_contra_account_id
+RETURNING a.current_balance INTO v_contra.current_balance;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, v_row.is_void,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.post_transaction(UUID, UUID, DATE, NUMERIC, VARCHAR, VARCHAR) IS 'Record a transaction and update both account balances in one call';
+-- Void a transaction in one round trip: lock the row and both accounts in
+-- id order, reverse the balances and flag the row. Raises AC404 when the
+-- transaction is missing and AC409 when it is already void.
+CREATE OR REPLACE FUNCTION accounting.void_transaction(
+p_transaction_id UUID
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount DECIMAL(19,4),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance DECIMAL(19,4),
+contra_account_balance DECIMAL(19,4)
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_row accounting.transactions%ROWTYPE;
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+BEGIN
+-- The transaction row and both accounts are locked in one statement,
+-- accounts in id order like every other write path
+PERFORM 1 FROM accounting.transactions t
+JOIN accounting.accounts a ON a.id IN (t.account_id, t.contra_account_id)
+WHERE t.id = p_transaction_id
+ORDER BY a.id
+FOR UPDATE;
+SELECT * INTO v_row FROM accounting.transactions t
+WHERE t.id = p_transaction_id;
+IF NOT FOUND THEN
+RAISE EXCEPTION 'Transaction not found' USING ERRCODE = 'AC404';
+END IF;
+IF v_row.is_void THEN
+RAISE EXCEPTION 'Transaction already voided' USING ERRCODE = 'AC409';
+END IF;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.account_id
+RETURNING * INTO v_account;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.contra_account_id
+RETURNING * INTO v_contra;
+UPDATE accounting.transactions t
+SET is_void = TRUE
+WHERE t.id = v_row.id AND t.transaction_date = v_row.transaction_date;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, TRUE,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.void_transaction(UUID) IS 'Void a transaction and reverse both account balances in one call';
+-- =============================================
+-- Balance Snapshots
+-- =============================================
+-- balance_history rows hold an account's closing balance at the end of
+-- balance_date and seed statement opening balances. Postings and voids dated
+-- on or before a snapshot move it by the same amount, so back-dated entries
+-- never leave a stale snapshot. Rows that create_transaction_partition moves
+-- out of the default partition are already counted and are skipped.
+CREATE OR REPLACE FUNCTION accounting.adjust_balance_snapshots()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+IF TG_OP = 'INSERT' THEN
+UPDATE accounting.balance_history h
+SET balance = h.balance + c.delta
+FROM (
+SELECT s.id, SUM(ch.delta) AS delta
+FROM accounting.balance_history s
+JOIN (
+SELECT account_id, transaction_date, amount AS delta FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, -amount FROM new_rows WHERE NOT is_void
+) ch ON ch.account_id = s.account_id AND ch.transaction_date <= s.balance_date
+GROUP BY s.id
+) c
+WHERE h.id = c.id;
+ELSE
+UPDATE accounting.balance_history h
+SET balance = h.balance + c.delta
+FROM (
+SELECT s.id, SUM(ch.delta) AS delta
+FROM accounting.balance_history s
+JOIN (
+SELECT account_id, transaction_date, amount AS delta FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, -amount FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT account_id, transaction_date, -amount FROM old_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, amount FROM old_rows WHERE NOT is_void
+) ch ON ch.account_id = s.account_id AND ch.transaction_date <= s.balance_date
+GROUP BY s.id
+HAVING SUM(ch.delta) <> 0
+) c
+WHERE h.id = c.id;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.adjust_balance_snapshots() IS 'Keep balance snapshots in step with postings and voids dated on or before them';
+CREATE TRIGGER transactions_adjust_snapshots_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.adjust_balance_snapshots();
+CREATE TRIGGER transactions_adjust_snapshots_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.adjust_balance_snapshots();
+-- =============================================
+-- Change Feed
+-- =============================================
+-- Outbox of account and transaction changes behind /api/changes. Statement
+-- triggers add one row per changed record in the writing transaction, so
+-- every path (ORM, posting functions, imports, repairs) is covered. txid is
+-- the writing transaction's id: the feed only returns rows of transactions
+-- older than every running one, so none can appear behind a reader's
+-- position. Rows moved between partitions are not changes and are skipped.
+CREATE TABLE accounting.change_outbox (
+id BIGSERIAL PRIMARY KEY,
+txid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+entity VARCHAR(20) NOT NULL CHECK (entity IN ('account', 'transaction')),
+entity_id UUID NOT NULL,
+operation VARCHAR(10) NOT NULL CHECK (operation IN ('INSERT', 'UPDATE', 'VOID')),
+changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE accounting.change_outbox IS 'Account and transaction changes, read by the change feed';
+COMMENT ON COLUMN accounting.change_outbox.txid IS 'Id of the transaction that made the change (pg_current_xact_id)';
+CREATE INDEX idx_change_outbox_position ON accounting.change_outbox(txid, id);
+-- Incremental reconciliation finds voided and updated transactions here
+CREATE INDEX idx_change_outbox_transaction_updates ON accounting.change_outbox(changed_at)
+    WHERE entity = 'transaction' AND operation <> 'INSERT';
+CREATE OR REPLACE FUNCTION accounting.record_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+IF TG_ARGV[0] = 'transaction' AND TG_OP = 'UPDATE' THEN
+INSERT INTO accounting.change_outbox (entity, entity_id, operation)
+SELECT 'transaction', id, CASE WHEN is_void THEN 'VOID' ELSE 'UPDATE' END
+FROM new_rows ORDER BY id;
+ELSE
+INSERT INTO accounting.change_outbox (entity, entity_id, operation)
+SELECT TG_ARGV[0], id, TG_OP FROM new_rows ORDER BY id;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.record_changes() IS 'Add the rows changed by a statement to the change outbox';
+CREATE TRIGGER accounts_record_changes_insert
+AFTER INSERT ON accounting.accounts
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('account');
+CREATE TRIGGER accounts_record_changes_update
+AFTER UPDATE ON accounting.accounts
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('account');
+CREATE TRIGGER transactions_record_changes_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('transaction');
+CREATE TRIGGER transactions_record_changes_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('transaction');
+-- =============================================
+-- Period Close
+-- =============================================
+-- A closed period ends at period_end and covers every earlier date. Closing
+-- freezes each account's balance at period_end in balance_history, derived
+-- from the previous close and the period's postings, and locks the period:
+-- the statement triggers below reject postings dated in it and voids of its
+-- transactions on every write path with SQLSTATE AC423. Rows moved between
+-- partitions are not new postings and are let through.
+CREATE TABLE accounting.closed_periods (
+period_end DATE PRIMARY KEY,
+archived BOOLEAN NOT NULL DEFAULT FALSE,
+closed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+closed_by VARCHAR(100) NOT NULL DEFAULT current_user
+);
+COMMENT ON TABLE accounting.closed_periods IS 'Closed accounting periods; postings dated on or before the latest period_end are rejected';
+COMMENT ON COLUMN accounting.closed_periods.archived IS 'Whether the transactions through period_end were moved to transactions_archive';
+-- Transactions of archived periods, moved out of the partitioned table so
+-- its indexes and partitions only hold the open period. Same columns as
+-- accounting.transactions, with search_vector stored as a plain column.
+CREATE TABLE accounting.transactions_archive (
+LIKE accounting.transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+PRIMARY KEY (id)
+);
+COMMENT ON TABLE accounting.transactions_archive IS 'Transactions of archived closed periods';
+CREATE INDEX idx_transactions_archive_date ON accounting.transactions_archive(transaction_date);
+CREATE OR REPLACE FUNCTION accounting.check_period_open()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_closed DATE;
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+SELECT max(period_end) INTO v_closed FROM accounting.closed_periods;
+IF v_closed IS NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (SELECT 1 FROM new_rows WHERE transaction_date <= v_closed) THEN
+RAISE EXCEPTION 'Period closed through %', v_closed USING ERRCODE = 'AC423';
+END IF;
+-- Voids and other updates of a closed period's rows
+IF TG_OP = 'UPDATE' THEN
+IF EXISTS (SELECT 1 FROM old_rows WHERE transaction_date <= v_closed) THEN
+RAISE EXCEPTION 'Period closed through %', v_closed USING ERRCODE = 'AC423';
+END IF;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.check_period_open() IS 'Reject postings and voids dated in a closed period';
+CREATE TRIGGER transactions_check_period_open_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.check_period_open();
+CREATE TRIGGER transactions_check_period_open_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.check_period_open();
+-- A close takes closed_periods in SHARE ROW EXCLUSIVE mode. Postings dated
+-- before the current day and every update take it in ROW EXCLUSIVE mode
+-- first, so they wait for a close in progress and the close waits for them;
+-- postings dated today or later never touch a period that can be closed and
+-- run alongside it. The lock is taken before any row or snapshot is written,
+-- so a waiting void cannot hold a row the archival DELETE needs. Closes
+-- only accept periods that ended before yesterday, so a transaction would
+-- have to stay open for over a day to post into one without the fence.
+CREATE OR REPLACE FUNCTION accounting.fence_period_close()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NEW;
+END IF;
+
+LOCK TABLE accounting.closed_periods IN ROW EXCLUSIVE MODE;
+RETURN NEW;
+END;
+$$;
+COMMENT ON FUNCTION accounting.fence_period_close() IS 'Make backdated postings and voids wait for a period close in progress';
+CREATE TRIGGER transactions_fence_period_close_insert
+BEFORE INSERT ON accounting.transactions
+FOR EACH ROW WHEN (NEW.transaction_date < CURRENT_DATE)
+EXECUTE FUNCTION accounting.fence_period_close();
+CREATE TRIGGER transactions_fence_period_close_update
+BEFORE UPDATE ON accounting.transactions
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.fence_period_close();
+-- =============================================
+-- Background Jobs
+-- =============================================
+-- Queue of long-running reports and exports. Workers claim the oldest
+-- runnable row with FOR UPDATE SKIP LOCKED and send heartbeats while a job
+-- runs; results are written to files on the worker host (JOB_RESULT_DIR).
+CREATE TABLE accounting.jobs (
+id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+kind VARCHAR(50) NOT NULL,
+params JSONB NOT NULL DEFAULT '{}',
+status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+progress NUMERIC(5, 2) NOT NULL DEFAULT 0 CHECK (progress BETWEEN 0 AND 100),
+attempts INTEGER NOT NULL DEFAULT 0,
+max_attempts INTEGER NOT NULL CHECK (max_attempts > 0),
+cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+result_path TEXT,
+error TEXT,
+created_by VARCHAR(100) NOT NULL,
+run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+heartbeat_at TIMESTAMP WITH TIME ZONE,
+created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+started_at TIMESTAMP WITH TIME ZONE,
+finished_at TIMESTAMP WITH TIME ZONE
+);
+COMMENT ON TABLE accounting.jobs IS 'Background report and export jobs run by the job workers';
+COMMENT ON COLUMN accounting.jobs.run_after IS 'Earliest time the job may be claimed; pushed back between retries';
+COMMENT ON COLUMN accounting.jobs.heartbeat_at IS 'Last heartbeat of the worker running the job; stale jobs are requeued';
+-- Dequeue reads only queued rows in run_after order
+CREATE INDEX idx_jobs_runnable ON accounting.jobs(run_after) WHERE status = 'queued';
+CREATE INDEX idx_jobs_running_heartbeat ON accounting.jobs(heartbeat_at) WHERE status = 'running';
+CREATE INDEX idx_jobs_finished_at ON accounting.jobs(finished_at) WHERE finished_at IS NOT NULL;
+CREATE INDEX idx_jobs_created_by ON accounting.jobs(created_by, created_at);
+-- =============================================
 -- Reporting Views
 -- =============================================
 -- View for current account balances
@@ -193,6 +739,8 @@ GRANT SELECT, INSERT, UPDATE ON ALL TABLES IN SCHEMA accounting TO accounting_ap
 GRANT USAGE ON ALL SEQUENCES IN SCHEMA accounting TO accounting_app;
 GRANT SELECT ON ALL TABLES IN SCHEMA accounting TO accounting_readonly;
 GRANT SELECT ON ALL SEQUENCES IN SCHEMA accounting TO accounting_readonly;
+-- Expired jobs are deleted by the job workers
+GRANT DELETE ON accounting.jobs TO accounting_app;
 -- Grant all permissions to admin role
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA accounting TO accounting_admin;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA accounting TO accounting_admin;
@@ -0,0 +1,21 @@
+-- =============================================
+-- Migration 001: Ledger reconciliation runs
+-- =============================================
+-- Apply to databases created from an earlier init.sql
+BEGIN;
+CREATE TABLE IF NOT EXISTS accounting.reconciliation_runs (
+id BIGSERIAL PRIMARY KEY,
+started_at TIMESTAMP WITH TIME ZONE NOT NULL,
+finished_at TIMESTAMP WITH TIME ZONE,
+mode VARCHAR(20) NOT NULL CHECK (mode IN ('full', 'incremental')),
+accounts_checked INTEGER NOT NULL DEFAULT 0,
+accounts_drifted INTEGER NOT NULL DEFAULT 0,
+accounts_repaired INTEGER NOT NULL DEFAULT 0
+);
+COMMENT ON TABLE accounting.reconciliation_runs IS 'History of balance reconciliation runs against the transaction ledger';
+CREATE INDEX IF NOT EXISTS idx_reconciliation_runs_started_at ON accounting.reconciliation_runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_accounts_updated_at ON accounting.accounts(updated_at);
+GRANT SELECT, INSERT, UPDATE ON accounting.reconciliation_runs TO accounting_app;
+GRANT USAGE ON SEQUENCE accounting.reconciliation_runs_id_seq TO accounting_app;
+GRANT SELECT ON accounting.reconciliation_runs TO accounting_readonly;
+COMMIT;
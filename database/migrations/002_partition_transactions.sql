@@ -0,0 +1,185 @@
+-- =============================================
+-- Migration 002: Range partition accounting.transactions by transaction_date
+-- =============================================
+-- Rebuilds the transactions table as a partitioned table and copies the
+-- existing rows across. Takes an ACCESS EXCLUSIVE lock on transactions for
+-- the duration, so run it in a maintenance window.
+BEGIN;
+LOCK TABLE accounting.transactions IN ACCESS EXCLUSIVE MODE;
+
+-- Move the old table and its index names out of the way
+ALTER TABLE accounting.transactions RENAME TO transactions_unpartitioned;
+ALTER TABLE accounting.transactions_unpartitioned RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey;
+DROP INDEX IF EXISTS accounting.idx_transactions_account_id;
+DROP INDEX IF EXISTS accounting.idx_transactions_contra_account_id;
+DROP INDEX IF EXISTS accounting.idx_transactions_date;
+DROP INDEX IF EXISTS accounting.idx_transactions_void_status;
+DROP INDEX IF EXISTS accounting.idx_transactions_created_at;
+
+CREATE TABLE accounting.transactions (
+id UUID NOT NULL DEFAULT gen_random_uuid(),
+account_id UUID NOT NULL REFERENCES accounting.accounts(id),
+contra_account_id UUID NOT NULL REFERENCES accounting.accounts(id),
+transaction_date DATE NOT NULL,
+amount DECIMAL(19,4) NOT NULL CHECK (amount > 0),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN NOT NULL DEFAULT FALSE,
+created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+created_by VARCHAR(100) NOT NULL DEFAULT current_user,
+PRIMARY KEY (id, transaction_date),
+CHECK (account_id != contra_account_id)
+) PARTITION BY RANGE (transaction_date);
+COMMENT ON TABLE accounting.transactions IS 'Records all financial transactions between accounts';
+COMMENT ON COLUMN accounting.transactions.contra_account_id IS 'The counterparty account for the transaction';
+COMMENT ON COLUMN accounting.transactions.is_void IS 'Flag for voided/cancelled transactions';
+CREATE TABLE accounting.transactions_default PARTITION OF accounting.transactions DEFAULT;
+COMMENT ON TABLE accounting.transactions_default IS 'Default partition for transactions outside the created date ranges';
+
+-- Create the partition covering p_date ('month' or 'year' granularity).
+-- Rows already sitting in the default partition for that range are moved
+-- into the new partition.
+CREATE OR REPLACE FUNCTION accounting.create_transaction_partition(
+p_date DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_start DATE;
+v_end DATE;
+v_name TEXT;
+BEGIN
+IF p_granularity = 'month' THEN
+v_start := date_trunc('month', p_date)::date;
+v_end := (v_start + INTERVAL '1 month')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY_MM');
+ELSIF p_granularity = 'year' THEN
+v_start := date_trunc('year', p_date)::date;
+v_end := (v_start + INTERVAL '1 year')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY');
+ELSE
+RAISE EXCEPTION 'Unknown partition granularity: %', p_granularity;
+END IF;
+
+IF to_regclass(format('accounting.%I', v_name)) IS NOT NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (
+SELECT 1 FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end
+) THEN
+CREATE TEMP TABLE pg_temp.moved_transactions ON COMMIT DROP AS
+SELECT * FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+DELETE FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+INSERT INTO accounting.transactions SELECT * FROM pg_temp.moved_transactions;
+DROP TABLE pg_temp.moved_transactions;
+ELSE
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+END IF;
+RETURN v_name;
+END;
+$$;
+COMMENT ON FUNCTION accounting.create_transaction_partition(DATE, TEXT) IS 'Create the transactions partition covering a date, moving matching rows out of the default partition';
+-- Create every missing partition between two dates; returns the new names.
+-- Serialised with an advisory lock so concurrent callers do not collide.
+CREATE OR REPLACE FUNCTION accounting.ensure_transaction_partitions(
+p_from DATE,
+p_to DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS SETOF TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_step INTERVAL := CASE WHEN p_granularity = 'year' THEN INTERVAL '1 year' ELSE INTERVAL '1 month' END;
+v_date DATE := date_trunc(CASE WHEN p_granularity = 'year' THEN 'year' ELSE 'month' END, p_from)::date;
+v_name TEXT;
+BEGIN
+PERFORM pg_advisory_xact_lock(hashtext('accounting.transactions partitions'));
+WHILE v_date <= p_to LOOP
+v_name := accounting.create_transaction_partition(v_date, p_granularity);
+IF v_name IS NOT NULL THEN
+RETURN NEXT v_name;
+END IF;
+v_date := (v_date + v_step)::date;
+END LOOP;
+END;
+$$;
+COMMENT ON FUNCTION accounting.ensure_transaction_partitions(DATE, DATE, TEXT) IS 'Create all missing transactions partitions between two dates';
+-- Partitions covering every existing row plus the next three months
+SELECT accounting.ensure_transaction_partitions(
+LEAST(
+(SELECT min(transaction_date) FROM accounting.transactions_unpartitioned),
+CURRENT_DATE
+),
+(CURRENT_DATE + INTERVAL '3 months')::date
+);
+
+INSERT INTO accounting.transactions
+(id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by)
+SELECT id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by
+FROM accounting.transactions_unpartitioned;
+
+CREATE INDEX idx_transactions_account_id ON accounting.transactions(account_id);
+CREATE INDEX idx_transactions_contra_account_id ON accounting.transactions(contra_account_id);
+CREATE INDEX idx_transactions_date ON accounting.transactions(transaction_date);
+CREATE INDEX idx_transactions_void_status ON accounting.transactions(is_void) WHERE is_void= TRUE;
+CREATE INDEX idx_transactions_created_at ON accounting.transactions(created_at);
+
+-- Views bind to the table they were created against; point them at the new table
+CREATE OR REPLACE VIEW accounting.transaction_history AS
+SELECT
+t.id,
+t.transaction_date,
+a1.name as account_name,
+a2.name as contra_account_name,
+t.amount,
+t.description,
+t.reference_number,
+t.is_void,
+t.created_at
+FROM
+accounting.transactions t
+JOIN
+accounting.accounts a1 ON t.account_id = a1.id
+JOIN
+accounting.accounts a2 ON t.contra_account_id = a2.id
+ORDER BY
+t.transaction_date DESC, t.created_at DESC;
+CREATE OR REPLACE VIEW accounting.monthly_profit_loss AS
+SELECT
+date_trunc('month', t.transaction_date) as month,
+SUM(CASE WHEN a.type = 'INCOME' THEN t.amount ELSE 0 END) as total_income,
+SUM(CASE WHEN a.type = 'EXPENSE' THEN t.amount ELSE 0 END) as total_expenses,
+SUM(CASE WHEN a.type = 'INCOME' THEN t.amount ELSE -t.amount END) as net_profit_loss
+FROM
+accounting.transactions t
+JOIN
+accounting.accounts a ON t.account_id = a.id
+WHERE
+t.is_void = FALSE
+AND a.type IN ('INCOME', 'EXPENSE')
+GROUP BY
+date_trunc('month', t.transaction_date)
+ORDER BY
+month DESC;
+
+DROP TABLE accounting.transactions_unpartitioned;
+
+GRANT SELECT, INSERT, UPDATE ON accounting.transactions TO accounting_app;
+GRANT SELECT ON accounting.transactions TO accounting_readonly;
+GRANT ALL PRIVILEGES ON accounting.transactions TO accounting_admin;
+ANALYZE accounting.transactions;
+COMMIT;
@@ -0,0 +1,19 @@
+-- =============================================
+-- Migration 003: Workload-matched transaction indexes
+-- =============================================
+-- Apply after 002. Replaces the single-column transaction indexes with
+-- composite and partial indexes matching the list and report queries.
+-- Index builds on a partitioned table cannot run CONCURRENTLY, so schedule
+-- this in a maintenance window on large ledgers.
+BEGIN;
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON accounting.transactions(account_id, transaction_date, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_contra_account_date ON accounting.transactions(contra_account_id, transaction_date, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_date_created ON accounting.transactions(transaction_date, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_active_date ON accounting.transactions(transaction_date)
+    INCLUDE (account_id, contra_account_id, amount) WHERE is_void = FALSE;
+DROP INDEX IF EXISTS accounting.idx_transactions_account_id;
+DROP INDEX IF EXISTS accounting.idx_transactions_contra_account_id;
+DROP INDEX IF EXISTS accounting.idx_transactions_date;
+DROP INDEX IF EXISTS accounting.idx_transactions_void_status;
+COMMIT;
+ANALYZE accounting.transactions;
@@ -0,0 +1,149 @@
+-- =============================================
+-- Migration 004: Database-side posting functions
+-- =============================================
+-- Apply after 003. Adds accounting.post_transaction and
+-- accounting.void_transaction, which lock, validate, write and return a
+-- posted transaction in one round trip. The API falls back to ORM posting
+-- when POSTING_FUNCTION_ENABLED=false.
+BEGIN;
+-- Post a transaction in one round trip: lock both accounts in id order (so
+-- concurrent postings cannot deadlock), check funds, insert the row and move
+-- both balances. Returns the new row with account names and balances.
+-- Raises SQLSTATE AC404 when an account is missing and AC402 on
+-- insufficient funds.
+CREATE OR REPLACE FUNCTION accounting.post_transaction(
+p_account_id UUID,
+p_contra_account_id UUID,
+p_transaction_date DATE,
+p_amount NUMERIC,
+p_description VARCHAR DEFAULT NULL,
+p_reference_number VARCHAR DEFAULT NULL
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount DECIMAL(19,4),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance DECIMAL(19,4),
+contra_account_balance DECIMAL(19,4)
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+v_row accounting.transactions%ROWTYPE;
+BEGIN
+PERFORM 1 FROM accounting.accounts a
+WHERE a.id IN (p_account_id, p_contra_account_id)
+ORDER BY a.id
+FOR UPDATE;
+
+SELECT * INTO v_account FROM accounting.accounts a WHERE a.id = p_account_id;
+SELECT * INTO v_contra FROM accounting.accounts a WHERE a.id = p_contra_account_id;
+IF v_account.id IS NULL OR v_contra.id IS NULL THEN
+RAISE EXCEPTION 'One or both accounts not found' USING ERRCODE = 'AC404';
+END IF;
+
+IF v_account.type IN ('ASSET', 'LIABILITY')
+AND v_account.current_balance + p_amount < 0 THEN
+RAISE EXCEPTION 'Insufficient funds' USING ERRCODE = 'AC402';
+END IF;
+
+INSERT INTO accounting.transactions (
+account_id, contra_account_id, transaction_date, amount, description, reference_number
+) VALUES (
+p_account_id, p_contra_account_id, p_transaction_date, p_amount, p_description, p_reference_number
+)
+RETURNING * INTO v_row;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_account_id
+RETURNING a.current_balance INTO v_account.current_balance;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_contra_account_id
+RETURNING a.current_balance INTO v_contra.current_balance;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, v_row.is_void,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.post_transaction(UUID, UUID, DATE, NUMERIC, VARCHAR, VARCHAR) IS 'Record a transaction and update both account balances in one call';
+-- Void a transaction in one round trip: lock the row, then both accounts in
+-- id order, reverse the balances and flag the row. Raises AC404 when the
+-- transaction is missing and AC409 when it is already void.
+CREATE OR REPLACE FUNCTION accounting.void_transaction(
+p_transaction_id UUID
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount DECIMAL(19,4),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance DECIMAL(19,4),
+contra_account_balance DECIMAL(19,4)
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_row accounting.transactions%ROWTYPE;
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+BEGIN
+SELECT * INTO v_row FROM accounting.transactions t
+WHERE t.id = p_transaction_id
+FOR UPDATE;
+IF NOT FOUND THEN
+RAISE EXCEPTION 'Transaction not found' USING ERRCODE = 'AC404';
+END IF;
+IF v_row.is_void THEN
+RAISE EXCEPTION 'Transaction already voided' USING ERRCODE = 'AC409';
+END IF;
+
+PERFORM 1 FROM accounting.accounts a
+WHERE a.id IN (v_row.account_id, v_row.contra_account_id)
+ORDER BY a.id
+FOR UPDATE;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.account_id
+RETURNING * INTO v_account;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.contra_account_id
+RETURNING * INTO v_contra;
+UPDATE accounting.transactions t
+SET is_void = TRUE
+WHERE t.id = v_row.id AND t.transaction_date = v_row.transaction_date;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, TRUE,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.void_transaction(UUID) IS 'Void a transaction and reverse both account balances in one call';
+COMMIT;
@@ -0,0 +1,127 @@
+-- =============================================
+-- Migration 005: Balance snapshot maintenance
+-- =============================================
+-- Apply after 004. balance_history snapshots seed account statements; the
+-- statement-level triggers below keep them correct when postings or voids
+-- are dated on or before a snapshot. create_transaction_partition is
+-- replaced so rows it moves out of the default partition are not counted
+-- twice. Take snapshots with: flask snapshot-balances --date YYYY-MM-DD
+BEGIN;
+-- Create the partition covering p_date ('month' or 'year' granularity).
+-- Rows already sitting in the default partition for that range are moved
+-- into the new partition.
+CREATE OR REPLACE FUNCTION accounting.create_transaction_partition(
+p_date DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_start DATE;
+v_end DATE;
+v_name TEXT;
+BEGIN
+IF p_granularity = 'month' THEN
+v_start := date_trunc('month', p_date)::date;
+v_end := (v_start + INTERVAL '1 month')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY_MM');
+ELSIF p_granularity = 'year' THEN
+v_start := date_trunc('year', p_date)::date;
+v_end := (v_start + INTERVAL '1 year')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY');
+ELSE
+RAISE EXCEPTION 'Unknown partition granularity: %', p_granularity;
+END IF;
+
+IF to_regclass(format('accounting.%I', v_name)) IS NOT NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (
+SELECT 1 FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end
+) THEN
+CREATE TEMP TABLE pg_temp.moved_transactions ON COMMIT DROP AS
+SELECT * FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+DELETE FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+PERFORM set_config('accounting.moving_rows', 'on', true);
+INSERT INTO accounting.transactions SELECT * FROM pg_temp.moved_transactions;
+PERFORM set_config('accounting.moving_rows', 'off', true);
+DROP TABLE pg_temp.moved_transactions;
+ELSE
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+END IF;
+RETURN v_name;
+END;
+$$;
+COMMENT ON FUNCTION accounting.create_transaction_partition(DATE, TEXT) IS 'Create the transactions partition covering a date, moving matching rows out of the default partition';
+-- balance_history rows hold an account's closing balance at the end of
+-- balance_date and seed statement opening balances. Postings and voids dated
+-- on or before a snapshot move it by the same amount, so back-dated entries
+-- never leave a stale snapshot. Rows that create_transaction_partition moves
+-- out of the default partition are already counted and are skipped.
+CREATE OR REPLACE FUNCTION accounting.adjust_balance_snapshots()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+IF TG_OP = 'INSERT' THEN
+UPDATE accounting.balance_history h
+SET balance = h.balance + c.delta
+FROM (
+SELECT s.id, SUM(ch.delta) AS delta
+FROM accounting.balance_history s
+JOIN (
+SELECT account_id, transaction_date, amount AS delta FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, -amount FROM new_rows WHERE NOT is_void
+) ch ON ch.account_id = s.account_id AND ch.transaction_date <= s.balance_date
+GROUP BY s.id
+) c
+WHERE h.id = c.id;
+ELSE
+UPDATE accounting.balance_history h
+SET balance = h.balance + c.delta
+FROM (
+SELECT s.id, SUM(ch.delta) AS delta
+FROM accounting.balance_history s
+JOIN (
+SELECT account_id, transaction_date, amount AS delta FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, -amount FROM new_rows WHERE NOT is_void
+UNION ALL
+SELECT account_id, transaction_date, -amount FROM old_rows WHERE NOT is_void
+UNION ALL
+SELECT contra_account_id, transaction_date, amount FROM old_rows WHERE NOT is_void
+) ch ON ch.account_id = s.account_id AND ch.transaction_date <= s.balance_date
+GROUP BY s.id
+HAVING SUM(ch.delta) <> 0
+) c
+WHERE h.id = c.id;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.adjust_balance_snapshots() IS 'Keep balance snapshots in step with postings and voids dated on or before them';
+CREATE TRIGGER transactions_adjust_snapshots_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.adjust_balance_snapshots();
+CREATE TRIGGER transactions_adjust_snapshots_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.adjust_balance_snapshots();
+COMMIT;
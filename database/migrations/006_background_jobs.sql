@@ -0,0 +1,37 @@
+-- =============================================
+-- Migration 006: Background jobs
+-- =============================================
+-- Apply after 005. Adds the queue table read by: flask jobs worker
+BEGIN;
+-- Queue of long-running reports and exports. Workers claim the oldest
+-- runnable row with FOR UPDATE SKIP LOCKED and send heartbeats while a job
+-- runs; results are written to files on the worker host (JOB_RESULT_DIR).
+CREATE TABLE IF NOT EXISTS accounting.jobs (
+id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+kind VARCHAR(50) NOT NULL,
+params JSONB NOT NULL DEFAULT '{}',
+status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+progress NUMERIC(5, 2) NOT NULL DEFAULT 0 CHECK (progress BETWEEN 0 AND 100),
+attempts INTEGER NOT NULL DEFAULT 0,
+max_attempts INTEGER NOT NULL CHECK (max_attempts > 0),
+cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+result_path TEXT,
+error TEXT,
+created_by VARCHAR(100) NOT NULL,
+run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+heartbeat_at TIMESTAMP WITH TIME ZONE,
+created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+started_at TIMESTAMP WITH TIME ZONE,
+finished_at TIMESTAMP WITH TIME ZONE
+);
+COMMENT ON TABLE accounting.jobs IS 'Background report and export jobs run by the job workers';
+COMMENT ON COLUMN accounting.jobs.run_after IS 'Earliest time the job may be claimed; pushed back between retries';
+COMMENT ON COLUMN accounting.jobs.heartbeat_at IS 'Last heartbeat of the worker running the job; stale jobs are requeued';
+-- Dequeue reads only queued rows in run_after order
+CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON accounting.jobs(run_after) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_running_heartbeat ON accounting.jobs(heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON accounting.jobs(finished_at) WHERE finished_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_jobs_created_by ON accounting.jobs(created_by, created_at);
+GRANT SELECT, INSERT, UPDATE, DELETE ON accounting.jobs TO accounting_app;
+GRANT SELECT ON accounting.jobs TO accounting_readonly;
+COMMIT;
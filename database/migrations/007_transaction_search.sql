@@ -0,0 +1,82 @@
+-- =============================================
+-- Migration 007: Transaction search
+-- =============================================
+-- Apply after 006. Adds the generated full-text search column and its GIN
+-- index read by GET /api/transactions/search, and a btree index for exact
+-- reference_number lookups. Adding a stored generated column rewrites the
+-- transactions partitions, so run it in a maintenance window.
+-- create_transaction_partition is replaced because generated columns cannot
+-- be inserted into: it now lists the columns of the rows it moves.
+BEGIN;
+ALTER TABLE accounting.transactions
+ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+setweight(to_tsvector('simple', coalesce(reference_number, '')), 'A') ||
+setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+) STORED;
+CREATE INDEX IF NOT EXISTS idx_transactions_search ON accounting.transactions USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_transactions_reference_number ON accounting.transactions(reference_number);
+-- Create the partition covering p_date ('month' or 'year' granularity).
+-- Rows already sitting in the default partition for that range are moved
+-- into the new partition.
+CREATE OR REPLACE FUNCTION accounting.create_transaction_partition(
+p_date DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_start DATE;
+v_end DATE;
+v_name TEXT;
+BEGIN
+IF p_granularity = 'month' THEN
+v_start := date_trunc('month', p_date)::date;
+v_end := (v_start + INTERVAL '1 month')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY_MM');
+ELSIF p_granularity = 'year' THEN
+v_start := date_trunc('year', p_date)::date;
+v_end := (v_start + INTERVAL '1 year')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY');
+ELSE
+RAISE EXCEPTION 'Unknown partition granularity: %', p_granularity;
+END IF;
+
+IF to_regclass(format('accounting.%I', v_name)) IS NOT NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (
+SELECT 1 FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end
+) THEN
+CREATE TEMP TABLE pg_temp.moved_transactions ON COMMIT DROP AS
+SELECT * FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+DELETE FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+PERFORM set_config('accounting.moving_rows', 'on', true);
+-- search_vector is generated, so the columns are listed
+INSERT INTO accounting.transactions (
+id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by
+)
+SELECT id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by
+FROM pg_temp.moved_transactions;
+PERFORM set_config('accounting.moving_rows', 'off', true);
+DROP TABLE pg_temp.moved_transactions;
+ELSE
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+END IF;
+RETURN v_name;
+END;
+$$;
+COMMENT ON FUNCTION accounting.create_transaction_partition(DATE, TEXT) IS 'Create the transactions partition covering a date, moving matching rows out of the default partition';
+COMMIT;
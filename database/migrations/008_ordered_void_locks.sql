@@ -0,0 +1,73 @@
+-- =============================================
+-- Migration 008: Ordered void locks
+-- =============================================
+-- Apply after 007. accounting.void_transaction now takes the transaction row
+-- and both account locks in a single statement, accounts in id order, like
+-- every other write path.
+BEGIN;
+-- Void a transaction in one round trip: lock the row and both accounts in
+-- id order, reverse the balances and flag the row. Raises AC404 when the
+-- transaction is missing and AC409 when it is already void.
+CREATE OR REPLACE FUNCTION accounting.void_transaction(
+p_transaction_id UUID
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount DECIMAL(19,4),
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance DECIMAL(19,4),
+contra_account_balance DECIMAL(19,4)
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_row accounting.transactions%ROWTYPE;
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+BEGIN
+-- The transaction row and both accounts are locked in one statement,
+-- accounts in id order like every other write path
+PERFORM 1 FROM accounting.transactions t
+JOIN accounting.accounts a ON a.id IN (t.account_id, t.contra_account_id)
+WHERE t.id = p_transaction_id
+ORDER BY a.id
+FOR UPDATE;
+SELECT * INTO v_row FROM accounting.transactions t
+WHERE t.id = p_transaction_id;
+IF NOT FOUND THEN
+RAISE EXCEPTION 'Transaction not found' USING ERRCODE = 'AC404';
+END IF;
+IF v_row.is_void THEN
+RAISE EXCEPTION 'Transaction already voided' USING ERRCODE = 'AC409';
+END IF;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.account_id
+RETURNING * INTO v_account;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.contra_account_id
+RETURNING * INTO v_contra;
+UPDATE accounting.transactions t
+SET is_void = TRUE
+WHERE t.id = v_row.id AND t.transaction_date = v_row.transaction_date;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, TRUE,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.void_transaction(UUID) IS 'Void a transaction and reverse both account balances in one call';
+COMMIT;
@@ -0,0 +1,69 @@
+-- =============================================
+-- Migration 009: Change feed outbox
+-- =============================================
+-- Apply after 008. Adds accounting.change_outbox and the triggers that fill
+-- it, read by GET /api/changes. Changes made before the migration are not
+-- in the feed: consumers start with a full download and since=now.
+BEGIN;
+-- Outbox of account and transaction changes behind /api/changes. Statement
+-- triggers add one row per changed record in the writing transaction, so
+-- every path (ORM, posting functions, imports, repairs) is covered. txid is
+-- the writing transaction's id: the feed only returns rows of transactions
+-- older than every running one, so none can appear behind a reader's
+-- position. Rows moved between partitions are not changes and are skipped.
+CREATE TABLE IF NOT EXISTS accounting.change_outbox (
+id BIGSERIAL PRIMARY KEY,
+txid BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+entity VARCHAR(20) NOT NULL CHECK (entity IN ('account', 'transaction')),
+entity_id UUID NOT NULL,
+operation VARCHAR(10) NOT NULL CHECK (operation IN ('INSERT', 'UPDATE', 'VOID')),
+changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE accounting.change_outbox IS 'Account and transaction changes, read by the change feed';
+COMMENT ON COLUMN accounting.change_outbox.txid IS 'Id of the transaction that made the change (pg_current_xact_id)';
+CREATE INDEX IF NOT EXISTS idx_change_outbox_position ON accounting.change_outbox(txid, id);
+CREATE OR REPLACE FUNCTION accounting.record_changes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+IF TG_ARGV[0] = 'transaction' AND TG_OP = 'UPDATE' THEN
+INSERT INTO accounting.change_outbox (entity, entity_id, operation)
+SELECT 'transaction', id, CASE WHEN is_void THEN 'VOID' ELSE 'UPDATE' END
+FROM new_rows ORDER BY id;
+ELSE
+INSERT INTO accounting.change_outbox (entity, entity_id, operation)
+SELECT TG_ARGV[0], id, TG_OP FROM new_rows ORDER BY id;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.record_changes() IS 'Add the rows changed by a statement to the change outbox';
+DROP TRIGGER IF EXISTS accounts_record_changes_insert ON accounting.accounts;
+CREATE TRIGGER accounts_record_changes_insert
+AFTER INSERT ON accounting.accounts
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('account');
+DROP TRIGGER IF EXISTS accounts_record_changes_update ON accounting.accounts;
+CREATE TRIGGER accounts_record_changes_update
+AFTER UPDATE ON accounting.accounts
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('account');
+DROP TRIGGER IF EXISTS transactions_record_changes_insert ON accounting.transactions;
+CREATE TRIGGER transactions_record_changes_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('transaction');
+DROP TRIGGER IF EXISTS transactions_record_changes_update ON accounting.transactions;
+CREATE TRIGGER transactions_record_changes_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.record_changes('transaction');
+GRANT SELECT, INSERT ON accounting.change_outbox TO accounting_app;
+GRANT USAGE ON SEQUENCE accounting.change_outbox_id_seq TO accounting_app;
+GRANT SELECT ON accounting.change_outbox TO accounting_readonly;
+COMMIT;
@@ -0,0 +1,252 @@
+-- =============================================
+-- Migration 010: Minor-unit amounts
+-- =============================================
+-- Apply after 009, together with AMOUNT_STORAGE=minor_units for the
+-- application; skip it to keep DECIMAL(19,4) amounts, the default.
+-- Amounts and balances become BIGINT counts of 1/10000 (the scale of
+-- DECIMAL(19,4)), so sums and balance updates use integer arithmetic. The
+-- API still takes and returns decimal amounts; the application converts
+-- exactly at the boundary. The largest amount a BIGINT holds is
+-- 922337203685477.5807, so the migration stops if a stored value is larger.
+-- Every table holding amounts is rewritten under an exclusive lock: stop
+-- the application while it runs. The posting functions take and return
+-- minor units, and the reporting views still show decimal amounts.
+-- To go back, ALTER the columns TYPE DECIMAL(19,4) USING (col / 10000.0),
+-- then re-apply 004 and 008 and recreate the views from init.sql.
+BEGIN;
+DO $$
+BEGIN
+IF EXISTS (
+SELECT 1 FROM accounting.accounts
+WHERE greatest(abs(opening_balance), abs(current_balance)) > 922337203685477.5807
+) OR EXISTS (
+SELECT 1 FROM accounting.transactions WHERE amount > 922337203685477.5807
+) OR EXISTS (
+SELECT 1 FROM accounting.balance_history
+WHERE abs(balance) > 922337203685477.5807
+) THEN
+RAISE EXCEPTION 'Amounts beyond 922337203685477.5807 cannot be stored as BIGINT minor units';
+END IF;
+END;
+$$;
+-- Views depend on the amount columns
+DROP VIEW accounting.current_balances;
+DROP VIEW accounting.transaction_history;
+DROP VIEW accounting.monthly_profit_loss;
+-- Return types change, so the functions are dropped and created again
+DROP FUNCTION accounting.post_transaction(UUID, UUID, DATE, NUMERIC, VARCHAR, VARCHAR);
+DROP FUNCTION accounting.void_transaction(UUID);
+ALTER TABLE accounting.accounts
+ALTER COLUMN opening_balance TYPE BIGINT USING (opening_balance * 10000)::BIGINT,
+ALTER COLUMN current_balance TYPE BIGINT USING (current_balance * 10000)::BIGINT;
+ALTER TABLE accounting.transactions
+ALTER COLUMN amount TYPE BIGINT USING (amount * 10000)::BIGINT;
+ALTER TABLE accounting.balance_history
+ALTER COLUMN balance TYPE BIGINT USING (balance * 10000)::BIGINT;
+-- Created by init.sql and 011
+ALTER TABLE IF EXISTS accounting.transactions_archive
+ALTER COLUMN amount TYPE BIGINT USING (amount * 10000)::BIGINT;
+COMMENT ON COLUMN accounting.accounts.opening_balance IS 'Initial balance when account was created, in minor units (1/10000)';
+COMMENT ON COLUMN accounting.accounts.current_balance IS 'Current balance after all transactions, in minor units (1/10000)';
+COMMENT ON COLUMN accounting.transactions.amount IS 'Transaction amount in minor units (1/10000)';
+COMMENT ON COLUMN accounting.balance_history.balance IS 'Closing balance on balance_date, in minor units (1/10000)';
+-- Post a transaction in one round trip: lock both accounts in id order (so
+-- concurrent postings cannot deadlock), check funds, insert the row and move
+-- both balances. Returns the new row with account names and balances.
+-- Raises SQLSTATE AC404 when an account is missing and AC402 on
+-- insufficient funds.
+CREATE OR REPLACE FUNCTION accounting.post_transaction(
+p_account_id UUID,
+p_contra_account_id UUID,
+p_transaction_date DATE,
+p_amount BIGINT,
+p_description VARCHAR DEFAULT NULL,
+p_reference_number VARCHAR DEFAULT NULL
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount BIGINT,
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance BIGINT,
+contra_account_balance BIGINT
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+v_row accounting.transactions%ROWTYPE;
+BEGIN
+PERFORM 1 FROM accounting.accounts a
+WHERE a.id IN (p_account_id, p_contra_account_id)
+ORDER BY a.id
+FOR UPDATE;
+
+SELECT * INTO v_account FROM accounting.accounts a WHERE a.id = p_account_id;
+SELECT * INTO v_contra FROM accounting.accounts a WHERE a.id = p_contra_account_id;
+IF v_account.id IS NULL OR v_contra.id IS NULL THEN
+RAISE EXCEPTION 'One or both accounts not found' USING ERRCODE = 'AC404';
+END IF;
+
+IF v_account.type IN ('ASSET', 'LIABILITY')
+AND v_account.current_balance + p_amount < 0 THEN
+RAISE EXCEPTION 'Insufficient funds' USING ERRCODE = 'AC402';
+END IF;
+
+INSERT INTO accounting.transactions (
+account_id, contra_account_id, transaction_date, amount, description, reference_number
+) VALUES (
+p_account_id, p_contra_account_id, p_transaction_date, p_amount, p_description, p_reference_number
+)
+RETURNING * INTO v_row;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_account_id
+RETURNING a.current_balance INTO v_account.current_balance;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - p_amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = p_contra_account_id
+RETURNING a.current_balance INTO v_contra.current_balance;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, v_row.is_void,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.post_transaction(UUID, UUID, DATE, BIGINT, VARCHAR, VARCHAR) IS 'Record a transaction and update both account balances in one call';
+-- Void a transaction in one round trip: lock the row and both accounts in
+-- id order, reverse the balances and flag the row. Raises AC404 when the
+-- transaction is missing and AC409 when it is already void.
+CREATE OR REPLACE FUNCTION accounting.void_transaction(
+p_transaction_id UUID
+) RETURNS TABLE (
+id UUID,
+account_id UUID,
+contra_account_id UUID,
+transaction_date DATE,
+amount BIGINT,
+description VARCHAR(500),
+reference_number VARCHAR(100),
+is_void BOOLEAN,
+created_at TIMESTAMP WITH TIME ZONE,
+created_by VARCHAR(100),
+account_name VARCHAR(255),
+contra_account_name VARCHAR(255),
+account_balance BIGINT,
+contra_account_balance BIGINT
+)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+v_row accounting.transactions%ROWTYPE;
+v_account accounting.accounts%ROWTYPE;
+v_contra accounting.accounts%ROWTYPE;
+BEGIN
+-- The transaction row and both accounts are locked in one statement,
+-- accounts in id order like every other write path
+PERFORM 1 FROM accounting.transactions t
+JOIN accounting.accounts a ON a.id IN (t.account_id, t.contra_account_id)
+WHERE t.id = p_transaction_id
+ORDER BY a.id
+FOR UPDATE;
+SELECT * INTO v_row FROM accounting.transactions t
+WHERE t.id = p_transaction_id;
+IF NOT FOUND THEN
+RAISE EXCEPTION 'Transaction not found' USING ERRCODE = 'AC404';
+END IF;
+IF v_row.is_void THEN
+RAISE EXCEPTION 'Transaction already voided' USING ERRCODE = 'AC409';
+END IF;
+
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance - v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.account_id
+RETURNING * INTO v_account;
+UPDATE accounting.accounts a
+SET current_balance = a.current_balance + v_row.amount, updated_at = CURRENT_TIMESTAMP
+WHERE a.id = v_row.contra_account_id
+RETURNING * INTO v_contra;
+UPDATE accounting.transactions t
+SET is_void = TRUE
+WHERE t.id = v_row.id AND t.transaction_date = v_row.transaction_date;
+
+RETURN QUERY SELECT
+v_row.id, v_row.account_id, v_row.contra_account_id, v_row.transaction_date,
+v_row.amount, v_row.description, v_row.reference_number, TRUE,
+v_row.created_at, v_row.created_by, v_account.name, v_contra.name,
+v_account.current_balance, v_contra.current_balance;
+END;
+$$;
+COMMENT ON FUNCTION accounting.void_transaction(UUID) IS 'Void a transaction and reverse both account balances in one call';
+-- Reporting views, showing amounts as DECIMAL(19,4)
+-- View for current account balances
+CREATE VIEW accounting.current_balances AS
+SELECT
+a.id,
+a.name,
+a.type,
+(a.current_balance / 10000.0)::DECIMAL(19,4) AS current_balance,
+a.updated_at as last_updated
+FROM
+accounting.accounts a
+ORDER BY
+a.type, a.name;
+COMMENT ON VIEW accounting.current_balances IS 'Current balance summary for all accounts';
+-- View for transaction history with account names
+CREATE VIEW accounting.transaction_history AS
+SELECT
+t.id,
+t.transaction_date,
+a1.name as account_name,
+a2.name as contra_account_name,
+(t.amount / 10000.0)::DECIMAL(19,4) AS amount,
+t.description,
+t.reference_number,
+t.is_void,
+t.created_at
+FROM
+accounting.transactions t
+JOIN
+accounting.accounts a1 ON t.account_id = a1.id
+JOIN
+accounting.accounts a2 ON t.contra_account_id = a2.id
+ORDER BY
+t.transaction_date DESC, t.created_at DESC;
+COMMENT ON VIEW accounting.transaction_history IS 'Detailed transaction history with account names';
+-- View for monthly profit/loss (income minus expenses)
+CREATE VIEW accounting.monthly_profit_loss AS
+SELECT
+date_trunc('month', t.transaction_date) as month,
+(SUM(CASE WHEN a.type = 'INCOME' THEN t.amount ELSE 0 END) / 10000.0)::DECIMAL(19,4) as total_income,
+(SUM(CASE WHEN a.type = 'EXPENSE' THEN t.amount ELSE 0 END) / 10000.0)::DECIMAL(19,4) as total_expenses,
+(SUM(CASE WHEN a.type = 'INCOME' THEN t.amount ELSE -t.amount END) / 10000.0)::DECIMAL(19,4) as net_profit_loss
+FROM
+accounting.transactions t
+JOIN
+accounting.accounts a ON t.account_id = a.id
+WHERE
+t.is_void = FALSE
+AND a.type IN ('INCOME', 'EXPENSE')
+GROUP BY
+date_trunc('month', t.transaction_date)
+ORDER BY
+month DESC;
+COMMENT ON VIEW accounting.monthly_profit_loss IS 'Monthly profit/loss calculation (income minus expenses)';
+GRANT SELECT ON accounting.current_balances, accounting.transaction_history,
+accounting.monthly_profit_loss TO accounting_app, accounting_readonly;
+GRANT ALL PRIVILEGES ON accounting.current_balances, accounting.transaction_history,
+accounting.monthly_profit_loss TO accounting_admin;
+COMMIT;
@@ -0,0 +1,75 @@
+-- =============================================
+-- Migration 011: Period close
+-- =============================================
+-- Apply after 010, or after 009 when amounts stay DECIMAL(19,4): the
+-- archive table copies the current column types of accounting.transactions.
+-- Adds accounting.closed_periods, the triggers that lock closed periods
+-- against postings and voids, and accounting.transactions_archive, filled
+-- by "flask periods close --archive". No period is closed by the migration.
+BEGIN;
+-- A closed period ends at period_end and covers every earlier date. Closing
+-- freezes each account's balance at period_end in balance_history, derived
+-- from the previous close and the period's postings, and locks the period:
+-- the statement triggers below reject postings dated in it and voids of its
+-- transactions on every write path with SQLSTATE AC423. Rows moved between
+-- partitions are not new postings and are let through.
+CREATE TABLE IF NOT EXISTS accounting.closed_periods (
+period_end DATE PRIMARY KEY,
+archived BOOLEAN NOT NULL DEFAULT FALSE,
+closed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+closed_by VARCHAR(100) NOT NULL DEFAULT current_user
+);
+COMMENT ON TABLE accounting.closed_periods IS 'Closed accounting periods; postings dated on or before the latest period_end are rejected';
+COMMENT ON COLUMN accounting.closed_periods.archived IS 'Whether the transactions through period_end were moved to transactions_archive';
+-- Transactions of archived periods, moved out of the partitioned table so
+-- its indexes and partitions only hold the open period. Same columns as
+-- accounting.transactions, with search_vector stored as a plain column.
+CREATE TABLE IF NOT EXISTS accounting.transactions_archive (
+LIKE accounting.transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+PRIMARY KEY (id)
+);
+COMMENT ON TABLE accounting.transactions_archive IS 'Transactions of archived closed periods';
+CREATE INDEX IF NOT EXISTS idx_transactions_archive_date ON accounting.transactions_archive(transaction_date);
+CREATE OR REPLACE FUNCTION accounting.check_period_open()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_closed DATE;
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NULL;
+END IF;
+
+SELECT max(period_end) INTO v_closed FROM accounting.closed_periods;
+IF v_closed IS NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (SELECT 1 FROM new_rows WHERE transaction_date <= v_closed) THEN
+RAISE EXCEPTION 'Period closed through %', v_closed USING ERRCODE = 'AC423';
+END IF;
+-- Voids and other updates of a closed period's rows
+IF TG_OP = 'UPDATE' THEN
+IF EXISTS (SELECT 1 FROM old_rows WHERE transaction_date <= v_closed) THEN
+RAISE EXCEPTION 'Period closed through %', v_closed USING ERRCODE = 'AC423';
+END IF;
+END IF;
+RETURN NULL;
+END;
+$$;
+COMMENT ON FUNCTION accounting.check_period_open() IS 'Reject postings and voids dated in a closed period';
+DROP TRIGGER IF EXISTS transactions_check_period_open_insert ON accounting.transactions;
+CREATE TRIGGER transactions_check_period_open_insert
+AFTER INSERT ON accounting.transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.check_period_open();
+DROP TRIGGER IF EXISTS transactions_check_period_open_update ON accounting.transactions;
+CREATE TRIGGER transactions_check_period_open_update
+AFTER UPDATE ON accounting.transactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.check_period_open();
+GRANT SELECT, INSERT, UPDATE ON accounting.closed_periods TO accounting_app;
+GRANT SELECT, INSERT ON accounting.transactions_archive TO accounting_app;
+GRANT SELECT ON accounting.closed_periods, accounting.transactions_archive TO accounting_readonly;
+COMMIT;
@@ -0,0 +1,94 @@
+-- =============================================
+-- Migration 012: Multi-leg journal entries
+-- =============================================
+-- Apply after 011. Adds accounting.journal_entries and the
+-- transactions.journal_entry_id column linking an entry to the two-leg
+-- transactions that carry its legs, posted by POST /api/journal-entries.
+-- Existing transactions belong to no entry. The column is appended to
+-- accounting.transactions_archive too, keeping its columns in step with
+-- the ledger's for archiving. create_transaction_partition is replaced to
+-- carry the column over when it moves rows out of the default partition.
+BEGIN;
+CREATE TABLE IF NOT EXISTS accounting.journal_entries (
+id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+entry_date DATE NOT NULL,
+description VARCHAR(500),
+reference_number VARCHAR(100),
+created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+created_by VARCHAR(100) NOT NULL DEFAULT current_user
+);
+COMMENT ON TABLE accounting.journal_entries IS 'Multi-leg journal entries, posted as the transactions referencing them';
+ALTER TABLE accounting.transactions
+ADD COLUMN IF NOT EXISTS journal_entry_id UUID REFERENCES accounting.journal_entries(id);
+COMMENT ON COLUMN accounting.transactions.journal_entry_id IS 'The journal entry this transaction carries legs of, if any';
+ALTER TABLE accounting.transactions_archive
+ADD COLUMN IF NOT EXISTS journal_entry_id UUID;
+CREATE INDEX IF NOT EXISTS idx_transactions_journal_entry ON accounting.transactions(journal_entry_id)
+    WHERE journal_entry_id IS NOT NULL;
+-- Create the partition covering p_date ('month' or 'year' granularity).
+-- Rows already sitting in the default partition for that range are moved
+-- into the new partition.
+CREATE OR REPLACE FUNCTION accounting.create_transaction_partition(
+p_date DATE,
+p_granularity TEXT DEFAULT 'month'
+) RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+v_start DATE;
+v_end DATE;
+v_name TEXT;
+BEGIN
+IF p_granularity = 'month' THEN
+v_start := date_trunc('month', p_date)::date;
+v_end := (v_start + INTERVAL '1 month')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY_MM');
+ELSIF p_granularity = 'year' THEN
+v_start := date_trunc('year', p_date)::date;
+v_end := (v_start + INTERVAL '1 year')::date;
+v_name := 'transactions_' || to_char(v_start, 'YYYY');
+ELSE
+RAISE EXCEPTION 'Unknown partition granularity: %', p_granularity;
+END IF;
+
+IF to_regclass(format('accounting.%I', v_name)) IS NOT NULL THEN
+RETURN NULL;
+END IF;
+
+IF EXISTS (
+SELECT 1 FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end
+) THEN
+CREATE TEMP TABLE pg_temp.moved_transactions ON COMMIT DROP AS
+SELECT * FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+DELETE FROM accounting.transactions_default
+WHERE transaction_date >= v_start AND transaction_date < v_end;
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+PERFORM set_config('accounting.moving_rows', 'on', true);
+-- search_vector is generated, so the columns are listed
+INSERT INTO accounting.transactions (
+id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by, journal_entry_id
+)
+SELECT id, account_id, contra_account_id, transaction_date, amount, description,
+reference_number, is_void, created_at, created_by, journal_entry_id
+FROM pg_temp.moved_transactions;
+PERFORM set_config('accounting.moving_rows', 'off', true);
+DROP TABLE pg_temp.moved_transactions;
+ELSE
+EXECUTE format(
+'CREATE TABLE accounting.%I PARTITION OF accounting.transactions FOR VALUES FROM (%L) TO (%L)',
+v_name, v_start, v_end
+);
+END IF;
+RETURN v_name;
+END;
+$$;
+COMMENT ON FUNCTION accounting.create_transaction_partition(DATE, TEXT) IS 'Create the transactions partition covering a date, moving matching rows out of the default partition';
+GRANT SELECT, INSERT ON accounting.journal_entries TO accounting_app;
+GRANT SELECT ON accounting.journal_entries TO accounting_readonly;
+COMMIT;
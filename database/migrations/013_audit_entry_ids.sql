@@ -0,0 +1,12 @@
+-- =============================================
+-- Migration 013: Audit record entry ids
+-- =============================================
+-- Apply after 012. The audit writer gives every record an entry_id and
+-- skips ids already written when it replays its spool file, so a crash
+-- between a replay's commit and the file's removal cannot duplicate audit
+-- records. Existing records keep a NULL entry_id.
+BEGIN;
+ALTER TABLE accounting.audit_log ADD COLUMN IF NOT EXISTS entry_id UUID;
+COMMENT ON COLUMN accounting.audit_log.entry_id IS 'Id the audit writer gives each record, so replaying its spool writes a record once';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_log_entry_id ON accounting.audit_log(entry_id);
+COMMIT;
@@ -0,0 +1,11 @@
+-- =============================================
+-- Migration 014: Voids in incremental reconciliation
+-- =============================================
+-- Apply after 013. Incremental reconciliation also re-checks the accounts
+-- of transactions voided or updated since the last run, found through the
+-- change outbox. This partial index keeps that lookup off the outbox's
+-- insert rows.
+BEGIN;
+CREATE INDEX IF NOT EXISTS idx_change_outbox_transaction_updates ON accounting.change_outbox(changed_at)
+    WHERE entity = 'transaction' AND operation <> 'INSERT';
+COMMIT;
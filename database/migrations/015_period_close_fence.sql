@@ -0,0 +1,43 @@
+-- =============================================
+-- Migration 015: Period close fence
+-- =============================================
+-- Apply after 014. Closing a period no longer locks accounting.transactions
+-- in SHARE mode, which held up every posting for the whole close. Instead
+-- postings dated before the current day and every update of a transaction
+-- take accounting.closed_periods in ROW EXCLUSIVE mode, which conflicts
+-- with the close's SHARE ROW EXCLUSIVE lock: backdated postings and voids
+-- wait for a close in progress and the close waits for those in flight,
+-- while postings dated today or later run alongside it. Closes now only
+-- accept periods that ended before yesterday, so a transaction would have
+-- to stay open for over a day to post into one without the fence.
+BEGIN;
+-- A close takes closed_periods in SHARE ROW EXCLUSIVE mode. Postings dated
+-- before the current day and every update take it in ROW EXCLUSIVE mode
+-- first, so they wait for a close in progress and the close waits for them;
+-- postings dated today or later never touch a period that can be closed and
+-- run alongside it. The lock is taken before any row or snapshot is written,
+-- so a waiting void cannot hold a row the archival DELETE needs.
+CREATE OR REPLACE FUNCTION accounting.fence_period_close()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+IF current_setting('accounting.moving_rows', true) = 'on' THEN
+RETURN NEW;
+END IF;
+
+LOCK TABLE accounting.closed_periods IN ROW EXCLUSIVE MODE;
+RETURN NEW;
+END;
+$$;
+COMMENT ON FUNCTION accounting.fence_period_close() IS 'Make backdated postings and voids wait for a period close in progress';
+DROP TRIGGER IF EXISTS transactions_fence_period_close_insert ON accounting.transactions;
+CREATE TRIGGER transactions_fence_period_close_insert
+BEFORE INSERT ON accounting.transactions
+FOR EACH ROW WHEN (NEW.transaction_date < CURRENT_DATE)
+EXECUTE FUNCTION accounting.fence_period_close();
+DROP TRIGGER IF EXISTS transactions_fence_period_close_update ON accounting.transactions;
+CREATE TRIGGER transactions_fence_period_close_update
+BEFORE UPDATE ON accounting.transactions
+FOR EACH STATEMENT EXECUTE FUNCTION accounting.fence_period_close();
+COMMIT;
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Load driver for the Apartment Accounting System API.
+
+Replays a weighted mix of login, list, get, post, void and report calls
+either at a fixed concurrency (closed loop: each worker sends its next
+request as soon as the previous one returns) or at a fixed arrival rate
+(open loop: requests are scheduled on a Poisson clock and latency is
+measured from the scheduled start, so a slow server cannot hide its queueing
+delay). Reports throughput and p50/p95/p99 latency per endpoint and can save
+the results as a baseline or compare them against one.
+
+Usage:
+    python testing/ledger_generator.py --manifest /tmp/ledger.json
+    python testing/load_test.py --manifest /tmp/ledger.json --concurrency 16 \\
+        --duration 60 --save-baseline local
+    python testing/load_test.py --manifest /tmp/ledger.json --rate 200 \\
+        --duration 60 --compare local
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+import requests
+
+from ledger_generator import ACCOUNT_MIX, ZipfPicker
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+DEFAULT_MIX = "login=1,list=30,get=25,post=25,void=4,report=15"
+
+
+class Recorder:
+    """
+    Thread-safe latency and error collection keyed by endpoint.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    def record(self, endpoint, seconds, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            self.latencies[endpoint].append(seconds * 1000)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        with self.lock:
+            every = []
+            for endpoint, samples in sorted(self.latencies.items()):
+                endpoints[endpoint] = _stats(samples, self.errors[endpoint], elapsed)
+                every.extend(samples)
+            total = _stats(every, sum(self.errors.values()), elapsed)
+        return {"total": total, "endpoints": endpoints}
+
+
+def _percentile(ordered, pct):
+    # Nearest-rank percentile
+    if not ordered:
+        return None
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return round(ordered[min(rank, len(ordered)) - 1], 2)
+
+
+def _stats(samples, errors, elapsed):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else None,
+        "p50_ms": _percentile(ordered, 50),
+        "p95_ms": _percentile(ordered, 95),
+        "p99_ms": _percentile(ordered, 99),
+        "max_ms": round(ordered[-1], 2) if ordered else None,
+    }
+
+
+class Workload:
+    """
+    Shared state for the operations: the API session per thread, the hot
+    account pickers and a pool of recently posted transaction ids.
+    """
+
+    def __init__(self, args, recorder):
+        self.base_url = args.base_url.rstrip("/")
+        self.username = args.username
+        self.password = args.password
+        self.timeout = args.timeout
+        self.recorder = recorder
+        self.local = threading.local()
+        self.posted = deque(maxlen=10000)
+        self.posted_lock = threading.Lock()
+        self.pickers = {}
+        self.all_accounts = None
+        self.token = None
+        self.token_lock = threading.Lock()
+
+    # HTTP helpers
+
+    @property
+    def http(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def call(self, endpoint, method, path, **kwargs):
+        started = kwargs.pop("started", None) or time.perf_counter()
+        headers = kwargs.pop("headers") if "headers" in kwargs else None
+        if headers is None:
+            headers = self.auth_headers()
+        try:
+            response = self.http.request(
+                method,
+                f"{self.base_url}{path}",
+                headers=headers,
+                timeout=self.timeout,
+                **kwargs,
+            )
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.record(endpoint, time.perf_counter() - started, ok)
+        if response is not None and response.status_code == 401:
+            self.login()
+        return response if ok else None
+
+    def login(self, started=None):
+        response = self.call(
+            "POST /api/login",
+            "POST",
+            "/api/login",
+            json={"username": self.username, "password": self.password},
+            headers={},
+            started=started,
+        )
+        if response is not None:
+            with self.token_lock:
+                self.token = response.json()["token"]
+        return response
+
+    def auth_headers(self):
+        with self.token_lock:
+            return {"Authorization": f"Bearer {self.token}"}
+
+    # Setup
+
+    def prepare(self, manifest, skew, seed):
+        if self.login() is None:
+            raise SystemExit(f"Cannot log in to {self.base_url} as {self.username}")
+        if manifest:
+            with open(manifest, encoding="utf-8") as fh:
+                by_type = json.load(fh)["accounts"]
+        else:
+            by_type = defaultdict(list)
+            page = 1
+            while True:
+                response = self.http.get(
+                    f"{self.base_url}/api/accounts",
+                    params={"page": page, "per_page": 500},
+                    headers=self.auth_headers(),
+                    timeout=self.timeout,
+                )
+                response.raise_for_status()
+                rows = response.json()
+                for row in rows:
+                    by_type[row["type"]].append(row["id"])
+                if len(rows) < 500:
+                    break
+                page += 1
+            # Without a manifest the hot accounts are a seeded shuffle
+            shuffler = random.Random(seed)
+            for ids in by_type.values():
+                ids.sort()
+                shuffler.shuffle(ids)
+        for account_type in ACCOUNT_MIX:
+            if by_type.get(account_type):
+                self.pickers[account_type] = ZipfPicker(by_type[account_type], skew)
+        self.all_accounts = ZipfPicker(
+            [i for t in ACCOUNT_MIX for i in by_type.get(t, [])], skew
+        )
+        if not self.pickers.get("ASSET") or len(self.all_accounts.items) < 2:
+            raise SystemExit("Load the ledger first: testing/ledger_generator.py")
+
+    # Operations
+
+    def op_login(self, rng, started):
+        self.login(started)
+
+    def op_list(self, rng, started):
+        params = {"page": 1 + int(rng.expovariate(1.0)), "per_page": 20}
+        if rng.random() < 0.15:
+            self.call(
+                "GET /api/accounts",
+                "GET",
+                "/api/accounts",
+                params=params,
+                started=started,
+            )
+            return
+        if rng.random() < 0.7:
+            params["account_id"] = self.all_accounts.pick(rng)
+        if rng.random() < 0.3:
+            params["start_date"] = (date.today() - timedelta(days=30)).isoformat()
+        self.call(
+            "GET /api/transactions",
+            "GET",
+            "/api/transactions",
+            params=params,
+            started=started,
+        )
+
+    def op_get(self, rng, started):
+        tx_id = self._posted_id(rng)
+        if tx_id and rng.random() < 0.6:
+            self.call(
+                "GET /api/transactions/<id>",
+                "GET",
+                f"/api/transactions/{tx_id}",
+                started=started,
+            )
+        else:
+            account_id = self.all_accounts.pick(rng)
+            self.call(
+                "GET /api/accounts/<id>",
+                "GET",
+                f"/api/accounts/{account_id}",
+                started=started,
+            )
+
+    def op_post(self, rng, started):
+        # Deposits into hot asset accounts never overdraw, so errors here are
+        # server-side failures rather than business rule rejections.
+        account_id = self.pickers["ASSET"].pick(rng)
+        contra_type = rng.choice(
+            [t for t in ("INCOME", "LIABILITY", "ASSET") if t in self.pickers]
+        )
+        contra_id = self.pickers[contra_type].pick(rng, exclude=account_id)
+        if contra_id == account_id:
+            return
+        response = self.call(
+            "POST /api/transactions",
+            "POST",
+            "/api/transactions",
+            json={
+                "account_id": account_id,
+                "contra_account_id": contra_id,
+                "transaction_date": date.today().isoformat(),
+                "amount": f"{rng.randrange(100, 200000) / 100:.2f}",
+                "description": "Load test entry",
+                "reference_number": f"LOAD-{rng.getrandbits(32):08x}",
+            },
+            started=started,
+        )
+        if response is not None:
+            with self.posted_lock:
+                self.posted.append(response.json()["transaction"]["id"])
+
+    def op_void(self, rng, started):
+        with self.posted_lock:
+            tx_id = self.posted.popleft() if self.posted else None
+        if tx_id is None:
+            self.op_post(rng, started)
+            return
+        self.call(
+            "POST /api/transactions/<id>/void",
+            "POST",
+            f"/api/transactions/{tx_id}/void",
+            started=started,
+        )
+
+    def op_report(self, rng, started):
+        if rng.random() < 0.5:
+            self.call(
+                "GET /api/reports/balance",
+                "GET",
+                "/api/reports/balance",
+                started=started,
+            )
+            return
+        end = date.today() - timedelta(days=rng.randrange(365))
+        start = end - timedelta(days=rng.choice((7, 30, 90, 365)))
+        self.call(
+            "GET /api/reports/profit-loss",
+            "GET",
+            "/api/reports/profit-loss",
+            params={"start_date": start.isoformat(), "end_date": end.isoformat()},
+            started=started,
+        )
+
+    def _posted_id(self, rng):
+        with self.posted_lock:
+            if not self.posted:
+                return None
+            return self.posted[rng.randrange(len(self.posted))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(Workload, f"op_{name}"):
+            raise argparse.ArgumentTypeError(f"Unknown operation: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def run_closed_loop(workload, mix, args, recorder):
+    names, weights = list(mix), list(mix.values())
+    stop_at = time.monotonic() + args.warmup + args.duration
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        while time.monotonic() < stop_at:
+            name = rng.choices(names, weights=weights)[0]
+            getattr(workload, f"op_{name}")(rng, None)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    _measure(args, recorder)
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(workload, mix, args, recorder):
+    names, weights = list(mix), list(mix.values())
+    rng = random.Random(args.seed)
+    stop_at = time.perf_counter() + args.warmup + args.duration
+    measuring = threading.Thread(target=_measure, args=(args, recorder))
+    measuring.start()
+    with ThreadPoolExecutor(max_workers=args.max_workers) as pool:
+        next_at = time.perf_counter()
+        while next_at < stop_at:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            name = rng.choices(names, weights=weights)[0]
+            op_rng = random.Random(rng.getrandbits(64))
+            pool.submit(getattr(workload, f"op_{name}"), op_rng, next_at)
+            next_at += rng.expovariate(args.rate)
+    measuring.join()
+
+
+def _measure(args, recorder):
+    time.sleep(args.warmup)
+    recorder.recording = True
+    time.sleep(args.duration)
+    recorder.recording = False
+
+
+def compare(results, baseline, max_regression):
+    """
+    Print per-endpoint deltas against a baseline and return the endpoints
+    whose p95 latency or error rate got worse than allowed.
+    """
+    regressions = []
+    print(f"\n{'endpoint':34} {'p95 base':>10} {'p95 now':>10} {'delta':>8}")
+    for endpoint, now in results["endpoints"].items():
+        base = baseline["endpoints"].get(endpoint)
+        if not base or not base["p95_ms"] or not now["p95_ms"]:
+            continue
+        delta = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+        print(
+            f"{endpoint:34} {base['p95_ms']:>10.2f} {now['p95_ms']:>10.2f} "
+            f"{delta:>+7.1f}%"
+        )
+        base_error_rate = base["errors"] / base["count"] if base["count"] else 0
+        error_rate = now["errors"] / now["count"] if now["count"] else 0
+        if delta > max_regression or error_rate > base_error_rate + 0.01:
+            regressions.append(endpoint)
+    return regressions
+
+
+def print_results(results):
+    print(
+        f"\n{'endpoint':34} {'count':>7} {'err':>5} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    rows = list(results["endpoints"].items()) + [("TOTAL", results["total"])]
+    for endpoint, s in rows:
+        print(
+            f"{endpoint:34} {s['count']:>7} {s['errors']:>5} "
+            f"{s['throughput_rps']:>8.1f} {s['p50_ms'] or 0:>8.1f} "
+            f"{s['p95_ms'] or 0:>8.1f} {s['p99_ms'] or 0:>8.1f}"
+        )
+
+
+def _baseline_path(name):
+    if os.sep in name or name.endswith(".json"):
+        return name
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--base-url", default=os.environ.get("LOAD_BASE_URL", "http://localhost:8000")
+    )
+    parser.add_argument("--username", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument(
+        "--manifest", help="Account manifest written by ledger_generator.py"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix(DEFAULT_MIX),
+        help=f"Operation weights (default: {DEFAULT_MIX})",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=8)
+    mode.add_argument(
+        "--rate", type=float, help="Open-loop arrival rate in requests per second"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=64,
+        help="Thread pool size for --rate mode",
+    )
+    parser.add_argument("--duration", type=float, default=30, help="Seconds measured")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds discarded")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results JSON to this path")
+    parser.add_argument(
+        "--save-baseline", metavar="NAME", help="Store results as a baseline"
+    )
+    parser.add_argument(
+        "--compare", metavar="NAME", help="Compare against a stored baseline"
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=20,
+        help="Allowed p95 increase in percent before --compare fails",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    recorder = Recorder()
+    workload = Workload(args, recorder)
+    workload.prepare(args.manifest, args.skew, args.seed)
+
+    if args.rate:
+        run_open_loop(workload, args.mix, args, recorder)
+    else:
+        run_closed_loop(workload, args.mix, args, recorder)
+
+    results = {
+        "meta": {
+            "base_url": args.base_url,
+            "mode": "rate" if args.rate else "concurrency",
+            "rate": args.rate,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        },
+        **recorder.summary(args.duration),
+    }
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.save_baseline:
+        path = _baseline_path(args.save_baseline)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"\nBaseline saved to {path}")
+    if args.compare:
+        with open(_baseline_path(args.compare), encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print(
+                f"\nRegressed beyond {args.max_regression}%: {', '.join(regressions)}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())